@@ -9,12 +9,16 @@ import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Header, status
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, status
 from pydantic import BaseModel, Field
 
 from app.auth.crypto import token_hash
 from app.auth.rbac import AuthContext, require_roles
+from app.auth.session_cache import get_session_cache
 from app.auth.settings import load_settings
+from app.auth.storage import bump_cache_epoch
+from app.services.audit_query import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, query_audit
+from app.services.audit_sink import SqliteAuditTarget, flush_audit, get_audit_sink
 
 
 router = APIRouter(dependencies=[Depends(forbid_moderator)], prefix="/admin", tags=["admin"])
@@ -52,26 +56,6 @@ def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
     return row is not None
 
 
-def _ensure_auth_audit_table(conn: sqlite3.Connection) -> None:
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS auth_audit_events (
-            event_id TEXT PRIMARY KEY,
-            at TEXT NOT NULL,
-            action TEXT NOT NULL,
-            result TEXT NOT NULL,
-            actor_user_id TEXT NOT NULL,
-            target_user_id TEXT NOT NULL,
-            details_json TEXT NOT NULL
-        );
-        """
-    )
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_auth_audit_at ON auth_audit_events(at);")
-    conn.execute(
-        "CREATE INDEX IF NOT EXISTS idx_auth_audit_target ON auth_audit_events(target_user_id);"
-    )
-
-
 def _ensure_admin_step_up_table(conn: sqlite3.Connection) -> None:
     conn.execute(
         """
@@ -111,78 +95,67 @@ def _normalize_admin_step_up_ttl(ttl_seconds: int) -> int:
     return max(ADMIN_STEP_UP_TTL_MIN_SECONDS, min(ttl, ADMIN_STEP_UP_TTL_MAX_SECONDS))
 
 
+_AUDIT_EVENTS_TARGETS: Dict[str, Any] = {}
+
+
+def _audit_events_mapping(cols: List[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+    """audit_events-Spalte -> payload-Key; None, wenn Pflichtspalten nicht abgedeckt sind."""
+    names = [c["name"] for c in cols]
+    mapping: Dict[str, str] = {}
+
+    def pick(candidates: tuple, key: str) -> None:
+        for name in candidates:
+            if name in names:
+                mapping[name] = key
+                return
+
+    pick(("event_id", "id"), "event_id")
+    pick(("at", "created_at", "ts"), "at")
+    pick(("action", "event_type", "type"), "action")
+    pick(("result", "status"), "result")
+    pick(("actor_user_id", "actor_id"), "actor_user_id")
+    pick(("target_user_id", "target_id"), "target_user_id")
+    pick(("details_json", "meta_json", "meta"), "details_json")
+
+    # Wenn praktisch nichts gemappt werden konnte: abbrechen
+    if len(mapping) < 3:
+        return None
+    # NOT NULL ohne Default, die wir nicht füllen (z.B. MasterClipboard-audit_events): jeder Insert scheitert
+    for c in cols:
+        if c["notnull"] and c["dflt_value"] is None and not c["pk"] and c["name"] not in mapping:
+            return None
+    return mapping
+
+
+def _audit_events_target(conn: sqlite3.Connection) -> Any:
+    # Spalten-Mapping einmal pro DB-Datei (statt sqlite_master + PRAGMA pro Insert)
+    db_path = conn.execute("PRAGMA database_list;").fetchone()["file"]
+    if db_path in _AUDIT_EVENTS_TARGETS:
+        return _AUDIT_EVENTS_TARGETS[db_path]
+    if not _table_exists(conn, "audit_events"):
+        return None
+
+    cols = [dict(r) for r in conn.execute("PRAGMA table_info(audit_events);").fetchall()]
+    mapping = _audit_events_mapping(cols)
+    target = None
+    if mapping is not None and db_path:
+        target = (SqliteAuditTarget(db_path, "audit_events", list(mapping)), mapping)
+    _AUDIT_EVENTS_TARGETS[db_path] = target
+    return target
+
+
 def _best_effort_insert_into_audit_events(conn: sqlite3.Connection, payload: Dict[str, Any]) -> None:
     """
     Best effort: wenn es bereits eine audit_events Tabelle gibt (z.B. aus dem Hauptsystem),
     versuchen wir kompatibel zu schreiben, ohne Schema-Annahmen zu erzwingen.
+    Write-Behind über den Audit-Sink (conn nur für sync/Back-Pressure, hält die Admin-TX).
     """
-    if not _table_exists(conn, "audit_events"):
-        return
-
-    cols = [r["name"] for r in conn.execute("PRAGMA table_info(audit_events);").fetchall()]
-    if not cols:
+    resolved = _audit_events_target(conn)
+    if resolved is None:
         return
-
-    values: Dict[str, Any] = {}
-
-    # IDs
-    if "event_id" in cols:
-        values["event_id"] = payload["event_id"]
-    elif "id" in cols:
-        values["id"] = payload["event_id"]
-
-    # Zeit
-    if "at" in cols:
-        values["at"] = payload["at"]
-    elif "created_at" in cols:
-        values["created_at"] = payload["at"]
-    elif "ts" in cols:
-        values["ts"] = payload["at"]
-
-    # Typ/Aktion
-    if "action" in cols:
-        values["action"] = payload["action"]
-    elif "event_type" in cols:
-        values["event_type"] = payload["action"]
-    elif "type" in cols:
-        values["type"] = payload["action"]
-
-    # Result
-    if "result" in cols:
-        values["result"] = payload["result"]
-    elif "status" in cols:
-        values["status"] = payload["result"]
-
-    # Actor/Target
-    if "actor_user_id" in cols:
-        values["actor_user_id"] = payload["actor_user_id"]
-    elif "actor_id" in cols:
-        values["actor_id"] = payload["actor_user_id"]
-
-    if "target_user_id" in cols:
-        values["target_user_id"] = payload["target_user_id"]
-    elif "target_id" in cols:
-        values["target_id"] = payload["target_user_id"]
-
-    # Meta
-    meta_json = payload.get("details_json", "{}")
-    if "details_json" in cols:
-        values["details_json"] = meta_json
-    elif "meta_json" in cols:
-        values["meta_json"] = meta_json
-    elif "meta" in cols:
-        values["meta"] = meta_json
-
-    # Wenn praktisch nichts gemappt werden konnte: abbrechen
-    if len(values) < 3:
-        return
-
-    col_list = ", ".join(values.keys())
-    placeholders = ", ".join(["?"] * len(values))
-    conn.execute(
-        f"INSERT INTO audit_events ({col_list}) VALUES ({placeholders});",
-        tuple(values.values()),
-    )
+    target, mapping = resolved
+    row = {col: payload[key] for col, key in mapping.items()}
+    get_audit_sink().emit(target, row, conn=conn)
 
 
 def _audit(
@@ -194,9 +167,8 @@ def _audit(
     details: Dict[str, Any],
 ) -> None:
     """
-    Audit ohne Klartext-PII. Keine Secrets.
+    Audit ohne Klartext-PII. Keine Secrets. auth_audit_events legt app.auth.storage.init_db an.
     """
-    _ensure_auth_audit_table(conn)
     payload = {
         "event_id": str(uuid.uuid4()),
         "at": _utc_now_iso(),
@@ -424,6 +396,20 @@ class VipBusinessListRow(BaseModel):
     staff_count: int = 0
 
 
+class AuditEventRow(BaseModel):
+    # PII-safe Projektion: keine Actor-IDs, Request-IDs, Metadaten/Payloads
+    source: str
+    event_id: str
+    at: Optional[str] = None
+    action: str
+    result: Optional[str] = None
+    module: Optional[str] = None
+    actor_role: Optional[str] = None
+    target_type: Optional[str] = None
+    target_id: Optional[str] = None
+    reason: Optional[str] = None
+
+
 class RoleSetResponse(BaseModel):
     ok: bool
     user_id: str
@@ -533,6 +519,12 @@ def _apply_role_change(
         },
     )
 
+    # Rolle ist Teil des Session-Caches: andere Worker über auth_cache_epoch, dann committen, dann invalidieren
+    if _table_exists(conn, "auth_cache_epoch"):
+        bump_cache_epoch(conn)
+    conn.commit()
+    get_session_cache().invalidate_user(user_id)
+
     return RoleSetResponse(
         ok=True,
         user_id=user_id,
@@ -565,6 +557,47 @@ def admin_list_vip_businesses(_: AuthContext = Depends(require_roles("admin", "s
         return _list_vip_businesses(conn)
 
 
+@router.get("/audit", response_model=List[AuditEventRow])
+def admin_query_audit(
+    source: str = Query(default="auth"),
+    action: Optional[str] = Query(default=None),
+    result: Optional[str] = Query(default=None),
+    target_id: Optional[str] = Query(default=None),
+    module: Optional[str] = Query(default=None),
+    since: Optional[datetime] = Query(default=None),
+    until: Optional[datetime] = Query(default=None),
+    after: Optional[str] = Query(default=None),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    flush: bool = Query(default=False),
+    _: AuthContext = Depends(require_roles("superadmin")),
+):
+    """
+    Audit-Abfrage über eine Quelle (auth|admin|events|sale_transfer|export), neueste zuerst.
+    Keyset-Pagination: after = event_id des letzten Eintrags der vorigen Seite.
+    flush=true: Write-Behind-Queue vorher schreiben (nur auf Anfrage, blockiert bis zu 1 s).
+    """
+    settings = load_settings()
+    if flush:
+        flush_audit(timeout=1.0)
+    try:
+        return query_audit(
+            source,
+            db_path=settings.db_path,
+            action=action,
+            result=result,
+            target_id=target_id,
+            module=module,
+            since=since,
+            until=until,
+            after=after,
+            limit=limit,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid_audit_source")
+    except KeyError:
+        raise HTTPException(status_code=400, detail="invalid_cursor")
+
+
 @router.post("/step-up/grant", response_model=AdminStepUpGrantResponse)
 def admin_grant_step_up(
     body: AdminStepUpGrantRequest,
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import json
 import uuid
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 
+from app.services.audit_sink import SqliteAuditTarget, get_audit_sink
+
 from .storage import audit_insert
 
 
@@ -52,6 +55,32 @@ def sanitize_meta(meta: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     return out or None
 
 
+AUTH_AUDIT_COLUMNS = (
+    "event_id",
+    "created_at",
+    "actor_id",
+    "actor_role",
+    "action",
+    "target_type",
+    "target_id",
+    "scope",
+    "result",
+    "request_id",
+    "correlation_id",
+    "reason_code",
+    "redacted_metadata",
+)
+
+_TARGETS: Dict[str, SqliteAuditTarget] = {}
+
+
+def _target(db_path: str) -> SqliteAuditTarget:
+    t = _TARGETS.get(db_path)
+    if t is None:
+        t = _TARGETS[db_path] = SqliteAuditTarget(db_path, "auth_audit", AUTH_AUDIT_COLUMNS)
+    return t
+
+
 def write_audit(
     conn,
     *,
@@ -66,20 +95,50 @@ def write_audit(
     correlation_id: Optional[str] = None,
     reason_code: Optional[str] = None,
     redacted_metadata: Optional[Dict[str, Any]] = None,
+    db_path: Optional[str] = None,
+    critical: Optional[bool] = None,
 ) -> None:
-    audit_insert(
-        conn,
-        event_id=str(uuid.uuid4()),
-        created_at=_utc_iso(),
-        actor_id=actor_id,
-        actor_role=actor_role,
-        action=action,
-        target_type=target_type,
-        target_id=target_id,
-        scope=scope,
-        result=result,
-        request_id=request_id,
-        correlation_id=correlation_id,
-        reason_code=reason_code,
-        redacted_metadata=sanitize_meta(redacted_metadata),
-    )
+    """
+    Ohne db_path: Insert direkt über conn (bisheriges Verhalten).
+    Mit db_path: über den Audit-Sink; Denials/Fehler sind security-kritisch und werden
+    synchron geschrieben (in conn, falls übergeben), Erfolge per Write-Behind.
+    conn=None nur, wenn der Aufrufer den Writer-Lock nicht hält.
+    """
+    if db_path is None:
+        audit_insert(
+            conn,
+            event_id=str(uuid.uuid4()),
+            created_at=_utc_iso(),
+            actor_id=actor_id,
+            actor_role=actor_role,
+            action=action,
+            target_type=target_type,
+            target_id=target_id,
+            scope=scope,
+            result=result,
+            request_id=request_id,
+            correlation_id=correlation_id,
+            reason_code=reason_code,
+            redacted_metadata=sanitize_meta(redacted_metadata),
+        )
+        return
+
+    meta = sanitize_meta(redacted_metadata)
+    row = {
+        "event_id": str(uuid.uuid4()),
+        "created_at": _utc_iso(),
+        "actor_id": actor_id,
+        "actor_role": actor_role,
+        "action": action,
+        "target_type": target_type,
+        "target_id": target_id,
+        "scope": scope,
+        "result": result,
+        "request_id": request_id,
+        "correlation_id": correlation_id,
+        "reason_code": reason_code,
+        "redacted_metadata": json.dumps(meta, ensure_ascii=False) if meta else None,
+    }
+    if critical is None:
+        critical = result != "success"
+    get_audit_sink().emit(_target(db_path), row, critical=critical, conn=conn)
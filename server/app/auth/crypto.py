@@ -1,11 +1,11 @@
 from __future__ import annotations
 
 import base64
-import hmac
 import os
 import secrets
 import unicodedata
-from hashlib import sha256
+
+from app.core.keyring import prekeyed_hmac
 
 
 def normalize_email(email: str) -> str:
@@ -14,7 +14,10 @@ def normalize_email(email: str) -> str:
 
 
 def hmac_sha256_base64url(secret_key: str, value: str) -> str:
-    mac = hmac.new(secret_key.encode("utf-8"), value.encode("utf-8"), sha256).digest()
+    # Secret kommt aus den Settings (Zweck "auth.lookup", Ableitung "raw"); Key-Schedule gecacht
+    h = prekeyed_hmac(secret_key.encode("utf-8")).copy()
+    h.update(value.encode("utf-8"))
+    mac = h.digest()
     return base64.urlsafe_b64encode(mac).decode("utf-8").rstrip("=")
 
 
@@ -1,38 +1,14 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
+from app.core.rate_limit_backends import check_rate_limit
 
-from .storage import rate_limit_get, rate_limit_set
 
-
-def _utc_now() -> datetime:
-    return datetime.now(timezone.utc)
-
-
-def _iso(dt: datetime) -> str:
-    return dt.astimezone(timezone.utc).isoformat()
-
-
-def check_and_inc(conn, key: str, window_seconds: int, limit: int) -> bool:
+def check_and_inc(db_path: str, key: str, window_seconds: int, limit: int) -> bool:
     """
     True = erlaubt, False = blockiert
-    Simple fixed window counter in SQLite.
+    Sliding-Window-Counter über das gemeinsame Rate-Limit-Backend
+    (auto: eigene Tabelle in der Auth-DB-Datei, ohne den Auth-Writer-Lock).
+    Fail-closed: Backend-Ausfall blockiert (Login/OTP-Versuche).
+    Nicht innerhalb einer offenen db()-Transaktion aufrufen.
     """
-    now = _utc_now()
-    row = rate_limit_get(conn, key)
-    if row is None:
-        rate_limit_set(conn, key, _iso(now), 1)
-        return True
-
-    window_start = datetime.fromisoformat(row["window_start"])
-    count = int(row["count"])
-
-    if now - window_start >= timedelta(seconds=window_seconds):
-        rate_limit_set(conn, key, _iso(now), 1)
-        return True
-
-    if count >= limit:
-        return False
-
-    rate_limit_set(conn, key, _iso(window_start), count + 1)
-    return True
+    return check_rate_limit(key, limit=limit, window_seconds=window_seconds, sqlite_path=db_path, fail_open=False)
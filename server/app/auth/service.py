@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Tuple
+from typing import Any, Optional, Tuple
 
 from .audit import write_audit
 from .crypto import (
@@ -15,10 +15,13 @@ from .crypto import (
 )
 from .mailer import get_mailer
 from .rate_limit import check_and_inc
+from .session_cache import get_session_cache
 from .settings import AuthSettings
 from .storage import (
     init_db,
     db,
+    db_read,
+    get_cache_epoch,
     upsert_user,
     get_user_by_email_hmac,
     insert_challenge,
@@ -57,40 +60,32 @@ def request_challenge(
     e_h = email_hmac_fn(settings.secret_key, email)
     ip_h = ip_hmac_fn(settings.secret_key, ip)
 
-    with db(settings.db_path) as conn:
-        # Rate limits (request)
-        if not check_and_inc(conn, f"rl:req:email:{e_h}", settings.rl_window_seconds, settings.rl_req_per_email):
-            write_audit(
-                conn,
-                actor_id="public",
-                actor_role="public",
-                action="AUTH_CHALLENGE_CREATED",
-                target_type="USER",
-                target_id=None,
-                scope="public",
-                result="denied",
-                request_id=request_id,
-                reason_code="RATE_LIMIT",
-                redacted_metadata={"kind": "auth_request", "key": "email"},
-            )
-            return (str(uuid.uuid4()), None)
-
-        if not check_and_inc(conn, f"rl:req:ip:{ip_h}", settings.rl_window_seconds, settings.rl_req_per_ip):
-            write_audit(
-                conn,
-                actor_id="public",
-                actor_role="public",
-                action="AUTH_CHALLENGE_CREATED",
-                target_type="USER",
-                target_id=None,
-                scope="public",
-                result="denied",
-                request_id=request_id,
-                reason_code="RATE_LIMIT",
-                redacted_metadata={"kind": "auth_request", "key": "ip"},
-            )
-            return (str(uuid.uuid4()), None)
+    # Rate limits (request) – vor dem Writer-Lock; IP wird nur gezählt, wenn email erlaubt ist
+    denied_key: Optional[str] = None
+    if not check_and_inc(settings.db_path, f"rl:req:email:{e_h}", settings.rl_window_seconds, settings.rl_req_per_email):
+        denied_key = "email"
+    elif not check_and_inc(settings.db_path, f"rl:req:ip:{ip_h}", settings.rl_window_seconds, settings.rl_req_per_ip):
+        denied_key = "ip"
 
+    if denied_key is not None:
+        # Denial: synchron (security-kritisch), eigener Writer-Zugriff im Sink
+        write_audit(
+            None,
+            db_path=settings.db_path,
+            actor_id="public",
+            actor_role="public",
+            action="AUTH_CHALLENGE_CREATED",
+            target_type="USER",
+            target_id=None,
+            scope="public",
+            result="denied",
+            request_id=request_id,
+            reason_code="RATE_LIMIT",
+            redacted_metadata={"kind": "auth_request", "key": denied_key},
+        )
+        return (str(uuid.uuid4()), None)
+
+    with db(settings.db_path) as conn:
         # user upsert (ohne Klartext-Email)
         user_row = get_user_by_email_hmac(conn, e_h)
         if user_row is None:
@@ -118,6 +113,7 @@ def request_challenge(
 
         write_audit(
             conn,
+            db_path=settings.db_path,
             actor_id="public",
             actor_role="public",
             action="AUTH_CHALLENGE_CREATED",
@@ -134,34 +130,34 @@ def request_challenge(
         mailer = get_mailer(settings)
         mailer.send_login_otp(to_email=email, otp=otp, challenge_id=challenge_id)
 
-        with db(settings.db_path) as conn2:
-            write_audit(
-                conn2,
-                actor_id="public",
-                actor_role="public",
-                action="AUTH_CHALLENGE_DELIVERED",
-                target_type="USER",
-                target_id=user_id,
-                scope="public",
-                result="success",
-                request_id=request_id,
-                redacted_metadata={"kind": "auth_delivery"},
-            )
+        write_audit(
+            None,
+            db_path=settings.db_path,
+            actor_id="public",
+            actor_role="public",
+            action="AUTH_CHALLENGE_DELIVERED",
+            target_type="USER",
+            target_id=user_id,
+            scope="public",
+            result="success",
+            request_id=request_id,
+            redacted_metadata={"kind": "auth_delivery"},
+        )
     except Exception:
         # Keine Details loggen/ausgeben (keine Secrets/PII).
-        with db(settings.db_path) as conn3:
-            write_audit(
-                conn3,
-                actor_id="public",
-                actor_role="public",
-                action="AUTH_CHALLENGE_DELIVERY_FAILED",
-                target_type="USER",
-                target_id=user_id,
-                scope="public",
-                result="error",
-                request_id=request_id,
-                redacted_metadata={"kind": "auth_delivery"},
-            )
+        write_audit(
+            None,
+            db_path=settings.db_path,
+            actor_id="public",
+            actor_role="public",
+            action="AUTH_CHALLENGE_DELIVERY_FAILED",
+            target_type="USER",
+            target_id=user_id,
+            scope="public",
+            result="error",
+            request_id=request_id,
+            redacted_metadata={"kind": "auth_delivery"},
+        )
 
     dev_otp = otp if settings.dev_expose_otp else None
     return (challenge_id, dev_otp)
@@ -186,149 +182,192 @@ def verify_challenge_and_create_session(
     e_h = email_hmac_fn(settings.secret_key, email)
     ip_h = ip_hmac_fn(settings.secret_key, ip)
 
+    # rate limit verify by ip (vor dem Writer-Lock)
+    if not check_and_inc(settings.db_path, f"rl:verify:ip:{ip_h}", settings.rl_window_seconds, settings.rl_verify_per_ip):
+        write_audit(
+            None,
+            db_path=settings.db_path,
+            actor_id="public",
+            actor_role="public",
+            action="AUTH_CHALLENGE_VERIFIED",
+            target_type="USER",
+            target_id=None,
+            scope="public",
+            result="denied",
+            request_id=request_id,
+            reason_code="RATE_LIMIT",
+            redacted_metadata={"kind": "auth_verify", "key": "ip"},
+        )
+        raise ValueError("RATE_LIMIT")
+
+    denied: Optional[_Denied] = None
     with db(settings.db_path) as conn:
-        # rate limit verify by ip
-        if not check_and_inc(conn, f"rl:verify:ip:{ip_h}", settings.rl_window_seconds, settings.rl_verify_per_ip):
-            write_audit(
-                conn,
-                actor_id="public",
-                actor_role="public",
-                action="AUTH_CHALLENGE_VERIFIED",
-                target_type="USER",
-                target_id=None,
-                scope="public",
-                result="denied",
-                request_id=request_id,
-                reason_code="RATE_LIMIT",
-                redacted_metadata={"kind": "auth_verify", "key": "ip"},
-            )
-            raise ValueError("RATE_LIMIT")
+        try:
+            return _verify_locked(conn, settings, e_h=e_h, challenge_id=challenge_id, otp=otp, request_id=request_id)
+        except _Denied as e:
+            # Versuchszähler + Denial-Audits committen (ein Rollback würde den Lockout aushebeln)
+            denied = e
+    raise denied
 
-        user_row = get_user_by_email_hmac(conn, e_h)
-        if user_row is None:
-            write_audit(
-                conn,
-                actor_id="public",
-                actor_role="public",
-                action="AUTH_CHALLENGE_VERIFIED",
-                target_type="USER",
-                target_id=None,
-                scope="public",
-                result="denied",
-                reason_code="RBAC_DENY",
-                request_id=request_id,
-                redacted_metadata={"kind": "auth_verify", "reason": "user_missing"},
-            )
-            raise ValueError("INVALID")
-
-        user_id = user_row["user_id"]
-        role = user_row["role"]
-
-        ch = get_challenge(conn, challenge_id)
-        if ch is None or ch["email_hmac"] != e_h:
-            write_audit(
-                conn,
-                actor_id="public",
-                actor_role="public",
-                action="AUTH_CHALLENGE_VERIFIED",
-                target_type="USER",
-                target_id=user_id,
-                scope="public",
-                result="denied",
-                reason_code="RBAC_DENY",
-                request_id=request_id,
-                redacted_metadata={"kind": "auth_verify", "reason": "challenge_mismatch"},
-            )
-            raise ValueError("INVALID")
-
-        if ch["used_at"] is not None:
-            raise ValueError("INVALID")
 
-        now = _utc_now()
-        expires_at = datetime.fromisoformat(ch["expires_at"])
-        if now > expires_at:
-            write_audit(
-                conn,
-                actor_id=user_id,
-                actor_role=role,
-                action="AUTH_CHALLENGE_VERIFIED",
-                target_type="USER",
-                target_id=user_id,
-                scope="own",
-                result="denied",
-                reason_code="RBAC_DENY",
-                request_id=request_id,
-                redacted_metadata={"kind": "auth_verify", "reason": "expired"},
-            )
-            raise ValueError("EXPIRED")
-
-        attempts = int(ch["attempts"])
-        if attempts >= 5:
-            raise ValueError("LOCKED")
-
-        expected = otp_hash_fn(settings.secret_key, otp, challenge_id)
-        if expected != ch["otp_hash"]:
-            attempts += 1
-            mark_challenge_attempt(conn, challenge_id, attempts, _iso(now))
-            write_audit(
-                conn,
-                actor_id=user_id,
-                actor_role=role,
-                action="AUTH_CHALLENGE_FAILED",
-                target_type="USER",
-                target_id=user_id,
-                scope="own",
-                result="denied",
-                reason_code="RBAC_DENY",
-                request_id=request_id,
-                redacted_metadata={"kind": "auth_verify", "reason": "otp_invalid"},
-            )
-            raise ValueError("INVALID")
-
-        mark_challenge_used(conn, challenge_id, _iso(now))
-
-        # create session token
-        raw_token = new_session_token()
-        th = token_hash_fn(settings.secret_key, raw_token)
-        session_id = str(uuid.uuid4())
-        sess_expires = now + timedelta(seconds=settings.session_ttl_seconds)
-
-        insert_session(
+class _Denied(ValueError):
+    """Abgelehnte Verifikation: Schreibzugriffe der Transaktion werden trotzdem committet."""
+
+
+def _verify_locked(
+    conn: Any,
+    settings: AuthSettings,
+    *,
+    e_h: str,
+    challenge_id: str,
+    otp: str,
+    request_id: str,
+) -> Tuple[str, str]:
+    # läuft im db()-Writer; Denials als _Denied (Aufrufer committet und wirft weiter)
+    user_row = get_user_by_email_hmac(conn, e_h)
+    if user_row is None:
+        write_audit(
             conn,
-            session_id=session_id,
-            user_id=user_id,
-            token_hash=th,
-            created_at=_iso(now),
-            expires_at=_iso(sess_expires),
+            db_path=settings.db_path,
+            actor_id="public",
+            actor_role="public",
+            action="AUTH_CHALLENGE_VERIFIED",
+            target_type="USER",
+            target_id=None,
+            scope="public",
+            result="denied",
+            reason_code="RBAC_DENY",
+            request_id=request_id,
+            redacted_metadata={"kind": "auth_verify", "reason": "user_missing"},
         )
+        raise _Denied("INVALID")
 
+    user_id = user_row["user_id"]
+    role = user_row["role"]
+
+    ch = get_challenge(conn, challenge_id)
+    if ch is None or ch["email_hmac"] != e_h:
         write_audit(
             conn,
+            db_path=settings.db_path,
+            actor_id="public",
+            actor_role="public",
+            action="AUTH_CHALLENGE_VERIFIED",
+            target_type="USER",
+            target_id=user_id,
+            scope="public",
+            result="denied",
+            reason_code="RBAC_DENY",
+            request_id=request_id,
+            redacted_metadata={"kind": "auth_verify", "reason": "challenge_mismatch"},
+        )
+        raise _Denied("INVALID")
+
+    if ch["used_at"] is not None:
+        raise _Denied("INVALID")
+
+    now = _utc_now()
+    expires_at = datetime.fromisoformat(ch["expires_at"])
+    if now > expires_at:
+        write_audit(
+            conn,
+            db_path=settings.db_path,
             actor_id=user_id,
             actor_role=role,
-            action="SESSION_CREATED",
+            action="AUTH_CHALLENGE_VERIFIED",
             target_type="USER",
             target_id=user_id,
             scope="own",
-            result="success",
+            result="denied",
+            reason_code="RBAC_DENY",
             request_id=request_id,
-            redacted_metadata={"kind": "session_created"},
+            redacted_metadata={"kind": "auth_verify", "reason": "expired"},
         )
+        raise _Denied("EXPIRED")
+
+    attempts = int(ch["attempts"])
+    if attempts >= 5:
+        raise _Denied("LOCKED")
+
+    expected = otp_hash_fn(settings.secret_key, otp, challenge_id)
+    if expected != ch["otp_hash"]:
+        attempts += 1
+        mark_challenge_attempt(conn, challenge_id, attempts, _iso(now))
+        write_audit(
+            conn,
+            db_path=settings.db_path,
+            actor_id=user_id,
+            actor_role=role,
+            action="AUTH_CHALLENGE_FAILED",
+            target_type="USER",
+            target_id=user_id,
+            scope="own",
+            result="denied",
+            reason_code="RBAC_DENY",
+            request_id=request_id,
+            redacted_metadata={"kind": "auth_verify", "reason": "otp_invalid"},
+        )
+        raise _Denied("INVALID")
+
+    mark_challenge_used(conn, challenge_id, _iso(now))
+
+    # create session token
+    raw_token = new_session_token()
+    th = token_hash_fn(settings.secret_key, raw_token)
+    session_id = str(uuid.uuid4())
+    sess_expires = now + timedelta(seconds=settings.session_ttl_seconds)
+
+    insert_session(
+        conn,
+        session_id=session_id,
+        user_id=user_id,
+        token_hash=th,
+        created_at=_iso(now),
+        expires_at=_iso(sess_expires),
+    )
+
+    write_audit(
+        conn,
+        db_path=settings.db_path,
+        actor_id=user_id,
+        actor_role=role,
+        action="SESSION_CREATED",
+        target_type="USER",
+        target_id=user_id,
+        scope="own",
+        result="success",
+        request_id=request_id,
+        redacted_metadata={"kind": "session_created"},
+    )
+
+    return raw_token, _iso(sess_expires)
+
 
-        return raw_token, _iso(sess_expires)
 def resolve_me(settings: AuthSettings, raw_token: str) -> Optional[Tuple[str, str]]:
     init_db(settings.db_path)
 
     # Token wird nur gehasht verwendet (kein Klartext im Storage/Logs)
     th = token_hash_fn(settings.secret_key, raw_token)
 
-    with db(settings.db_path) as conn:
+    cache = get_session_cache()
+
+    # Read-Path: gepoolte Reader-Connection, kein Writer-Lock
+    with db_read(settings.db_path) as conn:
+        # Revokes/Rollenwechsel anderer Worker (ein PK-Read statt Session- + User-Lookup)
+        cache.sync_shared(settings.db_path, get_cache_epoch(conn))
+        cached = cache.get(settings.db_path, th)
+        if cached is not None:
+            return cached
+        epoch = cache.epoch()
+
         sess = get_session_by_token_hash(conn, th)
         if sess is None:
             return None
 
         now = _utc_now()
         exp = datetime.fromisoformat(sess["expires_at"])
+        if exp.tzinfo is None:
+            exp = exp.replace(tzinfo=timezone.utc)
         if now > exp:
             return None
 
@@ -337,7 +376,16 @@ def resolve_me(settings: AuthSettings, raw_token: str) -> Optional[Tuple[str, st
         if user is None:
             return None
 
-        return (user["user_id"], user["role"])
+    cache.put(
+        settings.db_path,
+        th,
+        user["user_id"],
+        user["role"],
+        ttl_seconds=settings.session_cache_ttl_seconds,
+        expires_at=exp.timestamp(),
+        epoch=epoch,
+    )
+    return (user["user_id"], user["role"])
 
 
 def logout(settings: AuthSettings, raw_token: str, request_id: str) -> None:
@@ -354,6 +402,7 @@ def logout(settings: AuthSettings, raw_token: str, request_id: str) -> None:
         revoke_session(conn, th, now)
         write_audit(
             conn,
+            db_path=settings.db_path,
             actor_id=sess["user_id"],
             actor_role="user",
             action="SESSION_REVOKED",
@@ -364,3 +413,6 @@ def logout(settings: AuthSettings, raw_token: str, request_id: str) -> None:
             request_id=request_id,
             redacted_metadata={"kind": "logout"},
         )
+
+    # nach Commit invalidieren (sonst könnte ein paralleler Read den alten Stand wieder cachen)
+    get_session_cache().invalidate_token(th)
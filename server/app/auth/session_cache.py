@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from app.core.ttl_cache import TtlLruCache
+
+
+@dataclass(frozen=True)
+class _Entry:
+    db_path: str
+    user_id: str
+    role: str
+
+
+class SessionCache:
+    """
+    token_hash -> (user_id, role) (app.core.ttl_cache).
+
+    - Einträge laufen spätestens mit expires_at der Session ab
+    - logout/revoke_session und Rollenwechsel invalidieren sofort (im selben Prozess)
+    - andere Prozesse: Zähler auth_cache_epoch in der Auth-DB (sync_shared), gestiegen => leeren
+    """
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self._cache: "TtlLruCache[str, _Entry]" = TtlLruCache(max_entries, group=lambda _k, entry: entry.user_id)
+        self._shared_lock = threading.Lock()
+        self._shared: Dict[str, int] = {}
+
+    def epoch(self) -> int:
+        return self._cache.epoch()
+
+    def sync_shared(self, db_path: str, value: int) -> None:
+        # value = auth_cache_epoch der DB; nur steigende Werte leeren (parallele Reads mit altem Stand)
+        with self._shared_lock:
+            known = self._shared.get(db_path)
+            if known is not None and value <= known:
+                return
+            self._shared[db_path] = value
+        if known is not None:
+            self._cache.clear()
+
+    def get(self, db_path: str, token_hash: str) -> Optional[Tuple[str, str]]:
+        entry = self._cache.get(token_hash)
+        if entry is None or entry.db_path != db_path:
+            return None
+        return (entry.user_id, entry.role)
+
+    def put(
+        self,
+        db_path: str,
+        token_hash: str,
+        user_id: str,
+        role: str,
+        *,
+        ttl_seconds: int,
+        expires_at: float,
+        epoch: int,
+    ) -> None:
+        entry = _Entry(db_path=db_path, user_id=user_id, role=role)
+        self._cache.put(token_hash, entry, ttl=ttl_seconds, expires_at=expires_at, epoch=epoch)
+
+    def invalidate_token(self, token_hash: str) -> None:
+        self._cache.invalidate([token_hash])
+
+    def invalidate_user(self, user_id: str) -> None:
+        self._cache.invalidate_group(user_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        with self._shared_lock:
+            self._shared.clear()
+
+    def stats(self) -> Dict[str, float]:
+        return self._cache.stats()
+
+
+_SESSION_CACHE = SessionCache()
+
+
+def get_session_cache() -> SessionCache:
+    return _SESSION_CACHE
+
+
+def session_cache_stats() -> Dict[str, float]:
+    return _SESSION_CACHE.stats()
@@ -3,6 +3,8 @@ from __future__ import annotations
 import os
 from dataclasses import dataclass
 
+from app.core.config import env_int
+
 
 @dataclass(frozen=True)
 class AuthSettings:
@@ -16,6 +18,12 @@ class AuthSettings:
     otp_ttl_seconds: int = 10 * 60            # 10 Minuten
     session_ttl_seconds: int = 24 * 60 * 60   # 24h
 
+    # Session-Token-Cache vor resolve_me (0 = aus). Der Cache ist pro Prozess: logout und
+    # Rollenwechsel invalidieren lokal sofort, andere Worker beim nächsten resolve_me über den
+    # Zähler auth_cache_epoch (ein PK-Read pro Request). Ohne diesen Zähler (z. B. Rolle direkt
+    # in der DB geändert) gilt der alte Stand in anderen Workern bis zu dieser TTL.
+    session_cache_ttl_seconds: int = 30
+
     # Rate Limits (pro Fenster)
     rl_window_seconds: int = 10 * 60          # 10 Minuten
     rl_req_per_email: int = 5                # /auth/request pro email_hmac
@@ -56,6 +64,8 @@ def load_settings() -> AuthSettings:
     terms_v = (os.getenv("LTC_TERMS_VERSION") or "v1").strip()
     privacy_v = (os.getenv("LTC_PRIVACY_VERSION") or "v1").strip()
 
+    session_cache_ttl = env_int("LTC_SESSION_CACHE_TTL_SECONDS", 30)
+
     mailer_mode = (os.getenv("LTC_MAILER_MODE") or "null").strip().lower()
 
     smtp_host = (os.getenv("LTC_SMTP_HOST") or "").strip() or None
@@ -71,6 +81,7 @@ def load_settings() -> AuthSettings:
     return AuthSettings(
         secret_key=secret,
         db_path=db_path,
+        session_cache_ttl_seconds=session_cache_ttl,
         dev_expose_otp=dev_flag,
         terms_version_required=terms_v,
         privacy_version_required=privacy_v,
@@ -6,119 +6,272 @@ import threading
 from contextlib import contextmanager
 from typing import Any, Dict, Iterator, Optional, Tuple
 
-_DB_LOCK = threading.Lock()
+# Schema-Version (PRAGMA user_version): bei neuen Tabellen/Indizes erhöhen
+_SCHEMA_VERSION = 4
 
+_POOLS_LOCK = threading.Lock()
+_SCHEMA_LOCK = threading.Lock()
+_SCHEMA_READY: set[str] = set()
 
-def _connect(db_path: str) -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path, check_same_thread=False)
+
+def _connect(db_path: str, *, read_only: bool = False) -> sqlite3.Connection:
+    # PRAGMAs nur einmal pro Connection (nicht pro Request)
+    conn = sqlite3.connect(db_path, check_same_thread=read_only)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL;")
-    conn.execute("PRAGMA foreign_keys=ON;")
+    if read_only:
+        conn.execute("PRAGMA query_only=ON;")
+    else:
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA foreign_keys=ON;")
     return conn
 
 
+class _ConnectionPool:
+    """
+    Connections pro DB-Pfad:
+    - genau ein Writer (serialisiert über write_lock)
+    - ein Reader pro Thread (WAL: Reads blockieren weder Writer noch einander)
+    """
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self.write_lock = threading.Lock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._local = threading.local()
+        self._generation = 0
+
+    def writer(self) -> sqlite3.Connection:
+        # Aufrufer hält write_lock
+        if self._writer is None:
+            self._writer = _connect(self.db_path)
+        return self._writer
+
+    def reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.generation == self._generation:
+            return conn
+        if conn is not None:
+            conn.close()
+        conn = _connect(self.db_path, read_only=True)
+        self._local.conn = conn
+        self._local.generation = self._generation
+        return conn
+
+    def close(self) -> None:
+        with self.write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            # Reader gehören ihrem Thread: werden beim nächsten Zugriff bzw. Thread-Ende verworfen
+            self._generation += 1
+
+
+_POOLS: Dict[str, _ConnectionPool] = {}
+
+
+def _pool(db_path: str) -> _ConnectionPool:
+    pool = _POOLS.get(db_path)
+    if pool is not None:
+        return pool
+    with _POOLS_LOCK:
+        pool = _POOLS.get(db_path)
+        if pool is None:
+            pool = _ConnectionPool(db_path)
+            _POOLS[db_path] = pool
+        return pool
+
+
+def close_pools() -> None:
+    """Alle gepoolten Connections schließen (Shutdown/Tests). Schema-Status bleibt erhalten."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
+
+
 @contextmanager
 def db(db_path: str) -> Iterator[sqlite3.Connection]:
-    # WAL + lock für simple konsistente Writes
-    with _DB_LOCK:
-        conn = _connect(db_path)
+    # Writer: serialisiert, commit bei Erfolg, rollback bei Fehler
+    pool = _pool(db_path)
+    with pool.write_lock:
+        conn = pool.writer()
         try:
             yield conn
             conn.commit()
-        finally:
-            conn.close()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+@contextmanager
+def db_read(db_path: str) -> Iterator[sqlite3.Connection]:
+    # Reader: kein globaler Lock, Connection bleibt pro Thread offen (query_only)
+    conn = _pool(db_path).reader()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+
+
+def _schema_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute("PRAGMA user_version;").fetchone()[0])
 
 
 def init_db(db_path: str) -> None:
-    with db(db_path) as conn:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS auth_users (
-                user_id TEXT PRIMARY KEY,
-                email_hmac TEXT NOT NULL UNIQUE,
-                role TEXT NOT NULL DEFAULT 'user',
-                status TEXT NOT NULL DEFAULT 'active',
-                created_at TEXT NOT NULL
-            );
-            """
-        )
+    """
+    Einmaliges Schema-Bootstrap pro Prozess und DB-Pfad.
+    Fast-Path: bereits initialisiert (Prozess-Cache oder user_version) -> keine DDL.
+    """
+    if db_path in _SCHEMA_READY:
+        return
+    with _SCHEMA_LOCK:
+        if db_path in _SCHEMA_READY:
+            return
+        with db(db_path) as conn:
+            version = _schema_version(conn)
+            if version < _SCHEMA_VERSION:
+                _migrate(conn, version)
+                conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION};")
+        _SCHEMA_READY.add(db_path)
+
+
+def _migrate(conn: sqlite3.Connection, version: int) -> None:
+    # Schritte ab der gespeicherten user_version; jeder Schritt ist idempotent
+    if version < 1:
+        _create_schema(conn)
+    if version < 2:
+        # Rate-Limits liegen in rate_limit_counters (app.core.rate_limit_backends)
+        conn.execute("DROP TABLE IF EXISTS auth_rate_limits;")
+    if version < 3:
+        _create_audit_indexes(conn)
+    if version < 4:
+        _create_cache_epoch(conn)
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS auth_users (
+            user_id TEXT PRIMARY KEY,
+            email_hmac TEXT NOT NULL UNIQUE,
+            role TEXT NOT NULL DEFAULT 'user',
+            status TEXT NOT NULL DEFAULT 'active',
+            created_at TEXT NOT NULL
+        );
+        """
+    )
 
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS auth_challenges (
-                challenge_id TEXT PRIMARY KEY,
-                email_hmac TEXT NOT NULL,
-                otp_hash TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                expires_at TEXT NOT NULL,
-                used_at TEXT NULL,
-                attempts INTEGER NOT NULL DEFAULT 0,
-                last_attempt_at TEXT NULL
-            );
-            """
-        )
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_auth_challenges_email ON auth_challenges(email_hmac);")
-
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS auth_sessions (
-                session_id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                token_hash TEXT NOT NULL UNIQUE,
-                created_at TEXT NOT NULL,
-                expires_at TEXT NOT NULL,
-                revoked_at TEXT NULL
-            );
-            """
-        )
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_auth_sessions_user ON auth_sessions(user_id);")
-
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS auth_consents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                doc_type TEXT NOT NULL,
-                doc_version TEXT NOT NULL,
-                accepted_at TEXT NOT NULL,
-                source TEXT NOT NULL,
-                ip_hmac TEXT NULL,
-                ua_hmac TEXT NULL,
-                evidence_hash TEXT NULL
-            );
-            """
-        )
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_auth_consents_user ON auth_consents(user_id);")
-
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS auth_rate_limits (
-                key TEXT PRIMARY KEY,
-                window_start TEXT NOT NULL,
-                count INTEGER NOT NULL
-            );
-            """
-        )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS auth_challenges (
+            challenge_id TEXT PRIMARY KEY,
+            email_hmac TEXT NOT NULL,
+            otp_hash TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            expires_at TEXT NOT NULL,
+            used_at TEXT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_attempt_at TEXT NULL
+        );
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_auth_challenges_email ON auth_challenges(email_hmac);")
 
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS auth_audit (
-                event_id TEXT PRIMARY KEY,
-                created_at TEXT NOT NULL,
-                actor_id TEXT NOT NULL,
-                actor_role TEXT NOT NULL,
-                action TEXT NOT NULL,
-                target_type TEXT NOT NULL,
-                target_id TEXT NULL,
-                scope TEXT NOT NULL,
-                result TEXT NOT NULL,
-                request_id TEXT NOT NULL,
-                correlation_id TEXT NULL,
-                reason_code TEXT NULL,
-                redacted_metadata TEXT NULL
-            );
-            """
-        )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS auth_sessions (
+            session_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            token_hash TEXT NOT NULL UNIQUE,
+            created_at TEXT NOT NULL,
+            expires_at TEXT NOT NULL,
+            revoked_at TEXT NULL
+        );
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_auth_sessions_user ON auth_sessions(user_id);")
+
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS auth_consents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            doc_type TEXT NOT NULL,
+            doc_version TEXT NOT NULL,
+            accepted_at TEXT NOT NULL,
+            source TEXT NOT NULL,
+            ip_hmac TEXT NULL,
+            ua_hmac TEXT NULL,
+            evidence_hash TEXT NULL
+        );
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_auth_consents_user ON auth_consents(user_id);")
+
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS auth_audit (
+            event_id TEXT PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            actor_id TEXT NOT NULL,
+            actor_role TEXT NOT NULL,
+            action TEXT NOT NULL,
+            target_type TEXT NOT NULL,
+            target_id TEXT NULL,
+            scope TEXT NOT NULL,
+            result TEXT NOT NULL,
+            request_id TEXT NOT NULL,
+            correlation_id TEXT NULL,
+            reason_code TEXT NULL,
+            redacted_metadata TEXT NULL
+        );
+        """
+    )
+
+
+def _create_audit_indexes(conn: sqlite3.Connection) -> None:
+    # Admin-Audit (bisher lazy in app.admin.routes angelegt) + (Filter, Zeit, id)-Indizes für app.services.audit_query
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS auth_audit_events (
+            event_id TEXT PRIMARY KEY,
+            at TEXT NOT NULL,
+            action TEXT NOT NULL,
+            result TEXT NOT NULL,
+            actor_user_id TEXT NOT NULL,
+            target_user_id TEXT NOT NULL,
+            details_json TEXT NOT NULL
+        );
+        """
+    )
+    # (at) allein wird vom (at, event_id)-Index abgedeckt
+    conn.execute("DROP INDEX IF EXISTS idx_auth_audit_at;")
+    for ddl in (
+        "CREATE INDEX IF NOT EXISTS idx_auth_audit_target ON auth_audit_events(target_user_id);",
+        "CREATE INDEX IF NOT EXISTS idx_auth_audit_events_q_time ON auth_audit_events(at, event_id);",
+        "CREATE INDEX IF NOT EXISTS idx_auth_audit_events_q_action ON auth_audit_events(action, at, event_id);",
+        "CREATE INDEX IF NOT EXISTS idx_auth_audit_events_q_result ON auth_audit_events(result, at, event_id);",
+        "CREATE INDEX IF NOT EXISTS idx_auth_audit_q_time ON auth_audit(created_at, event_id);",
+        "CREATE INDEX IF NOT EXISTS idx_auth_audit_q_action ON auth_audit(action, created_at, event_id);",
+        "CREATE INDEX IF NOT EXISTS idx_auth_audit_q_result ON auth_audit(result, created_at, event_id);",
+        "CREATE INDEX IF NOT EXISTS idx_auth_audit_q_target_id ON auth_audit(target_id, created_at, event_id);",
+    ):
+        conn.execute(ddl)
+
+
+def _create_cache_epoch(conn: sqlite3.Connection) -> None:
+    # Zähler für Session-Cache-Invalidierung über Prozesse hinweg (app.auth.session_cache)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS auth_cache_epoch (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            value INTEGER NOT NULL
+        );
+        """
+    )
+    conn.execute("INSERT OR IGNORE INTO auth_cache_epoch(id, value) VALUES (1, 0);")
 
 
 def upsert_user(conn: sqlite3.Connection, user_id: str, email_hmac: str, created_at: str) -> None:
@@ -212,6 +365,17 @@ def get_session_by_token_hash(conn: sqlite3.Connection, token_hash: str) -> Opti
 
 def revoke_session(conn: sqlite3.Connection, token_hash: str, revoked_at: str) -> None:
     conn.execute("UPDATE auth_sessions SET revoked_at = ? WHERE token_hash = ?;", (revoked_at, token_hash))
+    bump_cache_epoch(conn)
+
+
+def bump_cache_epoch(conn: sqlite3.Connection) -> None:
+    # in derselben Transaktion wie Revoke/Rollenwechsel: andere Worker leeren ihren Session-Cache
+    conn.execute("UPDATE auth_cache_epoch SET value = value + 1 WHERE id = 1;")
+
+
+def get_cache_epoch(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT value FROM auth_cache_epoch WHERE id = 1;").fetchone()
+    return int(row[0]) if row is not None else 0
 
 
 def insert_consent(
@@ -239,22 +403,6 @@ def list_consents(conn: sqlite3.Connection, user_id: str) -> list[sqlite3.Row]:
     return cur.fetchall()
 
 
-def rate_limit_get(conn: sqlite3.Connection, key: str) -> Optional[sqlite3.Row]:
-    cur = conn.execute("SELECT * FROM auth_rate_limits WHERE key = ? LIMIT 1;", (key,))
-    return cur.fetchone()
-
-
-def rate_limit_set(conn: sqlite3.Connection, key: str, window_start: str, count: int) -> None:
-    conn.execute(
-        """
-        INSERT INTO auth_rate_limits(key, window_start, count)
-        VALUES (?, ?, ?)
-        ON CONFLICT(key) DO UPDATE SET window_start=excluded.window_start, count=excluded.count;
-        """,
-        (key, window_start, count),
-    )
-
-
 def audit_insert(
     conn: sqlite3.Connection,
     event_id: str,
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Tuple
+
+from app.consent.policy import required_consents
+from app.core.config import env_int
+from app.core.ttl_cache import TtlLruCache, engine_scope
+
+_Key = Tuple[int, str, str]  # (DB-Scope, user_id, Policy-Version)
+
+
+def policy_version() -> str:
+    """Stabiler Schlüssel der Pflicht-Dokumente; ändert sich mit jeder Versionserhöhung in policy.py."""
+    return ",".join(sorted(f"{c['doc_type']}:{c['doc_version']}" for c in required_consents()))
+
+
+class ConsentStatusCache:
+    """
+    (DB-Scope, user_id, Policy-Version) -> Pflicht-Consents vorhanden (app.core.ttl_cache).
+
+    - nur positive Ergebnisse: ein fehlender Consent wird immer in der DB nachgesehen
+      (Accept in einem anderen Worker-Prozess wirkt sofort)
+    - record_consents invalidiert den User (im selben Prozess)
+    - neue Policy-Version -> neuer Schlüssel, alte Einträge laufen per LRU/TTL aus
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: int = 300) -> None:
+        self.ttl_seconds = int(ttl_seconds)
+        self._cache: "TtlLruCache[_Key, bool]" = TtlLruCache(max_entries, group=lambda key, _v: key[1])
+
+    def scope(self, bind: Any) -> int:
+        return engine_scope(bind)
+
+    def epoch(self) -> int:
+        return self._cache.epoch()
+
+    def get(self, scope: int, user_id: str, version: str) -> bool:
+        return self._cache.get((scope, user_id, version)) is not None
+
+    def put(self, scope: int, user_id: str, version: str, *, epoch: int) -> None:
+        self._cache.put((scope, user_id, version), True, ttl=self.ttl_seconds, epoch=epoch)
+
+    def invalidate_user(self, user_id: str) -> None:
+        self._cache.invalidate_group(user_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, float]:
+        return {**self._cache.stats(), "ttl_seconds": self.ttl_seconds}
+
+
+# LTC_CONSENT_CACHE_TTL_SECONDS=0 schaltet den Cache ab
+_CONSENT_CACHE = ConsentStatusCache(ttl_seconds=env_int("LTC_CONSENT_CACHE_TTL_SECONDS", 300))
+
+
+def get_consent_cache() -> ConsentStatusCache:
+    return _CONSENT_CACHE
+
+
+def consent_cache_stats() -> Dict[str, float]:
+    return _CONSENT_CACHE.stats()
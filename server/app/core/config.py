@@ -1,3 +1,4 @@
+import os
 from functools import lru_cache
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -21,3 +22,9 @@ def get_settings() -> Settings:
         raise RuntimeError("LTC_SECRET_KEY fehlt (Pflicht).")
 
     return s
+
+
+def env_int(name: str, default: int) -> int:
+    """Ganzzahl >= 0 aus ENV (Limits, TTLs, Intervalle; 0 = aus); leer/ungültig -> default."""
+    raw = (os.getenv(name) or "").strip()
+    return int(raw) if raw.isdigit() else default
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from cryptography.fernet import Fernet, MultiFernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+MIN_SECRET_LEN = 16
+
+
+class KeyringError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Purpose:
+    """
+    Verwendungszweck eines Schlüssels.
+    derivation:
+    - "hkdf":   HKDF-SHA256(secret, info="ltc:<name>") – Standard für neue Zwecke (Key-Separation)
+    - "raw":    HMAC direkt mit dem Secret – nur Altbestand, Werte liegen persistiert in der DB
+    - "sha256": Fernet-Key = b64(sha256(secret)) – Alt-Format bestehender Exports
+    - "label":  HMAC(secret, label) – Alt-Format export.py (Fernet "export|full")
+    """
+
+    name: str
+    derivation: str = "hkdf"
+    label: bytes = b""
+
+
+# Wichtig: Ableitung bestehender Zwecke nicht ändern, sonst passen gespeicherte HMACs/Exports nicht mehr
+PURPOSES: Dict[str, Purpose] = {
+    p.name: p
+    for p in (
+        Purpose("auth.lookup", "raw"),  # token_hash, email/ip/ua_hmac, otp_hash
+        Purpose("vehicle.vin", "raw"),  # vehicles.vin_hmac
+        Purpose("export.token", "raw"),  # export_grants*.token_hmac
+        Purpose("export.redaction", "hkdf"),  # *_hmac in redacted Exports (getrennt von vehicles.vin_hmac)
+        Purpose("transfer.token", "raw"),  # sale_transfers.token_hmac, vehicle_id_hmac
+        Purpose("export.fernet", "sha256"),  # Full Exports (vehicle/user/servicebook/masterclipboard)
+        Purpose("export.full", "label", b"export|full"),  # Full Export export.py
+        Purpose("export.chunked", "hkdf"),  # Eingangsschlüssel für das Chunked-Format (+ Salt pro Export)
+    )
+}
+
+
+def _purpose(name: str) -> Purpose:
+    try:
+        return PURPOSES[name]
+    except KeyError:
+        raise KeyringError(f"unbekannter Schlüssel-Zweck: {name}") from None
+
+
+def key_id(secret: str) -> str:
+    # stabile, nicht-geheime Kennung (z. B. für Logs/Rotation)
+    return "k" + hashlib.sha256(b"ltc-kid|" + secret.encode("utf-8")).hexdigest()[:12]
+
+
+def _derive(secret: str, purpose: Purpose) -> bytes:
+    raw = secret.encode("utf-8")
+    if purpose.derivation == "raw":
+        return raw
+    if purpose.derivation == "sha256":
+        return hashlib.sha256(raw).digest()
+    if purpose.derivation == "label":
+        return hmac.new(raw, purpose.label, hashlib.sha256).digest()
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"ltc:" + purpose.name.encode("ascii")).derive(raw)
+
+
+@lru_cache(maxsize=256)
+def prekeyed_hmac(key: bytes) -> "hmac.HMAC":
+    """Vorbereitetes HMAC-SHA256 (Key-Schedule einmal); Aufrufer nutzen immer .copy()."""
+    return hmac.new(key, digestmod=hashlib.sha256)
+
+
+class Keyring:
+    """
+    Alle Schlüssel eines Prozesses: pro (Key-ID, Zweck) einmal abgeleitet.
+    - erstes Secret = primär (signieren/verschlüsseln), weitere = frühere Secrets (nur prüfen/entschlüsseln)
+    - HMACs als vorbereitete Objekte (.copy()), Fernet als MultiFernet (Rotation)
+    """
+
+    def __init__(self, secrets: Sequence[str]) -> None:
+        cleaned = [s for s in secrets if s]
+        if not cleaned or len(cleaned[0]) < MIN_SECRET_LEN:
+            raise KeyringError("LTC_SECRET_KEY fehlt/zu kurz (>=16)")
+        self._secrets: List[Tuple[str, str]] = []
+        for s in cleaned:
+            kid = key_id(s)
+            if all(kid != k for k, _ in self._secrets):
+                self._secrets.append((kid, s))
+        self._lock = threading.Lock()
+        self._keys: Dict[Tuple[str, str], bytes] = {}
+        self._fernets: Dict[str, MultiFernet] = {}
+
+    @property
+    def primary_kid(self) -> str:
+        return self._secrets[0][0]
+
+    def key_ids(self) -> List[str]:
+        return [kid for kid, _ in self._secrets]
+
+    def secret(self, kid: Optional[str] = None) -> str:
+        # Eingangsmaterial für Formate mit eigener Ableitung pro Objekt (Chunked-Export: HKDF + Salt)
+        if kid is None:
+            return self._secrets[0][1]
+        for k, s in self._secrets:
+            if k == kid:
+                return s
+        raise KeyringError(f"unbekannte Key-ID: {kid}")
+
+    def key(self, purpose: str, kid: Optional[str] = None) -> bytes:
+        p = _purpose(purpose)
+        kid = kid or self.primary_kid
+        cache_key = (kid, p.name)
+        key = self._keys.get(cache_key)
+        if key is None:
+            key = _derive(self.secret(kid), p)
+            with self._lock:
+                self._keys[cache_key] = key
+        return key
+
+    def hmac(self, purpose: str, kid: Optional[str] = None) -> "hmac.HMAC":
+        return prekeyed_hmac(self.key(purpose, kid)).copy()
+
+    def hmac_digest(self, purpose: str, value: str, kid: Optional[str] = None) -> bytes:
+        h = self.hmac(purpose, kid)
+        h.update(value.encode("utf-8"))
+        return h.digest()
+
+    def hmac_hex(self, purpose: str, value: str) -> str:
+        return self.hmac_digest(purpose, value).hex()
+
+    def hmac_hex_all(self, purpose: str, value: str) -> List[str]:
+        # für Lookups während einer Rotation: Werte unter allen aktiven Key-IDs (primär zuerst)
+        return [self.hmac_digest(purpose, value, kid).hex() for kid in self.key_ids()]
+
+    def fernet(self, purpose: str) -> MultiFernet:
+        f = self._fernets.get(purpose)
+        if f is None:
+            f = MultiFernet([Fernet(base64.urlsafe_b64encode(self.key(purpose, kid))) for kid in self.key_ids()])
+            with self._lock:
+                self._fernets[purpose] = f
+        return f
+
+
+@lru_cache(maxsize=8)
+def keyring_for(secret: str) -> Keyring:
+    """Keyring für ein explizit übergebenes Secret (Aufrufer mit eigener Secret-Quelle, z. B. Settings)."""
+    return Keyring([secret.strip()])
+
+
+_LOCK = threading.Lock()
+_CURRENT: Optional[Tuple[Tuple[str, str], Keyring]] = None
+
+
+def get_keyring() -> Keyring:
+    """
+    Keyring aus LTC_SECRET_KEY (primär) und LTC_SECRET_KEYS_PREVIOUS (kommagetrennt, nur prüfen/entschlüsseln).
+    Neu aufgebaut nur, wenn sich die ENV-Werte ändern; Ableitungen bleiben sonst gecacht.
+    """
+    global _CURRENT
+    env = ((os.getenv("LTC_SECRET_KEY") or "").strip(), (os.getenv("LTC_SECRET_KEYS_PREVIOUS") or "").strip())
+    current = _CURRENT
+    if current is not None and current[0] == env:
+        return current[1]
+    ring = Keyring([env[0], *(s.strip() for s in env[1].split(",") if s.strip())])
+    with _LOCK:
+        _CURRENT = (env, ring)
+    return ring
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicWorker:
+    """
+    Daemon-Thread, der fn() alle interval Sekunden aufruft (Purges, Janitor).
+
+    - erster Lauf nach einem Intervall; Fehler werden geloggt, der Worker läuft weiter
+    - stop() ist endgültig: start() nach stop() startet keinen Thread mehr (Shutdown-Reihenfolge)
+    - fn() liefert optional eine Anzahl (z. B. gelöschte Zeilen), summiert in processed
+    """
+
+    def __init__(self, name: str, interval: float, fn: Callable[[], Any]) -> None:
+        self.name = name
+        self.interval = float(interval)
+        self.fn = fn
+        self.runs = 0
+        self.failures = 0
+        self.processed = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "PeriodicWorker":
+        with self._lock:
+            if self._thread is None and not self._stop.is_set():
+                self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 10.0) -> None:
+        with self._lock:
+            self._stop.set()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+    def run_once(self) -> None:
+        try:
+            n = self.fn()
+        except Exception:
+            self.failures += 1
+            logger.warning("%s failed", self.name, exc_info=True)
+            return
+        self.runs += 1
+        if isinstance(n, int):
+            self.processed += n
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def stats(self) -> Dict[str, float]:
+        return {"interval": self.interval, "runs": self.runs, "failures": self.failures, "processed": self.processed}
+
+
+_WORKERS: Dict[str, PeriodicWorker] = {}
+_WORKERS_LOCK = threading.Lock()
+
+
+def start_periodic(name: str, interval: float, fn: Callable[[], Any]) -> Optional[PeriodicWorker]:
+    """Prozessweiten Worker unter name starten (einmal pro name); interval <= 0 = aus."""
+    if interval <= 0:
+        return None
+    with _WORKERS_LOCK:
+        worker = _WORKERS.get(name)
+        if worker is None:
+            worker = _WORKERS[name] = PeriodicWorker(name, interval, fn).start()
+        return worker
+
+
+def stop_periodic(name: Optional[str] = None) -> None:
+    """Einen (name) oder alle prozessweiten Worker stoppen (Shutdown/Tests)."""
+    with _WORKERS_LOCK:
+        if name is None:
+            workers = list(_WORKERS.values())
+            _WORKERS.clear()
+        else:
+            worker = _WORKERS.pop(name, None)
+            workers = [worker] if worker is not None else []
+    for worker in workers:
+        worker.stop()
+
+
+def periodic_stats() -> Dict[str, Dict[str, float]]:
+    with _WORKERS_LOCK:
+        return {name: w.stats() for name, w in _WORKERS.items()}
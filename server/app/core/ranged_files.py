@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import mmap
+import os
+import secrets
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# Mehr Teilbereiche => Range ignorieren und komplett ausliefern (Schutz vor Range-Fragmentierung)
+MAX_RANGES = 16
+CHUNK_BYTES = 256 * 1024
+
+ByteRange = Tuple[int, int]  # [start, end) – end exklusiv
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range_header(header: Optional[str], size: int) -> Optional[List[ByteRange]]:
+    """
+    "bytes=0-99,200-,-500" -> sortierte, zusammengefasste Bereiche.
+    None = Header fehlt/ungültig/zu viele Bereiche (=> ganze Datei), RangeNotSatisfiable => 416.
+    """
+    if not header or size <= 0:
+        return None
+    unit, _, spec = header.strip().partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+
+    parts = [p.strip() for p in spec.split(",") if p.strip()]
+    if not parts or len(parts) > MAX_RANGES:
+        return None
+
+    ranges: List[ByteRange] = []
+    for part in parts:
+        first, dash, last = part.partition("-")
+        if not dash:
+            return None
+        first, last = first.strip(), last.strip()
+        if not first:
+            if not last.isdigit():
+                return None
+            n = int(last)
+            if n == 0:
+                continue
+            ranges.append((max(size - n, 0), size))
+            continue
+        if not first.isdigit() or (last and not last.isdigit()):
+            return None
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start >= size:
+            continue
+        end = int(last) + 1 if last else size
+        ranges.append((start, min(end, size)))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    ranges.sort()
+    merged: List[ByteRange] = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match: schwacher Vergleich (W/ ignorieren)
+    tags = [t.strip() for t in header.split(",")]
+    if "*" in tags:
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return any((t[2:] if t.startswith("W/") else t) == bare for t in tags)
+
+
+class RangedFileResponse(Response):
+    """
+    Datei (ganz oder Teilbereiche) ausliefern:
+    - ASGI-Extension http.response.zerocopysend vorhanden => sendfile über den Server (ein Bereich)
+    - sonst mmap-Slices in Chunks (Lesen im Threadpool, kein Laden der ganzen Datei)
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        size: int,
+        media_type: str,
+        headers: dict[str, str],
+        ranges: Optional[Sequence[ByteRange]] = None,
+    ) -> None:
+        self.path = path
+        self.size = size
+        self.ranges = list(ranges) if ranges else [(0, size)]
+        self.partial = ranges is not None
+        self.status_code = 206 if self.partial else 200
+        self.background = None
+        self.media_type = media_type
+
+        self._parts: List[Tuple[bytes, int, int]] = []
+        self._trailer = b""
+        if self.partial and len(self.ranges) > 1:
+            boundary = secrets.token_hex(16)
+            for start, end in self.ranges:
+                prefix = (
+                    f"--{boundary}\r\nContent-Type: {media_type}\r\n"
+                    f"Content-Range: bytes {start}-{end - 1}/{size}\r\n\r\n"
+                ).encode("latin-1")
+                self._parts.append((prefix, start, end))
+            # CRLF vor jedem weiteren Boundary
+            self._parts = [(p if i == 0 else b"\r\n" + p, s, e) for i, (p, s, e) in enumerate(self._parts)]
+            self._trailer = f"\r\n--{boundary}--\r\n".encode("latin-1")
+            content_type = f"multipart/byteranges; boundary={boundary}"
+        else:
+            start, end = self.ranges[0]
+            self._parts.append((b"", start, end))
+            content_type = media_type
+
+        length = sum(len(p) + (e - s) for p, s, e in self._parts) + len(self._trailer)
+        all_headers = {**headers, "content-type": content_type, "content-length": str(length)}
+        if self.partial and len(self.ranges) == 1:
+            start, end = self.ranges[0]
+            all_headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+        self.init_headers(all_headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method", "GET").upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        with open(self.path, "rb") as f:
+            if zerocopy and len(self._parts) == 1:
+                _, start, end = self._parts[0]
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": f.fileno(),
+                        "offset": start,
+                        "count": end - start,
+                        "more_body": False,
+                    }
+                )
+                return
+
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size > 0 else None
+            try:
+                for prefix, start, end in self._parts:
+                    if prefix:
+                        await send({"type": "http.response.body", "body": prefix, "more_body": True})
+                    pos = start
+                    while pos < end and mm is not None:
+                        stop = min(pos + CHUNK_BYTES, end)
+                        chunk = await anyio.to_thread.run_sync(mm.__getitem__, slice(pos, stop))
+                        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                        pos = stop
+                await send({"type": "http.response.body", "body": self._trailer, "more_body": False})
+            finally:
+                if mm is not None:
+                    mm.close()
+
+
+def ranged_file_response(
+    request: Request,
+    path: Path,
+    *,
+    etag: str,
+    media_type: str,
+    filename: str,
+    size: Optional[int] = None,
+    conditional: bool = True,
+) -> Response:
+    """
+    Conditional GET + Range für eine (bereits autorisierte) Datei.
+    If-None-Match => 304 ohne Datei-I/O; If-Range mit abweichendem ETag => ganze Datei.
+    conditional=False: Range/If-* ignorieren, immer 200 mit ganzer Datei (Einmal-Downloads,
+    deren Berechtigung beim Request verbraucht wird – 206/304 würden sie sonst verbrennen).
+    """
+    headers = {
+        "etag": etag,
+        "accept-ranges": "bytes" if conditional else "none",
+        # privat + immer revalidieren: Berechtigungen werden bei jedem Request neu geprüft
+        "cache-control": "private, no-cache",
+        "content-disposition": f'attachment; filename="{filename}"',
+    }
+
+    inm = request.headers.get("if-none-match")
+    if conditional and inm is not None and etag_matches(inm, etag):
+        return Response(status_code=304, headers={k: headers[k] for k in ("etag", "cache-control")})
+
+    if size is None:
+        size = os.stat(path).st_size
+    if not conditional:
+        return RangedFileResponse(path, size=size, media_type=media_type, headers=headers)
+
+    ranges: Optional[List[ByteRange]] = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        try:
+            ranges = parse_range_header(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={"content-range": f"bytes */{size}", "etag": etag})
+
+    return RangedFileResponse(path, size=size, media_type=media_type, headers=headers, ranges=ranges)
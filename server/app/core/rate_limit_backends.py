@@ -0,0 +1,460 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Protocol, Sequence, Tuple
+from urllib.parse import unquote, urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitBackend(Protocol):
+    """
+    hit(key) zählt einen Request und liefert True = erlaubt, False = blockiert.
+    Abgelehnte Requests werden nicht gezählt.
+    """
+
+    def hit(self, key: str, *, limit: int, window_seconds: int) -> bool: ...
+
+    def close(self) -> None: ...
+
+
+def _validate(limit: int, window_seconds: int) -> None:
+    if limit <= 0 or window_seconds <= 0:
+        raise ValueError("rate_limit: invalid parameters")
+
+
+def _sliding(now: float, window_seconds: int, idx: int, curr: int, prev: int) -> Tuple[int, int, int, float]:
+    """
+    Sliding-Window-Counter (zwei feste Fenster, gewichtet):
+      estimate = prev * (Restanteil des aktuellen Fensters) + curr
+    Liefert (idx, curr, prev, estimate) nach dem Weiterrollen auf das aktuelle Fenster.
+    """
+    now_idx = int(now // window_seconds)
+    if idx != now_idx:
+        prev = curr if idx == now_idx - 1 else 0
+        curr = 0
+        idx = now_idx
+    weight = 1.0 - (now - idx * window_seconds) / window_seconds
+    return idx, curr, prev, prev * weight + curr
+
+
+def _allowed(estimate: float, limit: int) -> bool:
+    # der aktuelle Request zählt mit
+    return math.floor(estimate) + 1 <= limit
+
+
+class _Counter:
+    __slots__ = ("idx", "curr", "prev", "window", "touched")
+
+    def __init__(self, window: int) -> None:
+        self.idx = 0
+        self.curr = 0
+        self.prev = 0
+        self.window = window
+        self.touched = 0.0
+
+
+class InMemoryRateLimitBackend:
+    """
+    Pro Prozess: konstanter Speicher pro Key (zwei Zähler statt Timestamp-Liste).
+    Keys ohne Aktivität seit zwei Fenstern werden periodisch entfernt.
+    """
+
+    def __init__(self, *, sweep_interval_seconds: float = 60.0) -> None:
+        self.sweep_interval_seconds = float(sweep_interval_seconds)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, _Counter] = {}
+        self._next_sweep = time.time() + self.sweep_interval_seconds
+        self.evictions = 0
+
+    def hit(self, key: str, *, limit: int, window_seconds: int) -> bool:
+        _validate(limit, window_seconds)
+        now = time.time()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+
+            c = self._counters.get(key)
+            if c is None or c.window != window_seconds:
+                c = _Counter(window_seconds)
+                self._counters[key] = c
+
+            c.idx, c.curr, c.prev, estimate = _sliding(now, window_seconds, c.idx, c.curr, c.prev)
+            c.touched = now
+            if not _allowed(estimate, limit):
+                return False
+            c.curr += 1
+            return True
+
+    def _sweep(self, now: float) -> None:
+        # Aufrufer hält _lock
+        idle = [k for k, c in self._counters.items() if now - c.touched >= 2 * c.window]
+        for k in idle:
+            del self._counters[k]
+        self.evictions += len(idle)
+        self._next_sweep = now + self.sweep_interval_seconds
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"keys": len(self._counters), "evictions": self.evictions}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+    def close(self) -> None:
+        self.clear()
+
+
+class SQLiteRateLimitBackend:
+    """
+    Prozessübergreifend (uvicorn-Worker) über eine gemeinsame SQLite-Datei.
+    Eigene Connections pro Thread (WAL + mmap), eine kurze IMMEDIATE-TX pro Hit;
+    nutzt NICHT den Writer-Lock der Auth-DB.
+    """
+
+    def __init__(self, path: str, *, sweep_every: int = 500, busy_timeout_ms: int = 5000) -> None:
+        self.path = path
+        self.sweep_every = int(sweep_every)
+        self.busy_timeout_ms = int(busy_timeout_ms)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns: List[sqlite3.Connection] = []
+        self._generation = 0
+        self._hits_since_sweep = 0
+        self._schema_ready = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and getattr(self._local, "generation", -1) == self._generation:
+            return conn
+
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA mmap_size=8388608;")
+        conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms};")
+        with self._lock:
+            if not self._schema_ready:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS rate_limit_counters (
+                      key TEXT PRIMARY KEY,
+                      window_idx INTEGER NOT NULL,
+                      curr INTEGER NOT NULL,
+                      prev INTEGER NOT NULL,
+                      expires_at REAL NOT NULL
+                    ) WITHOUT ROWID;
+                    """
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_rate_limit_counters_expires ON rate_limit_counters(expires_at);")
+                self._schema_ready = True
+            self._conns.append(conn)
+        self._local.conn = conn
+        self._local.generation = self._generation
+        return conn
+
+    def _sweep_due(self) -> bool:
+        # Zähler wird von allen Request-Threads geteilt
+        if self.sweep_every <= 0:
+            return False
+        with self._lock:
+            self._hits_since_sweep += 1
+            if self._hits_since_sweep < self.sweep_every:
+                return False
+            self._hits_since_sweep = 0
+            return True
+
+    def hit(self, key: str, *, limit: int, window_seconds: int) -> bool:
+        _validate(limit, window_seconds)
+        conn = self._conn()
+        now = time.time()
+
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            row = conn.execute(
+                "SELECT window_idx, curr, prev FROM rate_limit_counters WHERE key = ?;", (key,)
+            ).fetchone()
+            idx, curr, prev = (int(row[0]), int(row[1]), int(row[2])) if row else (0, 0, 0)
+            idx, curr, prev, estimate = _sliding(now, window_seconds, idx, curr, prev)
+
+            allowed = _allowed(estimate, limit)
+            if allowed:
+                conn.execute(
+                    """
+                    INSERT INTO rate_limit_counters(key, window_idx, curr, prev, expires_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                      window_idx=excluded.window_idx,
+                      curr=excluded.curr,
+                      prev=excluded.prev,
+                      expires_at=excluded.expires_at;
+                    """,
+                    (key, idx, curr + 1, prev, float((idx + 2) * window_seconds)),
+                )
+
+            if self._sweep_due():
+                conn.execute("DELETE FROM rate_limit_counters WHERE expires_at < ?;", (now,))
+
+            conn.execute("COMMIT;")
+            return allowed
+        except BaseException:
+            conn.execute("ROLLBACK;")
+            raise
+
+    def close(self) -> None:
+        with self._lock:
+            conns, self._conns = self._conns, []
+            self._generation += 1
+        for c in conns:
+            try:
+                c.close()
+            except Exception:
+                pass
+
+
+class RedisProtocolError(RuntimeError):
+    pass
+
+
+class _RespConnection:
+    """Minimaler RESP2-Client (nur was der Rate-Limiter braucht, inkl. Pipelining)."""
+
+    def __init__(self, host: str, port: int, *, db: int = 0, password: Optional[str] = None, timeout: float = 1.0) -> None:
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._buf = self._sock.makefile("rb")
+        if password:
+            self.pipeline([("AUTH", password)])
+        if db:
+            self.pipeline([("SELECT", db)])
+
+    @staticmethod
+    def _encode(args: Sequence[Any]) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for a in args:
+            b = a if isinstance(a, bytes) else str(a).encode("utf-8")
+            out.append(b"$%d\r\n%s\r\n" % (len(b), b))
+        return b"".join(out)
+
+    def _read(self) -> Any:
+        line = self._buf.readline()
+        if not line:
+            raise ConnectionError("redis: connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode("utf-8")
+        if kind == b"-":
+            raise RedisProtocolError(payload.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            n = int(payload)
+            if n < 0:
+                return None
+            data = self._buf.read(n + 2)
+            return data[:-2]
+        if kind == b"*":
+            n = int(payload)
+            return None if n < 0 else [self._read() for _ in range(n)]
+        raise RedisProtocolError(f"unexpected reply: {line!r}")
+
+    def pipeline(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        self._sock.sendall(b"".join(self._encode(c) for c in commands))
+        return [self._read() for _ in commands]
+
+    def close(self) -> None:
+        try:
+            self._buf.close()
+        finally:
+            self._sock.close()
+
+
+class RedisRateLimitBackend:
+    """
+    Redis (oder kompatibler Server): ein Key pro (Limiter-Key, Fenster), Ablauf per PEXPIRE.
+    INCR zuerst, bei Überschreitung DECR => nie mehr als limit erlaubte Requests, auch parallel.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 6379,
+        *,
+        db: int = 0,
+        password: Optional[str] = None,
+        prefix: str = "ltc:rl:",
+        timeout: float = 1.0,
+    ) -> None:
+        self.host = host
+        self.port = int(port)
+        self.db = int(db)
+        self.password = password
+        self.prefix = prefix
+        self.timeout = float(timeout)
+        self._lock = threading.Lock()
+        self._conn: Optional[_RespConnection] = None
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RedisRateLimitBackend":
+        u = urlparse(url)
+        if u.scheme not in ("redis", ""):
+            raise ValueError("rate_limit: nur redis:// URLs werden unterstützt")
+        db_part = (u.path or "/").lstrip("/")
+        return cls(
+            host=u.hostname or "127.0.0.1",
+            port=u.port or 6379,
+            db=int(db_part) if db_part.isdigit() else 0,
+            password=unquote(u.password) if u.password else None,
+            **kwargs,
+        )
+
+    def _pipeline(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        # Aufrufer hält _lock; eine Wiederholung nach Verbindungsabbruch
+        for attempt in (0, 1):
+            if self._conn is None:
+                self._conn = _RespConnection(
+                    self.host, self.port, db=self.db, password=self.password, timeout=self.timeout
+                )
+            try:
+                return self._conn.pipeline(commands)
+            except (OSError, ConnectionError):
+                self._conn.close()
+                self._conn = None
+                if attempt:
+                    raise
+        raise AssertionError("unreachable")
+
+    def hit(self, key: str, *, limit: int, window_seconds: int) -> bool:
+        _validate(limit, window_seconds)
+        now = time.time()
+        idx = int(now // window_seconds)
+        curr_key = f"{self.prefix}{key}:{window_seconds}:{idx}"
+        prev_key = f"{self.prefix}{key}:{window_seconds}:{idx - 1}"
+
+        with self._lock:
+            curr, _, prev = self._pipeline(
+                [
+                    ("INCR", curr_key),
+                    ("PEXPIRE", curr_key, 2 * window_seconds * 1000),
+                    ("GET", prev_key),
+                ]
+            )
+            prev_n = int(prev) if prev is not None else 0
+            # INCR hat den aktuellen Request bereits gezählt
+            _, _, _, estimate = _sliding(now, window_seconds, idx, int(curr) - 1, prev_n)
+            if _allowed(estimate, limit):
+                return True
+            self._pipeline([("DECR", curr_key)])
+            return False
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# ---------------------------------------------------------------------------
+# Auswahl per ENV
+#   LTC_RATE_LIMIT_BACKEND = memory | sqlite | redis   (leer/auto = sqlite)
+#   LTC_RATE_LIMIT_SQLITE_PATH (sqlite, Default: Auth-DB-Datei), LTC_RATE_LIMIT_REDIS_URL (redis)
+# Default ist die gemeinsame SQLite-Datei: Limits gelten über alle uvicorn-Worker eines Hosts.
+# memory nur für Einzelprozess/Dev (Limits pro Worker).
+# ---------------------------------------------------------------------------
+
+_BACKENDS_LOCK = threading.Lock()
+_BACKENDS: Dict[Tuple[str, str], RateLimitBackend] = {}
+_OVERRIDE: Optional[RateLimitBackend] = None
+
+
+def _build(kind: str, target: str) -> RateLimitBackend:
+    if kind == "memory":
+        return InMemoryRateLimitBackend()
+    if kind == "sqlite":
+        return SQLiteRateLimitBackend(target)
+    if kind == "redis":
+        return RedisRateLimitBackend.from_url(target)
+    raise RuntimeError(f"LTC_RATE_LIMIT_BACKEND unbekannt: {kind}")
+
+
+def get_rate_limit_backend(sqlite_path: Optional[str] = None) -> RateLimitBackend:
+    """
+    sqlite_path: Default-Datei für den auto-Modus (Auth-Flow übergibt settings.db_path).
+    Instanzen werden pro (Backend, Ziel) wiederverwendet.
+    """
+    if _OVERRIDE is not None:
+        return _OVERRIDE
+
+    kind = (os.getenv("LTC_RATE_LIMIT_BACKEND") or "").strip().lower()
+    if kind == "redis":
+        target = (os.getenv("LTC_RATE_LIMIT_REDIS_URL") or "redis://127.0.0.1:6379/0").strip()
+    elif kind in ("", "auto", "sqlite"):
+        kind = "sqlite"
+        target = (
+            (os.getenv("LTC_RATE_LIMIT_SQLITE_PATH") or "").strip()
+            or sqlite_path
+            or (os.getenv("LTC_DB_PATH") or "").strip()
+            or "./data/app.db"
+        )
+    else:
+        target = ""
+
+    cache_key = (kind, target)
+    with _BACKENDS_LOCK:
+        backend = _BACKENDS.get(cache_key)
+        if backend is None:
+            backend = _build(kind, target)
+            _BACKENDS[cache_key] = backend
+        return backend
+
+
+def set_rate_limit_backend(backend: Optional[RateLimitBackend]) -> None:
+    """Backend fest setzen (Tests/Wiring); None = wieder per ENV auswählen."""
+    global _OVERRIDE
+    _OVERRIDE = backend
+
+
+def close_rate_limit_backends() -> None:
+    with _BACKENDS_LOCK:
+        backends = list(_BACKENDS.values())
+        _BACKENDS.clear()
+    for b in backends:
+        try:
+            b.close()
+        except Exception:
+            pass
+
+
+def check_rate_limit(
+    key: str,
+    *,
+    limit: int,
+    window_seconds: int,
+    sqlite_path: Optional[str] = None,
+    fail_open: bool = True,
+) -> bool:
+    """
+    True = erlaubt, False = blockiert.
+    Backend-Ausfall (z.B. Redis nicht erreichbar):
+      fail_open=True  => erlaubt mit Warnung (Zusatzschutz für normale Routen)
+      fail_open=False => blockiert (Auth-Flow: OTP-Brute-Force darf nicht am Ausfall vorbei)
+    """
+    _validate(limit, window_seconds)
+    try:
+        backend = get_rate_limit_backend(sqlite_path)
+        return backend.hit(key, limit=limit, window_seconds=window_seconds)
+    except (OSError, sqlite3.Error, RedisProtocolError) as e:
+        if fail_open:
+            logger.warning("rate limit backend unavailable (%s); request allowed", type(e).__name__)
+            return True
+        logger.warning("rate limit backend unavailable (%s); request denied", type(e).__name__)
+        return False
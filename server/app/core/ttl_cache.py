@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Iterable, Optional, Set, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TtlLruCache(Generic[K, V]):
+    """
+    Bounded TTL/LRU-Map für Prozess-Caches (Session, Consent, Public-QR, Idempotency).
+
+    - Race-Schutz: epoch() vor dem DB-Read holen, put(..., epoch=) verwirft Werte,
+      die vor einer Invalidierung gelesen wurden
+    - group: optionaler Index (z. B. user_id) für invalidate_group() ohne Vollscan
+    - andere Worker-Prozesse sehen Invalidierungen erst nach Ablauf der TTL (TTL kurz halten)
+    """
+
+    def __init__(self, max_entries: int, *, group: Optional[Callable[[K, V], Hashable]] = None) -> None:
+        self.max_entries = int(max_entries)
+        self._group = group
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self._groups: Dict[Hashable, Set[K]] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def epoch(self) -> int:
+        return self._epoch
+
+    def get(self, key: K) -> Optional[V]:
+        now = time.time()
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None and now < hit[0]:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return hit[1]
+            if hit is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        key: K,
+        value: V,
+        *,
+        ttl: Optional[float],
+        epoch: Optional[int] = None,
+        expires_at: Optional[float] = None,
+    ) -> bool:
+        """
+        ttl=None: kein Ablauf (nur LRU); ttl <= 0 oder max_entries <= 0: nicht cachen.
+        expires_at (epoch seconds) begrenzt die Deadline zusätzlich. False = nicht gecacht.
+        """
+        if self.max_entries <= 0 or (ttl is not None and ttl <= 0):
+            return False
+        deadline = time.time() + ttl if ttl is not None else float("inf")
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        with self._lock:
+            if epoch is not None and epoch != self._epoch:
+                return False
+            self._drop(key)
+            self._entries[key] = (deadline, value)
+            if self._group is not None:
+                self._groups.setdefault(self._group(key, value), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def discard(self, key: K) -> None:
+        # Eintrag ersetzen/verschieben, ohne Invalidierung (kein Epoch-Wechsel)
+        with self._lock:
+            self._drop(key)
+
+    def invalidate(self, keys: Iterable[K]) -> int:
+        with self._lock:
+            self._epoch += 1
+            n = sum(1 for key in keys if self._drop(key))
+            self.invalidations += n
+            return n
+
+    def invalidate_group(self, group: Hashable) -> int:
+        with self._lock:
+            self._epoch += 1
+            n = sum(1 for key in list(self._groups.get(group, ())) if self._drop(key))
+            self.invalidations += n
+            return n
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._groups.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+    def _drop(self, key: K) -> bool:
+        # Aufrufer hält _lock
+        hit = self._entries.pop(key, None)
+        if hit is None:
+            return False
+        if self._group is not None:
+            group = self._group(key, hit[1])
+            keys = self._groups.get(group)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._groups[group]
+        return True
+
+
+# Engine -> kleine Prozess-ID: Cache-Schlüssel pro DB getrennt (Tests/mehrere DBs teilen sich keine Einträge),
+# schwach referenziert, damit Test-Engines freigegeben werden
+_SCOPES: "weakref.WeakKeyDictionary[Any, int]" = weakref.WeakKeyDictionary()
+_SCOPE_IDS = itertools.count(1)
+_SCOPES_LOCK = threading.Lock()
+
+
+def engine_scope(bind: Any) -> int:
+    """Stabile Scope-ID für Engine/Connection (z. B. db.get_bind())."""
+    engine = getattr(bind, "engine", bind)
+    with _SCOPES_LOCK:
+        sid = _SCOPES.get(engine)
+        if sid is None:
+            sid = _SCOPES[engine] = next(_SCOPE_IDS)
+        return sid
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import threading
+import weakref
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+from sqlalchemy import Index, MetaData, Table
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+
+def _engine_of(bind: Any) -> Engine:
+    if isinstance(bind, Session):
+        bind = bind.get_bind()
+    if isinstance(bind, Connection):
+        return bind.engine
+    if isinstance(bind, Engine):
+        return bind
+    raise RuntimeError("DB bind ist weder Session, Engine noch Connection")
+
+
+def _connectable(bind: Any) -> Any:
+    # Session: über die Session-Connection reflektieren (sieht eigene TX, sqlite memory safe)
+    if isinstance(bind, Session):
+        return bind.connection()
+    return bind
+
+
+class TableRegistry:
+    """
+    Reflektierte/angelegte Tables pro (Engine, Tabellenname).
+
+    - Engines sind schwach referenziert: neue Engine (z.B. pro Test) => frische Einträge
+    - nur positive Treffer werden gecacht (fehlende Tabellen werden erneut geprüft)
+    - invalidate() nach DDL außerhalb der Registry (drop/alter)
+    """
+
+    def __init__(self) -> None:
+        # _lock schützt nur die Dicts; Reflection/DDL laufen außerhalb (pro Name eigener Create-Lock)
+        self._lock = threading.RLock()
+        self._tables: "weakref.WeakKeyDictionary[Engine, Dict[str, Table]]" = weakref.WeakKeyDictionary()
+        self._create_locks: "weakref.WeakKeyDictionary[Engine, Dict[str, threading.Lock]]" = weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.reflections = 0
+        self.invalidations = 0
+
+    def _cached(self, engine: Engine, name: str) -> Optional[Table]:
+        tables = self._tables.get(engine)
+        if tables is None:
+            return None
+        return tables.get(name)
+
+    def _store(self, engine: Engine, table: Table) -> Table:
+        # parallele Reflection: erster Eintrag gewinnt, alle Aufrufer bekommen dasselbe Objekt
+        with self._lock:
+            self.reflections += 1
+            return self._tables.setdefault(engine, {}).setdefault(table.name, table)
+
+    def get(self, bind: Any, name: str) -> Optional[Table]:
+        engine = _engine_of(bind)
+        with self._lock:
+            t = self._cached(engine, name)
+            if t is not None:
+                self.hits += 1
+            return t
+
+    def reflect(self, bind: Any, name: str) -> Table:
+        """Table per Reflection (gecacht). NoSuchTableError, wenn sie nicht existiert."""
+        t = self.get(bind, name)
+        if t is not None:
+            return t
+        return self._store(_engine_of(bind), Table(name, MetaData(), autoload_with=_connectable(bind)))
+
+    def find(self, bind: Any, candidates: Iterable[str]) -> Optional[Table]:
+        """Erste existierende Tabelle aus candidates (Reihenfolge = Priorität)."""
+        names = tuple(candidates)
+        engine = _engine_of(bind)
+        with self._lock:
+            for name in names:
+                t = self._cached(engine, name)
+                if t is not None:
+                    self.hits += 1
+                    return t
+
+        insp = sa_inspect(_connectable(bind))
+        for name in names:
+            if insp.has_table(name):
+                return self._store(engine, Table(name, MetaData(), autoload_with=_connectable(bind)))
+        return None
+
+    def get_or_create(self, bind: Any, name: str, factory: Callable[[Any], Table]) -> Table:
+        """
+        Gecachte Table oder factory(connection) aufrufen (legt an/migriert/reflektiert).
+
+        factory läuft in einer eigenen Transaktion (engine.begin()), nie auf der Request-Session;
+        gecacht wird erst nach deren Commit (Rollback des Aufrufers nimmt DDL/Migration nicht zurück).
+        factory läuft höchstens einmal pro Engine und Name.
+        """
+        engine = _engine_of(bind)
+        t = self.get(engine, name)
+        if t is not None:
+            return t
+        with self._lock:
+            create_lock = self._create_locks.setdefault(engine, {}).setdefault(name, threading.Lock())
+        with create_lock:
+            t = self.get(engine, name)
+            if t is not None:
+                return t
+            with engine.begin() as conn:
+                t = factory(conn)
+            return self._store(engine, t)
+
+    def warm_up(self, bind: Any, names: Iterable[str]) -> int:
+        """Vorhandene Tabellen vorab reflektieren (Startup). Liefert Anzahl neu geladener Tables."""
+        engine = _engine_of(bind)
+        loaded = 0
+        insp = sa_inspect(bind)
+        for name in names:
+            with self._lock:
+                cached = self._cached(engine, name) is not None
+            if cached or not insp.has_table(name):
+                continue
+            self._store(engine, Table(name, MetaData(), autoload_with=bind))
+            loaded += 1
+        return loaded
+
+    def invalidate(self, bind: Any = None, name: Optional[str] = None) -> None:
+        with self._lock:
+            self.invalidations += 1
+            if bind is None:
+                self._tables = weakref.WeakKeyDictionary()
+                return
+            tables = self._tables.get(_engine_of(bind))
+            if tables is None:
+                return
+            if name is None:
+                tables.clear()
+            else:
+                tables.pop(name, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "engines": len(self._tables),
+                "tables": sum(len(v) for v in self._tables.values()),
+                "reflections": self.reflections,
+                "reflections_avoided": self.hits,
+                "invalidations": self.invalidations,
+            }
+
+
+table_registry = TableRegistry()
+
+
+def reflection_stats() -> Dict[str, int]:
+    return table_registry.stats()
+
+
+def ensure_indexes(bind: Any, table: Table, indexes: Dict[str, Sequence[str]]) -> None:
+    """
+    Benannte Indizes anlegen, falls sie fehlen (auch auf bereits vorhandenen/reflektierten Tabellen).
+    Indizes mit Spalten, die die Tabelle nicht hat, werden übersprungen.
+    """
+    known = {ix.name for ix in table.indexes}
+    for name, cols in indexes.items():
+        if name in known or not all(c in table.c for c in cols):
+            continue
+        Index(name, *(table.c[c] for c in cols)).create(bind=bind, checkfirst=True)
@@ -111,3 +111,8 @@ def init_db() -> None:
     _try_import("app.models.consent")
 
     Base.metadata.create_all(bind=engine)
+
+    # create_all legt Indizes nur zusammen mit neuen Tabellen an: neue Indizes für Bestandstabellen nachziehen
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
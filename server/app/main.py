@@ -8,16 +8,21 @@ from fastapi.responses import JSONResponse, RedirectResponse, Response
 
 from app.admin.routes import router as admin_router
 from app.auth.routes import router as auth_router
+from app.auth.storage import close_pools as close_auth_pools
 from app.cms.routes import router as cms_router
-from app.core.config import get_settings
-from app.db.session import init_db
+from app.core.config import env_int, get_settings
+from app.core.periodic import start_periodic, stop_periodic
+from app.core.rate_limit_backends import close_rate_limit_backends
+from app.db.reflection import table_registry
+from app.db.session import get_engine, init_db
 from app.guards import forbid_moderator
 from app.public.routes import router as public_router
 from app.routers import blog, news, servicebook
 from app.routers.addons import router as addons_router
 from app.routers.consent import router as consent_router
-from app.routers.documents import router as documents_router
+from app.routers.documents import get_documents_store, router as documents_router
 from app.routers.export import router as export_router
+from app.routers.export_jobs import router as export_jobs_router
 from app.routers.export_servicebook import router as export_servicebook_router
 from app.routers.export_user import router as export_user_router
 from app.routers.export_vehicle import router as export_vehicle_router
@@ -26,6 +31,11 @@ from app.routers.public_site import router as public_site_router
 from app.routers.sale_transfer import router as sale_transfer_router
 from app.routers.trust_folders import router as trust_folders_router
 from app.routers.vehicles import router as vehicles_router
+from app.services.audit_sink import start_audit_sink, stop_audit_sink
+from app.services.document_scan import start_scan_workers, stop_scan_workers
+from app.services.export_jobs import start_export_jobs, stop_export_jobs
+from app.services.export_store import purge_expired_grants
+from app.services.idempotency_store import purge_expired_idempotency
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +46,31 @@ def create_app() -> FastAPI:
     @asynccontextmanager
     async def lifespan(_app: FastAPI):
         init_db()
+        # Reflection-Cache vorwärmen: nur reine Lookup-Tabellen (keine create/migrate-Factories)
+        try:
+            table_registry.warm_up(get_engine(), ("vehicles", "servicebook_entries", "auth_users"))
+        except Exception:
+            logger.warning("reflection warm-up failed", exc_info=True)
+        # Scan-Worker nur bei LTC_SCAN_WORKERS > 0 (sonst manueller Scan-Status durch Admins)
+        start_scan_workers(get_documents_store())
+        engine = get_engine()
+        # Export-Jobs: hängengebliebene Jobs zurücksetzen, Artefakte/Zeilen per TTL aufräumen
+        start_export_jobs(engine)
+        # abgelaufene Export-Grants periodisch löschen (LTC_EXPORT_GRANT_PURGE_SECONDS, 0 = aus)
+        start_periodic("export-grant-purge", env_int("LTC_EXPORT_GRANT_PURGE_SECONDS", 300), lambda: purge_expired_grants(engine))
+        # abgelaufene Idempotency-Records löschen (LTC_IDEMPOTENCY_PURGE_SECONDS, 0 = aus)
+        start_periodic("idempotency-purge", env_int("LTC_IDEMPOTENCY_PURGE_SECONDS", 3600), lambda: purge_expired_idempotency(engine))
+        # Audit Write-Behind (LTC_AUDIT_MODE=async|sync)
+        start_audit_sink()
         yield
+        stop_scan_workers()
+        stop_export_jobs()
+        stop_periodic()
+        # Audit-Queue flushen, solange DB-Pools noch offen sind
+        stop_audit_sink()
+        close_auth_pools()
+        close_rate_limit_backends()
+        get_documents_store().close()
 
     app = FastAPI(
         title="LifeTimeCircle – ServiceHeft 4.0",
@@ -78,6 +112,7 @@ def create_app() -> FastAPI:
     app.include_router(export_vehicle_router)
     app.include_router(export_servicebook_router)
     app.include_router(export_user_router)
+    app.include_router(export_jobs_router)
 
     app.include_router(consent_router)
 
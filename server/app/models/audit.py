@@ -1,7 +1,7 @@
 import json
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import String, DateTime, Text, UniqueConstraint
+from sqlalchemy import String, DateTime, Index, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -27,6 +27,11 @@ class AuditEvent(Base):
 
     __table_args__ = (
         UniqueConstraint("correlation_id", "idempotency_key", "event_name", name="uq_audit_idem"),
+        # (Filter, Zeit, id) für app.services.audit_query: Keyset-Seiten ohne Sort-Step
+        Index("idx_audit_events_q_time", "emitted_at", "id"),
+        Index("idx_audit_events_q_module_id", "module_id", "emitted_at", "id"),
+        Index("idx_audit_events_q_event_name", "event_name", "emitted_at", "id"),
+        Index("idx_audit_events_q_correlation_id", "correlation_id", "emitted_at", "id"),
     )
 
     @staticmethod
@@ -1,15 +1,13 @@
 from __future__ import annotations
 
-import hashlib
-import hmac
-import os
 import uuid
 from datetime import datetime
 from typing import Any, Optional
 
-from sqlalchemy import DateTime, Integer, String, JSON, func
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String, JSON, func
 from sqlalchemy.orm import Mapped, mapped_column
 
+from app.core.keyring import KeyringError, get_keyring
 from app.db.base import Base
 
 
@@ -30,12 +28,19 @@ def mask_vin(vin: Optional[str]) -> Optional[str]:
     return f"{v[:3]}***{v[-4:]}"
 
 
-def _vin_hmac(secret: str, vin: str) -> str:
-    return hmac.new(secret.encode("utf-8"), vin.encode("utf-8"), hashlib.sha256).hexdigest()
+def _vin_hmac(vin: str) -> Optional[str]:
+    try:
+        return get_keyring().hmac_hex("vehicle.vin", vin)
+    except KeyringError:
+        return None
 
 
 class Vehicle(Base):
     __tablename__ = "vehicles"
+    __table_args__ = (
+        # Keyset-Listing pro Owner (WHERE owner_user_id = ? AND id > ? ORDER BY id)
+        Index("ix_vehicles_owner_id", "owner_user_id", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     public_id: Mapped[str] = mapped_column(String(36), unique=True, index=True, nullable=False, default=_uuid4_str)
@@ -74,5 +79,35 @@ class Vehicle(Base):
         self.vin_prefix3 = v[:3]
         self.vin_last4 = v[-4:]
 
-        secret = os.environ.get("LTC_SECRET_KEY", "")
-        self.vin_hmac = _vin_hmac(secret, v) if len(secret) >= 16 else None
+        self.vin_hmac = _vin_hmac(v)
+
+
+class VehicleTrustSummaryRecord(Base):
+    """
+    Materialisierte Trust-Summary pro Fahrzeug (gepflegt in app.services.vehicle_trust).
+    Eingaben (top_trust_level, has_entries, Unfall-Meta) + abgeleitetes Ergebnis, Lesen = PK-Lookup.
+    """
+
+    __tablename__ = "vehicle_trust_summaries"
+
+    vehicle_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("vehicles.public_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    rules_version: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    top_trust_level: Mapped[Optional[str]] = mapped_column(String(2), nullable=True)
+    has_entries: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    accident_status: Mapped[str] = mapped_column(String(32), nullable=False)
+    accident_trust_completed: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+
+    trust_light: Mapped[str] = mapped_column(String(16), nullable=False)
+    hint: Mapped[str] = mapped_column(String(512), nullable=False)
+    reason_codes: Mapped[list[str]] = mapped_column(JSON, nullable=False)
+    todo_codes: Mapped[list[str]] = mapped_column(JSON, nullable=False)
+    verification_level: Mapped[str] = mapped_column(String(16), nullable=False)
+    history_status: Mapped[str] = mapped_column(String(32), nullable=False)
+    evidence_status: Mapped[str] = mapped_column(String(32), nullable=False)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -5,7 +5,7 @@ from datetime import date, datetime
 from decimal import Decimal
 from typing import Optional
 
-from sqlalchemy import Boolean, Date, DateTime, ForeignKey, Integer, Numeric, String, Text, func
+from sqlalchemy import Boolean, Date, DateTime, ForeignKey, Index, Integer, Numeric, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -17,6 +17,10 @@ def _uuid4_str() -> str:
 
 class VehicleEntry(Base):
     __tablename__ = "vehicle_entries"
+    __table_args__ = (
+        # Keyset-Listing der Latest-Einträge pro Fahrzeug: ORDER BY entry_date, created_at, id (DESC) ohne Sortierschritt
+        Index("ix_vehicle_entries_latest_listing", "vehicle_id", "is_latest", "entry_date", "created_at", "id"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=_uuid4_str)
     vehicle_id: Mapped[str] = mapped_column(
@@ -48,3 +52,29 @@ class VehicleEntry(Base):
         server_default=func.now(),
         onupdate=func.now(),
     )
+
+
+class EntryGroup(Base):
+    """
+    Denormalisierter Kopf einer Eintragsgruppe: aktuelle Revision + Anzahl Revisionen.
+    Wird in derselben Transaktion wie Anlage/Revision gepflegt (app.services.entry_groups).
+    """
+
+    __tablename__ = "entry_groups"
+
+    group_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    vehicle_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("vehicles.public_id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    head_entry_id: Mapped[str] = mapped_column(String(36), unique=True, nullable=False)
+    revision_count: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
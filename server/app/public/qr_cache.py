@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.core.config import env_int
+from app.core.ttl_cache import TtlLruCache
+from app.services.vehicle_trust import add_trust_summary_listener
+
+
+@dataclass(frozen=True)
+class CachedQr:
+    body: bytes
+    etag: str
+    negative: bool  # unbekannte vehicle_id (neutrale Antwort)
+
+
+class PublicQrCache:
+    """
+    vehicle public_id -> serialisierte Public-QR-Antwort (JSON-Bytes + ETag), zwei TtlLruCache:
+
+    - Invalidierung nach Commit über die Trust-Summary-Listener (Einträge, Revisionen, Meta)
+    - unbekannte IDs werden mit kurzer TTL in einem eigenen, kleineren LRU negativ gecacht:
+      Scans über zufällige IDs treffen nicht die DB und verdrängen keine positiven Einträge
+    - epoch() liefert den Stand beider Caches (an put() durchreichen)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 50_000,
+        *,
+        ttl_seconds: int = 300,
+        negative_ttl_seconds: int = 30,
+        negative_max_entries: int = 5_000,
+    ) -> None:
+        self.ttl_seconds = int(ttl_seconds)
+        self.negative_ttl_seconds = int(negative_ttl_seconds)
+        self._entries: "TtlLruCache[str, CachedQr]" = TtlLruCache(max_entries)
+        self._negative: "TtlLruCache[str, CachedQr]" = TtlLruCache(negative_max_entries)
+
+    def epoch(self) -> Tuple[int, int]:
+        return (self._entries.epoch(), self._negative.epoch())
+
+    def get(self, vehicle_id: str) -> Optional[CachedQr]:
+        # jede ID liegt höchstens in einem der beiden Caches
+        return self._entries.get(vehicle_id) or self._negative.get(vehicle_id)
+
+    def put(self, vehicle_id: str, body: bytes, *, negative: bool, epoch: Tuple[int, int]) -> CachedQr:
+        entry = CachedQr(body=body, etag=etag_for(body), negative=negative)
+        if negative:
+            target, other, ttl, target_epoch = self._negative, self._entries, self.negative_ttl_seconds, epoch[1]
+        else:
+            target, other, ttl, target_epoch = self._entries, self._negative, self.ttl_seconds, epoch[0]
+        if target.put(vehicle_id, entry, ttl=ttl, epoch=target_epoch):
+            other.discard(vehicle_id)
+        return entry
+
+    def invalidate(self, vehicle_ids: Iterable[str]) -> None:
+        ids = list(vehicle_ids)
+        self._entries.invalidate(ids)
+        self._negative.invalidate(ids)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._negative.clear()
+
+    def stats(self) -> Dict[str, float]:
+        pos, neg = self._entries.stats(), self._negative.stats()
+        hits = pos["hits"] + neg["hits"]
+        # jeder Fehlgriff im positiven Cache wird im negativen nachgesehen
+        lookups = hits + neg["misses"]
+        return {
+            "size": pos["size"],
+            "max_entries": pos["max_entries"],
+            "negative_size": neg["size"],
+            "negative_max_entries": neg["max_entries"],
+            "hits": hits,
+            "negative_hits": neg["hits"],
+            "misses": neg["misses"],
+            "hit_ratio": (hits / lookups) if lookups else 0.0,
+            "invalidations": pos["invalidations"] + neg["invalidations"],
+            "evictions": pos["evictions"] + neg["evictions"],
+        }
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+_PUBLIC_QR_CACHE = PublicQrCache(
+    env_int("LTC_PUBLIC_QR_CACHE_SIZE", 50_000),
+    ttl_seconds=env_int("LTC_PUBLIC_QR_CACHE_TTL_SECONDS", 300),
+    negative_ttl_seconds=env_int("LTC_PUBLIC_QR_NEGATIVE_TTL_SECONDS", 30),
+    negative_max_entries=env_int("LTC_PUBLIC_QR_NEGATIVE_CACHE_SIZE", 5_000),
+)
+add_trust_summary_listener(_PUBLIC_QR_CACHE.invalidate)
+
+
+def get_public_qr_cache() -> PublicQrCache:
+    return _PUBLIC_QR_CACHE
+
+
+def public_qr_cache_stats() -> Dict[str, float]:
+    return _PUBLIC_QR_CACHE.stats()
@@ -2,7 +2,10 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, Response
 from app.guards import forbid_moderator
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
@@ -12,11 +15,14 @@ try:
 except Exception:  # pragma: no cover
     from app.db.session import get_db  # type: ignore
 
-from app.models.vehicle import Vehicle
-from app.models.vehicle_entry import VehicleEntry
+from app.core.ranged_files import etag_matches
+from app.public.qr_cache import get_public_qr_cache
 from app.services.vehicle_trust import (
+    VehicleTrustSummary,
     accident_status_public_label,
     derive_vehicle_trust_summary,
+    load_vehicle_trust_summaries,
+    load_vehicle_trust_summary,
 )
 
 from app.services.trust_light_v1 import (
@@ -25,6 +31,14 @@ from app.services.trust_light_v1 import (
 router = APIRouter(dependencies=[Depends(forbid_moderator)], prefix="/public", tags=["public"])
 
 
+# Browser/CDN dürfen speichern, müssen aber per ETag revalidieren (304 aus dem Prozess-Cache):
+# nach einer Invalidierung sieht niemand mehr die alte Ampel. Gleich für bekannte und
+# unbekannte IDs (keine Existenz-Leaks über Header)
+PUBLIC_QR_CACHE_CONTROL = "public, no-cache"
+
+# Händler-Listings: eine Seite pro Request, nicht der ganze Bestand
+MAX_PUBLIC_QR_BATCH = 250
+
 DISCLAIMER_TEXT = "Die Trust-Ampel bewertet ausschließlich die Dokumentations- und Nachweisqualität. Sie ist keine Aussage über den technischen Zustand des Fahrzeugs."
 
 class PublicQrResponse(BaseModel):
@@ -38,24 +52,76 @@ class PublicQrResponse(BaseModel):
     disclaimer: str = Field(..., description="Pflicht-Disclaimer für Public-QR")
 
 
+class PublicQrBatchIn(BaseModel):
+    vehicle_ids: List[str] = Field(..., min_length=1, max_length=MAX_PUBLIC_QR_BATCH)
+
+
+class PublicQrBatchResponse(BaseModel):
+    results: dict[str, PublicQrResponse] = Field(..., description="vehicle_id -> Public-QR (unbekannte IDs: neutral)")
+
+
 @router.get("/qr/{vehicle_id}", response_model=PublicQrResponse)
-def get_public_qr(vehicle_id: str, db: Session = Depends(get_db)) -> PublicQrResponse:
+def get_public_qr(
+    vehicle_id: str,
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(default=None),
+) -> Response:
     """
     Public-QR: nur Doku-/Nachweisqualität, NIE technischer Zustand.
     Keine Metrics/Counts/Percentages/Zeiträume in der Response.
+    Antwort kommt serialisiert aus dem Public-QR-Cache (ETag, 304 bei If-None-Match).
     """
+    cache = get_public_qr_cache()
+    cached = cache.get(str(vehicle_id))
+    if cached is None:
+        epoch = cache.epoch()
+        body, negative = _render_public_qr(db, str(vehicle_id))
+        cached = cache.put(str(vehicle_id), body, negative=negative, epoch=epoch)
+
+    headers = {"ETag": cached.etag, "Cache-Control": PUBLIC_QR_CACHE_CONTROL}
+    if if_none_match is not None and etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+@router.post("/qr/batch", response_model=PublicQrBatchResponse)
+def get_public_qr_batch(payload: PublicQrBatchIn, db: Session = Depends(get_db)) -> Response:
+    """
+    Public-QR für viele Fahrzeuge (Händler-Listings): gleiche Felder/Redaktion wie der Einzel-Endpoint.
+    Cache-Treffer kommen aus dem Public-QR-Cache, der Rest mit konstanter Query-Zahl.
+    """
+    ids = list(dict.fromkeys(v.strip() for v in payload.vehicle_ids if v and v.strip()))
+    cache = get_public_qr_cache()
+    bodies: dict[str, bytes] = {}
+    for vid in ids:
+        cached = cache.get(vid)
+        if cached is not None:
+            bodies[vid] = cached.body
+
+    missing = [vid for vid in ids if vid not in bodies]
+    if missing:
+        epoch = cache.epoch()
+        summaries = load_vehicle_trust_summaries(db, missing)
+        for vid in missing:
+            summary = summaries.get(vid)
+            body = _public_qr_body(summary)
+            cache.put(vid, body, negative=summary is None, epoch=epoch)
+            bodies[vid] = body
+
+    # bereits serialisierte Einzelantworten zusammensetzen (kein erneutes Pydantic-Dump)
+    content = b'{"results":{' + b",".join(json.dumps(vid).encode("utf-8") + b":" + bodies[vid] for vid in ids) + b"}}"
+    return Response(content=content, media_type="application/json")
+
+
+def _render_public_qr(db: Session, vehicle_id: str) -> tuple[bytes, bool]:
+    # materialisierte Summary (PK-Lookup); unbekanntes Fahrzeug => neutrale Summary (negativ gecacht)
+    summary = load_vehicle_trust_summary(db, vehicle_id)
+    return _public_qr_body(summary), summary is None
+
 
-    vehicle = db.query(Vehicle).filter(Vehicle.public_id == str(vehicle_id)).first()
-    if vehicle is None:
+def _public_qr_body(summary: Optional[VehicleTrustSummary]) -> bytes:
+    if summary is None:
         summary = derive_vehicle_trust_summary(vehicle_meta=None, entries=[])
-    else:
-        entries = (
-            db.query(VehicleEntry)
-            .filter(VehicleEntry.vehicle_id == vehicle.public_id, VehicleEntry.is_latest.is_(True))
-            .order_by(VehicleEntry.entry_date.desc(), VehicleEntry.created_at.desc())
-            .all()
-        )
-        summary = derive_vehicle_trust_summary(vehicle_meta=vehicle.meta, entries=entries)
 
     hint = summary.hint or green_fallback_hint()
     return PublicQrResponse(
@@ -67,4 +133,4 @@ def get_public_qr(vehicle_id: str, db: Session = Depends(get_db)) -> PublicQrRes
         accident_status=summary.accident_status,
         accident_status_label=accident_status_public_label(summary.accident_status),
         disclaimer=DISCLAIMER_TEXT,
-    )
+    ).model_dump_json().encode("utf-8")
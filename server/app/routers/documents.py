@@ -1,15 +1,16 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Optional
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
 from pydantic import BaseModel
-from starlette.responses import FileResponse
 
 from app.auth.actor import require_actor
-from app.services.documents_store import DocumentsStore, default_store
+from app.core.ranged_files import ranged_file_response
+from app.services.documents_store import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, DocumentsStore, default_store
 from app.schemas.documents import DocumentOut
-from app.models.documents import DocumentScanStatus
+from app.models.documents import DocumentApprovalStatus, DocumentScanStatus
 
 # singleton store (can be overridden in tests via dependency_overrides)
 _STORE: DocumentsStore = default_store()
@@ -37,7 +38,7 @@ class ScanIn(BaseModel):
 
 
 @router.post("/upload", response_model=DocumentOut)
-async def upload_document(
+def upload_document(
     file: UploadFile = File(...),
     actor=Depends(require_actor),
     store: DocumentsStore = Depends(get_documents_store),
@@ -46,13 +47,13 @@ async def upload_document(
     if not uid:
         raise HTTPException(status_code=401, detail="unauthorized")
 
-    content = await file.read()
+    # sync-Endpoint (Threadpool): Datei chunkweise aus dem Spool streamen, nie komplett lesen
     try:
-        return store.upload(
+        return store.upload_stream(
             owner_user_id=str(uid),
             filename=file.filename or "upload.bin",
             content_type=file.content_type or "application/octet-stream",
-            content_bytes=content,
+            fileobj=file.file,
         )
     except ValueError as e:
         msg = str(e)
@@ -63,6 +64,23 @@ async def upload_document(
         raise
 
 
+@router.get("/mine", response_model=list[DocumentOut])
+def list_my_documents(
+    after: Optional[str] = Query(default=None),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    actor=Depends(require_actor),
+    store: DocumentsStore = Depends(get_documents_store),
+):
+    uid = store.actor_user_id(actor)
+    if not uid:
+        raise HTTPException(status_code=401, detail="unauthorized")
+    # wie can_read_meta: Owner sieht nur freigegebene Dokumente
+    try:
+        return store.list_by_owner(uid, approval_status=DocumentApprovalStatus.APPROVED, after=after, limit=limit)
+    except KeyError:
+        raise HTTPException(status_code=400, detail="invalid_cursor")
+
+
 @router.get("/{doc_id}", response_model=DocumentOut)
 def get_document(
     doc_id: str,
@@ -83,6 +101,7 @@ def get_document(
 @router.get("/{doc_id}/download")
 def download_document(
     doc_id: str,
+    request: Request,
     actor=Depends(require_actor),
     store: DocumentsStore = Depends(get_documents_store),
 ):
@@ -91,24 +110,58 @@ def download_document(
     except KeyError:
         raise HTTPException(status_code=404, detail="not_found")
 
+    # Berechtigung VOR jedem Datei-I/O (auch vor 304)
     if not store.can_download(actor, rec):
         raise HTTPException(status_code=403, detail="forbidden")
 
     path: Path = store.file_path(rec)
-    if not path.exists():
+    try:
+        st = path.stat()
+    except FileNotFoundError:
         raise HTTPException(status_code=500, detail="storage_missing")
 
-    return FileResponse(path=path, filename=rec.filename, media_type=rec.content_type)
+    # starker ETag aus dem Inhalt (Checksum); Altbestände ohne Checksum: Größe + mtime
+    etag = f'"{rec.checksum_sha256}"' if rec.checksum_sha256 else f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+    return ranged_file_response(
+        request,
+        path,
+        etag=etag,
+        media_type=rec.content_type,
+        filename=rec.filename,
+        size=st.st_size,
+    )
 
 
 @router.get("/admin/quarantine", response_model=list[DocumentOut])
 def admin_list_quarantine(
+    after: Optional[str] = Query(default=None),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     actor=Depends(require_actor),
     store: DocumentsStore = Depends(get_documents_store),
 ):
+    # Keyset-Pagination: after = id des letzten Eintrags der vorigen Seite
     if not store.is_admin(actor):
         raise HTTPException(status_code=403, detail="forbidden")
-    return store.list_quarantine()
+    try:
+        return store.list_quarantine(after=after, limit=limit)
+    except KeyError:
+        raise HTTPException(status_code=400, detail="invalid_cursor")
+
+
+@router.get("/admin/owners/{owner_user_id}", response_model=list[DocumentOut])
+def admin_list_owner_documents(
+    owner_user_id: str,
+    after: Optional[str] = Query(default=None),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    actor=Depends(require_actor),
+    store: DocumentsStore = Depends(get_documents_store),
+):
+    if not store.is_admin(actor):
+        raise HTTPException(status_code=403, detail="forbidden")
+    try:
+        return store.list_by_owner(owner_user_id, after=after, limit=limit)
+    except KeyError:
+        raise HTTPException(status_code=400, detail="invalid_cursor")
 
 
 @router.post("/{doc_id}/scan", response_model=DocumentOut)
@@ -24,7 +24,7 @@ from app.services.documents_service import (
     mark_pii_status,
     reject_document,
     set_scan_status,
-    sha256_stream,
+    sha256_stream_with_size,
 )
 
 # --- Integration placeholders: replace with your real deps ---
@@ -63,13 +63,9 @@ def upload_document(
 ):
     require_vehicle_access(vehicle_id, actor)
 
-    # Read file stream for checksum; we also need size.
+    # Checksum + Größe chunkweise aus dem Upload-Spool (nie die ganze Datei im RAM).
     # (We do not store raw bytes here; storage handled by your infra.)
-    # We'll read fully once; for large files you may stream to storage and hash during upload.
-    data = file.file.read()
-    size = len(data)
-
-    checksum = __import__("hashlib").sha256(data).hexdigest()
+    checksum, size = sha256_stream_with_size(file.file)
 
     doc = Document(
         vehicle_id=vehicle_id,
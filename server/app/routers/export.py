@@ -7,25 +7,26 @@ import importlib
 import inspect as pyinspect
 import json
 import uuid
-import hmac
-from hashlib import sha256
 from typing import Any, Dict, Optional, Tuple, Type
 
 import jwt
-from fastapi import APIRouter, Depends, Header, HTTPException
-from sqlalchemy import insert, select
-from sqlalchemy.exc import IntegrityError
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy import select
 from sqlalchemy.inspection import inspect as sa_inspect
 from sqlalchemy.orm import Session
 
 from app.auth.crypto import token_hash as token_hash_fn
 from app.core.config import get_settings
+from app.core.keyring import KeyringError, keyring_for
 from app.core.security import Actor, require_roles
 from app.db.session import get_db
-from app.models.audit import IdempotencyRecord
+from app.services.export_store import consume_one_time_token, issue_one_time_token
+from app.services.export_stream import chunked_export_response, full_export_format, iter_ndjson_export
 
 router = APIRouter(prefix="/export", tags=["export"], dependencies=[Depends(forbid_moderator)])
 
+GRANT_RESOURCE_TYPE = "masterclipboard"
+
 
 # ---------------------------
 # helpers: time / json
@@ -89,11 +90,11 @@ def _emit_best_effort_audit_event(
 # helpers: export-token (TTL/Limit)
 # ---------------------------
 
-def _mint_full_export_token(*, actor: Actor, target_id: str, ttl_seconds: int) -> Tuple[str, str]:
+def _mint_full_export_token(db: Session, *, actor: Actor, target_id: str, ttl_seconds: int) -> Tuple[str, str]:
     """
     Full-Export Token:
     - TTL über exp
-    - Limit (1-use) über IdempotencyRecord beim Verbrauch
+    - Limit (1-use) über den Grant-Store (nur HMAC des JWT gespeichert)
     """
     settings = get_settings()
 
@@ -119,6 +120,19 @@ def _mint_full_export_token(*, actor: Actor, target_id: str, ttl_seconds: int) -
     }
 
     token = jwt.encode(payload, settings.secret_key, algorithm=settings.jwt_algorithm)
+    try:
+        issue_one_time_token(
+            db,
+            resource_type=GRANT_RESOURCE_TYPE,
+            resource_id=target_id,
+            issued_by_role=getattr(actor, "role", None) or "unknown",
+            issued_by_user_id=getattr(actor, "user_id", None),
+            ttl_seconds=ttl,
+            uses=1,
+            token=token,
+        )
+    except RuntimeError:
+        raise HTTPException(status_code=500, detail="server_misconfigured")
     return token, exp.isoformat()
 
 
@@ -141,63 +155,19 @@ def _decode_full_export_token(raw_token: str) -> Dict[str, Any]:
     return payload
 
 
-def _consume_one_time_token(db: Session, *, jti: str, token_hmac: str) -> None:
+def _consume_one_time_token(db: Session, *, target_id: str, raw_token: str) -> None:
     """
-    One-time use via IdempotencyRecord – aber robust gegenüber abweichenden
-    ORM-Attributnamen: wir inserten direkt in die Table-Columns.
-
+    One-time use über den Grant-Store (atomares UPDATE auf remaining_uses).
     Token wird absichtlich VOR Datenzugriff konsumiert (least privilege).
     """
-    tbl = IdempotencyRecord.__table__
-    cols = {c.name for c in tbl.columns}
-
-    values: Dict[str, Any] = {}
-
-    # correlation / jti
-    if "correlation_id" in cols:
-        values["correlation_id"] = jti
-    elif "correlationId" in cols:
-        values["correlationId"] = jti
-    elif "correlation" in cols:
-        values["correlation"] = jti
-    elif "request_id" in cols:
-        values["request_id"] = jti
-    elif "requestId" in cols:
-        values["requestId"] = jti
-
-    # idempotency
-    if "idempotency_key" in cols:
-        values["idempotency_key"] = token_hmac
-    elif "idempotencyKey" in cols:
-        values["idempotencyKey"] = token_hmac
-    elif "idem_key" in cols:
-        values["idem_key"] = token_hmac
-
-    # event name
-    if "event_name" in cols:
-        values["event_name"] = "export.full.token_used"
-    elif "eventName" in cols:
-        values["eventName"] = "export.full.token_used"
-    elif "event" in cols:
-        values["event"] = "export.full.token_used"
-
-    # created timestamp (wenn vorhanden)
-    now = _utc_now()
-    if "created_at" in cols:
-        values["created_at"] = now
-    elif "createdAt" in cols:
-        values["createdAt"] = now
-    elif "at" in cols:
-        values["at"] = now
-
-    # Wenn die Tabelle zwingend mehr NOT NULL Felder hat, würden wir hier eh
-    # einen DB-Fehler bekommen – dann sehen wir den konkreten Spaltennamen im Trace.
     try:
-        db.execute(insert(tbl).values(**values))
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="export_token_already_used")
+        consume_one_time_token(db, GRANT_RESOURCE_TYPE, target_id, raw_token)
+    except PermissionError as e:
+        if str(e) == "token_used":
+            raise HTTPException(status_code=409, detail="export_token_already_used")
+        raise HTTPException(status_code=403, detail="export_token_invalid")
+    except RuntimeError:
+        raise HTTPException(status_code=500, detail="server_misconfigured")
 
 
 # ---------------------------
@@ -297,23 +267,16 @@ def _redact_dict(d: Dict[str, Any]) -> Dict[str, Any]:
 # helpers: encryption (Full Export)
 # ---------------------------
 
-def _derive_fernet_key(secret_key: str) -> bytes:
-    digest = hmac.new(secret_key.encode("utf-8"), b"export|full", sha256).digest()
-    return base64.urlsafe_b64encode(digest)
-
-
 def _encrypt_full_payload(secret_key: str, payload: Dict[str, Any]) -> str:
     """
     Strong encryption via cryptography.Fernet.
-    Wenn cryptography fehlt: bewusst blocken (Policy fordert Verschlüsselung).
+    Fehlendes/zu kurzes Secret: 500 server_misconfigured (wie export_vehicle), nie Klartext.
     """
+    # Key-Ableitung (HMAC(secret, "export|full")) einmal pro Secret, danach gecacht
     try:
-        from cryptography.fernet import Fernet  # type: ignore
-    except Exception:
-        raise HTTPException(status_code=501, detail="encryption_unavailable")
-
-    key = _derive_fernet_key(secret_key)
-    f = Fernet(key)
+        f = keyring_for(secret_key).fernet("export.full")
+    except KeyringError:
+        raise HTTPException(status_code=500, detail="server_misconfigured") from None
     token = f.encrypt(_json_dumps(payload).encode("utf-8"))
     return token.decode("utf-8")
 
@@ -368,9 +331,9 @@ def grant_masterclipboard_full_export(
     Full Export Grant:
     - nur SUPERADMIN
     - TTL via exp
-    - Limit via one-time consumption (IdempotencyRecord)
+    - Limit via one-time consumption (Grant-Store)
     """
-    token, expires_at = _mint_full_export_token(actor=actor, target_id=masterclipboard_id, ttl_seconds=ttl_seconds)
+    token, expires_at = _mint_full_export_token(db, actor=actor, target_id=masterclipboard_id, ttl_seconds=ttl_seconds)
 
     _emit_best_effort_audit_event(
         db,
@@ -392,17 +355,19 @@ def grant_masterclipboard_full_export(
 def export_masterclipboard_full_encrypted(
     masterclipboard_id: str,
     x_export_token: Optional[str] = Header(default=None, alias="X-Export-Token"),
+    export_format: Optional[str] = Query(default=None, alias="format"),
     db: Session = Depends(get_db),
     actor: Actor = Depends(require_roles("superadmin")),
-) -> Dict[str, Any]:
+) -> Any:
     """
     Full Export:
     - nur SUPERADMIN
     - zusätzlich X-Export-Token (TTL + one-time)
-    - Payload ist verschlüsselt (Fernet)
+    - Payload ist verschlüsselt (Fernet bzw. format=chunked: gestreamter AES-GCM-Container)
     """
     if not x_export_token:
         raise HTTPException(status_code=400, detail="missing_export_token")
+    fmt = full_export_format(export_format)
 
     claims = _decode_full_export_token(x_export_token)
     if str(claims.get("target_id")) != str(masterclipboard_id):
@@ -412,7 +377,7 @@ def export_masterclipboard_full_encrypted(
     token_h = token_hash_fn(settings.secret_key, x_export_token)
 
     # one-time consumption (vor Datenzugriff)
-    _consume_one_time_token(db, jti=str(claims["jti"]), token_hmac=token_h)
+    _consume_one_time_token(db, target_id=masterclipboard_id, raw_token=x_export_token)
 
     model = _find_first_model_class("app.models.masterclipboard", "masterclipboard")
     row = _get_row_by_any_key(db, model, masterclipboard_id)
@@ -436,6 +401,20 @@ def export_masterclipboard_full_encrypted(
         "data": raw,
     }
 
+    if fmt == "chunked":
+        _emit_best_effort_audit_event(
+            db,
+            actor=actor,
+            event_name="export.event.masterclipboard_full",
+            payload={"target_id": masterclipboard_id, "result": "success"},
+            idempotency_key=token_h,
+        )
+        return chunked_export_response(
+            iter_ndjson_export(payload, ()),
+            filename=f"masterclipboard-{masterclipboard_id}.ltcx",
+            secret=settings.secret_key,
+        )
+
     ciphertext = _encrypt_full_payload(settings.secret_key, payload)
 
     _emit_best_effort_audit_event(
@@ -0,0 +1,198 @@
+# server/app/routers/export_jobs.py
+from __future__ import annotations
+
+import re
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from sqlalchemy.orm import Session
+
+from app.core.ranged_files import ranged_file_response
+from app.guards import forbid_moderator
+from app.routers import export_servicebook, export_user, export_vehicle
+from app.routers.export_vehicle import get_actor, get_db
+from app.services.export_audit import write_export_audit
+from app.services.export_crypto import CHUNKED_ALG_NAME, CHUNKED_MEDIA_TYPE
+from app.services.export_jobs import ExportBuilder, ExportQueueFull, get_export_job_queue
+from app.services.export_store import consume_one_time_token, issue_one_time_token
+
+router = APIRouter(prefix="/export", tags=["export"], dependencies=[Depends(forbid_moderator)])
+
+# kind -> (ID auflösen/Existenz prüfen, Klartext-Builder für den Worker)
+EXPORT_JOB_KINDS: Dict[str, Tuple[Callable[[Session, str], str], ExportBuilder]] = {
+    "vehicle": (export_vehicle.resolve_full_export_id, export_vehicle.iter_full_export),
+    "servicebook": (export_servicebook.resolve_full_export_id, export_servicebook.iter_full_export),
+    "user": (export_user.resolve_full_export_id, export_user.iter_full_export),
+}
+
+GRANT_RESOURCE_TYPE = "export_job"
+
+
+def _role_of(actor: Any) -> str:
+    if isinstance(actor, dict):
+        return str(actor.get("role") or "")
+    return str(getattr(actor, "role", "") or "")
+
+
+def _user_id_of(actor: Any) -> Optional[str]:
+    if isinstance(actor, dict):
+        uid = actor.get("user_id")
+    else:
+        uid = getattr(actor, "user_id", None)
+    return str(uid) if uid else None
+
+
+def _require_superadmin(actor: Any) -> None:
+    # Full Exports (auch als Job) nur SUPERADMIN
+    if _role_of(actor) != "superadmin":
+        raise HTTPException(status_code=403, detail="forbidden")
+
+
+def _own_job(db: Session, actor: Any, job_id: str) -> Dict[str, Any]:
+    _require_superadmin(actor)
+    job = get_export_job_queue().get(db.get_bind(), job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="not_found")
+    # nur der Auftraggeber sieht/lädt seinen Job
+    if (job.get("requested_by_user_id") or None) != _user_id_of(actor):
+        raise HTTPException(status_code=404, detail="not_found")
+    return job
+
+
+def _iso(val: Any) -> Optional[str]:
+    return val.isoformat() if val is not None else None
+
+
+def _job_out(job: Dict[str, Any]) -> Dict[str, Any]:
+    out = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "resource_id": job["resource_id"],
+        "status": job["status"],
+        "created_at": _iso(job.get("created_at")),
+        "started_at": _iso(job.get("started_at")),
+        "finished_at": _iso(job.get("finished_at")),
+        "expires_at": _iso(job.get("expires_at")),
+        "size_bytes": job.get("size_bytes"),
+        "error": job.get("error"),
+    }
+    if job["status"] == "done":
+        out["alg"] = CHUNKED_ALG_NAME
+        out["download"] = f"/export/jobs/{job['id']}/download"
+    return out
+
+
+def _audit(db: Session, actor: Any, event_type: str, job: Dict[str, Any], *, success: bool, reason: Optional[str] = None) -> None:
+    write_export_audit(
+        db,
+        event_type=event_type,
+        actor_role=_role_of(actor),
+        actor_user_id=_user_id_of(actor),
+        target_type=str(job["kind"]),
+        target_id=str(job["resource_id"]),
+        success=success,
+        reason=reason,
+        meta={"job_id": job["id"]},
+        # Download = Datenabfluss: synchron auditieren
+        critical=event_type == "EXPORT_JOB_DOWNLOAD",
+    )
+
+
+@router.post("/{kind}/{resource_id}/jobs", status_code=202)
+def create_export_job(kind: str, resource_id: str, db: Session = Depends(get_db), actor: Any = Depends(get_actor)):
+    """
+    Full Export asynchron: Job wird eingereiht, ein Worker schreibt den verschlüsselten Container auf Platte.
+    Danach: GET /export/jobs/{id} (Status), POST .../grant (One-Time-Token), GET .../download.
+    """
+    _require_superadmin(actor)
+    spec = EXPORT_JOB_KINDS.get(kind)
+    if spec is None:
+        raise HTTPException(status_code=404, detail="unknown_export_kind")
+    resolve, build = spec
+
+    canonical_id = resolve(db, resource_id)
+    try:
+        job = get_export_job_queue().submit(
+            db.get_bind(),
+            kind=kind,
+            resource_id=canonical_id,
+            build=build,
+            requested_by_role=_role_of(actor),
+            requested_by_user_id=_user_id_of(actor),
+        )
+    except ExportQueueFull:
+        raise HTTPException(status_code=503, detail="export_queue_full", headers={"Retry-After": "30"})
+
+    _audit(db, actor, "EXPORT_JOB_CREATED", job, success=True)
+    return _job_out(job)
+
+
+@router.get("/jobs/{job_id}")
+def get_export_job(job_id: str, db: Session = Depends(get_db), actor: Any = Depends(get_actor)):
+    return _job_out(_own_job(db, actor, job_id))
+
+
+@router.post("/jobs/{job_id}/grant")
+def grant_export_job_download(job_id: str, db: Session = Depends(get_db), actor: Any = Depends(get_actor)):
+    job = _own_job(db, actor, job_id)
+    if job["status"] == "expired":
+        raise HTTPException(status_code=410, detail="export_job_expired")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail="export_job_not_ready")
+
+    try:
+        token, expires_at = issue_one_time_token(
+            db,
+            resource_type=GRANT_RESOURCE_TYPE,
+            resource_id=job_id,
+            issued_by_role=_role_of(actor),
+            issued_by_user_id=_user_id_of(actor),
+        )
+    except RuntimeError:
+        raise HTTPException(status_code=500, detail="server_misconfigured")
+    return {"export_token": token, "expires_at": expires_at.isoformat(), "header": "X-Export-Token", "one_time": True}
+
+
+@router.get("/jobs/{job_id}/download")
+def download_export_job(
+    job_id: str,
+    request: Request,
+    x_export_token: Optional[str] = Header(default=None, alias="X-Export-Token"),
+    db: Session = Depends(get_db),
+    actor: Any = Depends(get_actor),
+):
+    job = _own_job(db, actor, job_id)
+    if not x_export_token:
+        raise HTTPException(status_code=400, detail="missing_export_token")
+    if job["status"] == "expired":
+        raise HTTPException(status_code=410, detail="export_job_expired")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail="export_job_not_ready")
+
+    try:
+        consume_one_time_token(db, GRANT_RESOURCE_TYPE, job_id, x_export_token)
+    except PermissionError as e:
+        _audit(db, actor, "EXPORT_JOB_DOWNLOAD", job, success=False, reason=str(e))
+        raise HTTPException(status_code=403, detail="export_token_invalid")
+    except RuntimeError:
+        raise HTTPException(status_code=500, detail="server_misconfigured")
+
+    path = get_export_job_queue().artifact_path(job_id)
+    try:
+        size = path.stat().st_size
+    except FileNotFoundError:
+        raise HTTPException(status_code=410, detail="export_job_expired")
+
+    _audit(db, actor, "EXPORT_JOB_DOWNLOAD", job, success=True)
+    resp = ranged_file_response(
+        request,
+        path,
+        etag=f'"{job_id}-{size:x}"',
+        media_type=CHUNKED_MEDIA_TYPE,
+        filename=re.sub(r"[^A-Za-z0-9._-]", "_", f"{job['kind']}-{job['resource_id']}.ltcx"),
+        size=size,
+        # Token ist bereits verbraucht: immer die ganze Datei (kein 206/304)
+        conditional=False,
+    )
+    resp.headers["X-Export-Alg"] = CHUNKED_ALG_NAME
+    return resp
@@ -141,6 +141,7 @@ def export_masterclipboard_full_grant(
         target_id=masterclipboard_id,
         success=True,
         reason=None,
+        critical=True,
     )
 
     return {"export_token": token, "expires_at": expires_at.isoformat()}
@@ -166,6 +167,7 @@ def export_masterclipboard_full_encrypted(
             target_id=masterclipboard_id,
             success=False,
             reason="missing_x_export_token",
+            critical=True,
         )
         raise HTTPException(status_code=400, detail="missing_x_export_token")
 
@@ -181,6 +183,7 @@ def export_masterclipboard_full_encrypted(
             target_id=masterclipboard_id,
             success=False,
             reason=str(e),
+            critical=True,
         )
         raise HTTPException(status_code=403, detail="export_token_invalid")
 
@@ -198,6 +201,7 @@ def export_masterclipboard_full_encrypted(
         target_id=masterclipboard_id,
         success=True,
         reason=None,
+        critical=True,
     )
 
     return {"target": "masterclipboard", "id": masterclipboard_id, "ciphertext": ciphertext}
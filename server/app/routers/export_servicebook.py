@@ -1,21 +1,25 @@
 from __future__ import annotations
 
-import base64
-import hashlib
-import hmac
 import json
-import os
-import secrets
-import threading
-from datetime import date, datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Tuple
-
-from cryptography.fernet import Fernet
-from fastapi import APIRouter, Depends, Header, HTTPException, Request
-from sqlalchemy import Boolean, Column, DateTime, Integer, MetaData, String, Table, inspect, select, update
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from sqlalchemy import Table, or_, select
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 
+from app.core.keyring import Keyring, KeyringError, get_keyring
+from app.db.reflection import table_registry
 from app.routers.export_vehicle import get_actor, get_db
+from app.services.export_store import consume_one_time_token, issue_one_time_token
+from app.services.export_stream import (
+    chunked_export_response,
+    full_export_format,
+    iter_ndjson_export,
+    iter_table_rows,
+    ndjson_response,
+)
 
 from app.guards import forbid_moderator
 router = APIRouter(prefix="/export/servicebook", tags=["export"], dependencies=[Depends(forbid_moderator)])
@@ -59,24 +63,15 @@ def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def _utcnow_naive() -> datetime:
-    return _utcnow().replace(tzinfo=None)
-
-
-def _derive_fernet_key(secret: str) -> bytes:
-    digest = hashlib.sha256(secret.encode("utf-8")).digest()
-    return base64.urlsafe_b64encode(digest)
-
-
-def _get_secret() -> str:
-    secret = os.environ.get("LTC_SECRET_KEY", "")
-    if len(secret) < 16:
-        raise HTTPException(status_code=500, detail="server_misconfigured")
-    return secret
+def _keyring() -> Keyring:
+    try:
+        return get_keyring()
+    except KeyringError:
+        raise HTTPException(status_code=500, detail="server_misconfigured") from None
 
 
 def _hmac_value(value: str) -> str:
-    return hmac.new(_get_secret().encode("utf-8"), value.encode("utf-8"), hashlib.sha256).hexdigest()
+    return _keyring().hmac_hex("export.redaction", value)
 
 
 def _json_default(o: Any) -> Any:
@@ -85,62 +80,29 @@ def _json_default(o: Any) -> Any:
     return str(o)
 
 
-_grant_lock = threading.Lock()
-_grant_cache: Dict[int, Table] = {}
-
-
-def _grants_table(db: Session) -> Table:
-    engine = db.get_bind()
-    key = id(engine)
-
-    with _grant_lock:
-        cached = _grant_cache.get(key)
-        if cached is not None:
-            return cached
-
-        md = MetaData()
-        insp = inspect(engine)
-
-        if insp.has_table("export_grants_servicebook"):
-            tbl = Table("export_grants_servicebook", md, autoload_with=engine)
-            _grant_cache[key] = tbl
-            return tbl
-
-        tbl = Table(
-            "export_grants_servicebook",
-            md,
-            Column("id", Integer, primary_key=True, autoincrement=True),
-            Column("export_token", String(255), nullable=False, unique=True, index=True),
-            Column("servicebook_id", String(255), nullable=False, index=True),
-            Column("expires_at", DateTime(timezone=True), nullable=False, index=True),
-            Column("used", Boolean, nullable=False, default=False),
-            Column("created_at", DateTime(timezone=True), nullable=False),
-        )
-        md.create_all(engine, tables=[tbl])
-        _grant_cache[key] = tbl
-        return tbl
+def _servicebook_table(db: Session) -> Table:
+    tbl = table_registry.find(
+        db.get_bind(),
+        ("servicebook_entries", "servicebook_entry", "servicebooks", "servicebook", "service_entries", "service_entry"),
+    )
+    if tbl is None:
+        raise HTTPException(status_code=404, detail="not_found")
+    return tbl
 
 
-def _servicebook_table(db: Session) -> Table:
-    engine = db.get_bind()
-    md = MetaData()
-    insp = inspect(engine)
-    for name in ("servicebook_entries", "servicebook_entry", "servicebooks", "servicebook", "service_entries", "service_entry"):
-        if insp.has_table(name):
-            return Table(name, md, autoload_with=engine)
-    raise HTTPException(status_code=404, detail="not_found")
+def _servicebook_key(tbl: Table) -> Any:
+    if "servicebook_id" in tbl.c:
+        return tbl.c.servicebook_id
+    if "vehicle_id" in tbl.c:
+        return tbl.c.vehicle_id
+    if "id" in tbl.c:
+        return tbl.c.id
+    raise HTTPException(status_code=500, detail="server_misconfigured")
 
 
 def _fetch_servicebook_rows(db: Session, servicebook_id: str) -> Tuple[List[Dict[str, Any]], Table]:
     tbl = _servicebook_table(db)
-    if "servicebook_id" in tbl.c:
-        where_col = tbl.c.servicebook_id
-    elif "vehicle_id" in tbl.c:
-        where_col = tbl.c.vehicle_id
-    elif "id" in tbl.c:
-        where_col = tbl.c.id
-    else:
-        raise HTTPException(status_code=500, detail="server_misconfigured")
+    where_col = _servicebook_key(tbl)
 
     rows = db.execute(select(tbl).where(where_col == servicebook_id)).mappings().all()
     if not rows:
@@ -148,6 +110,9 @@ def _fetch_servicebook_rows(db: Session, servicebook_id: str) -> Tuple[List[Dict
     return [dict(r) for r in rows], tbl
 
 
+_OWNER_FIELDS = ("owner_id", "owner_user_id", "user_id", "created_by_user_id", "created_by", "actor_user_id")
+
+
 def _enforce_redacted_access(actor: Any, rows: List[Dict[str, Any]]) -> None:
     role = _role_of(actor)
     if role in {"admin", "superadmin"}:
@@ -160,26 +125,46 @@ def _enforce_redacted_access(actor: Any, rows: List[Dict[str, Any]]) -> None:
     if not uid:
         raise HTTPException(status_code=403, detail="forbidden")
 
-    owner_fields = ("owner_id", "owner_user_id", "user_id", "created_by_user_id", "created_by", "actor_user_id")
     for row in rows:
-        for key in owner_fields:
+        for key in _OWNER_FIELDS:
             val = row.get(key)
             if val and str(val) == uid:
                 return
 
     raise HTTPException(status_code=403, detail="forbidden")
 
-def _read_expires_at(val: Any) -> Optional[datetime]:
-    if val is None:
-        return None
-    if isinstance(val, datetime):
-        return val.replace(tzinfo=None)
-    if isinstance(val, str):
-        try:
-            return datetime.fromisoformat(val).replace(tzinfo=None)
-        except Exception:
-            return None
-    return None
+
+def _iter_servicebook_rows(engine: Engine, tbl: Table, servicebook_id: str) -> Any:
+    stmt = select(tbl).where(_servicebook_key(tbl) == servicebook_id).order_by(*tbl.primary_key.columns)
+    return iter_table_rows(engine, stmt)
+
+
+def _require_servicebook_exists(db: Session, tbl: Table, servicebook_id: str) -> None:
+    where_col = _servicebook_key(tbl)
+    if db.execute(select(where_col).where(where_col == servicebook_id).limit(1)).first() is None:
+        raise HTTPException(status_code=404, detail="not_found")
+
+
+def _enforce_streamed_access(db: Session, actor: Any, tbl: Table, servicebook_id: str) -> None:
+    # wie _fetch_servicebook_rows + _enforce_redacted_access, aber per LIMIT-1-Query statt alle Zeilen zu laden
+    _require_servicebook_exists(db, tbl, servicebook_id)
+    where_col = _servicebook_key(tbl)
+
+    role = _role_of(actor)
+    if role in {"admin", "superadmin"}:
+        return
+    if role not in {"user", "vip", "dealer"}:
+        raise HTTPException(status_code=403, detail="forbidden")
+
+    uid = _user_id_of(actor)
+    owner_cols = [tbl.c[k] for k in _OWNER_FIELDS if k in tbl.c]
+    if not uid or not owner_cols:
+        raise HTTPException(status_code=403, detail="forbidden")
+    owned = db.execute(
+        select(where_col).where(where_col == servicebook_id, or_(*(c == uid for c in owner_cols))).limit(1)
+    ).first()
+    if owned is None:
+        raise HTTPException(status_code=403, detail="forbidden")
 
 
 def _redact_row(row: Dict[str, Any]) -> Dict[str, Any]:
@@ -219,6 +204,23 @@ def _redact_row(row: Dict[str, Any]) -> Dict[str, Any]:
     return out
 
 
+def _full_export_chunks(db: Session, tbl: Table, servicebook_id: str) -> Iterator[bytes]:
+    header = {"target": "servicebook", "id": servicebook_id, "exported_at": _utcnow().isoformat()}
+    return iter_ndjson_export(header, _iter_servicebook_rows(db.get_bind(), tbl, servicebook_id))
+
+
+def resolve_full_export_id(db: Session, servicebook_id: str) -> str:
+    _require_servicebook_exists(db, _servicebook_table(db), servicebook_id)
+    return servicebook_id
+
+
+def iter_full_export(db: Session, servicebook_id: str) -> Iterator[bytes]:
+    """Klartext des Full Exports (Export-Jobs); Zugriff/Grant prüft der Aufrufer."""
+    tbl = _servicebook_table(db)
+    _require_servicebook_exists(db, tbl, servicebook_id)
+    return _full_export_chunks(db, tbl, servicebook_id)
+
+
 @router.get("/{servicebook_id}")
 def export_servicebook_redacted(servicebook_id: str, request: Request, actor: Any = Depends(get_actor)):
     _deny_moderator(actor)
@@ -239,6 +241,32 @@ def export_servicebook_redacted(servicebook_id: str, request: Request, actor: An
         db.close()
 
 
+@router.get("/{servicebook_id}/stream")
+def export_servicebook_redacted_stream(servicebook_id: str, request: Request, actor: Any = Depends(get_actor)):
+    """
+    Redacted Export als NDJSON-Stream (lange Historien): Zeilen cursor-basiert gelesen und einzeln redacted,
+    Speicher bleibt unabhängig von der Anzahl der Einträge konstant.
+    """
+    _deny_moderator(actor)
+    db: Session = next(get_db(request))
+    try:
+        tbl = _servicebook_table(db)
+        _enforce_streamed_access(db, actor, tbl, servicebook_id)
+        engine = db.get_bind()
+        header = {
+            "target": "servicebook",
+            "id": servicebook_id,
+            "_redacted": True,
+            "servicebook_id_hmac": _hmac_value(servicebook_id),
+            "exported_at": _utcnow().isoformat(),
+        }
+    finally:
+        db.close()
+
+    chunks = iter_ndjson_export(header, _iter_servicebook_rows(engine, tbl, servicebook_id), redact=_redact_row)
+    return ndjson_response(chunks, filename=f"servicebook-{servicebook_id}.ndjson")
+
+
 @router.post("/{servicebook_id}/grant")
 def export_servicebook_grant(servicebook_id: str, request: Request, ttl_seconds: int = 300, actor: Any = Depends(get_actor)):
     _deny_moderator(actor)
@@ -247,21 +275,18 @@ def export_servicebook_grant(servicebook_id: str, request: Request, ttl_seconds:
     try:
         _rows, _tbl = _fetch_servicebook_rows(db, servicebook_id)
         ttl = max(30, min(int(ttl_seconds), 3600))
-        tok = secrets.token_urlsafe(32)
-        now = _utcnow_naive()
-        exp = now + timedelta(seconds=ttl)
-
-        grants = _grants_table(db)
-        db.execute(
-            grants.insert().values(
-                export_token=tok,
-                servicebook_id=servicebook_id,
-                expires_at=exp,
-                used=0,
-                created_at=now,
+        try:
+            tok, exp = issue_one_time_token(
+                db,
+                resource_type="servicebook",
+                resource_id=servicebook_id,
+                issued_by_role=_role_of(actor),
+                issued_by_user_id=_user_id_of(actor) or None,
+                ttl_seconds=ttl,
+                uses=1,
             )
-        )
-        db.commit()
+        except RuntimeError:
+            raise HTTPException(status_code=500, detail="server_misconfigured")
         return {
             "servicebook_id": servicebook_id,
             "export_token": tok,
@@ -280,6 +305,7 @@ def export_servicebook_full(
     servicebook_id: str,
     request: Request,
     x_export_token: Optional[str] = Header(default=None, convert_underscores=False, alias="X-Export-Token"),
+    export_format: Optional[str] = Query(default=None, alias="format"),
     actor: Any = Depends(get_actor),
 ):
     _deny_moderator(actor)
@@ -287,23 +313,28 @@ def export_servicebook_full(
 
     if not x_export_token:
         raise HTTPException(status_code=400, detail="missing_export_token")
+    fmt = full_export_format(export_format)
 
     db: Session = next(get_db(request))
     try:
-        rows, _tbl = _fetch_servicebook_rows(db, servicebook_id)
-        grants = _grants_table(db)
-        g = db.execute(select(grants).where(grants.c.export_token == x_export_token)).mappings().first()
-        if g is None:
-            raise HTTPException(status_code=403, detail="forbidden")
-        if str(g.get("servicebook_id") or "") != str(servicebook_id):
-            raise HTTPException(status_code=403, detail="forbidden")
-
-        exp = _read_expires_at(g.get("expires_at"))
-        if exp is None or _utcnow_naive() > exp:
+        if fmt == "chunked":
+            # Zeilen erst im Stream lesen; hier nur Existenz prüfen (superadmin: kein Owner-Check)
+            tbl = _servicebook_table(db)
+            _enforce_streamed_access(db, actor, tbl, servicebook_id)
+            rows: List[Dict[str, Any]] = []
+        else:
+            rows, tbl = _fetch_servicebook_rows(db, servicebook_id)
+        # one-time: atomar verbrauchen, vor dem Export
+        try:
+            consume_one_time_token(db, "servicebook", servicebook_id, x_export_token)
+        except PermissionError:
             raise HTTPException(status_code=403, detail="forbidden")
+        except RuntimeError:
+            raise HTTPException(status_code=500, detail="server_misconfigured")
 
-        if int(g.get("used") or 0) != 0:
-            raise HTTPException(status_code=403, detail="forbidden")
+        if fmt == "chunked":
+            chunks = _full_export_chunks(db, tbl, servicebook_id)
+            return chunked_export_response(chunks, filename=f"servicebook-{servicebook_id}.ltcx")
 
         payload = {
             "target": "servicebook",
@@ -312,14 +343,11 @@ def export_servicebook_full(
             "data": {"servicebook": {"id": servicebook_id, "entries": rows}},
             "exported_at": _utcnow().isoformat(),
         }
-        f = Fernet(_derive_fernet_key(_get_secret()))
+        f = _keyring().fernet("export.fernet")
         ciphertext = f.encrypt(
             json.dumps(payload, ensure_ascii=False, separators=(",", ":"), sort_keys=True, default=_json_default).encode("utf-8")
         ).decode("utf-8")
 
-        db.execute(update(grants).where(grants.c.id == g["id"]).values(used=1))
-        db.commit()
-
         return {"servicebook_id": servicebook_id, "ciphertext": ciphertext, "alg": "fernet", "one_time": True}
     finally:
         db.close()
@@ -1,21 +1,18 @@
 from __future__ import annotations
 
-import base64
-import hashlib
-import hmac
 import json
-import os
-import secrets
-import threading
-from datetime import date, datetime, timedelta, timezone
-from typing import Any, Dict, Optional, Tuple
-
-from cryptography.fernet import Fernet
-from fastapi import APIRouter, Depends, Header, HTTPException, Request
-from sqlalchemy import Boolean, Column, DateTime, Integer, MetaData, String, Table, inspect, select, update
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from sqlalchemy import Table, select
 from sqlalchemy.orm import Session
 
+from app.core.keyring import Keyring, KeyringError, get_keyring
+from app.db.reflection import table_registry
 from app.routers.export_vehicle import get_actor, get_db
+from app.services.export_store import consume_one_time_token, issue_one_time_token
+from app.services.export_stream import chunked_export_response, full_export_format, iter_ndjson_export
 
 from app.guards import forbid_moderator
 router = APIRouter(prefix="/export/user", tags=["export"], dependencies=[Depends(forbid_moderator)])
@@ -59,24 +56,15 @@ def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def _utcnow_naive() -> datetime:
-    return _utcnow().replace(tzinfo=None)
-
-
-def _derive_fernet_key(secret: str) -> bytes:
-    digest = hashlib.sha256(secret.encode("utf-8")).digest()
-    return base64.urlsafe_b64encode(digest)
-
-
-def _get_secret() -> str:
-    secret = os.environ.get("LTC_SECRET_KEY", "")
-    if len(secret) < 16:
-        raise HTTPException(status_code=500, detail="server_misconfigured")
-    return secret
+def _keyring() -> Keyring:
+    try:
+        return get_keyring()
+    except KeyringError:
+        raise HTTPException(status_code=500, detail="server_misconfigured") from None
 
 
 def _hmac_value(value: str) -> str:
-    return hmac.new(_get_secret().encode("utf-8"), value.encode("utf-8"), hashlib.sha256).hexdigest()
+    return _keyring().hmac_hex("export.redaction", value)
 
 
 def _json_default(o: Any) -> Any:
@@ -85,49 +73,11 @@ def _json_default(o: Any) -> Any:
     return str(o)
 
 
-_grant_lock = threading.Lock()
-_grant_cache: Dict[int, Table] = {}
-
-
-def _grants_table(db: Session) -> Table:
-    engine = db.get_bind()
-    key = id(engine)
-
-    with _grant_lock:
-        cached = _grant_cache.get(key)
-        if cached is not None:
-            return cached
-
-        md = MetaData()
-        insp = inspect(engine)
-        if insp.has_table("export_grants_user"):
-            tbl = Table("export_grants_user", md, autoload_with=engine)
-            _grant_cache[key] = tbl
-            return tbl
-
-        tbl = Table(
-            "export_grants_user",
-            md,
-            Column("id", Integer, primary_key=True, autoincrement=True),
-            Column("export_token", String(255), nullable=False, unique=True, index=True),
-            Column("user_id", String(255), nullable=False, index=True),
-            Column("expires_at", DateTime(timezone=True), nullable=False, index=True),
-            Column("used", Boolean, nullable=False, default=False),
-            Column("created_at", DateTime(timezone=True), nullable=False),
-        )
-        md.create_all(engine, tables=[tbl])
-        _grant_cache[key] = tbl
-        return tbl
-
-
 def _users_table(db: Session) -> Table:
-    engine = db.get_bind()
-    md = MetaData()
-    insp = inspect(engine)
-    for name in ("auth_users", "users", "user"):
-        if insp.has_table(name):
-            return Table(name, md, autoload_with=engine)
-    raise HTTPException(status_code=404, detail="not_found")
+    tbl = table_registry.find(db.get_bind(), ("auth_users", "users", "user"))
+    if tbl is None:
+        raise HTTPException(status_code=404, detail="not_found")
+    return tbl
 
 
 def _fetch_user_row(db: Session, user_id: str) -> Tuple[Dict[str, Any], Table]:
@@ -151,18 +101,6 @@ def _enforce_redacted_access(actor: Any, target_user_id: str) -> None:
     if _user_id_of(actor) != str(target_user_id):
         raise HTTPException(status_code=403, detail="forbidden")
 
-def _read_expires_at(val: Any) -> Optional[datetime]:
-    if val is None:
-        return None
-    if isinstance(val, datetime):
-        return val.replace(tzinfo=None)
-    if isinstance(val, str):
-        try:
-            return datetime.fromisoformat(val).replace(tzinfo=None)
-        except Exception:
-            return None
-    return None
-
 
 def _redacted_user(row: Dict[str, Any], target_user_id: str) -> Dict[str, Any]:
     blocked_contains = (
@@ -197,6 +135,27 @@ def _redacted_user(row: Dict[str, Any], target_user_id: str) -> Dict[str, Any]:
     return out
 
 
+def _full_payload(row: Dict[str, Any], resolved_user_id: str) -> Dict[str, Any]:
+    return {
+        "target": "user",
+        "id": resolved_user_id,
+        "user": row,
+        "data": {"user": row},
+        "exported_at": _utcnow().isoformat(),
+    }
+
+
+def resolve_full_export_id(db: Session, user_id: str) -> str:
+    row, _tbl = _fetch_user_row(db, user_id)
+    return str(row.get("user_id") or row.get("id") or user_id)
+
+
+def iter_full_export(db: Session, user_id: str) -> Iterator[bytes]:
+    """Klartext des Full Exports (Export-Jobs); Zugriff/Grant prüft der Aufrufer."""
+    row, _tbl = _fetch_user_row(db, user_id)
+    return iter_ndjson_export(_full_payload(row, str(row.get("user_id") or row.get("id") or user_id)), ())
+
+
 @router.get("/{user_id}")
 def export_user_redacted(user_id: str, request: Request, actor: Any = Depends(get_actor)):
     _deny_moderator(actor)
@@ -226,21 +185,18 @@ def export_user_grant(user_id: str, request: Request, ttl_seconds: int = 300, ac
         resolved_user_id = str(row.get("user_id") or row.get("id") or user_id)
 
         ttl = max(30, min(int(ttl_seconds), 3600))
-        tok = secrets.token_urlsafe(32)
-        now = _utcnow_naive()
-        exp = now + timedelta(seconds=ttl)
-
-        grants = _grants_table(db)
-        db.execute(
-            grants.insert().values(
-                export_token=tok,
-                user_id=resolved_user_id,
-                expires_at=exp,
-                used=0,
-                created_at=now,
+        try:
+            tok, exp = issue_one_time_token(
+                db,
+                resource_type="user",
+                resource_id=resolved_user_id,
+                issued_by_role=_role_of(actor),
+                issued_by_user_id=_user_id_of(actor) or None,
+                ttl_seconds=ttl,
+                uses=1,
             )
-        )
-        db.commit()
+        except RuntimeError:
+            raise HTTPException(status_code=500, detail="server_misconfigured")
         return {
             "user_id": resolved_user_id,
             "export_token": tok,
@@ -259,6 +215,7 @@ def export_user_full(
     user_id: str,
     request: Request,
     x_export_token: Optional[str] = Header(default=None, convert_underscores=False, alias="X-Export-Token"),
+    export_format: Optional[str] = Query(default=None, alias="format"),
     actor: Any = Depends(get_actor),
 ):
     _deny_moderator(actor)
@@ -266,41 +223,30 @@ def export_user_full(
 
     if not x_export_token:
         raise HTTPException(status_code=400, detail="missing_export_token")
+    fmt = full_export_format(export_format)
 
     db: Session = next(get_db(request))
     try:
         row, _tbl = _fetch_user_row(db, user_id)
         resolved_user_id = str(row.get("user_id") or row.get("id") or user_id)
 
-        grants = _grants_table(db)
-        g = db.execute(select(grants).where(grants.c.export_token == x_export_token)).mappings().first()
-        if g is None:
-            raise HTTPException(status_code=403, detail="forbidden")
-        if str(g.get("user_id") or "") != resolved_user_id:
-            raise HTTPException(status_code=403, detail="forbidden")
-
-        exp = _read_expires_at(g.get("expires_at"))
-        if exp is None or _utcnow_naive() > exp:
+        # one-time: atomar verbrauchen, vor jedem Datenzugriff
+        try:
+            consume_one_time_token(db, "user", resolved_user_id, x_export_token)
+        except PermissionError:
             raise HTTPException(status_code=403, detail="forbidden")
+        except RuntimeError:
+            raise HTTPException(status_code=500, detail="server_misconfigured")
 
-        if int(g.get("used") or 0) != 0:
-            raise HTTPException(status_code=403, detail="forbidden")
+        payload = _full_payload(row, resolved_user_id)
+        if fmt == "chunked":
+            return chunked_export_response(iter_ndjson_export(payload, ()), filename=f"user-{resolved_user_id}.ltcx")
 
-        payload = {
-            "target": "user",
-            "id": resolved_user_id,
-            "user": row,
-            "data": {"user": row},
-            "exported_at": _utcnow().isoformat(),
-        }
-        f = Fernet(_derive_fernet_key(_get_secret()))
+        f = _keyring().fernet("export.fernet")
         ciphertext = f.encrypt(
             json.dumps(payload, ensure_ascii=False, separators=(",", ":"), sort_keys=True, default=_json_default).encode("utf-8")
         ).decode("utf-8")
 
-        db.execute(update(grants).where(grants.c.id == g["id"]).values(used=1))
-        db.commit()
-
         return {"user_id": resolved_user_id, "ciphertext": ciphertext, "alg": "fernet", "one_time": True}
     finally:
         db.close()
@@ -1,33 +1,34 @@
 from __future__ import annotations
 
 import base64
-import hashlib
-import hmac
+import importlib
+import inspect as pyinspect
 import json
 import os
-import secrets
-import threading
+import weakref
 from contextlib import contextmanager
-from datetime import date, datetime, timedelta, timezone
+from datetime import date, datetime, timezone
 from typing import Any, Callable, Dict, Iterator, Optional, Tuple
 
-from cryptography.fernet import Fernet
-from fastapi import APIRouter, Depends, Header, HTTPException, Request
-from sqlalchemy import (
-    Column,
-    DateTime,
-    Integer,
-    MetaData,
-    String,
-    Table,
-    inspect,
-    select,
-    update,
-)
+from cryptography.fernet import MultiFernet
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi import params as fastapi_params
+from sqlalchemy import Table, select
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 
 from app.auth.actor import dev_headers_enabled, require_actor as core_require_actor
+from app.core.keyring import Keyring, KeyringError, get_keyring
+from app.db.reflection import table_registry
+from app.services.export_servicebook_redaction import redact_servicebook_entry_row
+from app.services.export_store import consume_one_time_token, issue_one_time_token
+from app.services.export_stream import (
+    chunked_export_response,
+    full_export_format,
+    iter_ndjson_export,
+    iter_table_rows,
+    ndjson_response,
+)
 
 # ============================================================
 # Actor / RBAC (LAZY, keine Varargs => keine 422 Query-Fallen)
@@ -86,69 +87,96 @@ def _call_best_effort(fn: Callable[..., Any], request: Request) -> Any:
     return fn()
 
 
-def get_actor(request: Request) -> Any:
-    ov = getattr(request.app, "dependency_overrides", None)
-    if isinstance(ov, dict) and ov:
-        for fn in list(ov.values()) + list(ov.keys()):
-            if not callable(fn):
-                continue
-            try:
-                res = _call_best_effort(fn, request)
-            except Exception:
-                continue
+# ============================================================
+# Actor-/DB-Auflösung: einmal pro App aufgelöst (neu bei geänderten dependency_overrides)
+#   -> je genau eine Actor- und eine DB-Quelle, pro Request direkt aufgerufen
+#   -> Override-Rolle über den Namen der überschriebenen Dependency (actor/current_user vs. db/session)
+#   -> Aufrufform per Signatur, Module/app.state nur beim Auflösen durchsucht
+# ============================================================
 
-            actor = None
-            if hasattr(res, "__iter__") and hasattr(res, "__next__"):
-                gen = res
-                try:
-                    actor = next(gen)
-                except Exception:
-                    actor = None
-                finally:
-                    try:
-                        if hasattr(gen, "close"):
-                            gen.close()
-                    except Exception:
-                        pass
-            else:
-                actor = res
+_DI_MARKERS = (fastapi_params.Depends, fastapi_params.Param, fastapi_params.Body)
+
+_DB_STATE_FACTORIES = (
+    "_SessionLocal",
+    "SessionLocal",
+    "session_local",
+    "sessionmaker",
+    "SessionMaker",
+    "db_sessionmaker",
+    "db_session_factory",
+    "db_factory",
+)
+_DB_STATE_ENGINES = ("engine", "db_engine", "_engine")
+_DB_MODULES = ("app.db", "app.database", "app.core.db", "app.core.database", "app.deps", "app.dependencies")
+_DB_MODULE_FUNCS = ("get_db_prod", "get_db", "get_session", "db_session")
+_DB_MODULE_FACTORIES = ("SessionLocal", "session_local", "SessionMaker", "sessionmaker")
 
-            if _role_of(actor):
-                return actor
 
+def _compile_call(fn: Callable[..., Any]) -> Optional[Callable[[Request], Any]]:
+    """Aufrufform wie _call_best_effort, aber einmalig über die Signatur bestimmt. None = nie aufrufbar."""
     try:
-        import app.rbac as _rbac  # type: ignore
+        sig = pyinspect.signature(fn)
+    except (TypeError, ValueError):
+        return lambda request: _call_best_effort(fn, request)
 
-        for name in ("require_actor", "get_actor"):
-            fn = getattr(_rbac, name, None)
-            if not callable(fn):
-                continue
+    # FastAPI-Dependencies mit Depends()/Header()-Defaults liefern außerhalb der DI nur Unsinn
+    if any(isinstance(p.default, _DI_MARKERS) for p in sig.parameters.values()):
+        return None
+
+    def binds(*args: Any, **kwargs: Any) -> bool:
+        try:
+            sig.bind(*args, **kwargs)
+            return True
+        except TypeError:
+            return False
+
+    if binds():
+        return lambda request: fn()
+    if binds(None):
+        return lambda request: fn(request)
+    if binds(request=None):
+        return lambda request: fn(request=request)
+    if binds(app=None):
+        return lambda request: fn(app=request.app)
+    return None
+
+
+def _first_value(res: Any) -> Any:
+    if hasattr(res, "__iter__") and hasattr(res, "__next__"):
+        gen = res
+        try:
+            return next(gen)
+        except Exception:
+            return None
+        finally:
             try:
-                res = _call_best_effort(fn, request)
+                if hasattr(gen, "close"):
+                    gen.close()
             except Exception:
-                continue
+                pass
+    return res
 
-            actor = None
-            if hasattr(res, "__iter__") and hasattr(res, "__next__"):
-                gen = res
-                try:
-                    actor = next(gen)
-                except Exception:
-                    actor = None
-                finally:
-                    try:
-                        if hasattr(gen, "close"):
-                            gen.close()
-                    except Exception:
-                        pass
-            else:
-                actor = res
 
-            if _role_of(actor):
-                return actor
-    except Exception:
-        pass
+def _dependency_kind(dep: Any) -> Optional[str]:
+    # Rolle einer überschriebenen Dependency: get_actor/require_actor/get_current_user -> "actor", get_db/... -> "db"
+    name = str(getattr(dep, "__name__", "") or "").lower()
+    if "actor" in name or "current_user" in name:
+        return "actor"
+    if "db" in name.split("_") or "session" in name:
+        return "db"
+    return None
+
+
+def _override_call(overrides: Dict[Any, Any], kind: str) -> Optional[Callable[[Request], Any]]:
+    for dep, fn in overrides.items():
+        if callable(fn) and _dependency_kind(dep) == kind:
+            call = _compile_call(fn)
+            if call is not None:
+                return call
+    return None
 
+
+def _default_actor(request: Request) -> Any:
     try:
         return core_require_actor(request)
     except HTTPException as exc:
@@ -166,6 +194,126 @@ def get_actor(request: Request) -> Any:
     raise HTTPException(status_code=401, detail="unauthorized")
 
 
+def _session_or_none(make: Callable[[], Any]) -> Optional[Session]:
+    try:
+        db = make()
+    except Exception:
+        return None
+    return db if isinstance(db, Session) else None
+
+
+def _engine_source(engine: Any) -> Callable[[Request], Optional[Session]]:
+    from sqlalchemy.orm import sessionmaker
+
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return lambda request: _session_or_none(factory)
+
+
+def _factory_source(factory: Callable[[], Any]) -> Callable[[Request], Optional[Session]]:
+    return lambda request: _session_or_none(factory)
+
+
+def _call_source(call: Callable[[Request], Any]) -> Callable[[Request], Optional[Session]]:
+    def source(request: Request) -> Optional[Session]:
+        try:
+            with _session_from_result(call(request)) as db:
+                return db
+        except Exception:
+            return None
+
+    return source
+
+
+def _no_session(request: Request) -> Optional[Session]:
+    return None
+
+
+class _Resolution:
+    """Aufgelöste Quellen für eine App + einen Stand der dependency_overrides."""
+
+    def __init__(self, app: Any, overrides: Dict[Any, Any]) -> None:
+        self.fingerprint = _overrides_fingerprint(overrides)
+        self._keep = tuple(overrides.items())  # hält ids im Fingerprint gültig
+        self.actor_call = _override_call(overrides, "actor")
+        self.session = self._db_source(app, overrides)
+
+    def actor(self, request: Request) -> Any:
+        if self.actor_call is not None:
+            try:
+                actor = _first_value(self.actor_call(request))
+            except Exception:
+                actor = None
+            if _role_of(actor):
+                return actor
+        return _default_actor(request)
+
+    @staticmethod
+    def _db_source(app: Any, overrides: Dict[Any, Any]) -> Callable[[Request], Optional[Session]]:
+        # Reihenfolge wie bisher: Override, app.state (Factory, Engine), Module (Funktion, Factory, Engine)
+        call = _override_call(overrides, "db")
+        if call is not None:
+            return _call_source(call)
+
+        st = getattr(app, "state", None)
+        if st is not None:
+            for name in _DB_STATE_FACTORIES:
+                factory = getattr(st, name, None)
+                if callable(factory):
+                    return _factory_source(factory)
+            engine = next((e for e in (getattr(st, n, None) for n in _DB_STATE_ENGINES) if e is not None), None)
+            if engine is not None:
+                return _engine_source(engine)
+
+        for modname in _DB_MODULES:
+            try:
+                mod = importlib.import_module(modname)
+            except Exception:
+                continue
+            for fname in _DB_MODULE_FUNCS:
+                fn = getattr(mod, fname, None)
+                call = _compile_call(fn) if callable(fn) else None
+                if call is not None:
+                    return _call_source(call)
+            for sname in _DB_MODULE_FACTORIES:
+                fac = getattr(mod, sname, None)
+                if callable(fac):
+                    return _factory_source(fac)
+            engine = getattr(mod, "engine", None)
+            if engine is not None:
+                return _engine_source(engine)
+
+        return _no_session
+
+
+def _overrides_fingerprint(overrides: Dict[Any, Any]) -> Tuple[Tuple[int, int], ...]:
+    return tuple((id(k), id(v)) for k, v in overrides.items())
+
+
+_RESOLUTIONS: "weakref.WeakKeyDictionary[Any, _Resolution]" = weakref.WeakKeyDictionary()
+_RESOLUTION_STATS = {"compiles": 0}
+
+
+def _resolution(request: Request) -> _Resolution:
+    app = request.app
+    ov = getattr(app, "dependency_overrides", None)
+    if not isinstance(ov, dict):
+        ov = {}
+    res = _RESOLUTIONS.get(app)
+    if res is None or res.fingerprint != _overrides_fingerprint(ov):
+        res = _Resolution(app, ov)
+        _RESOLUTIONS[app] = res
+        _RESOLUTION_STATS["compiles"] += 1
+    return res
+
+
+def resolution_stats() -> Dict[str, int]:
+    return {"apps": len(_RESOLUTIONS), **_RESOLUTION_STATS}
+
+
+def get_actor(request: Request) -> Any:
+    return _resolution(request).actor(request)
+
+
 def forbid_moderator(actor: Any = Depends(get_actor)) -> None:
     if _role_of(actor) == "moderator":
         raise HTTPException(status_code=403, detail="forbidden")
@@ -210,125 +358,8 @@ def _session_from_result(res: Any) -> Iterator[Session]:
     raise HTTPException(status_code=500, detail="server_misconfigured")
 
 
-def _probe_db_from_overrides(request: Request) -> Optional[Session]:
-    ov = getattr(request.app, "dependency_overrides", None)
-    if not isinstance(ov, dict) or not ov:
-        return None
-
-    for fn in list(ov.values()) + list(ov.keys()):
-        if not callable(fn):
-            continue
-        try:
-            res = _call_best_effort(fn, request)
-        except Exception:
-            continue
-        try:
-            with _session_from_result(res) as db:
-                return db
-        except Exception:
-            continue
-
-    return None
-
-
-def _probe_db_from_state(request: Request) -> Optional[Session]:
-    st = getattr(request.app, "state", None)
-    if st is None:
-        return None
-
-    for name in (
-        "_SessionLocal",
-        "SessionLocal",
-        "session_local",
-        "sessionmaker",
-        "SessionMaker",
-        "db_sessionmaker",
-        "db_session_factory",
-        "db_factory",
-    ):
-        factory = getattr(st, name, None)
-        if callable(factory):
-            try:
-                db = factory()
-                if isinstance(db, Session):
-                    return db
-            except Exception:
-                continue
-
-    engine = getattr(st, "engine", None) or getattr(st, "db_engine", None) or getattr(st, "_engine", None)
-    if engine is not None:
-        try:
-            from sqlalchemy.orm import sessionmaker
-
-            SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-            db = SessionLocal()
-            if isinstance(db, Session):
-                return db
-        except Exception:
-            return None
-
-    return None
-
-
-def _probe_db_from_modules(request: Request) -> Optional[Session]:
-    for modname in (
-        "app.db",
-        "app.database",
-        "app.core.db",
-        "app.core.database",
-        "app.deps",
-        "app.dependencies",
-    ):
-        try:
-            mod = __import__(modname, fromlist=["*"])
-        except Exception:
-            continue
-
-        for fname in ("get_db_prod", "get_db", "get_session", "db_session"):
-            fn = getattr(mod, fname, None)
-            if callable(fn):
-                try:
-                    res = _call_best_effort(fn, request)
-                except Exception:
-                    continue
-                try:
-                    with _session_from_result(res) as db:
-                        return db
-                except Exception:
-                    continue
-
-        for sname in ("SessionLocal", "session_local", "SessionMaker", "sessionmaker"):
-            fac = getattr(mod, sname, None)
-            if callable(fac):
-                try:
-                    db = fac()
-                    if isinstance(db, Session):
-                        return db
-                except Exception:
-                    continue
-
-        engine = getattr(mod, "engine", None)
-        if engine is not None:
-            try:
-                from sqlalchemy.orm import sessionmaker
-
-                SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-                db = SessionLocal()
-                if isinstance(db, Session):
-                    return db
-            except Exception:
-                continue
-
-    return None
-
-
 def get_db(request: Request) -> Iterator[Session]:
-    db = _probe_db_from_overrides(request)
-    if db is None:
-        db = _probe_db_from_state(request)
-    if db is None:
-        db = _probe_db_from_modules(request)
-
+    db = _resolution(request).session(request)
     if db is None:
         raise HTTPException(status_code=500, detail="server_misconfigured")
 
@@ -369,13 +400,6 @@ router = APIRouter(
 
 _ADMIN_ROLES = {"admin", "superadmin"}
 
-_meta_lock = threading.Lock()
-_meta_cache: Dict[int, Tuple[MetaData, Table]] = {}
-
-_grant_lock = threading.Lock()
-_grant_cache: Dict[int, Table] = {}
-
-
 def _is_admin_like(actor: Any) -> bool:
     return _role_of(actor) in _ADMIN_ROLES
 
@@ -402,23 +426,10 @@ def _get_engine(db: Session) -> Engine:
 
 def _vehicles_table(db: Session) -> Table:
     engine = _get_engine(db)
-    key = id(engine)
-
-    with _meta_lock:
-        cached = _meta_cache.get(key)
-        if cached is not None:
-            return cached[1]
-
-        md = MetaData()
-        for name in ("vehicles", "vehicle"):
-            try:
-                tbl = Table(name, md, autoload_with=engine)
-                _meta_cache[key] = (md, tbl)
-                return tbl
-            except Exception:
-                continue
-
-    raise HTTPException(status_code=500, detail="server_misconfigured")
+    tbl = table_registry.find(engine, ("vehicles", "vehicle"))
+    if tbl is None:
+        raise HTTPException(status_code=500, detail="server_misconfigured")
+    return tbl
 
 
 def _lookup_vehicle(db: Session, vehicle_id: str) -> Tuple[Dict[str, Any], Table]:
@@ -485,78 +496,19 @@ def _enforce_scope(actor: Any, row: Dict[str, Any], tbl: Table) -> None:
         raise HTTPException(status_code=403, detail="forbidden")
 
 
-# ============================================================
-# Grant persistence: export_grants_vehicle (für TTL Test)
-#   -> braucht id PK (test nutzt grants.c.id / row["id"])
-#   -> migriert test-sicher: wenn Tabelle existiert aber ohne id -> drop & recreate
-# ============================================================
-
-def _grants_table(db: Session) -> Table:
-    engine = _get_engine(db)
-    key = id(engine)
-
-    with _grant_lock:
-        cached = _grant_cache.get(key)
-        if cached is not None:
-            return cached
-
-        insp = inspect(engine)
-        if insp.has_table("export_grants_vehicle"):
-            cols = [c.get("name") for c in insp.get_columns("export_grants_vehicle")]
-            if "id" not in cols:
-                old_md = MetaData()
-                old = Table("export_grants_vehicle", old_md, autoload_with=engine)
-                old.drop(engine, checkfirst=True)
-
-        md = MetaData()
-        grants = Table(
-            "export_grants_vehicle",
-            md,
-            Column("id", Integer, primary_key=True, autoincrement=True),
-            Column("export_token", String, nullable=False, unique=True),
-            Column("vehicle_id", String, nullable=False),
-            Column("expires_at", DateTime, nullable=False),
-            Column("used", Integer, nullable=False, default=0, server_default="0"),
-            Column("created_at", DateTime, nullable=False),
-        )
-        md.create_all(engine, tables=[grants])
-        _grant_cache[key] = grants
-        return grants
-
-
-def _read_expires_at(val: Any) -> Optional[datetime]:
-    if val is None:
-        return None
-    if isinstance(val, datetime):
-        return val.replace(tzinfo=None)
-    if isinstance(val, str):
-        try:
-            dt = datetime.fromisoformat(val)
-            return dt.replace(tzinfo=None)
-        except Exception:
-            return None
-    return None
-
-
 # ============================================================
 # Crypto / helpers
 # ============================================================
 
-def _derive_fernet_key(secret: str) -> bytes:
-    digest = hashlib.sha256(secret.encode("utf-8")).digest()
-    return base64.urlsafe_b64encode(digest)
-
-
-def _get_secret() -> str:
-    secret = os.environ.get("LTC_SECRET_KEY", "")
-    if len(secret) < 16:
-        raise HTTPException(status_code=500, detail="server_misconfigured")
-    return secret
+def _keyring() -> Keyring:
+    try:
+        return get_keyring()
+    except KeyringError:
+        raise HTTPException(status_code=500, detail="server_misconfigured") from None
 
 
-def _get_fernet() -> Fernet:
-    secret = _get_secret()
-    return Fernet(_derive_fernet_key(secret))
+def _get_fernet() -> MultiFernet:
+    return _keyring().fernet("export.fernet")
 
 
 def _ttl_seconds(ttl_seconds_param: int) -> int:
@@ -589,8 +541,78 @@ def _vin_hmac(row: Dict[str, Any]) -> Optional[str]:
     vin = row.get("vin")
     if vin is None or str(vin) == "":
         return None
-    secret = _get_secret()
-    return hmac.new(secret.encode("utf-8"), str(vin).encode("utf-8"), hashlib.sha256).hexdigest()
+    return _keyring().hmac_hex("export.redaction", str(vin))
+
+
+def _iter_entry_rows(engine: Engine, pid: str) -> Iterator[Dict[str, Any]]:
+    # Eintragshistorie cursor-basiert (für Streams); ohne vehicle_entries-Tabelle leer
+    entries = table_registry.find(engine, ("vehicle_entries", "vehicle_entry"))
+    if entries is None or "vehicle_id" not in entries.c:
+        return iter(())
+    order = [entries.c[c] for c in ("entry_date", "created_at", "id") if c in entries.c]
+    return iter_table_rows(engine, select(entries).where(entries.c.vehicle_id == pid).order_by(*order))
+
+
+_ENTRY_PRIVATE_KEYS = ("owner_user_id", "owner_id", "owner_email", "vin")
+
+
+def _redact_entry_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    # wie Servicebook-Redaction (kein Freitext, nur APPROVED Doc-Refs) + keine Owner-Referenzen
+    out = redact_servicebook_entry_row(row)
+    for key in _ENTRY_PRIVATE_KEYS:
+        out.pop(key, None)
+    return out
+
+
+def _redacted_vehicle_data(row: Dict[str, Any], tbl: Table, vehicle_id: str) -> Dict[str, Any]:
+    pid = str(row.get("public_id") or row.get("id") or vehicle_id)
+
+    data: Dict[str, Any] = {
+        "target": "vehicle",
+        "id": pid,
+        "vehicle_id": pid,
+        "public_id": pid,
+        "_redacted": True,
+        "exported_at": _utcnow().isoformat(),
+        # p0-kompat: nested vehicle mit safe-only Teilen
+        "vehicle": {"public_id": pid},
+    }
+
+    # optional mask-helpers (falls vorhanden)
+    if "vin_prefix3" in tbl.c:
+        data["vehicle"]["vin_prefix3"] = row.get("vin_prefix3")
+    if "vin_last4" in tbl.c:
+        data["vehicle"]["vin_last4"] = row.get("vin_last4")
+
+    # REQUIRED by tests/test_export_vehicle.py
+    vh = _vin_hmac(row)
+    if vh is not None:
+        data["vin_hmac"] = vh
+
+    # Hard guarantee: no raw vin / owner_email leaks
+    data.pop("vin", None)
+    data.pop("owner_email", None)
+    if isinstance(data.get("vehicle"), dict):
+        data["vehicle"].pop("vin", None)
+        data["vehicle"].pop("owner_email", None)
+    return data
+
+
+def _full_export_chunks(db: Session, row: Dict[str, Any], pid: str) -> Iterator[bytes]:
+    # Full Export als NDJSON: Header = Fahrzeug (unredacted), dann volle Einträge
+    header = {"target": "vehicle", "id": pid, "exported_at": _utcnow().isoformat(), "vehicle": row}
+    return iter_ndjson_export(header, _iter_entry_rows(_get_engine(db), pid))
+
+
+def resolve_full_export_id(db: Session, vehicle_id: str) -> str:
+    row, _tbl = _lookup_vehicle(db, vehicle_id)
+    return str(row.get("public_id") or row.get("id") or vehicle_id)
+
+
+def iter_full_export(db: Session, vehicle_id: str) -> Iterator[bytes]:
+    """Klartext des Full Exports (Export-Jobs); Zugriff/Grant prüft der Aufrufer."""
+    row, _tbl = _lookup_vehicle(db, vehicle_id)
+    return _full_export_chunks(db, row, str(row.get("public_id") or row.get("id") or vehicle_id))
 
 
 # ============================================================
@@ -605,39 +627,26 @@ def export_vehicle_redacted(vehicle_id: str, request: Request, actor: Any = Depe
     with _db_from_request(request) as db:
         row, tbl = _lookup_vehicle(db, vehicle_id)
         _enforce_scope(actor, row, tbl)
+        return {"data": _redacted_vehicle_data(row, tbl, vehicle_id)}
 
-        pid = str(row.get("public_id") or row.get("id") or vehicle_id)
-
-        data: Dict[str, Any] = {
-            "target": "vehicle",
-            "id": pid,
-            "vehicle_id": pid,
-            "public_id": pid,
-            "_redacted": True,
-            "exported_at": _utcnow().isoformat(),
-            # p0-kompat: nested vehicle mit safe-only Teilen
-            "vehicle": {"public_id": pid},
-        }
-
-        # optional mask-helpers (falls vorhanden)
-        if "vin_prefix3" in tbl.c:
-            data["vehicle"]["vin_prefix3"] = row.get("vin_prefix3")
-        if "vin_last4" in tbl.c:
-            data["vehicle"]["vin_last4"] = row.get("vin_last4")
 
-        # REQUIRED by tests/test_export_vehicle.py
-        vh = _vin_hmac(row)
-        if vh is not None:
-            data["vin_hmac"] = vh
+@router.get("/{vehicle_id}/stream")
+def export_vehicle_redacted_stream(vehicle_id: str, request: Request, actor: Any = Depends(get_actor)):
+    """
+    Redacted Export inkl. Eintragshistorie als NDJSON-Stream: Header = redacted Fahrzeug,
+    danach Einträge cursor-basiert gelesen und einzeln redacted (Speicher unabhängig von der Historie).
+    """
+    if _role_of(actor) == "moderator":
+        raise HTTPException(status_code=403, detail="forbidden")
 
-        # Hard guarantee: no raw vin / owner_email leaks
-        data.pop("vin", None)
-        data.pop("owner_email", None)
-        if isinstance(data.get("vehicle"), dict):
-            data["vehicle"].pop("vin", None)
-            data["vehicle"].pop("owner_email", None)
+    with _db_from_request(request) as db:
+        row, tbl = _lookup_vehicle(db, vehicle_id)
+        _enforce_scope(actor, row, tbl)
+        header = _redacted_vehicle_data(row, tbl, vehicle_id)
+        rows = _iter_entry_rows(_get_engine(db), header["id"])
 
-        return {"data": data}
+    chunks = iter_ndjson_export(header, rows, redact=_redact_entry_row)
+    return ndjson_response(chunks, filename=f"vehicle-{header['id']}.ndjson")
 
 
 @router.post("/{vehicle_id}/grant")
@@ -652,21 +661,18 @@ def export_vehicle_grant(vehicle_id: str, request: Request, ttl_seconds: int = 3
         pid = str(row.get("public_id") or row.get("id") or vehicle_id)
 
         ttl = _ttl_seconds(ttl_seconds)
-        tok = secrets.token_urlsafe(32)
-        now = _utcnow_naive()
-        exp = now + timedelta(seconds=ttl)
-
-        grants = _grants_table(db)
-        db.execute(
-            grants.insert().values(
-                export_token=tok,
-                vehicle_id=pid,
-                expires_at=exp,
-                used=0,
-                created_at=now,
+        try:
+            tok, exp = issue_one_time_token(
+                db,
+                resource_type="vehicle",
+                resource_id=pid,
+                issued_by_role=_role_of(actor),
+                issued_by_user_id=_user_id_of(actor) or None,
+                ttl_seconds=ttl,
+                uses=1,
             )
-        )
-        db.commit()
+        except RuntimeError:
+            raise HTTPException(status_code=500, detail="server_misconfigured")
 
         return {
             "vehicle_id": pid,
@@ -684,6 +690,7 @@ def export_vehicle_full(
     vehicle_id: str,
     request: Request,
     x_export_token: Optional[str] = Header(default=None, convert_underscores=False, alias="X-Export-Token"),
+    export_format: Optional[str] = Query(default=None, alias="format"),
     actor: Any = Depends(get_actor),
 ):
     if _role_of(actor) == "moderator":
@@ -693,29 +700,22 @@ def export_vehicle_full(
 
     if not x_export_token:
         raise HTTPException(status_code=400, detail="missing_export_token")
+    fmt = full_export_format(export_format)
 
     with _db_from_request(request) as db:
         row, _tbl = _lookup_vehicle(db, vehicle_id)
         pid = str(row.get("public_id") or row.get("id") or vehicle_id)
 
-        grants = _grants_table(db)
-        g = db.execute(select(grants).where(grants.c.export_token == x_export_token)).mappings().first()
-        if g is None:
-            raise HTTPException(status_code=403, detail="forbidden")
-
-        if str(g.get("vehicle_id") or "") != pid:
-            raise HTTPException(status_code=403, detail="forbidden")
-
-        exp = _read_expires_at(g.get("expires_at"))
-        if exp is None or _utcnow_naive() > exp:
-            raise HTTPException(status_code=403, detail="forbidden")
-
+        # one-time: atomar verbrauchen, vor jedem Datenzugriff
         try:
-            used_int = int(g.get("used") or 0)
-        except Exception:
-            used_int = 0
-        if used_int != 0:
+            consume_one_time_token(db, "vehicle", pid, x_export_token)
+        except PermissionError:
             raise HTTPException(status_code=403, detail="forbidden")
+        except RuntimeError:
+            raise HTTPException(status_code=500, detail="server_misconfigured")
+
+        if fmt == "chunked":
+            return chunked_export_response(_full_export_chunks(db, row, pid), filename=f"vehicle-{pid}.ltcx")
 
         # Full payload MUST satisfy tests/test_export_vehicle.py:
         # payload["target"], payload["id"], payload["vehicle"]["vin"]
@@ -739,8 +739,4 @@ def export_vehicle_full(
         ).encode("utf-8")
         ciphertext = f.encrypt(plaintext).decode("utf-8")
 
-        # one-time: mark used by id (tests reflect grants.c.id)
-        db.execute(update(grants).where(grants.c.id == g["id"]).values(used=1))
-        db.commit()
-
         return {"vehicle_id": pid, "ciphertext": ciphertext, "alg": "fernet", "one_time": True}
@@ -6,9 +6,10 @@ from decimal import Decimal
 import uuid
 from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
 from pydantic import BaseModel, Field
-from sqlalchemy import func
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import aliased
 from sqlalchemy.orm import Session
 
 from app.auth.actor import require_actor
@@ -20,15 +21,31 @@ except Exception:  # pragma: no cover
     from app.db.session import get_db  # type: ignore
 
 from app.models.vehicle import Vehicle
-from app.models.vehicle_entry import VehicleEntry
+from app.models.vehicle_entry import EntryGroup, VehicleEntry
+from app.services.consent_store import has_required_consents
+from app.services.entry_groups import (
+    EntryGroupConflict,
+    advance_entry_group,
+    entry_group_revision_count,
+    open_entry_group,
+    revision_count_column,
+)
+from app.services.entry_import import ImportFormatError, detect_format, import_entries, iter_rows
 from app.services.vehicle_trust import (
+    VehicleTrustSummary,
     accident_status_public_label,
     derive_vehicle_trust_summary,
+    load_vehicle_trust_summary,
 )
 
 VIN_RE = re.compile(r"^[A-HJ-NPR-Z0-9]{11,17}$")  # excludes I,O,Q
 ALLOWED_ROLES = {"user", "vip", "dealer", "admin", "superadmin"}
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# gesetzt, wenn weitere Seiten existieren (Wert = after für die nächste Seite)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
 
 def _role_of(actor: Any) -> str:
     if isinstance(actor, dict):
@@ -56,27 +73,13 @@ def _normalize_vin(vin: str) -> str:
 def require_consent(db: Session, actor: Any) -> None:
     uid = _user_id_of(actor)
 
+    # gemeinsamer, gecachter Check (app/consent/cache.py); Fehler -> deny
     try:
-        from app.services.consent_store import has_required_consents  # type: ignore
         if has_required_consents(db, uid):
             return
     except Exception:
         pass
 
-    try:
-        import app.consent_store as cs  # type: ignore
-        required_version = cs.env_consent_version()
-        st = cs.get_consent_status(cs.env_db_path(), uid, required_version)
-        ok = False
-        if isinstance(st, dict):
-            ok = bool(st.get("ok") or st.get("has_required") or st.get("accepted"))
-        else:
-            ok = bool(getattr(st, "ok", False) or getattr(st, "has_required", False) or getattr(st, "accepted", False))
-        if ok:
-            return
-    except Exception:
-        pass
-
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="consent_required")
 
 
@@ -135,6 +138,20 @@ class VehicleEntryOut(BaseModel):
     updated_at: datetime
 
 
+class VehicleEntryImportError(BaseModel):
+    row: int
+    error: str
+    field: Optional[str] = None
+
+
+class VehicleEntryImportOut(BaseModel):
+    inserted: int
+    failed: int
+    vehicles: int
+    errors: list[VehicleEntryImportError]
+    errors_truncated: bool
+
+
 def _require_consent_dep(
     db: Session = Depends(get_db),
     actor: Any = Depends(require_actor),
@@ -174,14 +191,16 @@ def _load_vehicle_for_actor(db: Session, actor: Any, vehicle_id: str) -> Vehicle
     return v
 
 
-def _revision_counts(db: Session, vehicle_id: str) -> dict[str, int]:
-    rows = (
-        db.query(VehicleEntry.entry_group_id, func.count(VehicleEntry.id))
-        .filter(VehicleEntry.vehicle_id == vehicle_id)
-        .group_by(VehicleEntry.entry_group_id)
-        .all()
-    )
-    return {group_id: count for group_id, count in rows}
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_cursor")
+
+
+def _set_next_cursor(response: Response, rows: list, limit: int, cursor_of: Any) -> list:
+    # Seite mit limit + 1 Zeilen gelesen: Überhang => es gibt eine nächste Seite
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(cursor_of(rows[-1]))
+    return rows
 
 
 def _entry_to_out(entry: VehicleEntry, revision_count: int) -> VehicleEntryOut:
@@ -206,17 +225,46 @@ def _entry_to_out(entry: VehicleEntry, revision_count: int) -> VehicleEntryOut:
     )
 
 
-def _latest_entries_for_vehicle(db: Session, vehicle_public_id: str) -> list[VehicleEntry]:
-    return (
-        db.query(VehicleEntry)
+def _latest_entries_page(
+    db: Session,
+    vehicle_public_id: str,
+    *,
+    after: Optional[str],
+    limit: int,
+) -> list[tuple[VehicleEntry, int]]:
+    """
+    Keyset-Seite der Latest-Einträge (entry_date DESC, created_at DESC, id DESC) inkl. Revisionszahl
+    aus entry_groups (Join, kein Aggregat). after = id des letzten Eintrags der vorigen Seite.
+    """
+    q = (
+        db.query(VehicleEntry, revision_count_column())
+        .outerjoin(EntryGroup, EntryGroup.group_id == VehicleEntry.entry_group_id)
         .filter(VehicleEntry.vehicle_id == vehicle_public_id, VehicleEntry.is_latest.is_(True))
-        .order_by(VehicleEntry.entry_date.desc(), VehicleEntry.created_at.desc())
+    )
+    if after is not None:
+        exists = (
+            db.query(VehicleEntry.id)
+            .filter(VehicleEntry.vehicle_id == vehicle_public_id, VehicleEntry.id == after, VehicleEntry.is_latest.is_(True))
+            .first()
+        )
+        if exists is None:
+            raise _invalid_cursor()
+        # Vergleich gegen die gespeicherten Werte der Anker-Zeile (Join), nicht gegen Python-Werte:
+        # server_default-Zeitstempel und gebundene datetimes haben in SQLite unterschiedliche Textformate
+        anchor = aliased(VehicleEntry)
+        q = q.join(anchor, anchor.id == after).filter(
+            tuple_(VehicleEntry.entry_date, VehicleEntry.created_at, VehicleEntry.id)
+            < tuple_(anchor.entry_date, anchor.created_at, anchor.id)
+        )
+    rows = (
+        q.order_by(VehicleEntry.entry_date.desc(), VehicleEntry.created_at.desc(), VehicleEntry.id.desc())
+        .limit(limit)
         .all()
     )
+    return [(entry, int(count or 1)) for entry, count in rows]
 
 
-def _trust_summary_out(vehicle: Vehicle, entries: list[VehicleEntry]) -> VehicleTrustSummaryOut:
-    summary = derive_vehicle_trust_summary(vehicle_meta=vehicle.meta, entries=entries)
+def _trust_summary_out(summary: VehicleTrustSummary) -> VehicleTrustSummaryOut:
     return VehicleTrustSummaryOut(
         trust_light=summary.trust_light,
         hint=summary.hint,
@@ -264,17 +312,70 @@ def create_vehicle(payload: VehicleCreateIn, db: Session = Depends(get_db), acto
 
 @router.get("", response_model=list[VehicleOut])
 @router.get("/", response_model=list[VehicleOut])
-def list_vehicles(db: Session = Depends(get_db), actor: Any = Depends(require_actor)) -> list[VehicleOut]:
+def list_vehicles(
+    response: Response,
+    after: Optional[str] = Query(default=None),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    actor: Any = Depends(require_actor),
+) -> list[VehicleOut]:
     try:
         role = _enforce_role(actor)
         uid = _user_id_of(actor)
 
+        # Keyset-Pagination über vehicles.id (Index owner_user_id, id); after = id des letzten Fahrzeugs
         q = db.query(Vehicle)
+        anchor_q = db.query(Vehicle.id).filter(Vehicle.public_id == after)
         if role not in {"admin", "superadmin"}:
             q = q.filter(Vehicle.owner_user_id == uid)
+            # fremde IDs als Cursor: wie unbekannte behandeln (kein Existenz-Leak)
+            anchor_q = anchor_q.filter(Vehicle.owner_user_id == uid)
+        if after is not None:
+            anchor_id = anchor_q.scalar()
+            if anchor_id is None:
+                raise _invalid_cursor()
+            q = q.filter(Vehicle.id > anchor_id)
+
+        rows = q.order_by(Vehicle.id.asc()).limit(limit + 1).all()
+        return [_to_out(v) for v in _set_next_cursor(response, rows, limit, lambda v: v.public_id)]
+
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="internal_error")
 
-        return [_to_out(v) for v in q.all()]
 
+@router.post("/entries/import", response_model=VehicleEntryImportOut)
+def import_vehicle_entries(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(default=None, pattern="^(ndjson|csv|xlsx)$"),
+    db: Session = Depends(get_db),
+    actor: Any = Depends(require_actor),
+) -> VehicleEntryImportOut:
+    """
+    Bulk-Import (NDJSON/CSV/XLSX) für ein oder mehrere Fahrzeuge; Spalten wie VehicleEntryCreateIn + vehicle_id.
+    Consent/Rolle einmal pro Request, Fahrzeugzugriff per IN-Query, Fehler als Zeilen-Report.
+    """
+    try:
+        role = _enforce_role(actor)
+        uid = _user_id_of(actor)
+        try:
+            fmt = detect_format(explicit=format, filename=file.filename, content_type=file.content_type)
+        except ImportFormatError:
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="unsupported_format")
+
+        is_admin = role in {"admin", "superadmin"}
+        try:
+            report = import_entries(
+                db,
+                iter_rows(file.file, fmt),
+                schema=VehicleEntryCreateIn,
+                can_write=lambda owner: is_admin or owner == uid,
+            )
+        except ImportFormatError as e:
+            # Datei nicht lesbar; bereits committete Batches bleiben (Report nur bei lesbarer Datei)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return VehicleEntryImportOut(**report.as_dict())
     except HTTPException:
         raise
     except Exception:
@@ -294,12 +395,19 @@ def get_vehicle(vehicle_id: str, db: Session = Depends(get_db), actor: Any = Dep
 
 
 @router.get("/{vehicle_id}/entries", response_model=list[VehicleEntryOut])
-def list_vehicle_entries(vehicle_id: str, db: Session = Depends(get_db), actor: Any = Depends(require_actor)) -> list[VehicleEntryOut]:
+def list_vehicle_entries(
+    vehicle_id: str,
+    response: Response,
+    after: Optional[str] = Query(default=None),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    actor: Any = Depends(require_actor),
+) -> list[VehicleEntryOut]:
     try:
         vehicle = _load_vehicle_for_actor(db, actor, vehicle_id)
-        revision_counts = _revision_counts(db, vehicle.public_id)
-        entries = _latest_entries_for_vehicle(db, vehicle.public_id)
-        return [_entry_to_out(entry, revision_counts.get(entry.entry_group_id, 1)) for entry in entries]
+        page = _latest_entries_page(db, vehicle.public_id, after=after, limit=limit + 1)
+        page = _set_next_cursor(response, page, limit, lambda row: row[0].id)
+        return [_entry_to_out(entry, revision_count) for entry, revision_count in page]
     except HTTPException:
         raise
     except Exception:
@@ -314,8 +422,10 @@ def get_vehicle_trust_summary(
 ) -> VehicleTrustSummaryOut:
     try:
         vehicle = _load_vehicle_for_actor(db, actor, vehicle_id)
-        entries = _latest_entries_for_vehicle(db, vehicle.public_id)
-        return _trust_summary_out(vehicle, entries)
+        summary = load_vehicle_trust_summary(db, vehicle.public_id)
+        if summary is None:
+            summary = derive_vehicle_trust_summary(vehicle_meta=vehicle.meta, entries=[])
+        return _trust_summary_out(summary)
     except HTTPException:
         raise
     except Exception:
@@ -326,6 +436,8 @@ def get_vehicle_trust_summary(
 def get_vehicle_entry_history(
     vehicle_id: str,
     entry_id: str,
+    after_version: Optional[int] = Query(default=None, ge=0),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     actor: Any = Depends(require_actor),
 ) -> list[VehicleEntryOut]:
@@ -339,13 +451,21 @@ def get_vehicle_entry_history(
         if anchor is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="entry_not_found")
 
-        history = (
-            db.query(VehicleEntry)
-            .filter(VehicleEntry.vehicle_id == vehicle.public_id, VehicleEntry.entry_group_id == anchor.entry_group_id)
-            .order_by(VehicleEntry.version.asc(), VehicleEntry.created_at.asc())
-            .all()
+        # Revisionszahl aus entry_groups: Seiten der Kette (after_version/limit) ohne die ganze Kette zu laden
+        q = db.query(VehicleEntry).filter(
+            VehicleEntry.vehicle_id == vehicle.public_id, VehicleEntry.entry_group_id == anchor.entry_group_id
         )
-        revision_count = len(history)
+        if after_version is not None:
+            q = q.filter(VehicleEntry.version > after_version)
+        q = q.order_by(VehicleEntry.version.asc(), VehicleEntry.created_at.asc())
+        history = q.limit(limit).all() if limit is not None else q.all()
+
+        revision_count = entry_group_revision_count(db, anchor.entry_group_id)
+        if revision_count is None:
+            # Altbestand ohne Gruppenzeile
+            revision_count = (
+                db.query(func.count(VehicleEntry.id)).filter(VehicleEntry.entry_group_id == anchor.entry_group_id).scalar()
+            )
         return [_entry_to_out(entry, revision_count) for entry in history]
     except HTTPException:
         raise
@@ -380,6 +500,7 @@ def create_vehicle_entry(
         )
         entry.entry_group_id = entry.id
         db.add(entry)
+        open_entry_group(db, entry)
         db.commit()
         db.refresh(entry)
         return _entry_to_out(entry, 1)
@@ -413,6 +534,7 @@ def create_vehicle_entry_revision(
 
         current.is_latest = False
         revision = VehicleEntry(
+            id=str(uuid.uuid4()),
             vehicle_id=vehicle.public_id,
             owner_user_id=vehicle.owner_user_id,
             entry_group_id=current.entry_group_id,
@@ -428,9 +550,14 @@ def create_vehicle_entry_revision(
             trust_level=payload.trust_level,
         )
         db.add(revision)
+        try:
+            revision_count = advance_entry_group(db, previous=current, revision=revision)
+        except EntryGroupConflict:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="entry_conflict")
         db.commit()
         db.refresh(revision)
-        return _entry_to_out(revision, revision.version)
+        return _entry_to_out(revision, revision_count)
     except HTTPException:
         raise
     except Exception:
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.engine import Engine
+
+from app.auth.storage import db_read, init_db
+from app.db.reflection import table_registry
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+_Run = Callable[[str, Tuple[Any, ...]], Sequence[Any]]
+
+
+@dataclass(frozen=True)
+class AuditSource:
+    """
+    Eine Audit-Tabelle und ihre Abbildung auf die gemeinsame Projektion.
+
+    db: "auth" = Auth-SQLite (LTC_DB_PATH), "main" = SQLAlchemy-Engine
+    time_format: "iso" (isoformat mit Offset) | "sql" (SQLAlchemy-DateTime auf SQLite, UTC ohne Offset)
+    *_expr: SQL-Ausdruck (Spalte oder Konstante); Metadaten/Payload-JSON werden nie ausgeliefert (PII-safe).
+    Die (Filter, Zeit, id)-Indizes legt der Besitzer der Tabelle an (Auth: init_db-Migration,
+    audit_events: Model, Fallback-Tabellen: QUERY_INDEXES der schreibenden Module).
+    """
+
+    name: str
+    db: str
+    table: str
+    id_col: str
+    time_col: str
+    time_format: str
+    action_col: str
+    result_expr: str = "NULL"
+    module_expr: str = "NULL"
+    actor_role_expr: str = "NULL"
+    target_type_expr: str = "NULL"
+    target_col: Optional[str] = None
+    reason_expr: str = "NULL"
+
+
+SOURCES: Dict[str, AuditSource] = {
+    s.name: s
+    for s in (
+        AuditSource(
+            name="auth",
+            db="auth",
+            table="auth_audit",
+            id_col="event_id",
+            time_col="created_at",
+            time_format="iso",
+            action_col="action",
+            result_expr="result",
+            module_expr="'auth'",
+            actor_role_expr="actor_role",
+            target_type_expr="target_type",
+            target_col="target_id",
+            reason_expr="reason_code",
+        ),
+        AuditSource(
+            name="admin",
+            db="auth",
+            table="auth_audit_events",
+            id_col="event_id",
+            time_col="at",
+            time_format="iso",
+            action_col="action",
+            result_expr="result",
+            module_expr="'admin'",
+            target_type_expr="'USER'",
+            target_col="target_user_id",
+        ),
+        AuditSource(
+            name="events",
+            db="main",
+            table="audit_events",
+            id_col="id",
+            time_col="emitted_at",
+            time_format="sql",
+            action_col="event_name",
+            module_expr="module_id",
+            actor_role_expr="actor_role",
+            target_type_expr="'correlation'",
+            target_col="correlation_id",
+        ),
+        AuditSource(
+            name="sale_transfer",
+            db="main",
+            table="sale_transfer_audit_events",
+            id_col="id",
+            time_col="at",
+            time_format="sql",
+            action_col="event_type",
+            module_expr="module_id",
+            target_type_expr="'sale_transfer'",
+            target_col="target_id",
+        ),
+        AuditSource(
+            name="export",
+            db="main",
+            table="export_audit_events",
+            id_col="id",
+            time_col="created_at",
+            time_format="sql",
+            action_col="event_type",
+            result_expr="CASE WHEN success THEN 'success' ELSE 'denied' END",
+            module_expr="'export'",
+            actor_role_expr="actor_role",
+            target_type_expr="target_type",
+            target_col="target_id",
+            reason_expr="reason",
+        ),
+    )
+}
+
+
+def _fmt_time(src: AuditSource, value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    if src.time_format == "sql":
+        return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+    return value.isoformat()
+
+
+def _iso_out(src: AuditSource, raw: Any) -> Optional[str]:
+    if raw is None or src.time_format == "iso":
+        return raw
+    try:
+        return datetime.fromisoformat(str(raw)).replace(tzinfo=timezone.utc).isoformat()
+    except ValueError:
+        return str(raw)
+
+
+def _page(
+    run: _Run,
+    src: AuditSource,
+    *,
+    action: Optional[str],
+    result: Optional[str],
+    target_id: Optional[str],
+    module: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    after: Optional[str],
+    limit: int,
+) -> List[Dict[str, Any]]:
+    """
+    Keyset-Pagination (neueste zuerst): after = event_id des letzten Eintrags der vorigen Seite.
+    Sortierung (time, id) absteigend über die (filter, time, id)-Indizes.
+    """
+    where: List[str] = []
+    args: List[Any] = []
+    for expr, value in (
+        (src.action_col, action),
+        (src.result_expr, result),
+        (src.target_col or "NULL", target_id),
+        (src.module_expr, module),
+    ):
+        if value is not None:
+            where.append(f"{expr} = ?")
+            args.append(value)
+    if since is not None:
+        where.append(f"{src.time_col} >= ?")
+        args.append(_fmt_time(src, since))
+    if until is not None:
+        where.append(f"{src.time_col} < ?")
+        args.append(_fmt_time(src, until))
+    if after:
+        row = run(f"SELECT {src.time_col}, {src.id_col} FROM {src.table} WHERE {src.id_col} = ?;", (after,))
+        if not row:
+            raise KeyError("cursor_not_found")
+        where.append(f"({src.time_col}, {src.id_col}) < (?, ?)")
+        args.extend((row[0][0], row[0][1]))
+
+    sql = (
+        f"SELECT {src.id_col}, {src.time_col}, {src.action_col}, {src.result_expr}, {src.module_expr}, "
+        f"{src.actor_role_expr}, {src.target_type_expr}, {src.target_col or 'NULL'}, {src.reason_expr} "
+        f"FROM {src.table}"
+        + (f" WHERE {' AND '.join(where)}" if where else "")
+        + f" ORDER BY {src.time_col} DESC, {src.id_col} DESC LIMIT ?;"
+    )
+    rows = run(sql, tuple(args) + (limit,))
+    return [
+        {
+            "source": src.name,
+            "event_id": r[0],
+            "at": _iso_out(src, r[1]),
+            "action": r[2],
+            "result": r[3],
+            "module": r[4],
+            "actor_role": r[5],
+            "target_type": r[6],
+            "target_id": r[7],
+            "reason": r[8],
+        }
+        for r in rows
+    ]
+
+
+def query_audit(
+    source: str,
+    *,
+    db_path: str,
+    engine: Optional[Engine] = None,
+    action: Optional[str] = None,
+    result: Optional[str] = None,
+    target_id: Optional[str] = None,
+    module: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Gefilterte Audit-Seite einer Quelle (SOURCES). ValueError bei unbekannter Quelle,
+    KeyError bei unbekanntem Cursor. Fehlende Tabelle (main) -> leere Liste.
+    """
+    src = SOURCES.get(source)
+    if src is None:
+        raise ValueError("invalid_audit_source")
+    n = DEFAULT_PAGE_SIZE if limit is None else max(1, min(int(limit), MAX_PAGE_SIZE))
+    filters = dict(action=action, result=result, target_id=target_id, module=module, since=since, until=until, after=after, limit=n)
+
+    if src.db == "auth":
+        # Tabellen + Indizes aus der Schema-Migration (Fast-Path nach dem ersten Aufruf)
+        init_db(db_path)
+        with db_read(db_path) as conn:
+            return _page(lambda sql, a: conn.execute(sql, a).fetchall(), src, **filters)
+
+    if engine is None:
+        from app.db.session import get_engine
+
+        engine = get_engine()
+    # Fallback-Tabellen entstehen erst mit dem ersten Event; vorhandene Tabellen bleiben pro Engine gecacht
+    if table_registry.find(engine, (src.table,)) is None:
+        if after:
+            raise KeyError("cursor_not_found")
+        return []
+    with engine.connect() as conn:
+        return _page(lambda sql, a: conn.exec_driver_sql(sql, a).fetchall(), src, **filters)
@@ -0,0 +1,372 @@
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Table, event, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import env_int
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "ltc_audit_pending"
+
+
+class SqliteAuditTarget:
+    """Tabelle in einer Auth-SQLite-DB (app.auth.storage-Pool, Writer-Lock nur pro Batch)."""
+
+    def __init__(self, db_path: str, table: str, columns: Sequence[str]) -> None:
+        self.db_path = db_path
+        self.table = table
+        self.columns = tuple(columns)
+        self.key = ("sqlite", db_path, table, self.columns)
+        self._sql = f"INSERT INTO {table}({', '.join(self.columns)}) VALUES ({', '.join('?' * len(self.columns))});"
+
+    def write(self, rows: List[Dict[str, Any]], conn: Any = None) -> None:
+        params = [tuple(r.get(c) for c in self.columns) for r in rows]
+        if conn is not None:
+            # Transaktion des Aufrufers (hält ggf. schon den Writer-Lock) – commit macht der Aufrufer
+            conn.executemany(self._sql, params)
+            return
+        from app.auth.storage import db
+
+        with db(self.db_path) as c:
+            c.executemany(self._sql, params)
+
+
+class TableAuditTarget:
+    """SQLAlchemy-Table einer Engine (ein executemany pro Batch und Spaltensatz)."""
+
+    def __init__(self, engine: Engine, table: Table) -> None:
+        self.engine = engine
+        self.table = table
+        self.key = ("table", engine, table.name)
+
+    def write(self, rows: List[Dict[str, Any]], conn: Any = None) -> None:
+        # executemany braucht pro Aufruf identische Keys
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for r in rows:
+            groups.setdefault(tuple(sorted(r)), []).append(r)
+        stmt = insert(self.table)
+        if conn is not None:
+            # Session/Connection des Aufrufers – commit macht der Aufrufer
+            for part in groups.values():
+                conn.execute(stmt, part)
+            return
+        with self.engine.begin() as c:
+            for part in groups.values():
+                c.execute(stmt, part)
+
+
+def covers_required_columns(table: Table, keys: Iterable[str]) -> bool:
+    """True, wenn keys alle NOT-NULL-Spalten ohne Default abdecken (sonst schlägt jeder Insert fehl)."""
+    have = set(keys)
+    for c in table.columns:
+        if c.name in have or c.nullable or c.default is not None or c.server_default is not None:
+            continue
+        if c.primary_key and c.autoincrement is not False and str(c.type).upper().startswith("INTEGER"):
+            continue
+        return False
+    return True
+
+
+_TABLE_TARGETS: "weakref.WeakKeyDictionary[Engine, Dict[str, TableAuditTarget]]" = weakref.WeakKeyDictionary()
+_TABLE_TARGETS_LOCK = threading.Lock()
+
+
+def table_target(db: Session, name: str, factory: Callable[[Session], Table]) -> TableAuditTarget:
+    """
+    TableAuditTarget pro (Engine, name); factory(db) wählt/legt die Tabelle an und läuft
+    einmal pro Engine (statt Reflection pro Event).
+    """
+    bind = db.get_bind()
+    engine = getattr(bind, "engine", bind)
+    with _TABLE_TARGETS_LOCK:
+        per_engine = _TABLE_TARGETS.setdefault(engine, {})
+        target = per_engine.get(name)
+        if target is None:
+            target = per_engine[name] = TableAuditTarget(engine, factory(db))
+        return target
+
+
+class AuditSink:
+    """
+    Eine Audit-Pipeline für alle Writer (Auth, Admin, Export, Sale/Transfer, MasterClipboard).
+
+    - async: bounded Queue, ein Flusher-Thread schreibt gebündelt (executemany pro Ziel)
+    - sync / critical=True: direkt im Aufrufer, optional in dessen Transaktion (conn=...)
+    - Queue voll: overflow="block" wartet kurz und schreibt dann selbst (Back-Pressure),
+      overflow="drop" verwirft und zählt
+    - fehlgeschlagener Batch: zeilenweise Retry, danach verworfen (dropped)
+    - stop(): Rest-Queue wird geschrieben (Lifespan-Shutdown); danach werden async-Events
+      verworfen und gezählt (kein stiller Neustart des Threads), erst start() öffnet wieder
+    """
+
+    def __init__(
+        self,
+        *,
+        mode: str = "async",
+        max_queue: int = 10_000,
+        batch_size: int = 500,
+        flush_interval_ms: int = 200,
+        overflow: str = "block",
+        block_timeout_ms: int = 50,
+    ) -> None:
+        self.mode = "sync" if mode == "sync" else "async"
+        self.max_queue = max(1, int(max_queue))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(1, int(flush_interval_ms)) / 1000.0
+        self.overflow = "drop" if overflow == "drop" else "block"
+        self.block_timeout = max(0, int(block_timeout_ms)) / 1000.0
+        self._q: "queue.Queue[Tuple[Any, Dict[str, Any]]]" = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._batch_ms: deque = deque(maxlen=1000)
+        self.enqueued = 0
+        self.written = 0
+        self.sync_writes = 0
+        self.overflow_writes = 0
+        self.dropped = 0
+        self.batches = 0
+        self.batch_failures = 0
+
+    # -- Producer ---------------------------------------------------------
+
+    def emit(self, target: Any, row: Dict[str, Any], *, critical: bool = False, conn: Any = None) -> None:
+        if critical or self.mode == "sync":
+            # Fehler gehen an den Aufrufer (wie der bisherige Inline-Insert)
+            target.write([row], conn=conn)
+            with self._lock:
+                self.sync_writes += 1
+            return
+
+        if not self._ensure_running():
+            logger.warning("audit event after shutdown dropped")
+            with self._lock:
+                self.dropped += 1
+            return
+        try:
+            if self.overflow == "block" and self.block_timeout > 0:
+                self._q.put((target, row), timeout=self.block_timeout)
+            else:
+                self._q.put_nowait((target, row))
+        except queue.Full:
+            self._on_overflow(target, row, conn)
+            return
+        with self._lock:
+            self.enqueued += 1
+
+    def emit_on_commit(self, session: Session, target: Any, row: Dict[str, Any], *, critical: bool = False) -> None:
+        """
+        Audit zu einer Business-Transaktion: async erst nach commit() einreihen (rollback verwirft),
+        sync/critical direkt in derselben Transaktion schreiben.
+        """
+        if critical or self.mode == "sync":
+            self.emit(target, row, critical=True, conn=session)
+            return
+        session.info.setdefault(_PENDING_KEY, []).append((self, target, row))
+
+    def _on_overflow(self, target: Any, row: Dict[str, Any], conn: Any) -> None:
+        if self.overflow == "block":
+            try:
+                target.write([row], conn=conn)
+                with self._lock:
+                    self.overflow_writes += 1
+                return
+            except Exception:
+                logger.warning("audit overflow write failed", exc_info=True)
+        with self._lock:
+            self.dropped += 1
+
+    # -- Flusher ----------------------------------------------------------
+
+    def start(self) -> None:
+        # expliziter (Re-)Start, z. B. Lifespan
+        with self._lock:
+            self._closed = False
+        self._ensure_running()
+
+    def _ensure_running(self) -> bool:
+        # False = gestoppt (emit verwirft)
+        if self._thread is not None and self._thread.is_alive():
+            return True
+        with self._lock:
+            if self._closed:
+                return False
+            if self._thread is not None and self._thread.is_alive():
+                return True
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ltc-audit-sink", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        with self._lock:
+            self._closed = True
+            t, self._thread = self._thread, None
+        self._stop.set()
+        if t is not None:
+            t.join(timeout=timeout)
+        # was der Thread nicht mehr geschafft hat, schreibt der Aufrufer
+        while self._drain_once():
+            pass
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wartet, bis alles Eingereihte geschrieben (oder verworfen) ist."""
+        if self._thread is None or not self._thread.is_alive():
+            while self._drain_once():
+                pass
+            return True
+        deadline = time.monotonic() + timeout
+        with self._q.all_tasks_done:
+            while self._q.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._q.all_tasks_done.wait(remaining)
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                first = self._q.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            self._process([first] + self._take(self.batch_size - 1))
+        while self._drain_once():
+            pass
+
+    def _take(self, n: int) -> List[Tuple[Any, Dict[str, Any]]]:
+        items = []
+        while len(items) < n:
+            try:
+                items.append(self._q.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _drain_once(self) -> bool:
+        items = self._take(self.batch_size)
+        if items:
+            self._process(items)
+        return bool(items)
+
+    def _process(self, items: List[Tuple[Any, Dict[str, Any]]]) -> None:
+        try:
+            groups: Dict[Any, Tuple[Any, List[Dict[str, Any]]]] = {}
+            for target, row in items:
+                groups.setdefault(target.key, (target, []))[1].append(row)
+            for target, rows in groups.values():
+                self._write_batch(target, rows)
+        finally:
+            for _ in items:
+                self._q.task_done()
+
+    def _write_batch(self, target: Any, rows: List[Dict[str, Any]]) -> None:
+        t0 = time.perf_counter()
+        try:
+            target.write(rows)
+            ok, failed, batch_failed = len(rows), 0, False
+        except Exception:
+            logger.warning("audit batch failed (%d rows), retrying row by row", len(rows), exc_info=True)
+            ok, failed, batch_failed = 0, 0, True
+            for row in rows:
+                try:
+                    target.write([row])
+                    ok += 1
+                except Exception:
+                    failed += 1
+        with self._lock:
+            self.batches += 1
+            self.written += ok
+            self.dropped += failed
+            self.batch_failures += int(batch_failed)
+            self._batch_ms.append((time.perf_counter() - t0) * 1000.0)
+
+    # -- Metriken ---------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            ms = sorted(self._batch_ms)
+            return {
+                "mode": self.mode,
+                "queue_depth": self._q.qsize(),
+                "queue_max": self.max_queue,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "sync_writes": self.sync_writes,
+                "overflow_writes": self.overflow_writes,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "batch_failures": self.batch_failures,
+                "batch_ms_p50": ms[len(ms) // 2] if ms else 0.0,
+                "batch_ms_p95": ms[min(len(ms) - 1, int(len(ms) * 0.95))] if ms else 0.0,
+            }
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_pending(session: Session) -> None:
+    for sink, target, row in session.info.pop(_PENDING_KEY, ()):
+        sink.emit(target, row)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session: Session, previous_transaction: Any) -> None:
+    # nur äußerste Transaktion (Savepoint-Rollback verwirft nicht alles)
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def _from_env() -> AuditSink:
+    # LTC_AUDIT_MODE=sync schreibt alles direkt (z.B. Tests/Debugging)
+    return AuditSink(
+        mode=(os.getenv("LTC_AUDIT_MODE") or "async").strip().lower(),
+        max_queue=env_int("LTC_AUDIT_QUEUE_MAX", 10_000),
+        batch_size=env_int("LTC_AUDIT_BATCH_SIZE", 500),
+        flush_interval_ms=env_int("LTC_AUDIT_FLUSH_MS", 200),
+        overflow=(os.getenv("LTC_AUDIT_OVERFLOW") or "block").strip().lower(),
+    )
+
+
+_SINK: Optional[AuditSink] = None
+_SINK_LOCK = threading.Lock()
+
+
+def get_audit_sink() -> AuditSink:
+    global _SINK
+    if _SINK is None:
+        with _SINK_LOCK:
+            if _SINK is None:
+                _SINK = _from_env()
+    return _SINK
+
+
+def start_audit_sink() -> AuditSink:
+    sink = get_audit_sink()
+    if sink.mode == "async":
+        sink.start()
+    return sink
+
+
+def stop_audit_sink() -> None:
+    # Shutdown: Queue leeren, bevor die DB-Pools geschlossen werden
+    if _SINK is not None:
+        _SINK.stop()
+
+
+def flush_audit(timeout: float = 5.0) -> bool:
+    return get_audit_sink().flush(timeout=timeout)
+
+
+def audit_sink_stats() -> Dict[str, Any]:
+    return get_audit_sink().stats()
@@ -6,6 +6,7 @@ from typing import Any
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.consent.cache import get_consent_cache, policy_version
 from app.consent.policy import (
     ALLOWED_DOC_TYPES,
     ALLOWED_SOURCES,
@@ -119,6 +120,7 @@ def record_consents(db: Session, user_id: str, normalized: list[dict[str, Any]])
         )
 
     db.commit()
+    get_consent_cache().invalidate_user(user_id)
 
 
 def get_user_consents(db: Session, user_id: str) -> list[dict[str, Any]]:
@@ -136,9 +138,18 @@ def get_user_consents(db: Session, user_id: str) -> list[dict[str, Any]]:
 
 
 def has_required_consents(db: Session, user_id: str) -> bool:
+    """Gemeinsamer Check aller Consent-Gates; positive Ergebnisse kommen aus dem Consent-Cache (0 DB-Queries)."""
+    cache = get_consent_cache()
+    scope = cache.scope(db.get_bind())
+    version = policy_version()
+    if cache.get(scope, user_id, version):
+        return True
+
+    epoch = cache.epoch()
     rows = get_user_consents(db, user_id)
     have = {(r["doc_type"], r["doc_version"]) for r in rows}
     for doc_type, ver in CURRENT_DOC_VERSIONS.items():
         if (doc_type, ver) not in have:
             return False
+    cache.put(scope, user_id, version, epoch=epoch)
     return True
\ No newline at end of file
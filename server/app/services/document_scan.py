@@ -0,0 +1,373 @@
+# server/app/services/document_scan.py
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Protocol, Tuple, Union
+
+from app.core.config import env_int
+from app.models.documents import DocumentScanStatus
+from app.services.documents_store import DocumentsStore, ScanJob
+
+logger = logging.getLogger(__name__)
+
+EICAR_SIGNATURE = b"EICAR-STANDARD-ANTIVIRUS-TEST-FILE"
+
+
+class ScanError(RuntimeError):
+    """Vorübergehender Scanner-Fehler (Job wird mit Backoff wiederholt)."""
+
+
+class Scanner(Protocol):
+    def scan(self, path: Path) -> DocumentScanStatus:
+        """CLEAN oder INFECTED; ScanError bei (vorübergehenden) Fehlern."""
+        ...
+
+
+class StubScanner:
+    """Lokaler Stub: INFECTED nur für die EICAR-Testsignatur, sonst CLEAN."""
+
+    chunk_bytes = 1024 * 1024
+
+    def scan(self, path: Path) -> DocumentScanStatus:
+        tail = b""
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(self.chunk_bytes)
+                if not chunk:
+                    return DocumentScanStatus.CLEAN
+                if EICAR_SIGNATURE in tail + chunk:
+                    return DocumentScanStatus.INFECTED
+                tail = chunk[-len(EICAR_SIGNATURE):]
+
+
+class ClamdScanner:
+    """
+    clamd INSTREAM über TCP (host, port) oder Unix-Socket (Pfad).
+    Antwort "stream: OK" => CLEAN, "... FOUND" => INFECTED, sonst ScanError.
+    """
+
+    chunk_bytes = 64 * 1024
+
+    def __init__(self, address: Union[Tuple[str, int], str], *, timeout: float = 30.0) -> None:
+        self.address = address
+        self.timeout = float(timeout)
+
+    @classmethod
+    def from_env_value(cls, value: str, **kwargs: object) -> "ClamdScanner":
+        # "host:port" oder "/run/clamav/clamd.ctl"
+        value = value.strip()
+        if value.startswith("/"):
+            return cls(value, **kwargs)  # type: ignore[arg-type]
+        host, _, port = value.rpartition(":")
+        return cls((host or "127.0.0.1", int(port or 3310)), **kwargs)  # type: ignore[arg-type]
+
+    def _connect(self) -> socket.socket:
+        if isinstance(self.address, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.address)
+            return sock
+        return socket.create_connection(self.address, timeout=self.timeout)
+
+    def scan(self, path: Path) -> DocumentScanStatus:
+        try:
+            with self._connect() as sock, open(path, "rb") as f:
+                sock.sendall(b"zINSTREAM\0")
+                while True:
+                    chunk = f.read(self.chunk_bytes)
+                    if not chunk:
+                        break
+                    sock.sendall(struct.pack("!L", len(chunk)) + chunk)
+                sock.sendall(struct.pack("!L", 0))
+
+                reply = b""
+                while not reply.endswith(b"\0"):
+                    data = sock.recv(4096)
+                    if not data:
+                        break
+                    reply += data
+        except OSError as e:
+            raise ScanError(f"clamd unreachable: {type(e).__name__}") from e
+
+        text = reply.rstrip(b"\0").decode("utf-8", "replace").strip()
+        if text.endswith("OK"):
+            return DocumentScanStatus.CLEAN
+        if text.endswith("FOUND"):
+            return DocumentScanStatus.INFECTED
+        raise ScanError(f"clamd: {text[:200] or 'empty reply'}")
+
+
+def _scan_call(scanner: Scanner, path: Path) -> Tuple[DocumentScanStatus, float]:
+    # top-level (picklebar) für ProcessPoolExecutor
+    t0 = time.perf_counter()
+    status = scanner.scan(path)
+    return status, time.perf_counter() - t0
+
+
+class ScanMetrics:
+    """Durchsatz/Latenz der Scan-Pipeline (Prozess-lokal)."""
+
+    def __init__(self, window: int = 1000) -> None:
+        self._lock = threading.Lock()
+        self.started_at: Optional[float] = None
+        self.processed = 0
+        self.clean = 0
+        self.infected = 0
+        self.retries = 0
+        self.failed = 0
+        self.in_flight = 0
+        self._scan_s: Deque[float] = deque(maxlen=window)
+        self._queue_s: Deque[float] = deque(maxlen=window)
+
+    def record(self, status: DocumentScanStatus, scan_s: float, queue_s: float) -> None:
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.time() - queue_s
+            self.processed += 1
+            if status == DocumentScanStatus.INFECTED:
+                self.infected += 1
+            else:
+                self.clean += 1
+            self._scan_s.append(scan_s)
+            self._queue_s.append(queue_s)
+
+    def record_error(self, *, final: bool) -> None:
+        with self._lock:
+            if final:
+                self.failed += 1
+            else:
+                self.retries += 1
+
+    def add_in_flight(self, n: int) -> None:
+        with self._lock:
+            self.in_flight += n
+
+    @staticmethod
+    def _pct(values: List[float], q: float) -> float:
+        if not values:
+            return 0.0
+        values = sorted(values)
+        return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            elapsed = time.time() - self.started_at if self.started_at else 0.0
+            scan = list(self._scan_s)
+            queue = list(self._queue_s)
+            return {
+                "processed": self.processed,
+                "clean": self.clean,
+                "infected": self.infected,
+                "retries": self.retries,
+                "failed": self.failed,
+                "in_flight": self.in_flight,
+                "throughput_per_s": round(self.processed / elapsed, 3) if elapsed > 0 else 0.0,
+                "scan_ms_p50": round(self._pct(scan, 0.50), 2),
+                "scan_ms_p95": round(self._pct(scan, 0.95), 2),
+                "queue_ms_p50": round(self._pct(queue, 0.50), 2),
+                "queue_ms_p95": round(self._pct(queue, 0.95), 2),
+            }
+
+
+class ScanWorkerPool:
+    """
+    Arbeitet die Scan-Queue (document_scan_jobs) ab:
+    - Dispatcher-Thread claimt fällige Jobs batchweise, höchstens `workers` gleichzeitig in Arbeit
+    - Scans laufen in Thread- oder Prozess-Pool (mode="thread"|"process")
+    - Fehler: Retry mit exponentiellem Backoff, nach max_attempts scan_status=ERROR
+    - Lease: Jobs abgestürzter Worker werden nach lease_seconds erneut vergeben (bis max_attempts)
+    - abgeschlossene Jobs werden nach job_ttl_seconds gelöscht (0 = behalten)
+    """
+
+    def __init__(
+        self,
+        store: DocumentsStore,
+        scanner: Scanner,
+        *,
+        workers: int = 4,
+        mode: str = "thread",
+        batch_size: int = 16,
+        poll_interval: float = 0.5,
+        lease_seconds: float = 300.0,
+        max_attempts: int = 5,
+        backoff_base: float = 2.0,
+        backoff_max: float = 600.0,
+        job_ttl_seconds: float = 7 * 86_400,
+        purge_interval: float = 3600.0,
+    ) -> None:
+        if workers <= 0:
+            raise ValueError("workers must be > 0")
+        if mode not in ("thread", "process"):
+            raise ValueError("mode must be thread|process")
+        self.store = store
+        self.scanner = scanner
+        self.workers = int(workers)
+        self.mode = mode
+        self.batch_size = int(batch_size)
+        self.poll_interval = float(poll_interval)
+        self.lease_seconds = float(lease_seconds)
+        self.max_attempts = int(max_attempts)
+        self.backoff_base = float(backoff_base)
+        self.backoff_max = float(backoff_max)
+        self.job_ttl_seconds = float(job_ttl_seconds)
+        self.purge_interval = float(purge_interval)
+        self._next_purge = 0.0
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.metrics = ScanMetrics()
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[Executor] = None
+
+    def backoff(self, attempt: int) -> float:
+        return min(self.backoff_max, self.backoff_base * (2 ** max(0, attempt - 1)))
+
+    # --- Ergebnis verbuchen ---
+
+    def _finish(self, job: ScanJob, result: Optional[Tuple[DocumentScanStatus, float]], error: Optional[BaseException]) -> None:
+        if error is None and result is not None:
+            status, scan_s = result
+            self.store.complete_scan_job(job.doc_id, status)
+            self.metrics.record(status, scan_s, time.time() - job.enqueued_at)
+            return
+
+        final = job.attempt >= self.max_attempts
+        msg = f"{type(error).__name__}: {error}" if error is not None else "no result"
+        self.store.fail_scan_job(job.doc_id, msg, retry_in=None if final else self.backoff(job.attempt))
+        self.metrics.record_error(final=final)
+        if final:
+            logger.warning("document scan failed permanently (doc=%s, attempts=%s)", job.doc_id, job.attempt)
+
+    def _claim(self, limit: int) -> List[ScanJob]:
+        return self.store.claim_scan_jobs(
+            self.worker_id, limit=limit, lease_seconds=self.lease_seconds, max_attempts=self.max_attempts
+        )
+
+    def _maybe_purge(self) -> None:
+        now = time.time()
+        if self.job_ttl_seconds <= 0 or now < self._next_purge:
+            return
+        self._next_purge = now + self.purge_interval
+        try:
+            self.store.purge_scan_jobs(older_than_seconds=self.job_ttl_seconds)
+        except Exception:
+            logger.warning("scan job purge failed", exc_info=True)
+
+    # --- synchron (Tests/CLI) ---
+
+    def run_once(self) -> int:
+        """Einen Batch claimen und im aufrufenden Thread scannen. Liefert Anzahl Jobs."""
+        jobs = self._claim(self.batch_size)
+        for job in jobs:
+            try:
+                self._finish(job, _scan_call(self.scanner, job.path), None)
+            except Exception as e:
+                self._finish(job, None, e)
+        return len(jobs)
+
+    # --- Hintergrundbetrieb ---
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        if self.mode == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="doc-scan")
+        self._thread = threading.Thread(target=self._loop, name="doc-scan-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _loop(self) -> None:
+        assert self._executor is not None
+        inflight: Dict[Future, ScanJob] = {}
+        while not self._stop.is_set() or inflight:
+            free = self.workers - len(inflight)
+            if free > 0 and not self._stop.is_set():
+                try:
+                    jobs = self._claim(min(free, self.batch_size))
+                except Exception:
+                    logger.warning("scan queue claim failed", exc_info=True)
+                    jobs = []
+                for job in jobs:
+                    inflight[self._executor.submit(_scan_call, self.scanner, job.path)] = job
+                self.metrics.add_in_flight(len(jobs))
+
+            if not inflight:
+                self._maybe_purge()
+                self._stop.wait(self.poll_interval)
+                continue
+
+            done, _ = wait(list(inflight), timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+            for fut in done:
+                job = inflight.pop(fut)
+                self.metrics.add_in_flight(-1)
+                try:
+                    err = fut.exception()
+                    self._finish(job, None if err else fut.result(), err)
+                except Exception:
+                    logger.warning("scan result could not be stored (doc=%s)", job.doc_id, exc_info=True)
+
+
+# ---------------------------------------------------------------------------
+# Wiring per ENV
+#   LTC_SCAN_WORKERS (0 = aus, Scan-Status nur manuell durch Admins)
+#   LTC_SCAN_MODE = thread | process, LTC_SCANNER = stub | clamd, LTC_CLAMD_ADDRESS
+#   LTC_SCAN_JOB_TTL_SECONDS (abgeschlossene Jobs löschen, Default 7 Tage, 0 = behalten)
+# ---------------------------------------------------------------------------
+
+_POOL: Optional[ScanWorkerPool] = None
+
+
+def scanner_from_env() -> Scanner:
+    kind = (os.getenv("LTC_SCANNER") or "stub").strip().lower()
+    if kind == "clamd":
+        return ClamdScanner.from_env_value(os.getenv("LTC_CLAMD_ADDRESS") or "127.0.0.1:3310")
+    if kind == "stub":
+        return StubScanner()
+    raise RuntimeError(f"LTC_SCANNER unbekannt: {kind}")
+
+
+def start_scan_workers(store: DocumentsStore) -> Optional[ScanWorkerPool]:
+    global _POOL
+    workers = env_int("LTC_SCAN_WORKERS", 0)
+    if workers <= 0 or _POOL is not None:
+        return _POOL
+    _POOL = ScanWorkerPool(
+        store,
+        scanner_from_env(),
+        workers=workers,
+        mode=(os.getenv("LTC_SCAN_MODE") or "thread").strip().lower(),
+        job_ttl_seconds=env_int("LTC_SCAN_JOB_TTL_SECONDS", 7 * 86_400),
+    )
+    _POOL.start()
+    return _POOL
+
+
+def stop_scan_workers() -> None:
+    global _POOL
+    if _POOL is not None:
+        _POOL.stop()
+        _POOL = None
+
+
+def scan_metrics() -> Dict[str, float]:
+    return _POOL.metrics.stats() if _POOL is not None else {}
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import hashlib
 from datetime import datetime, timezone
-from typing import BinaryIO, Optional
+from typing import BinaryIO, Optional, Tuple
 
 from fastapi import HTTPException
 
@@ -21,13 +21,19 @@ def _utcnow() -> datetime:
 
 
 def sha256_stream(fp: BinaryIO) -> str:
+    return sha256_stream_with_size(fp)[0]
+
+
+def sha256_stream_with_size(fp: BinaryIO) -> Tuple[str, int]:
     h = hashlib.sha256()
+    size = 0
     while True:
         chunk = fp.read(1024 * 1024)
         if not chunk:
             break
         h.update(chunk)
-    return h.hexdigest()
+        size += len(chunk)
+    return h.hexdigest(), size
 
 
 def is_valid_trust_evidence(doc: Document) -> bool:
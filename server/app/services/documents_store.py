@@ -1,16 +1,36 @@
 # FILE: server/app/services/documents_store.py
 from __future__ import annotations
 
+import hashlib
+import io
+import os
 import re
 import sqlite3
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, Set
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
 from uuid import uuid4
 
 from app.models.documents import DocumentApprovalStatus, DocumentOut, DocumentScanStatus
 
+# Upload wird in Chunks dieser Größe gelesen/gehasht/geschrieben (nie die ganze Datei im RAM)
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Schema-Version (PRAGMA user_version): neue Migrationen unten in _MIGRATIONS anhängen
+_SCHEMA_VERSION = 3
+
+# Admin-Queue/Owner-Listen: Keyset-Pagination, Obergrenze pro Seite
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+_SELECT_COLUMNS = """
+    id, owner_user_id, filename, content_type, size_bytes,
+    storage_relpath, created_at, approval_status, scan_status, checksum_sha256
+"""
+
 
 @dataclass(frozen=True)
 class DocumentRecord:
@@ -23,6 +43,15 @@ class DocumentRecord:
     created_at: str
     approval_status: str
     scan_status: str
+    checksum_sha256: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ScanJob:
+    doc_id: str
+    path: Path
+    attempt: int
+    enqueued_at: float
 
 
 class DocumentsStore:
@@ -43,35 +72,168 @@ class DocumentsStore:
         self.allowed_mime = {m.lower() for m in (allowed_mime or set())}
         self.scan_mode = scan_mode
 
+        self._write_lock = threading.Lock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._local = threading.local()
+        self._readers_lock = threading.Lock()
+        self._readers: List[sqlite3.Connection] = []
+        self._generation = 0
+
         self.storage_root.mkdir(parents=True, exist_ok=True)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._init_db()
 
-    def _connect(self) -> sqlite3.Connection:
-        # Wichtig für Windows: Connections IMMER explizit schließen (sonst file-locks)
-        return sqlite3.connect(self.db_path)
-
-    def _init_db(self) -> None:
-        con = self._connect()
+    # --- Connections: ein Writer (Lock), ein Reader pro Thread (WAL) ---
+
+    def _open(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.db_path, check_same_thread=False)
+        con.execute("PRAGMA journal_mode=WAL;")
+        con.execute("PRAGMA synchronous=NORMAL;")
+        con.execute("PRAGMA busy_timeout=5000;")
+        return con
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        # serialisiert, commit bei Erfolg, rollback bei Fehler
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open()
+            con = self._writer
+            try:
+                yield con
+                con.commit()
+            except BaseException:
+                con.rollback()
+                raise
+
+    @contextmanager
+    def _read(self) -> Iterator[sqlite3.Connection]:
+        con = getattr(self._local, "con", None)
+        if con is None or self._local.generation != self._generation:
+            con = self._open()
+            with self._readers_lock:
+                self._readers.append(con)
+            self._local.con = con
+            self._local.generation = self._generation
         try:
-            con.execute(
-                """
-                CREATE TABLE IF NOT EXISTS documents (
-                  id TEXT PRIMARY KEY,
-                  owner_user_id TEXT NOT NULL,
-                  filename TEXT NOT NULL,
-                  content_type TEXT NOT NULL,
-                  size_bytes INTEGER NOT NULL,
-                  storage_relpath TEXT NOT NULL,
-                  created_at TEXT NOT NULL,
-                  approval_status TEXT NOT NULL,
-                  scan_status TEXT NOT NULL
-                );
-                """
-            )
-            con.commit()
+            yield con
         finally:
-            con.close()
+            if con.in_transaction:
+                con.rollback()
+
+    def close(self) -> None:
+        """
+        Alle Connections schließen (Shutdown/Tests).
+        Wichtig für Windows: ohne close() bleiben file-locks auf db_path bestehen.
+        """
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            with self._readers_lock:
+                readers, self._readers = self._readers, []
+                self._generation += 1
+            for con in readers:
+                con.close()
+
+    def __enter__(self) -> "DocumentsStore":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    # --- Schema ---
+
+    @staticmethod
+    def _migrate_v1(con: sqlite3.Connection) -> None:
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+              id TEXT PRIMARY KEY,
+              owner_user_id TEXT NOT NULL,
+              filename TEXT NOT NULL,
+              content_type TEXT NOT NULL,
+              size_bytes INTEGER NOT NULL,
+              storage_relpath TEXT NOT NULL,
+              created_at TEXT NOT NULL,
+              approval_status TEXT NOT NULL,
+              scan_status TEXT NOT NULL
+            );
+            """
+        )
+        cols = {r[1] for r in con.execute("PRAGMA table_info(documents);").fetchall()}
+        if "checksum_sha256" not in cols:
+            # Migration: Altbestände behalten NULL
+            con.execute("ALTER TABLE documents ADD COLUMN checksum_sha256 TEXT NULL;")
+        # Content-addressed Blobs (Key = SHA-256), von documents über checksum_sha256 referenziert
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS document_blobs (
+              sha256 TEXT PRIMARY KEY,
+              size_bytes INTEGER NOT NULL,
+              storage_relpath TEXT NOT NULL,
+              refcount INTEGER NOT NULL,
+              scan_status TEXT NOT NULL,
+              created_at TEXT NOT NULL
+            );
+            """
+        )
+
+    @staticmethod
+    def _migrate_v2(con: sqlite3.Connection) -> None:
+        # Admin-Queue (Status + Zeit), Owner-Listen, Blob-Geschwister (Scan-Übernahme)
+        con.execute(
+            "CREATE INDEX IF NOT EXISTS idx_documents_status_created "
+            "ON documents(approval_status, created_at, id);"
+        )
+        con.execute(
+            "CREATE INDEX IF NOT EXISTS idx_documents_owner_created "
+            "ON documents(owner_user_id, created_at, id);"
+        )
+        con.execute("CREATE INDEX IF NOT EXISTS idx_documents_checksum ON documents(checksum_sha256);")
+
+    @staticmethod
+    def _migrate_v3(con: sqlite3.Connection) -> None:
+        # Durable Scan-Queue: ein Job pro Dokument; Lease (locked_until) für abgestürzte Worker
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS document_scan_jobs (
+              doc_id TEXT PRIMARY KEY,
+              status TEXT NOT NULL,
+              attempts INTEGER NOT NULL DEFAULT 0,
+              next_attempt_at REAL NOT NULL,
+              locked_by TEXT NULL,
+              locked_until REAL NULL,
+              last_error TEXT NULL,
+              enqueued_at REAL NOT NULL,
+              finished_at REAL NULL
+            );
+            """
+        )
+        con.execute(
+            "CREATE INDEX IF NOT EXISTS idx_document_scan_jobs_due "
+            "ON document_scan_jobs(status, next_attempt_at);"
+        )
+        # Backlog: bereits wartende Dokumente einreihen
+        now = datetime.now(timezone.utc).timestamp()
+        con.execute(
+            """
+            INSERT OR IGNORE INTO document_scan_jobs (doc_id, status, next_attempt_at, enqueued_at)
+            SELECT id, 'queued', ?, ? FROM documents WHERE scan_status = ?
+            """,
+            (now, now, DocumentScanStatus.PENDING.value),
+        )
+
+    _MIGRATIONS = ((1, "_migrate_v1"), (2, "_migrate_v2"), (3, "_migrate_v3"))
+
+    def _init_db(self) -> None:
+        with self._write() as con:
+            version = int(con.execute("PRAGMA user_version;").fetchone()[0])
+            for target, name in self._MIGRATIONS:
+                if version < target:
+                    getattr(self, name)(con)
+            if version < _SCHEMA_VERSION:
+                con.execute(f"PRAGMA user_version = {_SCHEMA_VERSION};")
 
     @staticmethod
     def _now_iso_utc() -> str:
@@ -92,9 +254,7 @@ class DocumentsStore:
             return ""
         return n.rsplit(".", 1)[-1].lstrip(".")
 
-    def _validate(self, filename: str, content_type: str, data: bytes) -> None:
-        if len(data) > self.max_upload_bytes:
-            raise ValueError("too_large")
+    def _validate_meta(self, filename: str, content_type: str) -> None:
         ext = self._ext(filename)
         if self.allowed_ext and ext not in self.allowed_ext:
             raise ValueError("ext_not_allowed")
@@ -102,6 +262,68 @@ class DocumentsStore:
         if self.allowed_mime and ct not in self.allowed_mime:
             raise ValueError("mime_not_allowed")
 
+    @staticmethod
+    def blob_relpath(checksum: str) -> str:
+        return f"blobs/{checksum[:2]}/{checksum}"
+
+    def _spool(self, fp: BinaryIO) -> Tuple[Path, int, str]:
+        """
+        Chunkweise in eine Temp-Datei unter storage_root schreiben (SHA-256 + Größenlimit laufend).
+        Liefert (tmp_path, size_bytes, sha256_hex); Aufrufer verschiebt/löscht tmp_path.
+        """
+        tmp_dir = self.storage_root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = tmp_dir / f"{uuid4().hex}.part"
+
+        h = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as out:
+                while True:
+                    chunk = fp.read(UPLOAD_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_upload_bytes:
+                        raise ValueError("too_large")
+                    h.update(chunk)
+                    out.write(chunk)
+                out.flush()
+                os.fsync(out.fileno())
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return tmp_path, size, h.hexdigest()
+
+    def _ref_blob(self, con: sqlite3.Connection, tmp_path: Path, size: int, checksum: str) -> Tuple[str, Optional[str]]:
+        """
+        Blob referenzieren (Aufrufer hält BEGIN IMMEDIATE): vorhandener Blob => refcount+1, tmp verwerfen;
+        sonst tmp atomar per os.replace nach blobs/ verschieben. Liefert (storage_relpath, bekannter scan_status).
+        """
+        rel = self.blob_relpath(checksum)
+        abs_path = self.storage_root / rel
+        row = con.execute("SELECT scan_status FROM document_blobs WHERE sha256 = ?", (checksum,)).fetchone()
+
+        if row is not None and abs_path.exists():
+            tmp_path.unlink(missing_ok=True)
+            con.execute("UPDATE document_blobs SET refcount = refcount + 1 WHERE sha256 = ?", (checksum,))
+            return rel, row[0]
+
+        abs_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, abs_path)
+        if row is not None:
+            # Datei fehlte (z.B. GC-Abbruch): wiederhergestellt
+            con.execute("UPDATE document_blobs SET refcount = refcount + 1 WHERE sha256 = ?", (checksum,))
+            return rel, row[0]
+        con.execute(
+            """
+            INSERT INTO document_blobs (sha256, size_bytes, storage_relpath, refcount, scan_status, created_at)
+            VALUES (?, ?, ?, 1, ?, ?)
+            """,
+            (checksum, size, rel, DocumentScanStatus.PENDING.value, self._now_iso_utc()),
+        )
+        return rel, None
+
     def upload(
         self,
         *,
@@ -109,143 +331,412 @@ class DocumentsStore:
         filename: str,
         content_type: str,
         content_bytes: bytes,
+    ) -> DocumentOut:
+        return self.upload_stream(
+            owner_user_id=owner_user_id,
+            filename=filename,
+            content_type=content_type,
+            fileobj=io.BytesIO(content_bytes),
+        )
+
+    def upload_stream(
+        self,
+        *,
+        owner_user_id: str,
+        filename: str,
+        content_type: str,
+        fileobj: BinaryIO,
     ) -> DocumentOut:
         safe = self._sanitize_filename(filename)
-        self._validate(safe, content_type, content_bytes)
+        self._validate_meta(safe, content_type)
 
-        doc_id = uuid4().hex
-        rel = f"documents/{doc_id}_{safe}"
-        abs_path = self.storage_root / rel
-        abs_path.parent.mkdir(parents=True, exist_ok=True)
-        abs_path.write_bytes(content_bytes)
-
-        rec = DocumentRecord(
-            id=doc_id,
-            owner_user_id=str(owner_user_id),
-            filename=safe,
-            content_type=content_type or "application/octet-stream",
-            size_bytes=len(content_bytes),
-            storage_relpath=rel,
-            created_at=self._now_iso_utc(),
-            approval_status=DocumentApprovalStatus.QUARANTINED.value,
-            scan_status=DocumentScanStatus.PENDING.value,
-        )
+        tmp_path, size, checksum = self._spool(fileobj)
 
-        con = self._connect()
         try:
-            con.execute(
-                """
-                INSERT INTO documents (
-                  id, owner_user_id, filename, content_type, size_bytes,
-                  storage_relpath, created_at, approval_status, scan_status
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    rec.id,
-                    rec.owner_user_id,
-                    rec.filename,
-                    rec.content_type,
-                    rec.size_bytes,
-                    rec.storage_relpath,
-                    rec.created_at,
-                    rec.approval_status,
-                    rec.scan_status,
-                ),
-            )
-            con.commit()
-        finally:
-            con.close()
+            with self._write() as con:
+                con.execute("BEGIN IMMEDIATE")
+                rel, blob_scan = self._ref_blob(con, tmp_path, size, checksum)
+
+                # Scan-Ergebnis gilt pro Inhalt: finales Ergebnis des Blobs übernehmen
+                scan_status = DocumentScanStatus.PENDING.value
+                approval_status = DocumentApprovalStatus.QUARANTINED.value
+                if blob_scan in (DocumentScanStatus.CLEAN.value, DocumentScanStatus.INFECTED.value):
+                    scan_status = blob_scan
+                    if blob_scan == DocumentScanStatus.INFECTED.value:
+                        approval_status = DocumentApprovalStatus.REJECTED.value
+
+                rec = DocumentRecord(
+                    id=uuid4().hex,
+                    owner_user_id=str(owner_user_id),
+                    filename=safe,
+                    content_type=content_type or "application/octet-stream",
+                    size_bytes=size,
+                    storage_relpath=rel,
+                    created_at=self._now_iso_utc(),
+                    approval_status=approval_status,
+                    scan_status=scan_status,
+                    checksum_sha256=checksum,
+                )
+                con.execute(
+                    """
+                    INSERT INTO documents (
+                      id, owner_user_id, filename, content_type, size_bytes,
+                      storage_relpath, created_at, approval_status, scan_status, checksum_sha256
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        rec.id,
+                        rec.owner_user_id,
+                        rec.filename,
+                        rec.content_type,
+                        rec.size_bytes,
+                        rec.storage_relpath,
+                        rec.created_at,
+                        rec.approval_status,
+                        rec.scan_status,
+                        rec.checksum_sha256,
+                    ),
+                )
+                if rec.scan_status == DocumentScanStatus.PENDING.value:
+                    now = datetime.now(timezone.utc).timestamp()
+                    con.execute(
+                        """
+                        INSERT INTO document_scan_jobs (doc_id, status, next_attempt_at, enqueued_at)
+                        VALUES (?, 'queued', ?, ?)
+                        """,
+                        (rec.id, now, now),
+                    )
+        except BaseException:
+            # neu angelegte Blob-Datei bleibt ggf. ohne Zeile liegen -> gc_blobs() räumt auf
+            tmp_path.unlink(missing_ok=True)
+            raise
 
         return self._to_out(rec)
 
-    def get(self, doc_id: str) -> DocumentRecord:
-        con = self._connect()
-        try:
-            row = con.execute(
-                """
-                SELECT id, owner_user_id, filename, content_type, size_bytes,
-                       storage_relpath, created_at, approval_status, scan_status
-                FROM documents WHERE id = ?
-                """,
-                (doc_id,),
-            ).fetchone()
-        finally:
-            con.close()
+    def delete(self, doc_id: str) -> None:
+        """Dokument-Zeile löschen; Blob-Referenz freigeben (Datei entfernt erst gc_blobs())."""
+        with self._write() as con:
+            con.execute("BEGIN IMMEDIATE")
+            row = con.execute("SELECT checksum_sha256 FROM documents WHERE id = ?", (doc_id,)).fetchone()
+            if row is None:
+                raise KeyError("not_found")
+            con.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+            con.execute("DELETE FROM document_scan_jobs WHERE doc_id = ?", (doc_id,))
+            if row[0]:
+                con.execute(
+                    "UPDATE document_blobs SET refcount = MAX(refcount - 1, 0) WHERE sha256 = ?",
+                    (row[0],),
+                )
+
+    def gc_blobs(self, *, grace_seconds: float = 3600.0) -> int:
+        """
+        Verwaiste Blobs entfernen:
+        - Zeilen mit refcount=0 (Datei + Zeile)
+        - Dateien unter blobs/ ohne Zeile, älter als grace_seconds (abgebrochene Uploads)
+        - Temp-Dateien unter tmp/, älter als grace_seconds
+        Liefert Anzahl gelöschter Dateien.
+        """
+        removed = 0
+        with self._write() as con:
+            # Dateien innerhalb der TX löschen: parallele Uploads warten auf den Write-Lock
+            con.execute("BEGIN IMMEDIATE")
+            rows = con.execute("SELECT sha256, storage_relpath FROM document_blobs WHERE refcount <= 0").fetchall()
+            for sha, rel in rows:
+                p = self.storage_root / rel
+                if p.exists():
+                    p.unlink()
+                    removed += 1
+                con.execute("DELETE FROM document_blobs WHERE sha256 = ? AND refcount <= 0", (sha,))
+
+            known = {r[0] for r in con.execute("SELECT sha256 FROM document_blobs").fetchall()}
+            cutoff = datetime.now(timezone.utc).timestamp() - grace_seconds
+            blob_root = self.storage_root / "blobs"
+            if blob_root.exists():
+                for p in blob_root.glob("*/*"):
+                    if p.name not in known and p.stat().st_mtime < cutoff:
+                        p.unlink(missing_ok=True)
+                        removed += 1
+            tmp_root = self.storage_root / "tmp"
+            if tmp_root.exists():
+                for p in tmp_root.glob("*.part"):
+                    if p.stat().st_mtime < cutoff:
+                        p.unlink(missing_ok=True)
+                        removed += 1
+        return removed
 
+    @staticmethod
+    def _fetch(con: sqlite3.Connection, doc_id: str) -> DocumentRecord:
+        row = con.execute(f"SELECT {_SELECT_COLUMNS} FROM documents WHERE id = ?", (doc_id,)).fetchone()
         if not row:
             raise KeyError("not_found")
         return DocumentRecord(*row)
 
-    def list_quarantine(self) -> list[DocumentOut]:
-        con = self._connect()
-        try:
-            rows = con.execute(
-                """
-                SELECT id, owner_user_id, filename, content_type, size_bytes,
-                       storage_relpath, created_at, approval_status, scan_status
-                FROM documents
-                WHERE approval_status = ?
-                ORDER BY created_at DESC
-                """,
-                (DocumentApprovalStatus.QUARANTINED.value,),
-            ).fetchall()
-        finally:
-            con.close()
+    def get(self, doc_id: str) -> DocumentRecord:
+        with self._read() as con:
+            return self._fetch(con, doc_id)
 
-        return [self._to_out(DocumentRecord(*r)) for r in rows]
+    def _page(
+        self,
+        con: sqlite3.Connection,
+        where: str,
+        params: Tuple[str, ...],
+        after: Optional[str],
+        limit: Optional[int],
+    ) -> List[DocumentRecord]:
+        """
+        Keyset-Pagination (neueste zuerst): after = id des letzten Dokuments der vorigen Seite.
+        Sortierung (created_at, id) absteigend; nutzt die (…, created_at, id)-Indizes ohne Sort-Step.
+        """
+        n = DEFAULT_PAGE_SIZE if limit is None else max(1, min(int(limit), MAX_PAGE_SIZE))
+        sql = f"SELECT {_SELECT_COLUMNS} FROM documents WHERE {where}"
+        args: Tuple[object, ...] = params
+        if after:
+            cursor = con.execute("SELECT created_at, id FROM documents WHERE id = ?", (after,)).fetchone()
+            if cursor is None:
+                raise KeyError("cursor_not_found")
+            sql += " AND (created_at, id) < (?, ?)"
+            args = args + (cursor[0], cursor[1])
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        rows = con.execute(sql, args + (n,)).fetchall()
+        return [DocumentRecord(*r) for r in rows]
+
+    def list_quarantine(self, *, after: Optional[str] = None, limit: Optional[int] = None) -> list[DocumentOut]:
+        with self._read() as con:
+            recs = self._page(con, "approval_status = ?", (DocumentApprovalStatus.QUARANTINED.value,), after, limit)
+        return [self._to_out(r) for r in recs]
+
+    def list_by_owner(
+        self,
+        owner_user_id: str,
+        *,
+        approval_status: Optional[DocumentApprovalStatus] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> list[DocumentOut]:
+        where, params = "owner_user_id = ?", (str(owner_user_id),)
+        if approval_status is not None:
+            where, params = where + " AND approval_status = ?", params + (approval_status.value,)
+        with self._read() as con:
+            recs = self._page(con, where, params, after, limit)
+        return [self._to_out(r) for r in recs]
 
-    def set_scan_status(self, doc_id: str, status: DocumentScanStatus) -> DocumentOut:
-        rec = self.get(doc_id)
+    @staticmethod
+    def _apply_scan_status(con: sqlite3.Connection, rec: DocumentRecord, status: DocumentScanStatus) -> None:
         approval = rec.approval_status
         if status == DocumentScanStatus.INFECTED:
             approval = DocumentApprovalStatus.REJECTED.value
 
-        con = self._connect()
-        try:
+        con.execute(
+            """
+            UPDATE documents
+            SET scan_status = ?, approval_status = ?
+            WHERE id = ?
+            """,
+            (status.value, approval, rec.id),
+        )
+        if status not in (DocumentScanStatus.CLEAN, DocumentScanStatus.INFECTED):
+            return
+
+        now = datetime.now(timezone.utc).timestamp()
+        con.execute(
+            "UPDATE document_scan_jobs SET status = 'done', finished_at = ?, locked_by = NULL WHERE doc_id = ?",
+            (now, rec.id),
+        )
+        if not rec.checksum_sha256:
+            return
+
+        # finales Ergebnis gilt für den Inhalt: Blob + noch ungescannte Dokumente desselben Blobs
+        con.execute(
+            "UPDATE document_blobs SET scan_status = ? WHERE sha256 = ?",
+            (status.value, rec.checksum_sha256),
+        )
+        con.execute(
+            """
+            UPDATE document_scan_jobs SET status = 'done', finished_at = ?
+            WHERE status = 'queued'
+              AND doc_id IN (SELECT id FROM documents WHERE checksum_sha256 = ? AND scan_status = ?)
+            """,
+            (now, rec.checksum_sha256, DocumentScanStatus.PENDING.value),
+        )
+        if status == DocumentScanStatus.INFECTED:
             con.execute(
                 """
-                UPDATE documents
-                SET scan_status = ?, approval_status = ?
-                WHERE id = ?
+                UPDATE documents SET scan_status = ?, approval_status = ?
+                WHERE checksum_sha256 = ? AND scan_status = ?
                 """,
-                (status.value, approval, doc_id),
+                (status.value, approval, rec.checksum_sha256, DocumentScanStatus.PENDING.value),
+            )
+        else:
+            con.execute(
+                "UPDATE documents SET scan_status = ? WHERE checksum_sha256 = ? AND scan_status = ?",
+                (status.value, rec.checksum_sha256, DocumentScanStatus.PENDING.value),
             )
-            con.commit()
-        finally:
-            con.close()
 
-        return self._to_out(self.get(doc_id))
+    def set_scan_status(self, doc_id: str, status: DocumentScanStatus) -> DocumentOut:
+        with self._write() as con:
+            rec = self._fetch(con, doc_id)
+            self._apply_scan_status(con, rec, status)
+            return self._to_out(self._fetch(con, doc_id))
+
+    # --- Scan-Queue (siehe app.services.document_scan) ---
+
+    def claim_scan_jobs(
+        self, worker_id: str, *, limit: int, lease_seconds: float, max_attempts: Optional[int] = None
+    ) -> List[ScanJob]:
+        """
+        Fällige Jobs atomar übernehmen (queued + fällig, oder running mit abgelaufener Lease).
+        attempts wird beim Claim erhöht: ein abgestürzter Worker zählt als Versuch.
+        max_attempts: Jobs mit abgelaufener Lease und ausgeschöpften Versuchen werden nicht
+        erneut vergeben, sondern als failed abgeschlossen (Dokument scan_status=ERROR).
+        """
+        now = datetime.now(timezone.utc).timestamp()
+        cap = int(max_attempts) if max_attempts is not None else -1
+        with self._write() as con:
+            con.execute("BEGIN IMMEDIATE")
+            if cap > 0:
+                exhausted = [
+                    r[0]
+                    for r in con.execute(
+                        """
+                        SELECT doc_id FROM document_scan_jobs
+                        WHERE status = 'running' AND locked_until < ? AND attempts >= ?
+                        """,
+                        (now, cap),
+                    ).fetchall()
+                ]
+                for doc_id in exhausted:
+                    self._fail_job(con, doc_id, "lease expired after max attempts", now)
 
-    def approve(self, doc_id: str) -> DocumentOut:
-        rec = self.get(doc_id)
-        if rec.scan_status != DocumentScanStatus.CLEAN.value:
-            raise ValueError("not_scanned_clean")
+            rows = con.execute(
+                """
+                SELECT j.doc_id, j.attempts, j.enqueued_at, d.storage_relpath, d.scan_status
+                FROM document_scan_jobs j
+                LEFT JOIN documents d ON d.id = j.doc_id
+                WHERE ((j.status = 'queued' AND j.next_attempt_at <= ?)
+                   OR (j.status = 'running' AND j.locked_until < ?))
+                  AND (? <= 0 OR j.attempts < ?)
+                ORDER BY j.next_attempt_at
+                LIMIT ?
+                """,
+                (now, now, cap, cap, int(limit)),
+            ).fetchall()
 
-        con = self._connect()
-        try:
+            jobs: List[ScanJob] = []
+            for doc_id, attempts, enqueued_at, rel, scan_status in rows:
+                if rel is None or scan_status != DocumentScanStatus.PENDING.value:
+                    # Dokument weg oder inzwischen manuell/über Blob entschieden
+                    con.execute(
+                        "UPDATE document_scan_jobs SET status = 'done', finished_at = ? WHERE doc_id = ?",
+                        (now, doc_id),
+                    )
+                    continue
+                con.execute(
+                    """
+                    UPDATE document_scan_jobs
+                    SET status = 'running', attempts = attempts + 1, locked_by = ?, locked_until = ?
+                    WHERE doc_id = ?
+                    """,
+                    (worker_id, now + lease_seconds, doc_id),
+                )
+                jobs.append(
+                    ScanJob(
+                        doc_id=doc_id,
+                        path=self.storage_root / rel,
+                        attempt=int(attempts) + 1,
+                        enqueued_at=float(enqueued_at),
+                    )
+                )
+            return jobs
+
+    def complete_scan_job(self, doc_id: str, status: DocumentScanStatus) -> None:
+        with self._write() as con:
+            try:
+                rec = self._fetch(con, doc_id)
+            except KeyError:
+                con.execute("DELETE FROM document_scan_jobs WHERE doc_id = ?", (doc_id,))
+                return
+            if rec.scan_status == DocumentScanStatus.PENDING.value:
+                self._apply_scan_status(con, rec, status)
+            con.execute(
+                "UPDATE document_scan_jobs SET status = 'done', finished_at = ?, locked_by = NULL WHERE doc_id = ?",
+                (datetime.now(timezone.utc).timestamp(), doc_id),
+            )
+
+    def fail_scan_job(self, doc_id: str, error: str, *, retry_in: Optional[float]) -> None:
+        """retry_in=None => endgültig fehlgeschlagen (Dokument scan_status=ERROR, bleibt in Quarantäne)."""
+        now = datetime.now(timezone.utc).timestamp()
+        with self._write() as con:
+            if retry_in is not None:
+                con.execute(
+                    """
+                    UPDATE document_scan_jobs
+                    SET status = 'queued', next_attempt_at = ?, locked_by = NULL, locked_until = NULL, last_error = ?
+                    WHERE doc_id = ?
+                    """,
+                    (now + retry_in, error[:500], doc_id),
+                )
+                return
+            self._fail_job(con, doc_id, error, now)
+
+    @staticmethod
+    def _fail_job(con: sqlite3.Connection, doc_id: str, error: str, now: float) -> None:
+        con.execute(
+            """
+            UPDATE document_scan_jobs
+            SET status = 'failed', finished_at = ?, locked_by = NULL, locked_until = NULL, last_error = ?
+            WHERE doc_id = ?
+            """,
+            (now, error[:500], doc_id),
+        )
+        con.execute(
+            "UPDATE documents SET scan_status = ? WHERE id = ? AND scan_status = ?",
+            (DocumentScanStatus.ERROR.value, doc_id, DocumentScanStatus.PENDING.value),
+        )
+
+    def purge_scan_jobs(self, *, older_than_seconds: float, batch_size: int = 1000) -> int:
+        """Abgeschlossene Jobs (done/failed) nach TTL löschen; das Ergebnis steht am Dokument."""
+        cutoff = datetime.now(timezone.utc).timestamp() - float(older_than_seconds)
+        total = 0
+        while True:
+            with self._write() as con:
+                n = con.execute(
+                    """
+                    DELETE FROM document_scan_jobs WHERE doc_id IN (
+                      SELECT doc_id FROM document_scan_jobs
+                      WHERE status IN ('done', 'failed') AND finished_at < ?
+                      LIMIT ?
+                    )
+                    """,
+                    (cutoff, int(batch_size)),
+                ).rowcount
+            total += n
+            if n < batch_size:
+                return total
+
+    def scan_queue_depth(self) -> Dict[str, int]:
+        with self._read() as con:
+            rows = con.execute("SELECT status, COUNT(*) FROM document_scan_jobs GROUP BY status").fetchall()
+        return {str(k): int(v) for k, v in rows}
+
+    def approve(self, doc_id: str) -> DocumentOut:
+        with self._write() as con:
+            rec = self._fetch(con, doc_id)
+            if rec.scan_status != DocumentScanStatus.CLEAN.value:
+                raise ValueError("not_scanned_clean")
             con.execute(
                 "UPDATE documents SET approval_status = ? WHERE id = ?",
                 (DocumentApprovalStatus.APPROVED.value, doc_id),
             )
-            con.commit()
-        finally:
-            con.close()
-
-        return self._to_out(self.get(doc_id))
+            return self._to_out(self._fetch(con, doc_id))
 
     def reject(self, doc_id: str) -> DocumentOut:
-        self.get(doc_id)
-        con = self._connect()
-        try:
+        with self._write() as con:
+            self._fetch(con, doc_id)
             con.execute(
                 "UPDATE documents SET approval_status = ? WHERE id = ?",
                 (DocumentApprovalStatus.REJECTED.value, doc_id),
             )
-            con.commit()
-        finally:
-            con.close()
-
-        return self._to_out(self.get(doc_id))
+            return self._to_out(self._fetch(con, doc_id))
 
     def file_path(self, rec: DocumentRecord) -> Path:
         return self.storage_root / rec.storage_relpath
@@ -299,6 +790,7 @@ class DocumentsStore:
             approval_status=DocumentApprovalStatus(rec.approval_status),
             scan_status=DocumentScanStatus(rec.scan_status),
             created_at=rec.created_at,
+            checksum_sha256=rec.checksum_sha256,
         )
 
 
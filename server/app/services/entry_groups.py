@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.vehicle_entry import EntryGroup, VehicleEntry
+
+_GROUPS = EntryGroup.__table__
+_ENTRIES = VehicleEntry.__table__
+
+
+class EntryGroupConflict(Exception):
+    """Gruppe hat inzwischen einen anderen Kopf (parallele Revision)."""
+
+
+def open_entry_group(db: Session, entry: VehicleEntry) -> None:
+    """Neue Gruppe für einen Erst-Eintrag (gleiche Transaktion wie das Insert)."""
+    db.execute(
+        insert(_GROUPS).values(
+            group_id=entry.entry_group_id,
+            vehicle_id=entry.vehicle_id,
+            head_entry_id=entry.id,
+            revision_count=1,
+        )
+    )
+
+
+def advance_entry_group(db: Session, *, previous: VehicleEntry, revision: VehicleEntry) -> int:
+    """
+    Kopf der Gruppe auf die neue Revision setzen; liefert die neue Revisionszahl.
+    Bedingtes Update auf den bisherigen Kopf: parallele Revisionen desselben Kopfs => EntryGroupConflict.
+    """
+    res = db.execute(
+        update(_GROUPS)
+        .where(_GROUPS.c.group_id == previous.entry_group_id, _GROUPS.c.head_entry_id == previous.id)
+        .values(head_entry_id=revision.id, revision_count=_GROUPS.c.revision_count + 1)
+    )
+    if res.rowcount == 1:
+        return int(entry_group_revision_count(db, previous.entry_group_id) or 1)
+
+    if db.execute(select(_GROUPS.c.group_id).where(_GROUPS.c.group_id == previous.entry_group_id)).first():
+        raise EntryGroupConflict(previous.entry_group_id)
+
+    # Altbestand ohne Gruppenzeile: einmalig aus der Kette nachziehen
+    db.flush()
+    count = _chain_length(db, previous.entry_group_id)
+    db.execute(
+        insert(_GROUPS).values(
+            group_id=previous.entry_group_id,
+            vehicle_id=revision.vehicle_id,
+            head_entry_id=revision.id,
+            revision_count=count,
+        )
+    )
+    return count
+
+
+def _chain_length(db: Session, group_id: str) -> int:
+    return int(db.execute(select(func.count()).where(_ENTRIES.c.entry_group_id == group_id)).scalar_one())
+
+
+def entry_group_revision_count(db: Session, group_id: str) -> Optional[int]:
+    """PK-Lookup; None, wenn (noch) keine Gruppenzeile existiert."""
+    row = db.execute(select(_GROUPS.c.revision_count).where(_GROUPS.c.group_id == group_id)).first()
+    return int(row[0]) if row is not None else None
+
+
+def revision_count_column():
+    """
+    Revisionszahl für Listen-Queries (Outer Join auf entry_groups).
+    Fehlt die Gruppenzeile (Altbestand, Schreiben an der API vorbei), zählt die Subquery die Kette.
+    """
+    chain = _ENTRIES.alias("chain")
+    fallback = (
+        select(func.count(chain.c.id))
+        .where(chain.c.entry_group_id == VehicleEntry.entry_group_id)
+        .correlate(VehicleEntry)
+        .scalar_subquery()
+    )
+    return func.coalesce(EntryGroup.revision_count, fallback)
+
+
+def _expected(db: Session, vehicle_id: Optional[str]) -> dict[str, tuple[str, Optional[str], int]]:
+    q = select(
+        _ENTRIES.c.entry_group_id,
+        func.max(_ENTRIES.c.vehicle_id),
+        func.max(case((_ENTRIES.c.is_latest.is_(True), _ENTRIES.c.id), else_=None)),
+        func.count(_ENTRIES.c.id),
+    ).group_by(_ENTRIES.c.entry_group_id)
+    if vehicle_id is not None:
+        q = q.where(_ENTRIES.c.vehicle_id == vehicle_id)
+    return {gid: (vid, head, int(n)) for gid, vid, head, n in db.execute(q)}
+
+
+def check_entry_groups(db: Session, *, vehicle_id: Optional[str] = None) -> dict[str, list[str]]:
+    """Abgleich gegen die Revisionskette: fehlende, abweichende und verwaiste Gruppenzeilen."""
+    expected = _expected(db, vehicle_id)
+    q = select(_GROUPS.c.group_id, _GROUPS.c.head_entry_id, _GROUPS.c.revision_count)
+    if vehicle_id is not None:
+        q = q.where(_GROUPS.c.vehicle_id == vehicle_id)
+    stored = {gid: (head, int(n)) for gid, head, n in db.execute(q)}
+
+    return {
+        "missing": sorted(gid for gid in expected if gid not in stored),
+        "drifted": sorted(
+            gid for gid, (_, head, n) in expected.items() if gid in stored and stored[gid] != (head, n)
+        ),
+        "orphaned": sorted(gid for gid in stored if gid not in expected),
+    }
+
+
+def repair_entry_groups(db: Session, *, vehicle_id: Optional[str] = None) -> int:
+    """Repair-Job: Gruppenzeilen aus der Kette neu schreiben bzw. verwaiste löschen. Liefert Anzahl Korrekturen."""
+    report = check_entry_groups(db, vehicle_id=vehicle_id)
+    expected = _expected(db, vehicle_id)
+
+    fixed = 0
+    for gid in report["missing"] + report["drifted"]:
+        vid, head, n = expected[gid]
+        if head is None:
+            # Kette ohne Latest-Eintrag: Kopf nicht bestimmbar, bleibt im Report
+            continue
+        db.execute(delete(_GROUPS).where(_GROUPS.c.group_id == gid))
+        db.execute(insert(_GROUPS).values(group_id=gid, vehicle_id=vid, head_entry_id=head, revision_count=n))
+        fixed += 1
+    if report["orphaned"]:
+        db.execute(delete(_GROUPS).where(_GROUPS.c.group_id.in_(report["orphaned"])))
+    db.commit()
+    return fixed + len(report["orphaned"])
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import IO, Any, Callable, Iterable, Iterator, Optional
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models.vehicle import Vehicle
+from app.models.vehicle_entry import EntryGroup, VehicleEntry
+from app.services.vehicle_trust import refresh_vehicle_trust_summaries
+
+IMPORT_FORMATS = ("ndjson", "csv", "xlsx")
+IMPORT_BATCH_ROWS = 5_000
+IMPORT_MAX_ROWS = 200_000
+MAX_REPORTED_ERRORS = 1_000
+
+_ENTRIES = VehicleEntry.__table__
+_GROUPS = EntryGroup.__table__
+_VEHICLES = Vehicle.__table__
+
+# Spalten der Importdatei (wie VehicleEntryCreateIn + vehicle_id)
+_OPTIONAL_FIELDS = ("note", "cost_amount", "trust_level")
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    failed: int = 0
+    vehicles: set[str] = field(default_factory=set)
+    errors: list[dict[str, Any]] = field(default_factory=list)
+    errors_truncated: bool = False
+
+    def error(self, row: int, code: str, field_name: Optional[str] = None) -> None:
+        self.failed += 1
+        if len(self.errors) >= MAX_REPORTED_ERRORS:
+            self.errors_truncated = True
+            return
+        self.errors.append({"row": row, "error": code, "field": field_name})
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "vehicles": len(self.vehicles),
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated,
+        }
+
+
+def detect_format(*, explicit: Optional[str], filename: Optional[str], content_type: Optional[str]) -> str:
+    if explicit:
+        fmt = explicit.strip().lower()
+    else:
+        name = (filename or "").lower()
+        ctype = (content_type or "").split(";", 1)[0].strip().lower()
+        if name.endswith((".ndjson", ".jsonl")) or ctype in ("application/x-ndjson", "application/jsonl"):
+            fmt = "ndjson"
+        elif name.endswith(".csv") or ctype == "text/csv":
+            fmt = "csv"
+        elif name.endswith(".xlsx") or ctype == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet":
+            fmt = "xlsx"
+        else:
+            fmt = ""
+    if fmt not in IMPORT_FORMATS:
+        raise ImportFormatError("unsupported_format")
+    return fmt
+
+
+def iter_rows(fileobj: IO[bytes], fmt: str) -> Iterator[tuple[int, Optional[dict[str, Any]]]]:
+    """(Zeilennummer ab 1, Dict) je Datenzeile; None = Zeile nicht lesbar."""
+    if fmt == "ndjson":
+        for n, line in enumerate(fileobj, start=1):
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                yield n, None
+                continue
+            yield n, obj if isinstance(obj, dict) else None
+        return
+
+    if fmt == "csv":
+        text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+        try:
+            for n, rec in enumerate(csv.DictReader(text), start=1):
+                yield n, {k.strip(): v for k, v in rec.items() if k}
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise ImportFormatError("unreadable_file") from e
+        finally:
+            text.detach()
+        return
+
+    if fmt == "xlsx":
+        import openpyxl
+
+        try:
+            wb = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+        except Exception as e:
+            raise ImportFormatError("unreadable_file") from e
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = [str(h).strip() if h is not None else "" for h in next(rows, ())]
+            for n, values in enumerate(rows, start=1):
+                if values is None or all(v is None for v in values):
+                    continue
+                rec = {}
+                for key, value in zip(header, values):
+                    if key:
+                        rec[key] = value.date() if isinstance(value, datetime) else value
+                yield n, rec
+        finally:
+            wb.close()
+        return
+
+    raise ImportFormatError("unsupported_format")
+
+
+def _normalize(raw: dict[str, Any]) -> dict[str, Any]:
+    # CSV/XLSX: leere Zellen => None (optionale Felder), Zahlen aus XLSX als Text für vehicle_id
+    out = dict(raw)
+    for key in _OPTIONAL_FIELDS:
+        if isinstance(out.get(key), str) and not out[key].strip():
+            out[key] = None
+    if out.get("vehicle_id") is not None:
+        out["vehicle_id"] = str(out["vehicle_id"]).strip()
+    return out
+
+
+def import_entries(
+    db: Session,
+    rows: Iterable[tuple[int, Optional[dict[str, Any]]]],
+    *,
+    schema: type[BaseModel],
+    can_write: Callable[[str], bool],
+    batch_rows: int = IMPORT_BATCH_ROWS,
+    max_rows: int = IMPORT_MAX_ROWS,
+) -> ImportReport:
+    """
+    Einträge (ggf. mehrerer Fahrzeuge) batchweise importieren:
+    - Validierung je Zeile mit `schema` (VehicleEntryCreateIn), Fehler landen im Report
+    - Fahrzeuge + Berechtigung (`can_write(owner_user_id)`) per IN-Query, gecacht über Batches
+    - pro Batch eine Transaktion mit executemany für vehicle_entries + entry_groups
+    - Trust-Summaries am Ende einmal pro Fahrzeug
+    """
+    report = ImportReport()
+    owners: dict[str, Optional[str]] = {}  # vehicle_id -> owner (None = unbekannt/kein Zugriff)
+    pending: list[tuple[int, dict[str, Any]]] = []
+    seen = 0
+
+    def _flush_batch() -> None:
+        unknown = {rec["vehicle_id"] for _, rec in pending if rec["vehicle_id"] not in owners}
+        if unknown:
+            found = dict(
+                db.execute(
+                    select(_VEHICLES.c.public_id, _VEHICLES.c.owner_user_id).where(_VEHICLES.c.public_id.in_(unknown))
+                ).all()
+            )
+            for vid in unknown:
+                owner = found.get(vid)
+                owners[vid] = owner if owner is not None and can_write(owner) else None
+
+        entries: list[dict[str, Any]] = []
+        groups: list[dict[str, Any]] = []
+        batch_rows_ok: list[int] = []
+        for n, rec in pending:
+            owner = owners.get(rec["vehicle_id"])
+            if owner is None:
+                # unbekannt und fremd nicht unterscheiden (keine Existenz-Leaks)
+                report.error(n, "vehicle_not_found", "vehicle_id")
+                continue
+            entry_id = str(uuid.uuid4())
+            p = rec["payload"]
+            note = p.note.strip() if isinstance(p.note, str) and p.note.strip() else None
+            entries.append(
+                {
+                    "id": entry_id,
+                    "vehicle_id": rec["vehicle_id"],
+                    "owner_user_id": owner,
+                    "entry_group_id": entry_id,
+                    "supersedes_entry_id": None,
+                    "version": 1,
+                    "is_latest": True,
+                    "entry_date": p.date,
+                    "entry_type": p.type.strip(),
+                    "performed_by": p.performed_by.strip(),
+                    "km": p.km,
+                    "note": note,
+                    "cost_amount": p.cost_amount,
+                    "trust_level": p.trust_level,
+                }
+            )
+            groups.append({"group_id": entry_id, "vehicle_id": rec["vehicle_id"], "head_entry_id": entry_id, "revision_count": 1})
+            batch_rows_ok.append(n)
+        pending.clear()
+        if not entries:
+            return
+
+        try:
+            db.execute(insert(_ENTRIES), entries)
+            db.execute(insert(_GROUPS), groups)
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            for n in batch_rows_ok:
+                report.error(n, "insert_failed")
+            return
+        report.inserted += len(entries)
+        report.vehicles.update(e["vehicle_id"] for e in entries)
+
+    for n, raw in rows:
+        seen += 1
+        if seen > max_rows:
+            report.error(n, "row_limit_exceeded")
+            break
+        if raw is None:
+            report.error(n, "unreadable_row")
+            continue
+        rec = _normalize(raw)
+        if not rec.get("vehicle_id"):
+            report.error(n, "missing_field", "vehicle_id")
+            continue
+        try:
+            payload = schema.model_validate(rec)
+        except ValidationError as e:
+            first = e.errors()[0]
+            loc = ".".join(str(x) for x in first.get("loc", ())) or None
+            report.error(n, "invalid_row", loc)
+            continue
+        pending.append((n, {"vehicle_id": rec["vehicle_id"], "payload": payload}))
+        if len(pending) >= batch_rows:
+            _flush_batch()
+    if pending:
+        _flush_batch()
+
+    if report.vehicles:
+        refresh_vehicle_trust_summaries(db, report.vehicles)
+        db.commit()
+    return report
@@ -2,10 +2,22 @@ import datetime as dt
 import json
 from typing import Any, Dict, Optional
 
-from sqlalchemy import MetaData, Table, Column, String, DateTime, Boolean, insert
+from sqlalchemy import MetaData, Table, Column, String, DateTime, Boolean
 from sqlalchemy.orm import Session
 from sqlalchemy import inspect as sa_inspect
 
+from app.db.reflection import ensure_indexes
+from app.services.audit_sink import covers_required_columns, get_audit_sink, table_target
+
+# (Filter, Zeit, id)-Indizes für app.services.audit_query (Quelle "export")
+QUERY_INDEXES = {
+    "idx_export_audit_events_q_time": ("created_at", "id"),
+    "idx_export_audit_events_q_event_type": ("event_type", "created_at", "id"),
+    "idx_export_audit_events_q_target_id": ("target_id", "created_at", "id"),
+}
+
+_PAYLOAD_KEYS = ("id", "event_type", "created_at", "actor_role", "actor_user_id", "target_type", "target_id", "success", "reason", "meta_json")
+
 
 def _utcnow() -> dt.datetime:
     return dt.datetime.now(dt.timezone.utc)
@@ -17,6 +29,13 @@ def _safe_json(meta: Optional[Dict[str, Any]]) -> str:
     return json.dumps(meta, ensure_ascii=False, separators=(",", ":"))
 
 
+def _columns_we_fill(t: Table) -> set:
+    cols = set(t.columns.keys())
+    out = cols & set(_PAYLOAD_KEYS)
+    out |= cols & {"ts", "created", "type"}
+    return out
+
+
 def _pick_audit_table(db: Session) -> Table:
     # WICHTIG: gleiche Connection nutzen (sqlite :memory: safe)
     conn = db.connection()
@@ -25,7 +44,12 @@ def _pick_audit_table(db: Session) -> Table:
 
     for name in ("audit_events", "audit", "audits"):
         if insp.has_table(name):
-            return Table(name, md, autoload_with=conn)
+            t = Table(name, md, autoload_with=conn)
+            # Tabelle mit Pflichtspalten, die wir nicht kennen (z.B. MasterClipboard-audit_events):
+            # jeder Insert würde scheitern -> Fallback-Tabelle
+            if covers_required_columns(t, _columns_we_fill(t)):
+                return t
+            break
 
     # Fallback (nur wenn gar nichts existiert)
     fallback = "export_audit_events"
@@ -44,6 +68,9 @@ def _pick_audit_table(db: Session) -> Table:
         Column("meta_json", String, nullable=False),
     )
     md.create_all(bind=conn, tables=[t], checkfirst=True)
+    ensure_indexes(conn, t, QUERY_INDEXES)
+    # DDL sofort committen: der Flusher schreibt über eigene Connections
+    db.commit()
     return t
 
 
@@ -58,12 +85,16 @@ def write_export_audit(
     success: bool,
     reason: Optional[str] = None,
     meta: Optional[Dict[str, Any]] = None,
+    critical: bool = False,
 ) -> None:
     """
     Audit ohne Klartext-PII/Secrets.
     Token wird NIE geloggt.
+    critical=True (Full-Export/Grant/Download): synchron in der Session, sonst Write-Behind.
     """
-    t = _pick_audit_table(db)
+    # Zieltabelle einmal pro Engine bestimmen (statt Reflection pro Event)
+    target = table_target(db, "export_audit", _pick_audit_table)
+    t = target.table
     now = _utcnow()
 
     payload = {
@@ -90,8 +121,16 @@ def write_export_audit(
     if "type" in cols and "type" not in filtered:
         filtered["type"] = event_type
 
+    sink = get_audit_sink()
+    if not critical and sink.mode == "async":
+        try:
+            sink.emit(target, filtered)
+        except Exception:
+            pass
+        return
+
     try:
-        db.execute(insert(t).values(**filtered))
+        sink.emit(target, filtered, critical=True, conn=db)
         db.commit()
     except Exception:
         db.rollback()
@@ -1,24 +1,46 @@
-import base64
 import datetime as dt
 import hashlib
+import hmac
 import json
-import os
-from typing import Any, Dict
+import secrets
+import struct
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
 
-from cryptography.fernet import Fernet, InvalidToken
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 
+from app.core.keyring import Keyring, get_keyring, keyring_for
 
-def _require_secret_key() -> str:
-    secret = os.environ.get("LTC_SECRET_KEY", "").strip()
-    if not secret:
-        raise RuntimeError("LTC_SECRET_KEY fehlt (ENV).")
-    return secret
 
+# Chunked-Format (Full Exports, Streaming):
+#   Header: MAGIC | version u8 | alg u8 | chunk_size u32 | salt 16 | nonce_prefix 7 | HMAC-SHA256(Header) 32
+#   danach Segmente: len u32 | AES-256-GCM(chunk), AAD = Header
+#   Nonce je Segment: nonce_prefix | Zähler u32 | last u8 (Abschneiden/Umsortieren fällt beim Entschlüsseln auf)
+# Schlüssel pro Export: HKDF-SHA256(ikm, salt, info je Version) -> enc 32 | mac 32
+#   v2: ikm = Keyring-Key "export.chunked" (Key-Separation)
+#   v1: ikm = rohes Secret (nur noch Entschlüsseln bestehender Exports)
+# Rotation: Entschlüsseln probiert alle aktiven Key-IDs (Header-HMAC entscheidet, ohne Segmente zu lesen)
+CHUNKED_MAGIC = b"LTCX"
+CHUNKED_VERSION = 2
+CHUNKED_ALG_AES256GCM = 1
+CHUNKED_ALG_NAME = "aes256gcm-chunked-v1"
+CHUNKED_MEDIA_TYPE = "application/vnd.ltc.export+chunked"
+DEFAULT_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
 
-def _fernet_from_secret(secret: str) -> Fernet:
-    digest = hashlib.sha256(secret.encode("utf-8")).digest()  # 32 bytes
-    key = base64.urlsafe_b64encode(digest)
-    return Fernet(key)
+_HEADER_FMT = ">4sBBI16s7s"
+_HEADER_LEN = struct.calcsize(_HEADER_FMT)
+_MAC_LEN = 32
+_TAG_LEN = 16
+_HKDF_INFO = {1: b"ltc-export-chunked-v1", 2: b"ltc-export-chunked-v2"}
+
+
+def _keyring(secret: Optional[str] = None) -> Keyring:
+    # explizites Secret (z. B. Settings) oder Prozess-Keyring aus ENV
+    return keyring_for(secret) if secret else get_keyring()
 
 
 def _json_default(o: Any) -> Any:
@@ -36,8 +58,7 @@ def _json_default(o: Any) -> Any:
 
 
 def encrypt_json(payload: Dict[str, Any]) -> str:
-    secret = _require_secret_key()
-    f = _fernet_from_secret(secret)
+    f = get_keyring().fernet("export.fernet")
     raw = json.dumps(
         payload,
         ensure_ascii=False,
@@ -48,8 +69,7 @@ def encrypt_json(payload: Dict[str, Any]) -> str:
 
 
 def decrypt_json(ciphertext: str) -> Dict[str, Any]:
-    secret = _require_secret_key()
-    f = _fernet_from_secret(secret)
+    f = get_keyring().fernet("export.fernet")
     try:
         raw = f.decrypt(ciphertext.encode("utf-8"))
     except InvalidToken as e:
@@ -58,3 +78,160 @@ def decrypt_json(ciphertext: str) -> Dict[str, Any]:
     if not isinstance(obj, dict):
         raise ValueError("payload ist kein JSON-Objekt")
     return obj
+
+
+def _chunked_ikm(ring: Keyring, version: int, kid: Optional[str] = None) -> bytes:
+    if version == 1:
+        return ring.secret(kid).encode("utf-8")
+    return ring.key("export.chunked", kid)
+
+
+def _chunked_keys(ikm: bytes, salt: bytes, version: int = CHUNKED_VERSION) -> tuple[bytes, bytes]:
+    okm = HKDF(algorithm=hashes.SHA256(), length=64, salt=salt, info=_HKDF_INFO[version]).derive(ikm)
+    return okm[:32], okm[32:]
+
+
+def _nonce(prefix: bytes, counter: int, last: bool) -> bytes:
+    return prefix + struct.pack(">IB", counter, 1 if last else 0)
+
+
+def encrypt_stream(
+    chunks: Iterable[bytes], *, chunk_size: int = DEFAULT_CHUNK_SIZE, secret: Optional[str] = None
+) -> Iterator[bytes]:
+    """
+    Klartext-Chunks beliebiger Größe -> Chunked-Container (Header, dann Segmente à chunk_size).
+    Speicher: höchstens ein Segment plus der aktuelle Eingabe-Chunk.
+    Secret/chunk_size werden sofort geprüft (nicht erst, wenn der Stream schon läuft).
+    """
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError("chunk_size ungültig")
+    return _encrypt_segments(chunks, chunk_size, _chunked_ikm(_keyring(secret), CHUNKED_VERSION))
+
+
+def _encrypt_segments(
+    chunks: Iterable[bytes], chunk_size: int, ikm: bytes, version: int = CHUNKED_VERSION
+) -> Iterator[bytes]:
+    salt = secrets.token_bytes(16)
+    prefix = secrets.token_bytes(7)
+    enc_key, mac_key = _chunked_keys(ikm, salt, version)
+    header = struct.pack(_HEADER_FMT, CHUNKED_MAGIC, version, CHUNKED_ALG_AES256GCM, chunk_size, salt, prefix)
+    header += hmac.new(mac_key, header, hashlib.sha256).digest()
+    yield header
+
+    aead = AESGCM(enc_key)
+    counter = 0
+    buf = bytearray()
+
+    def _seal(data: bytes, last: bool) -> bytes:
+        ct = aead.encrypt(_nonce(prefix, counter, last), data, header)
+        return struct.pack(">I", len(ct)) + ct
+
+    for chunk in chunks:
+        buf += chunk
+        # immer ein volles Segment zurückhalten: das letzte wird erst am Ende (last=1) versiegelt
+        while len(buf) > chunk_size:
+            yield _seal(bytes(buf[:chunk_size]), False)
+            del buf[:chunk_size]
+            counter += 1
+    yield _seal(bytes(buf), True)
+
+
+class _Reader:
+    # kleiner Puffer über einem Iterable[bytes]; liest genau n Bytes
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._it = iter(chunks)
+        self._buf = bytearray()
+
+    def read(self, n: int) -> bytes:
+        while len(self._buf) < n:
+            nxt = next(self._it, None)
+            if nxt is None:
+                break
+            self._buf += nxt
+        out = bytes(self._buf[:n])
+        del self._buf[:n]
+        return out
+
+    def at_end(self) -> bool:
+        return not self.read(1)
+
+
+def decrypt_stream(chunks: Iterable[bytes], *, secret: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Chunked-Container -> Klartext-Segmente (streamend, Speicher ~ ein Segment).
+    Header-HMAC, jedes Segment und das Ende (last-Flag, nichts danach) werden geprüft.
+    """
+    reader = _Reader(chunks)
+    header = reader.read(_HEADER_LEN)
+    if len(header) != _HEADER_LEN:
+        raise ValueError("ciphertext ungültig")
+    magic, version, alg, chunk_size, salt, prefix = struct.unpack(_HEADER_FMT, header)
+    if magic != CHUNKED_MAGIC or version not in _HKDF_INFO or alg != CHUNKED_ALG_AES256GCM:
+        raise ValueError("ciphertext ungültig")
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError("ciphertext ungültig")
+
+    ring = _keyring(secret)
+    mac = reader.read(_MAC_LEN)
+    for kid in ring.key_ids():
+        enc_key, mac_key = _chunked_keys(_chunked_ikm(ring, version, kid), salt, version)
+        if hmac.compare_digest(mac, hmac.new(mac_key, header, hashlib.sha256).digest()):
+            break
+    else:
+        raise ValueError("ciphertext ungültig")
+    aad = header + mac
+
+    aead = AESGCM(enc_key)
+    counter = 0
+    while True:
+        raw_len = reader.read(4)
+        if len(raw_len) != 4:
+            raise ValueError("ciphertext abgeschnitten")
+        (ct_len,) = struct.unpack(">I", raw_len)
+        if not _TAG_LEN <= ct_len <= chunk_size + _TAG_LEN:
+            raise ValueError("ciphertext ungültig")
+        ct = reader.read(ct_len)
+        if len(ct) != ct_len:
+            raise ValueError("ciphertext abgeschnitten")
+        for last in (False, True):
+            try:
+                plain = aead.decrypt(_nonce(prefix, counter, last), ct, aad)
+            except InvalidTag:
+                continue
+            break
+        else:
+            raise ValueError("ciphertext ungültig")
+        yield plain
+        if last:
+            if not reader.at_end():
+                raise ValueError("ciphertext ungültig")
+            return
+        counter += 1
+
+
+def is_chunked(data: Union[bytes, str]) -> bool:
+    head = data[: len(CHUNKED_MAGIC)]
+    return (head.encode("latin-1") if isinstance(head, str) else head) == CHUNKED_MAGIC
+
+
+def encrypt_json_chunked(payload: Dict[str, Any], *, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_json_default)
+    return encrypt_stream((part.encode("utf-8") for part in encoder.iterencode(payload)), chunk_size=chunk_size)
+
+
+def decrypt_export(data: Union[bytes, str]) -> bytes:
+    """
+    Klartext eines Full Exports, egal ob Chunked-Container oder Alt-Format (Fernet-Token).
+    Alt-Format: Zweck "export.fernet" (export_crypto/export_vehicle/...) oder "export.full" (export.py).
+    """
+    raw = data.encode("utf-8") if isinstance(data, str) else data
+    if is_chunked(raw):
+        return b"".join(decrypt_stream([raw]))
+
+    ring = get_keyring()
+    for f in (ring.fernet("export.fernet"), ring.fernet("export.full")):
+        try:
+            return f.decrypt(raw)
+        except InvalidToken:
+            continue
+    raise ValueError("ciphertext ungültig")
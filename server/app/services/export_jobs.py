@@ -0,0 +1,407 @@
+# server/app/services/export_jobs.py
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import os
+import threading
+import time
+import uuid
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, delete, func, literal, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import env_int
+from app.core.periodic import PeriodicWorker
+from app.db.reflection import table_registry
+from app.services.export_crypto import encrypt_stream
+
+logger = logging.getLogger(__name__)
+
+# Klartext-Quelle eines Jobs: (Session, resource_id) -> NDJSON-Chunks (wird im Worker verschlüsselt)
+ExportBuilder = Callable[[Session, str], Iterable[bytes]]
+
+ARTIFACT_SUFFIX = ".ltcx"
+PART_SUFFIX = ".part"
+
+OPEN_STATUSES = ("queued", "running")
+TERMINAL_STATUSES = ("failed", "expired")
+
+
+class ExportQueueFull(RuntimeError):
+    """Zu viele offene Jobs (Client soll später erneut versuchen)."""
+
+
+def _utcnow_naive() -> dt.datetime:
+    return dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+
+
+def _as_naive_utc(d: dt.datetime) -> dt.datetime:
+    if d.tzinfo is None:
+        return d
+    return d.astimezone(dt.timezone.utc).replace(tzinfo=None)
+
+
+def _create_jobs_table(engine: Engine) -> Table:
+    md = MetaData()
+    t = Table(
+        "export_jobs",
+        md,
+        Column("id", String(36), primary_key=True),
+        Column("kind", String(32), nullable=False),
+        Column("resource_id", String(128), nullable=False),
+        Column("status", String(16), nullable=False, index=True),
+        Column("requested_by_role", String(32), nullable=True),
+        Column("requested_by_user_id", String(64), nullable=True),
+        Column("created_at", DateTime(timezone=False), nullable=False),
+        Column("started_at", DateTime(timezone=False), nullable=True),
+        Column("finished_at", DateTime(timezone=False), nullable=True),
+        Column("expires_at", DateTime(timezone=False), nullable=True, index=True),
+        Column("size_bytes", Integer, nullable=True),
+        Column("error", String(200), nullable=True),
+    )
+    md.create_all(engine, tables=[t])
+    return t
+
+
+def jobs_table(engine: Engine) -> Table:
+    return table_registry.get_or_create(engine, "export_jobs", _create_jobs_table)
+
+
+class ExportJobMetrics:
+    """Queue-Tiefe, Wartezeit und Laufzeit der Export-Jobs (Prozess-lokal)."""
+
+    def __init__(self, window: int = 1000) -> None:
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.expired = 0
+        self._run_s: Deque[float] = deque(maxlen=window)
+        self._wait_s: Deque[float] = deque(maxlen=window)
+
+    def enqueued(self) -> None:
+        with self._lock:
+            self.queued += 1
+
+    def reject(self) -> None:
+        with self._lock:
+            self.rejected += 1
+
+    def started(self, wait_s: float) -> None:
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self._wait_s.append(wait_s)
+
+    def finished(self, run_s: float, *, ok: bool) -> None:
+        with self._lock:
+            self.running -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self._run_s.append(run_s)
+
+    def add_expired(self, n: int) -> None:
+        with self._lock:
+            self.expired += n
+
+    @staticmethod
+    def _pct(values: List[float], q: float) -> float:
+        if not values:
+            return 0.0
+        values = sorted(values)
+        return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            run = list(self._run_s)
+            wait = list(self._wait_s)
+            return {
+                "queue_depth": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "duration_ms_p50": round(self._pct(run, 0.50), 2),
+                "duration_ms_p95": round(self._pct(run, 0.95), 2),
+                "wait_ms_p50": round(self._pct(wait, 0.50), 2),
+                "wait_ms_p95": round(self._pct(wait, 0.95), 2),
+            }
+
+
+class ExportJobQueue:
+    """
+    Full Exports als Hintergrund-Jobs:
+    - Job-Status in der DB (export_jobs), damit Polling über Prozesse hinweg funktioniert
+    - begrenzter Thread-Pool baut den verschlüsselten Chunked-Container (.ltcx) direkt auf Platte
+    - höchstens max_pending offene Jobs in der DB, sonst ExportQueueFull (Prüfung im Insert selbst)
+    - Janitor-Thread: Artefakte nach ttl_seconds löschen (Status "expired"), hängengebliebene
+      queued/running-Jobs nach stale_seconds auf "failed", failed/expired-Zeilen nach retention_seconds löschen
+    - Artefakt-Verzeichnis wird unabhängig von der DB nach Datei-Alter aufgeräumt (auch Reste früherer Läufe)
+    """
+
+    def __init__(
+        self,
+        artifact_dir: Path,
+        *,
+        workers: int = 2,
+        max_pending: int = 32,
+        ttl_seconds: int = 3600,
+        stale_seconds: int = 3600,
+        retention_seconds: int = 7 * 86400,
+        cleanup_interval: float = 60.0,
+    ) -> None:
+        if workers <= 0:
+            raise ValueError("workers must be > 0")
+        self.artifact_dir = Path(artifact_dir)
+        self.workers = int(workers)
+        self.max_pending = max(1, int(max_pending))
+        self.ttl_seconds = max(1, int(ttl_seconds))
+        self.stale_seconds = max(1, int(stale_seconds))
+        self.retention_seconds = max(1, int(retention_seconds))
+        self.cleanup_interval = float(cleanup_interval)
+        self.metrics = ExportJobMetrics()
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="export-job")
+        # Engines für den Janitor (attach() beim Start + Engines mit Jobs); schwach, damit Test-Engines freigegeben werden
+        self._engines: "weakref.WeakSet[Engine]" = weakref.WeakSet()
+        self._janitor = PeriodicWorker("export-job-janitor", self.cleanup_interval, self.cleanup_all)
+
+    def artifact_path(self, job_id: str) -> Path:
+        return self.artifact_dir / f"{job_id}{ARTIFACT_SUFFIX}"
+
+    # --- API ---
+
+    def attach(self, engine: Engine) -> None:
+        """Engine beim App-Start registrieren: hängengebliebene Jobs früherer Läufe zurücksetzen, Janitor starten."""
+        self._engines.add(engine)
+        try:
+            self.recover(engine)
+        except Exception:
+            logger.warning("export job recovery failed", exc_info=True)
+        self._janitor.start()
+
+    def submit(
+        self,
+        engine: Engine,
+        *,
+        kind: str,
+        resource_id: str,
+        build: ExportBuilder,
+        requested_by_role: Optional[str],
+        requested_by_user_id: Optional[str],
+    ) -> Dict[str, Any]:
+        t = jobs_table(engine)
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "resource_id": str(resource_id),
+            "status": "queued",
+            "requested_by_role": requested_by_role or None,
+            "requested_by_user_id": requested_by_user_id or None,
+            "created_at": _utcnow_naive(),
+        }
+        # Limit und Insert in einem Statement: parallele Submits können die Grenze nicht gemeinsam überschreiten
+        open_jobs = select(func.count()).select_from(t).where(t.c.status.in_(OPEN_STATUSES)).scalar_subquery()
+        row = select(*(literal(v, t.c[k].type) for k, v in job.items())).where(open_jobs < self.max_pending)
+        with engine.begin() as conn:
+            inserted = conn.execute(t.insert().from_select(list(job), row)).rowcount
+        if not inserted:
+            self.metrics.reject()
+            raise ExportQueueFull("export_queue_full")
+
+        self._engines.add(engine)
+        self.metrics.enqueued()
+        self._executor.submit(self._run, engine, job["id"], job["resource_id"], build, time.monotonic())
+        self._janitor.start()
+        return job
+
+    def get(self, engine: Engine, job_id: str) -> Optional[Dict[str, Any]]:
+        t = jobs_table(engine)
+        with engine.connect() as conn:
+            row = conn.execute(select(t).where(t.c.id == job_id).limit(1)).mappings().first()
+        return dict(row) if row else None
+
+    # --- Worker ---
+
+    def _set(self, engine: Engine, job_id: str, **values: Any) -> None:
+        t = jobs_table(engine)
+        with engine.begin() as conn:
+            conn.execute(update(t).where(t.c.id == job_id).values(**values))
+
+    def _run(self, engine: Engine, job_id: str, resource_id: str, build: ExportBuilder, enqueued: float) -> None:
+        t0 = time.monotonic()
+        self.metrics.started(t0 - enqueued)
+        path = self.artifact_path(job_id)
+        part = path.with_suffix(PART_SUFFIX)
+        ok = False
+        try:
+            self._set(engine, job_id, status="running", started_at=_utcnow_naive())
+            self.artifact_dir.mkdir(parents=True, exist_ok=True)
+            with Session(bind=engine) as db, open(part, "wb") as fh:
+                for segment in encrypt_stream(build(db, resource_id)):
+                    fh.write(segment)
+            os.replace(part, path)
+
+            now = _utcnow_naive()
+            self._set(
+                engine,
+                job_id,
+                status="done",
+                finished_at=now,
+                expires_at=now + dt.timedelta(seconds=self.ttl_seconds),
+                size_bytes=path.stat().st_size,
+            )
+            ok = True
+        except Exception as e:
+            # nur Fehlertyp/Detail speichern: Exceptions können Klartext aus dem Export enthalten
+            detail = getattr(e, "detail", None)
+            error = f"{type(e).__name__}: {detail}" if isinstance(detail, str) else type(e).__name__
+            logger.warning("export job failed (job=%s, error=%s)", job_id, error)
+            part.unlink(missing_ok=True)
+            try:
+                self._set(engine, job_id, status="failed", finished_at=_utcnow_naive(), error=error[:200])
+            except Exception:
+                logger.warning("export job status could not be stored (job=%s)", job_id, exc_info=True)
+        finally:
+            self.metrics.finished(time.monotonic() - t0, ok=ok)
+
+    # --- TTL-Cleanup ---
+
+    def cleanup(self, engine: Engine, *, now: Optional[dt.datetime] = None) -> int:
+        """Abgelaufene Artefakte löschen und Jobs auf "expired" setzen. Liefert Anzahl Jobs."""
+        now = _as_naive_utc(now) if now is not None else _utcnow_naive()
+        t = jobs_table(engine)
+        with engine.connect() as conn:
+            ids = conn.execute(select(t.c.id).where(t.c.status == "done", t.c.expires_at <= now)).scalars().all()
+        for job_id in ids:
+            self.artifact_path(job_id).unlink(missing_ok=True)
+            self._set(engine, job_id, status="expired")
+        self.metrics.add_expired(len(ids))
+        return len(ids)
+
+    def recover(self, engine: Engine, *, now: Optional[dt.datetime] = None) -> int:
+        """queued/running-Jobs ohne Fortschritt seit stale_seconds (z. B. Prozess-Neustart) -> "failed"."""
+        now = _as_naive_utc(now) if now is not None else _utcnow_naive()
+        t = jobs_table(engine)
+        cutoff = now - dt.timedelta(seconds=self.stale_seconds)
+        with engine.begin() as conn:
+            res = conn.execute(
+                update(t)
+                .where(t.c.status.in_(OPEN_STATUSES), func.coalesce(t.c.started_at, t.c.created_at) <= cutoff)
+                .values(status="failed", finished_at=now, error="stale")
+            )
+        if res.rowcount:
+            logger.warning("export jobs reset as stale: %s", res.rowcount)
+        return int(res.rowcount or 0)
+
+    def purge(self, engine: Engine, *, now: Optional[dt.datetime] = None) -> int:
+        """failed/expired-Zeilen nach retention_seconds löschen."""
+        now = _as_naive_utc(now) if now is not None else _utcnow_naive()
+        t = jobs_table(engine)
+        cutoff = now - dt.timedelta(seconds=self.retention_seconds)
+        with engine.begin() as conn:
+            res = conn.execute(
+                delete(t).where(
+                    t.c.status.in_(TERMINAL_STATUSES), func.coalesce(t.c.finished_at, t.c.created_at) <= cutoff
+                )
+            )
+        return int(res.rowcount or 0)
+
+    def sweep_artifacts(self, *, now: Optional[float] = None) -> int:
+        """Dateien nach Alter löschen (.ltcx > ttl_seconds, .part > stale_seconds), unabhängig von Engines/Jobs."""
+        now = time.time() if now is None else now
+        limits = {ARTIFACT_SUFFIX: self.ttl_seconds, PART_SUFFIX: self.stale_seconds}
+        removed = 0
+        try:
+            files = list(self.artifact_dir.iterdir())
+        except FileNotFoundError:
+            return 0
+        for path in files:
+            limit = limits.get(path.suffix)
+            try:
+                if limit is not None and path.stat().st_mtime <= now - limit:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+    def cleanup_all(self) -> int:
+        total = 0
+        for engine in list(self._engines):
+            try:
+                total += self.cleanup(engine)
+                self.recover(engine)
+                self.purge(engine)
+            except Exception:
+                logger.warning("export job cleanup failed", exc_info=True)
+        try:
+            self.sweep_artifacts()
+        except Exception:
+            logger.warning("export artifact sweep failed", exc_info=True)
+        return total
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._janitor.stop(timeout)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+# ---------------------------------------------------------------------------
+# Wiring per ENV
+#   LTC_EXPORT_JOB_WORKERS (Default 2), LTC_EXPORT_JOB_MAX_PENDING (Default 32)
+#   LTC_EXPORT_JOB_TTL_SECONDS (Default 3600), LTC_EXPORT_JOBS_DIR (Default server/storage/export_jobs)
+#   LTC_EXPORT_JOB_STALE_SECONDS (Default 3600), LTC_EXPORT_JOB_RETENTION_SECONDS (Default 7 Tage)
+# ---------------------------------------------------------------------------
+
+_QUEUE: Optional[ExportJobQueue] = None
+_QUEUE_LOCK = threading.Lock()
+
+
+def _default_artifact_dir() -> Path:
+    # .../server/app/services/export_jobs.py -> parents[2] == server/
+    return Path(__file__).resolve().parents[2] / "storage" / "export_jobs"
+
+
+def get_export_job_queue() -> ExportJobQueue:
+    global _QUEUE
+    if _QUEUE is None:
+        with _QUEUE_LOCK:
+            if _QUEUE is None:
+                _QUEUE = ExportJobQueue(
+                    Path(os.getenv("LTC_EXPORT_JOBS_DIR") or _default_artifact_dir()),
+                    workers=max(1, env_int("LTC_EXPORT_JOB_WORKERS", 2)),
+                    max_pending=env_int("LTC_EXPORT_JOB_MAX_PENDING", 32),
+                    ttl_seconds=env_int("LTC_EXPORT_JOB_TTL_SECONDS", 3600),
+                    stale_seconds=env_int("LTC_EXPORT_JOB_STALE_SECONDS", 3600),
+                    retention_seconds=env_int("LTC_EXPORT_JOB_RETENTION_SECONDS", 7 * 86400),
+                )
+    return _QUEUE
+
+
+def start_export_jobs(engine: Engine) -> None:
+    # beim App-Start: Altlasten früherer Läufe aufräumen, Janitor unabhängig von neuen Jobs
+    get_export_job_queue().attach(engine)
+
+
+def stop_export_jobs() -> None:
+    global _QUEUE
+    with _QUEUE_LOCK:
+        if _QUEUE is not None:
+            _QUEUE.stop()
+            _QUEUE = None
+
+
+def export_job_metrics() -> Dict[str, float]:
+    return _QUEUE.metrics.stats() if _QUEUE is not None else {}
@@ -1,19 +1,11 @@
 import datetime as dt
-import hashlib
-import hmac
-import os
 from typing import Any, Dict
 
+from app.core.keyring import get_keyring
 
-def _require_secret_key() -> str:
-    secret = os.environ.get("LTC_SECRET_KEY", "").strip()
-    if not secret:
-        raise RuntimeError("LTC_SECRET_KEY fehlt (ENV).")
-    return secret
 
-
-def _hmac_hex(secret: str, value: str) -> str:
-    return hmac.new(secret.encode("utf-8"), value.encode("utf-8"), hashlib.sha256).hexdigest()
+def _hmac_hex(value: str) -> str:
+    return get_keyring().hmac_hex("export.redaction", value)
 
 
 def _iso(ts: Any) -> Any:
@@ -29,8 +21,6 @@ def redact_vehicle_row(vehicle_row: Dict[str, Any]) -> Dict[str, Any]:
     Redacted default: keine Klartext-PII, keine Secrets.
     Minimal halten.
     """
-    secret = _require_secret_key()
-
     out: Dict[str, Any] = {"_redacted": True}
 
     if "id" in vehicle_row:
@@ -41,7 +31,7 @@ def redact_vehicle_row(vehicle_row: Dict[str, Any]) -> Dict[str, Any]:
 
     vin = vehicle_row.get("vin")
     if vin:
-        out["vin_hmac"] = _hmac_hex(secret, str(vin))
+        out["vin_hmac"] = _hmac_hex(str(vin))
 
     # explizit NICHT rausgeben:
     # - vin (klartext)
@@ -57,8 +47,6 @@ def redact_masterclipboard_row(mc_row: Dict[str, Any]) -> Dict[str, Any]:
     - kein Freitext/Transcript/Notes
     - minimaler Meta-Block
     """
-    secret = _require_secret_key()
-
     out: Dict[str, Any] = {"_redacted": True}
 
     if "id" in mc_row:
@@ -67,7 +55,7 @@ def redact_masterclipboard_row(mc_row: Dict[str, Any]) -> Dict[str, Any]:
     # Vehicle-Public-ID lieber pseudonymisieren
     vpid = mc_row.get("vehicle_public_id") or mc_row.get("vehiclePublicId") or mc_row.get("vehicle_id")
     if vpid:
-        out["vehicle_public_id_hmac"] = _hmac_hex(secret, str(vpid))
+        out["vehicle_public_id_hmac"] = _hmac_hex(str(vpid))
 
     # status falls vorhanden
     for k in ("status", "state"):
@@ -1,17 +1,30 @@
 import datetime as dt
-import hmac
+import logging
 import os
 import re
 import secrets
 import uuid
-from hashlib import sha256
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, update
-from sqlalchemy.engine import Connection
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, delete, insert, select, update
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.orm import Session
 
-from app.core.config import get_settings
+from app.core.keyring import KeyringError, get_keyring
+from app.db.reflection import table_registry
+
+logger = logging.getLogger(__name__)
+
+GRANTS_TABLE = "export_grants"
+# Altbestand: eine Tabelle pro Ressource (export_store: token_hmac/remaining_uses, Router: export_token/used).
+# Bewusst explizite Liste: andere Tabellen mit ähnlichem Namen werden nie angefasst
+LEGACY_GRANT_TABLES: Dict[str, str] = {
+    "export_grants_vehicle": "vehicle",
+    "export_grants_servicebook": "servicebook",
+    "export_grants_user": "user",
+    "export_grants_masterclipboard": "masterclipboard",
+}
 
 
 def _safe_resource_type(resource_type: str) -> str:
@@ -34,45 +47,119 @@ def _as_naive_utc(d: dt.datetime) -> dt.datetime:
     return d.astimezone(dt.timezone.utc).replace(tzinfo=None)
 
 
-def _require_secret_key() -> str:
-    settings = get_settings()
-    secret = getattr(settings, "secret_key", None)
-    if not isinstance(secret, str) or len(secret.strip()) < 16:
-        raise RuntimeError("missing_or_weak_secret_key")
-    return secret.strip()
-
+def _read_datetime(val: Any) -> Optional[dt.datetime]:
+    if isinstance(val, dt.datetime):
+        return _as_naive_utc(val)
+    if isinstance(val, str):
+        try:
+            return _as_naive_utc(dt.datetime.fromisoformat(val))
+        except ValueError:
+            return None
+    return None
 
-def _hmac_hex(secret: str, value: str) -> str:
-    return hmac.new(secret.encode("utf-8"), value.encode("utf-8"), sha256).hexdigest()
 
-
-def _ensure_table(conn: Connection, resource_type: str) -> Table:
+def _keyring():
+    try:
+        return get_keyring()
+    except KeyringError:
+        raise RuntimeError("missing_or_weak_secret_key") from None
+
+
+# ---------------------------------------------------------------------------
+# Tabelle + Migration
+# ---------------------------------------------------------------------------
+
+def _legacy_grant_values(row: Dict[str, Any], resource_type: str, now: dt.datetime) -> Optional[Dict[str, Any]]:
+    # nur noch gültige Grants übernehmen; abgelaufene/verbrauchte entfallen mit der Alt-Tabelle
+    expires_at = _read_datetime(row.get("expires_at"))
+    if expires_at is None or expires_at <= now:
+        return None
+
+    if row.get("token_hmac"):
+        token_h = str(row["token_hmac"])
+        remaining = int(row.get("remaining_uses") or 0)
+        resource_type = str(row.get("resource_type") or resource_type)
+        resource_id = row.get("resource_id")
+    elif row.get("export_token"):
+        # Router-Tabellen hielten den Token im Klartext: ab jetzt nur noch als HMAC
+        token_h = _keyring().hmac_hex("export.token", str(row["export_token"]))
+        remaining = 0 if int(row.get("used") or 0) else 1
+        resource_id = row.get(f"{resource_type}_id")
+    else:
+        return None
+
+    if remaining <= 0 or not resource_id:
+        return None
+    return {
+        "id": str(uuid.uuid4()),
+        "resource_type": _safe_resource_type(resource_type),
+        "resource_id": str(resource_id),
+        "token_hmac": token_h,
+        "expires_at": expires_at,
+        "remaining_uses": remaining,
+        "issued_by_role": row.get("issued_by_role"),
+        "issued_by_user_id": row.get("issued_by_user_id"),
+        "created_at": _read_datetime(row.get("created_at")) or now,
+    }
+
+
+def _migrate_legacy_tables(conn: Connection, grants: Table) -> int:
     """
-    Wichtig: KEIN globaler Cache!
-    Pytest baut gern neue Engine/DB je Test -> Cache würde auf "alte" DB zeigen.
+    Bekannte Alt-Tabellen (LEGACY_GRANT_TABLES) in die gemeinsame Tabelle übernehmen und löschen.
+    Läuft in der eigenen Transaktion der Tabellen-Factory (nicht in der Request-Session). Liefert Anzahl Grants.
     """
-    rt = _safe_resource_type(resource_type)
-    table_name = f"export_grants_{rt}"
-
+    moved = 0
+    now = _utcnow_naive()
+    existing = set(sa_inspect(conn).get_table_names())
+    for name, resource_type in LEGACY_GRANT_TABLES.items():
+        if name not in existing:
+            continue
+        legacy = Table(name, MetaData(), autoload_with=conn)
+        rows = conn.execute(select(legacy)).mappings().all()
+        values = [v for v in (_legacy_grant_values(dict(r), resource_type, now) for r in rows) if v is not None]
+        if values:
+            known = set(
+                conn.execute(select(grants.c.token_hmac).where(grants.c.token_hmac.in_([v["token_hmac"] for v in values])))
+                .scalars()
+                .all()
+            )
+            values = [v for v in values if v["token_hmac"] not in known]
+        if values:
+            conn.execute(insert(grants), values)
+        legacy.drop(conn)
+        table_registry.invalidate(conn, name)
+        moved += len(values)
+        logger.info("export grants migrated (table=%s, grants=%s)", name, len(values))
+    return moved
+
+
+def _create_grants_table(conn: Connection) -> Table:
     md = MetaData()
-    Table(
-        table_name,
+    t = Table(
+        GRANTS_TABLE,
         md,
         Column("id", String(36), primary_key=True),
         Column("resource_type", String(64), nullable=False),
         Column("resource_id", String(128), nullable=False),
         Column("token_hmac", String(128), nullable=False),
-        Column("expires_at", DateTime(timezone=True), nullable=False),
+        Column("expires_at", DateTime(timezone=False), nullable=False),
         Column("remaining_uses", Integer, nullable=False, default=1),
         Column("issued_by_role", String(32), nullable=True),
         Column("issued_by_user_id", String(64), nullable=True),
-        Column("created_at", DateTime(timezone=True), nullable=False),
+        Column("created_at", DateTime(timezone=False), nullable=False),
+        # Lookup beim Verbrauch + Eindeutigkeit; expires_at für den Purge
+        Index("ux_export_grants_token_hmac", "token_hmac", unique=True),
+        Index("ix_export_grants_resource", "resource_type", "resource_id"),
+        Index("ix_export_grants_expires_at", "expires_at"),
     )
-
     md.create_all(bind=conn)
+    _migrate_legacy_tables(conn, t)
+    return t
+
 
-    # Reflection liefert columns so, wie Dialekt sie tatsächlich abbildet
-    return Table(table_name, MetaData(), autoload_with=conn)
+def _grants_table(conn: Connection) -> Table:
+    """create_all + Migration nur einmal pro Engine, in eigener Transaktion (app.db.reflection)."""
+    return table_registry.get_or_create(conn, GRANTS_TABLE, _create_grants_table)
 
 
 def _ttl_seconds(default: int = 600) -> int:
@@ -89,6 +176,10 @@ def _max_uses(default: int = 1) -> int:
         return default
 
 
+# ---------------------------------------------------------------------------
+# API
+# ---------------------------------------------------------------------------
+
 def issue_one_time_token(
     db: Session,
     *,
@@ -98,13 +189,17 @@ def issue_one_time_token(
     issued_by_user_id: Optional[str],
     ttl_seconds: Optional[int] = None,
     uses: Optional[int] = None,
+    token: Optional[str] = None,
 ) -> Tuple[str, dt.datetime]:
+    """
+    Grant anlegen; gespeichert wird nur der HMAC des Tokens.
+    token: vorgegebener Token (z. B. signiertes JWT), sonst zufällig.
+    """
     conn = db.connection()
-    grants = _ensure_table(conn, resource_type)
+    grants = _grants_table(conn)
 
-    secret = _require_secret_key()
-    raw_token = secrets.token_urlsafe(32)
-    token_h = _hmac_hex(secret, raw_token)
+    raw_token = token or secrets.token_urlsafe(32)
+    token_h = _keyring().hmac_hex("export.token", raw_token)
 
     now = _utcnow_naive()
     ttl = _ttl_seconds() if ttl_seconds is None else max(1, int(ttl_seconds))
@@ -129,46 +224,75 @@ def issue_one_time_token(
     return raw_token, expires_at
 
 
+def _reject_reason(conn: Connection, grants: Table, match: List[Any], now: dt.datetime) -> str:
+    # nur für die Fehlermeldung; verbraucht wird ausschließlich über das atomare UPDATE
+    row = conn.execute(select(grants.c.expires_at, grants.c.remaining_uses).where(*match).limit(1)).mappings().first()
+    if row is None:
+        return "token_invalid"
+    expires_at = _read_datetime(row.get("expires_at"))
+    if expires_at is None:
+        return "token_invalid"
+    if expires_at <= now:
+        return "token_expired"
+    return "token_used"
+
+
 def consume_one_time_token(
     db: Session,
     resource_type: str,
     resource_id: str,
     export_token: str,
 ) -> Dict[str, Any]:
+    """
+    Grant atomar verbrauchen: UPDATE ... SET remaining_uses = remaining_uses - 1
+    WHERE Token/Ressource passen AND remaining_uses > 0 AND nicht abgelaufen (RETURNING, sonst rowcount).
+    Parallele Requests mit demselben Token: genau einer gewinnt. Sonst PermissionError mit Grund.
+    """
     conn = db.connection()
-    grants = _ensure_table(conn, resource_type)
+    grants = _grants_table(conn)
 
-    secret = _require_secret_key()
-    token_h = _hmac_hex(secret, export_token)
+    # alle aktiven Key-IDs: Tokens aus der Zeit vor einer Rotation bleiben gültig
+    token_hs = _keyring().hmac_hex_all("export.token", export_token)
     now = _utcnow_naive()
+    match = [
+        grants.c.token_hmac.in_(token_hs),
+        grants.c.resource_type == _safe_resource_type(resource_type),
+        grants.c.resource_id == str(resource_id),
+    ]
+    stmt = (
+        update(grants)
+        .where(*match, grants.c.remaining_uses > 0, grants.c.expires_at > now)
+        .values(remaining_uses=grants.c.remaining_uses - 1)
+    )
 
-    row = conn.execute(
-        select(grants)
-        .where(grants.c.resource_type == _safe_resource_type(resource_type))
-        .where(grants.c.resource_id == str(resource_id))
-        .where(grants.c.token_hmac == token_h)
-        .limit(1)
-    ).mappings().first()
-
-    if not row:
-        raise PermissionError("token_invalid")
-
-    expires_at = row.get("expires_at")
-    if not isinstance(expires_at, dt.datetime):
-        raise PermissionError("token_invalid")
-
-    if _as_naive_utc(expires_at) <= now:
-        raise PermissionError("token_expired")
+    if conn.dialect.update_returning:
+        row = conn.execute(stmt.returning(*grants.c)).mappings().first()
+    else:
+        row = None
+        if conn.execute(stmt).rowcount == 1:
+            row = conn.execute(select(grants).where(*match).limit(1)).mappings().first()
 
-    remaining = int(row.get("remaining_uses") or 0)
-    if remaining <= 0:
-        raise PermissionError("token_used")
+    if row is None:
+        reason = _reject_reason(conn, grants, match, now)
+        db.rollback()
+        raise PermissionError(reason)
 
-    conn.execute(
-        update(grants)
-        .where(grants.c.id == row["id"])
-        .values(remaining_uses=remaining - 1)
-    )
+    out = dict(row)
     db.commit()
+    return out
+
+
+def purge_expired_grants(engine: Engine, *, now: Optional[dt.datetime] = None, batch_size: int = 1000) -> int:
+    """Abgelaufene Grants batchweise löschen (expires_at-Index). Liefert Anzahl gelöschter Zeilen."""
+    now = _as_naive_utc(now) if now is not None else _utcnow_naive()
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            grants = _grants_table(conn)
+            ids = conn.execute(select(grants.c.id).where(grants.c.expires_at <= now).limit(batch_size)).scalars().all()
+            if ids:
+                conn.execute(delete(grants).where(grants.c.id.in_(ids)))
+        total += len(ids)
+        if len(ids) < batch_size:
+            return total
 
-    return dict(row)
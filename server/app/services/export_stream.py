@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import base64
+import datetime as dt
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.engine import Engine
+
+from app.services.export_crypto import CHUNKED_ALG_NAME, CHUNKED_MEDIA_TYPE, encrypt_stream
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Full Exports: "fernet" (Alt-Format, JSON mit ciphertext) oder "chunked" (gestreamter AEAD-Container mit NDJSON)
+FULL_EXPORT_FORMATS = ("fernet", "chunked")
+
+# Zeilen pro DB-Fetch (yield_per) und Bytes pro Chunk an den Client
+STREAM_BATCH_ROWS = 500
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _json_default(o: Any) -> Any:
+    if isinstance(o, (dt.datetime, dt.date)):
+        return o.isoformat()
+    if isinstance(o, (bytes, bytearray)):
+        return base64.urlsafe_b64encode(bytes(o)).decode("ascii")
+    if isinstance(o, (set, tuple)):
+        return list(o)
+    return str(o)
+
+
+def ndjson_line(obj: Dict[str, Any]) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8") + b"\n"
+
+
+def iter_table_rows(engine: Engine, stmt: Select, *, batch_rows: int = STREAM_BATCH_ROWS) -> Iterator[Dict[str, Any]]:
+    """
+    Zeilen cursor-basiert lesen (stream_results/yield_per): nie mehr als ein Batch im Speicher.
+    Eigene Connection, weil der Stream erst nach dem Handler (und dessen Session) läuft.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_rows).execute(stmt)
+        for row in result.mappings():
+            yield dict(row)
+
+
+def iter_ndjson_export(
+    header: Dict[str, Any],
+    rows: Iterable[Dict[str, Any]],
+    *,
+    redact: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    chunk_bytes: int = STREAM_CHUNK_BYTES,
+) -> Iterator[bytes]:
+    """
+    NDJSON-Export: {"type":"header",...}, je Zeile {"type":"entry","data":...}, zum Schluss {"type":"end","count":n}.
+    Redaction pro Zeile (kein Deepcopy des ganzen Exports); Ausgabe in Chunks von ca. chunk_bytes.
+    Fehlt die End-Zeile, ist der Export abgebrochen.
+    """
+    buf = [ndjson_line({"type": "header", **header})]
+    size = len(buf[0])
+    count = 0
+    for row in rows:
+        line = ndjson_line({"type": "entry", "data": redact(row) if redact is not None else row})
+        buf.append(line)
+        size += len(line)
+        count += 1
+        if size >= chunk_bytes:
+            yield b"".join(buf)
+            buf.clear()
+            size = 0
+    buf.append(ndjson_line({"type": "end", "count": count}))
+    yield b"".join(buf)
+
+
+def _attachment_headers(filename: str) -> Dict[str, str]:
+    filename = re.sub(r"[^A-Za-z0-9._-]", "_", filename)
+    return {"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"}
+
+
+def ndjson_response(chunks: Iterator[bytes], *, filename: str) -> StreamingResponse:
+    return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE, headers=_attachment_headers(filename))
+
+
+def full_export_format(value: Optional[str]) -> str:
+    fmt = (value or "fernet").strip().lower()
+    if fmt not in FULL_EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="unsupported_format")
+    return fmt
+
+
+def chunked_export_response(
+    chunks: Iterator[bytes], *, filename: str, secret: Optional[str] = None
+) -> StreamingResponse:
+    """Klartext-NDJSON -> verschlüsselter Chunked-Container (siehe export_crypto), gestreamt."""
+    try:
+        body = encrypt_stream(chunks, secret=secret)
+    except RuntimeError:
+        raise HTTPException(status_code=500, detail="server_misconfigured")
+    headers = {**_attachment_headers(filename), "X-Export-Alg": CHUNKED_ALG_NAME}
+    return StreamingResponse(body, media_type=CHUNKED_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import env_int
+from app.core.ttl_cache import TtlLruCache, engine_scope
+from app.models.audit import IdempotencyRecord
+
+
+_T = IdempotencyRecord.__table__
+_PENDING_KEY = "ltc_idempotency_pending"
+_COMPRESSED = "z:"
+_KEY_MAX = _T.c.key.type.length
+# Platzhalter-Status einer geclaimten, noch nicht abgeschlossenen Anfrage
+STATUS_IN_PROGRESS = 0
+
+Response = Tuple[int, Any]
+
+
+def encode_body(body: Any, *, compress_min_bytes: int) -> str:
+    raw = json.dumps(body, ensure_ascii=False)
+    if compress_min_bytes <= 0 or len(raw) < compress_min_bytes:
+        return raw
+    packed = base64.b64encode(zlib.compress(raw.encode("utf-8"), 6)).decode("ascii")
+    return _COMPRESSED + packed if len(packed) + len(_COMPRESSED) < len(raw) else raw
+
+
+def decode_body(stored: str) -> Any:
+    # bestehende Zeilen sind unkomprimiertes JSON
+    if stored.startswith(_COMPRESSED):
+        return json.loads(zlib.decompress(base64.b64decode(stored[len(_COMPRESSED):])).decode("utf-8"))
+    return json.loads(stored)
+
+
+def _utcnow_naive() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _as_naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _insert_ignore(db: Session):
+    # INSERT … ON CONFLICT(key) DO NOTHING (SQLite/Postgres)
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(_T)
+
+
+class IdempotencyStore:
+    """
+    Idempotency-Keys für mutierende POST/PATCH-Endpunkte (Tabelle idempotency_records).
+
+    - claim(): Insert-first (ON CONFLICT DO NOTHING) in der Business-Transaktion. Warten eines
+      parallelen Retrys auf deren Commit (danach gespeicherte Antwort) garantiert nur Postgres
+      (Unique-Index blockiert bis Commit/Rollback); auf SQLite serialisiert der Schreib-Lock der DB,
+      der zweite Writer wartet nur bis busy_timeout und bekommt sonst "database is locked"
+    - LRU-Front-Cache (nur committete Antworten): Replays ohne DB-Roundtrip
+    - TTL: ältere Records zählen nicht mehr als Replay und werden vom Purge gelöscht
+    - große Antworten werden komprimiert gespeichert (zlib + base64, Präfix "z:")
+    """
+
+    def __init__(self, *, max_entries: int = 10_000, ttl_seconds: int = 86_400, compress_min_bytes: int = 1024) -> None:
+        self.max_entries = int(max_entries)
+        self.ttl_seconds = int(ttl_seconds)
+        self.compress_min_bytes = int(compress_min_bytes)
+        # (Engine-Scope, Key) -> Antwort; Gruppe = Key für invalidate(key)
+        self._cache: "TtlLruCache[Tuple[int, str], Response]" = TtlLruCache(max_entries, group=lambda ck, _v: ck[1])
+        self.claims = 0
+        self.replays = 0
+
+    # -- Front-Cache --------------------------------------------------------
+
+    def _scope(self, db: Session) -> int:
+        return engine_scope(db.get_bind())
+
+    def _cached(self, ck: Tuple[int, str]) -> Optional[Response]:
+        return self._cache.get(ck)
+
+    def _put(self, ck: Tuple[int, str], response: Response, ttl: Optional[float]) -> None:
+        # ttl=None: Records laufen nicht ab (LTC_IDEMPOTENCY_TTL_SECONDS=0), nur LRU begrenzt
+        self._cache.put(ck, response, ttl=ttl)
+
+    # -- Claim-Protokoll ----------------------------------------------------
+
+    def claim(self, db: Session, key: str) -> Optional[Response]:
+        """
+        None = Key gehört dieser Transaktion (Handler ausführen, danach complete/release).
+        Sonst die gespeicherte Antwort; (409, idempotency_in_progress) bei offenem Claim.
+        """
+        ck = (self._scope(db), key)
+        cached = self._cached(ck)
+        if cached is not None:
+            self.replays += 1
+            return cached
+
+        now = _utcnow_naive()
+        stmt = _insert_ignore(db).values(
+            id=str(uuid.uuid4()), key=key, status_code=STATUS_IN_PROGRESS, response_json="null", created_at=now
+        ).on_conflict_do_nothing(index_elements=["key"])
+        if db.execute(stmt).rowcount == 1:
+            self.claims += 1
+            return None
+
+        row = db.execute(select(_T.c.status_code, _T.c.response_json, _T.c.created_at).where(_T.c.key == key)).one()
+        created = _as_naive_utc(row.created_at)
+        if self.ttl_seconds > 0 and created <= now - timedelta(seconds=self.ttl_seconds):
+            # abgelaufen, aber noch nicht gepurged: Key neu vergeben
+            taken = db.execute(
+                update(_T)
+                .where(_T.c.key == key, _T.c.created_at == row.created_at)
+                .values(status_code=STATUS_IN_PROGRESS, response_json="null", created_at=now)
+            ).rowcount
+            if taken == 1:
+                self.claims += 1
+                return None
+        if row.status_code == STATUS_IN_PROGRESS:
+            return 409, {"error": "idempotency_in_progress"}
+
+        response = (int(row.status_code), decode_body(row.response_json))
+        self.replays += 1
+        self._put(ck, response, self._remaining(created, now))
+        return response
+
+    def complete(self, db: Session, key: str, status_code: int, body: Any) -> None:
+        db.execute(
+            update(_T)
+            .where(_T.c.key == key)
+            .values(status_code=int(status_code), response_json=encode_body(body, compress_min_bytes=self.compress_min_bytes))
+        )
+        # erst nach commit() cachen (rollback -> Key bleibt frei)
+        db.info.setdefault(_PENDING_KEY, []).append((self, (self._scope(db), key), (int(status_code), body)))
+
+    def release(self, db: Session, key: str) -> None:
+        # Fehlerantworten werden nicht gespeichert: Retry darf es erneut versuchen
+        db.execute(delete(_T).where(_T.c.key == key, _T.c.status_code == STATUS_IN_PROGRESS))
+
+    def _remaining(self, created: datetime, now: datetime) -> Optional[float]:
+        if self.ttl_seconds <= 0:
+            return None
+        return self.ttl_seconds - (now - created).total_seconds()
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.invalidate_group(key)
+
+    def stats(self) -> Dict[str, float]:
+        return {**self._cache.stats(), "ttl_seconds": self.ttl_seconds, "claims": self.claims, "replays": self.replays}
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed(session: Session) -> None:
+    for store, ck, response in session.info.pop(_PENDING_KEY, ()):
+        store._put(ck, response, store.ttl_seconds if store.ttl_seconds > 0 else None)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session: Session, previous_transaction: Any) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def scoped_key(scope: str, key: str) -> str:
+    """
+    Record-Key aus Scope (Org/Actor) + Client-Key: gleiche Idempotency-Keys verschiedener Scopes
+    kollidieren nie (kein Replay fremder Antworten). Zu lange Keys werden gehasht (Spaltenlänge).
+    """
+    if not scope:
+        raise ValueError("idempotency_scope_required")
+    full = f"{scope}:{key}"
+    if len(full) <= _KEY_MAX:
+        return full
+    return "sha256:" + hashlib.sha256(full.encode("utf-8")).hexdigest()
+
+
+def run_idempotent(db: Session, scope: str, key: str, handler: Callable[[], Response]) -> Response:
+    """
+    Wiederverwendbar für POST-Endpunkte: Replay oder handler() genau einmal pro (scope, key).
+    scope = Org/Actor des Aufrufers (Pflicht): Replays nur innerhalb desselben Scopes.
+    2xx-Antworten werden gespeichert, andere geben den Key wieder frei. Commit macht der Router.
+    Parallele Retries: siehe IdempotencyStore (Warten auf den ersten Claim nur auf Postgres).
+    """
+    key = scoped_key(scope, key)
+    store = get_idempotency_store()
+    replay = store.claim(db, key)
+    if replay is not None:
+        return replay
+    status_code, body = handler()
+    if 200 <= status_code < 300:
+        store.complete(db, key, status_code, body)
+    else:
+        store.release(db, key)
+    return status_code, body
+
+
+def purge_expired_idempotency(engine: Engine, *, ttl_seconds: Optional[int] = None, now: Optional[datetime] = None, batch_size: int = 1000) -> int:
+    """Records älter als die TTL batchweise löschen (created_at-Index). Liefert Anzahl gelöschter Zeilen."""
+    ttl = get_idempotency_store().ttl_seconds if ttl_seconds is None else int(ttl_seconds)
+    if ttl <= 0:
+        return 0
+    cutoff = (_as_naive_utc(now) if now is not None else _utcnow_naive()) - timedelta(seconds=ttl)
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            ids = conn.execute(select(_T.c.id).where(_T.c.created_at <= cutoff).limit(batch_size)).scalars().all()
+            if ids:
+                conn.execute(delete(_T).where(_T.c.id.in_(ids)))
+        total += len(ids)
+        if len(ids) < batch_size:
+            return total
+
+
+# ---------------------------------------------------------------------------
+# Konfiguration + Hintergrund-Purge per ENV
+#   LTC_IDEMPOTENCY_TTL_SECONDS (Replay-Fenster/Retention, Default 86400)
+#   LTC_IDEMPOTENCY_CACHE_MAX (Front-Cache-Einträge, Default 10000, 0 = aus)
+#   LTC_IDEMPOTENCY_COMPRESS_MIN_BYTES (Default 1024, 0 = nie komprimieren)
+#   LTC_IDEMPOTENCY_PURGE_SECONDS (Intervall, Default 3600, 0 = aus; Worker startet app.main)
+# ---------------------------------------------------------------------------
+
+_STORE = IdempotencyStore(
+    max_entries=env_int("LTC_IDEMPOTENCY_CACHE_MAX", 10_000),
+    ttl_seconds=env_int("LTC_IDEMPOTENCY_TTL_SECONDS", 86_400),
+    compress_min_bytes=env_int("LTC_IDEMPOTENCY_COMPRESS_MIN_BYTES", 1024),
+)
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    return _STORE
+
+
+def idempotency_stats() -> Dict[str, float]:
+    return _STORE.stats()
@@ -1,10 +1,12 @@
 import json
+import uuid
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
-from sqlalchemy import select
 
 from app.core.security import Actor
-from app.models.audit import AuditEvent, IdempotencyRecord
+from app.models.audit import AuditEvent
+from app.services.audit_sink import get_audit_sink, table_target
+from app.services.idempotency_store import run_idempotent
 from app.models.masterclipboard import (
     MasterClipboardSession,
     MasterClipboardSpeechChunk,
@@ -17,28 +19,16 @@ MODULE_ID = "masterclipboard"
 SCHEMA_VERSION = "v1"
 
 
-def _ensure_same_org(actor: Actor, session: MasterClipboardSession) -> None:
-    if session.org_id != actor.org_id:
-        raise PermissionError("forbidden")
+def _same_org(actor: Actor, session: MasterClipboardSession) -> bool:
+    # fremde Org => 403 als Antwort (nicht gespeichert, Key wird freigegeben)
+    return session.org_id == actor.org_id
 
 
 def _idem_key(route_key: str, idempotency_key: str) -> str:
-    # route_key + idempotency -> global unique record
+    # route_key + idempotency; run_idempotent stellt die Org davor (kein Replay über Org-Grenzen)
     return f"{MODULE_ID}:{route_key}:{idempotency_key}"
 
 
-def _load_idempotency(db: Session, route_key: str, idempotency_key: str):
-    key = _idem_key(route_key, idempotency_key)
-    rec = db.execute(select(IdempotencyRecord).where(IdempotencyRecord.key == key)).scalar_one_or_none()
-    return rec
-
-
-def _store_idempotency(db: Session, route_key: str, idempotency_key: str, status_code: int, response_obj: dict):
-    key = _idem_key(route_key, idempotency_key)
-    rec = IdempotencyRecord(key=key, status_code=status_code, response_json=json.dumps(response_obj, ensure_ascii=False))
-    db.add(rec)
-
-
 def emit_event(
     db: Session,
     *,
@@ -48,7 +38,9 @@ def emit_event(
     actor: Actor,
     payload: dict,
 ) -> None:
-    ev = AuditEvent(
+    # Write-Behind nach commit() der Business-Transaktion (rollback verwirft das Event)
+    row = dict(
+        id=str(uuid.uuid4()),
         module_id=MODULE_ID,
         event_name=event_name,
         schema_version=SCHEMA_VERSION,
@@ -58,205 +50,199 @@ def emit_event(
         actor_subject_id=actor.subject_id,
         actor_scope_ref=actor.org_id,
         payload_json=AuditEvent.dump_payload(payload),
+        emitted_at=datetime.now(timezone.utc),
     )
-    db.add(ev)
+    target = table_target(db, AuditEvent.__tablename__, lambda _db: AuditEvent.__table__)
+    get_audit_sink().emit_on_commit(db, target, row)
 
 
 def create_session(db: Session, actor: Actor, vehicle_public_id: str, idempotency_key: str):
-    existing = _load_idempotency(db, "sessions.create", idempotency_key)
-    if existing:
-        return existing.status_code, json.loads(existing.response_json)
-
-    s = MasterClipboardSession(org_id=actor.org_id, vehicle_public_id=vehicle_public_id)
-    db.add(s)
-    db.flush()  # s.id
-
-    emit_event(
-        db,
-        event_name="masterclipboard.event.session_started",
-        correlation_id=s.id,
-        idempotency_key=idempotency_key,
-        actor=actor,
-        payload={"session_id": s.id, "vehicle_public_id": vehicle_public_id},
-    )
+    def handler():
+        s = MasterClipboardSession(org_id=actor.org_id, vehicle_public_id=vehicle_public_id)
+        db.add(s)
+        db.flush()  # s.id
+
+        emit_event(
+            db,
+            event_name="masterclipboard.event.session_started",
+            correlation_id=s.id,
+            idempotency_key=idempotency_key,
+            actor=actor,
+            payload={"session_id": s.id, "vehicle_public_id": vehicle_public_id},
+        )
 
-    resp = {"session_id": s.id}
-    _store_idempotency(db, "sessions.create", idempotency_key, 201, resp)
-    return 201, resp
+        resp = {"session_id": s.id}
+        return 201, resp
+
+    return run_idempotent(db, actor.org_id, _idem_key("sessions.create", idempotency_key), handler)
 
 
 def add_speech_chunk(db: Session, actor: Actor, session_id: str, source: str, content_redacted: str, idempotency_key: str):
-    existing = _load_idempotency(db, f"{session_id}.speech.add", idempotency_key)
-    if existing:
-        return existing.status_code, json.loads(existing.response_json)
-
-    s = db.get(MasterClipboardSession, session_id)
-    if not s:
-        return 404, {"error": "not_found"}
-    _ensure_same_org(actor, s)
-    if s.is_closed:
-        return 409, {"error": "session_closed"}
-
-    ch = MasterClipboardSpeechChunk(session_id=session_id, source=source, content_redacted=content_redacted)
-    db.add(ch)
-    db.flush()
-
-    emit_event(
-        db,
-        event_name="masterclipboard.event.speech_chunk_added",
-        correlation_id=session_id,
-        idempotency_key=idempotency_key,
-        actor=actor,
-        payload={"session_id": session_id, "speech_chunk_id": ch.id, "source": source},
-    )
+    def handler():
+        s = db.get(MasterClipboardSession, session_id)
+        if not s:
+            return 404, {"error": "not_found"}
+        if not _same_org(actor, s):
+            return 403, {"error": "forbidden"}
+        if s.is_closed:
+            return 409, {"error": "session_closed"}
+
+        ch = MasterClipboardSpeechChunk(session_id=session_id, source=source, content_redacted=content_redacted)
+        db.add(ch)
+        db.flush()
+
+        emit_event(
+            db,
+            event_name="masterclipboard.event.speech_chunk_added",
+            correlation_id=session_id,
+            idempotency_key=idempotency_key,
+            actor=actor,
+            payload={"session_id": session_id, "speech_chunk_id": ch.id, "source": source},
+        )
 
-    resp = {"speech_chunk_id": ch.id}
-    _store_idempotency(db, f"{session_id}.speech.add", idempotency_key, 201, resp)
-    return 201, resp
+        resp = {"speech_chunk_id": ch.id}
+        return 201, resp
+
+    return run_idempotent(db, actor.org_id, _idem_key(f"{session_id}.speech.add", idempotency_key), handler)
 
 
 def create_triage_items(db: Session, actor: Actor, session_id: str, items: list[dict], idempotency_key: str):
-    existing = _load_idempotency(db, f"{session_id}.triage.create", idempotency_key)
-    if existing:
-        return existing.status_code, json.loads(existing.response_json)
-
-    s = db.get(MasterClipboardSession, session_id)
-    if not s:
-        return 404, {"error": "not_found"}
-    _ensure_same_org(actor, s)
-    if s.is_closed:
-        return 409, {"error": "session_closed"}
-
-    created_ids: list[str] = []
-    for it in items:
-        ev_refs = it.get("evidence_refs")
-        ev_json = json.dumps(ev_refs, ensure_ascii=False) if ev_refs else None
-        tri = MasterClipboardTriageItem(
-            session_id=session_id,
-            kind=it["kind"],
-            title=it["title"],
-            details_redacted=it.get("details_redacted"),
-            severity=it["severity"],
-            status=it["status"],
-            evidence_refs_json=ev_json,
+    def handler():
+        s = db.get(MasterClipboardSession, session_id)
+        if not s:
+            return 404, {"error": "not_found"}
+        if not _same_org(actor, s):
+            return 403, {"error": "forbidden"}
+        if s.is_closed:
+            return 409, {"error": "session_closed"}
+
+        created_ids: list[str] = []
+        for it in items:
+            ev_refs = it.get("evidence_refs")
+            ev_json = json.dumps(ev_refs, ensure_ascii=False) if ev_refs else None
+            tri = MasterClipboardTriageItem(
+                session_id=session_id,
+                kind=it["kind"],
+                title=it["title"],
+                details_redacted=it.get("details_redacted"),
+                severity=it["severity"],
+                status=it["status"],
+                evidence_refs_json=ev_json,
+            )
+            db.add(tri)
+            db.flush()
+            created_ids.append(tri.id)
+
+        emit_event(
+            db,
+            event_name="masterclipboard.event.triage_item_created",
+            correlation_id=session_id,
+            idempotency_key=idempotency_key,
+            actor=actor,
+            payload={"session_id": session_id, "created_ids": created_ids},
         )
-        db.add(tri)
-        db.flush()
-        created_ids.append(tri.id)
 
-    emit_event(
-        db,
-        event_name="masterclipboard.event.triage_item_created",
-        correlation_id=session_id,
-        idempotency_key=idempotency_key,
-        actor=actor,
-        payload={"session_id": session_id, "created_ids": created_ids},
-    )
+        resp = {"created_ids": created_ids}
+        return 201, resp
 
-    resp = {"created_ids": created_ids}
-    _store_idempotency(db, f"{session_id}.triage.create", idempotency_key, 201, resp)
-    return 201, resp
+    return run_idempotent(db, actor.org_id, _idem_key(f"{session_id}.triage.create", idempotency_key), handler)
 
 
 def patch_triage_item(db: Session, actor: Actor, session_id: str, item_id: str, patch: dict, idempotency_key: str):
-    existing = _load_idempotency(db, f"{session_id}.triage.patch.{item_id}", idempotency_key)
-    if existing:
-        return existing.status_code, json.loads(existing.response_json)
-
-    s = db.get(MasterClipboardSession, session_id)
-    if not s:
-        return 404, {"error": "not_found"}
-    _ensure_same_org(actor, s)
-    if s.is_closed:
-        return 409, {"error": "session_closed"}
-
-    tri = db.get(MasterClipboardTriageItem, item_id)
-    if not tri or tri.session_id != session_id:
-        return 404, {"error": "not_found"}
-
-    if patch.get("title") is not None:
-        tri.title = patch["title"]
-    if patch.get("details_redacted") is not None:
-        tri.details_redacted = patch["details_redacted"]
-    if patch.get("severity") is not None:
-        tri.severity = patch["severity"]
-    if patch.get("status") is not None:
-        tri.status = patch["status"]
-
-    tri.updated_at = datetime.now(timezone.utc)
-
-    emit_event(
-        db,
-        event_name="masterclipboard.event.triage_item_updated",
-        correlation_id=session_id,
-        idempotency_key=idempotency_key,
-        actor=actor,
-        payload={"session_id": session_id, "item_id": item_id},
-    )
+    def handler():
+        s = db.get(MasterClipboardSession, session_id)
+        if not s:
+            return 404, {"error": "not_found"}
+        if not _same_org(actor, s):
+            return 403, {"error": "forbidden"}
+        if s.is_closed:
+            return 409, {"error": "session_closed"}
+
+        tri = db.get(MasterClipboardTriageItem, item_id)
+        if not tri or tri.session_id != session_id:
+            return 404, {"error": "not_found"}
+
+        if patch.get("title") is not None:
+            tri.title = patch["title"]
+        if patch.get("details_redacted") is not None:
+            tri.details_redacted = patch["details_redacted"]
+        if patch.get("severity") is not None:
+            tri.severity = patch["severity"]
+        if patch.get("status") is not None:
+            tri.status = patch["status"]
+
+        tri.updated_at = datetime.now(timezone.utc)
+
+        emit_event(
+            db,
+            event_name="masterclipboard.event.triage_item_updated",
+            correlation_id=session_id,
+            idempotency_key=idempotency_key,
+            actor=actor,
+            payload={"session_id": session_id, "item_id": item_id},
+        )
 
-    resp = {"ok": True}
-    _store_idempotency(db, f"{session_id}.triage.patch.{item_id}", idempotency_key, 200, resp)
-    return 200, resp
+        resp = {"ok": True}
+        return 200, resp
+
+    return run_idempotent(db, actor.org_id, _idem_key(f"{session_id}.triage.patch.{item_id}", idempotency_key), handler)
 
 
 def create_board_snapshot(db: Session, actor: Actor, session_id: str, ordered_item_ids: list[str], notes_redacted: str | None, idempotency_key: str):
-    existing = _load_idempotency(db, f"{session_id}.board.snapshot", idempotency_key)
-    if existing:
-        return existing.status_code, json.loads(existing.response_json)
-
-    s = db.get(MasterClipboardSession, session_id)
-    if not s:
-        return 404, {"error": "not_found"}
-    _ensure_same_org(actor, s)
-    if s.is_closed:
-        return 409, {"error": "session_closed"}
-
-    snap = MasterClipboardBoardSnapshot(
-        session_id=session_id,
-        ordered_item_ids_json=json.dumps(ordered_item_ids, ensure_ascii=False),
-        notes_redacted=notes_redacted,
-    )
-    db.add(snap)
-    db.flush()
+    def handler():
+        s = db.get(MasterClipboardSession, session_id)
+        if not s:
+            return 404, {"error": "not_found"}
+        if not _same_org(actor, s):
+            return 403, {"error": "forbidden"}
+        if s.is_closed:
+            return 409, {"error": "session_closed"}
+
+        snap = MasterClipboardBoardSnapshot(
+            session_id=session_id,
+            ordered_item_ids_json=json.dumps(ordered_item_ids, ensure_ascii=False),
+            notes_redacted=notes_redacted,
+        )
+        db.add(snap)
+        db.flush()
 
-    emit_event(
-        db,
-        event_name="masterclipboard.event.board_snapshot",
-        correlation_id=session_id,
-        idempotency_key=idempotency_key,
-        actor=actor,
-        payload={"session_id": session_id, "snapshot_id": snap.id, "ordered_item_ids": ordered_item_ids},
-    )
+        emit_event(
+            db,
+            event_name="masterclipboard.event.board_snapshot",
+            correlation_id=session_id,
+            idempotency_key=idempotency_key,
+            actor=actor,
+            payload={"session_id": session_id, "snapshot_id": snap.id, "ordered_item_ids": ordered_item_ids},
+        )
 
-    resp = {"snapshot_id": snap.id}
-    _store_idempotency(db, f"{session_id}.board.snapshot", idempotency_key, 201, resp)
-    return 201, resp
+        resp = {"snapshot_id": snap.id}
+        return 201, resp
+
+    return run_idempotent(db, actor.org_id, _idem_key(f"{session_id}.board.snapshot", idempotency_key), handler)
 
 
 def close_session(db: Session, actor: Actor, session_id: str, idempotency_key: str):
-    existing = _load_idempotency(db, f"{session_id}.close", idempotency_key)
-    if existing:
-        return existing.status_code, json.loads(existing.response_json)
-
-    s = db.get(MasterClipboardSession, session_id)
-    if not s:
-        return 404, {"error": "not_found"}
-    _ensure_same_org(actor, s)
-
-    if not s.is_closed:
-        s.is_closed = True
-        s.closed_at = datetime.now(timezone.utc)
-
-    emit_event(
-        db,
-        event_name="masterclipboard.event.session_closed",
-        correlation_id=session_id,
-        idempotency_key=idempotency_key,
-        actor=actor,
-        payload={"session_id": session_id},
-    )
+    def handler():
+        s = db.get(MasterClipboardSession, session_id)
+        if not s:
+            return 404, {"error": "not_found"}
+        if not _same_org(actor, s):
+            return 403, {"error": "forbidden"}
+
+        if not s.is_closed:
+            s.is_closed = True
+            s.closed_at = datetime.now(timezone.utc)
+
+        emit_event(
+            db,
+            event_name="masterclipboard.event.session_closed",
+            correlation_id=session_id,
+            idempotency_key=idempotency_key,
+            actor=actor,
+            payload={"session_id": session_id},
+        )
 
-    resp = {"ok": True}
-    _store_idempotency(db, f"{session_id}.close", idempotency_key, 200, resp)
-    return 200, resp
+        resp = {"ok": True}
+        return 200, resp
 
+    return run_idempotent(db, actor.org_id, _idem_key(f"{session_id}.close", idempotency_key), handler)
@@ -5,15 +5,28 @@ import uuid
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 
-from sqlalchemy import Column, DateTime, MetaData, String, Table, Text, insert
+from sqlalchemy import Column, DateTime, MetaData, String, Table, Text
 from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.orm import Session
 
+from app.db.reflection import ensure_indexes
+from app.services.audit_sink import covers_required_columns, get_audit_sink, table_target
+
 # Fallback-table (sale_transfer-spezifisch)
 name = "sale_transfer_audit_events"
 MODULE_ID = "sale_transfer"
 
+# (Filter, Zeit, id)-Indizes für app.services.audit_query (Quelle "sale_transfer")
+QUERY_INDEXES = {
+    "idx_sale_transfer_audit_events_q_time": ("at", "id"),
+    "idx_sale_transfer_audit_events_q_event_type": ("event_type", "at", "id"),
+    "idx_sale_transfer_audit_events_q_target_id": ("target_id", "at", "id"),
+}
+
+# Eigentümerwechsel: synchron schreiben, Rest per Write-Behind
+CRITICAL_EVENTS = {"SALE_TRANSFER_REDEEMED"}
+
 
 def _utc_now() -> datetime:
     # naive UTC (SQLite-friendly) – ohne datetime.utcnow() (DeprecationWarning)
@@ -36,13 +49,15 @@ def _json(payload: Dict[str, Any]) -> str:
 def _ensure_fallback_table(engine: Engine) -> Table:
     """
     Wenn Tabelle existiert: autoload (damit Schema-Mismatch nicht crasht).
-    Wenn nicht: anlegen mit unseren Spalten.
+    Wenn nicht: anlegen mit unseren Spalten. Query-Indizes in beiden Fällen.
     """
     insp = sa_inspect(engine)
     md = MetaData()
 
     if name in set(insp.get_table_names()):
-        return Table(name, md, autoload_with=engine)
+        t = Table(name, md, autoload_with=engine)
+        ensure_indexes(engine, t, QUERY_INDEXES)
+        return t
 
     t = Table(
         name,
@@ -58,6 +73,7 @@ def _ensure_fallback_table(engine: Engine) -> Table:
         Column("payload_json", Text, nullable=False),
     )
     md.create_all(engine, tables=[t], checkfirst=True)
+    ensure_indexes(engine, t, QUERY_INDEXES)
     return t
 
 
@@ -148,6 +164,28 @@ def _build_values(
     return v
 
 
+def _pick_table(db: Session) -> Table:
+    """
+    Primary (audit_events/audit/audits), wenn unsere Werte alle Pflichtspalten abdecken;
+    sonst sale_transfer_audit_events (bisher: Primary-Insert scheiterte bei jedem Event).
+    """
+    engine = _get_engine(db)
+    primary = _pick_primary_table(engine)
+    if primary is not None:
+        probe = _build_values(
+            primary,
+            "probe",
+            actor_user_id="probe",
+            target_id="probe",
+            correlation_id="probe",
+            idempotency_key="probe",
+            payload={},
+        )
+        if covers_required_columns(primary, probe):
+            return primary
+    return _ensure_fallback_table(engine)
+
+
 def write_sale_audit(
     db: Session,
     event_type: str,
@@ -161,35 +199,14 @@ def write_sale_audit(
     """
     Best-effort Audit: darf Sale/Transfer NICHT killen.
     Prefer existing audit_events/audit/audits; fallback auf sale_transfer_audit_events.
+    Eigene TX (Flusher bzw. sync-Write), damit die Business-Session nicht kaputt geht.
     """
-    engine = _get_engine(db)
     payload = payload or {}
-
-    primary = _pick_primary_table(engine)
-    fallback = _ensure_fallback_table(engine)
-
-    # 1) primary best-effort (eigene TX, damit Business-Session nicht kaputt geht)
-    if primary is not None:
-        try:
-            values = _build_values(
-                primary,
-                event_type,
-                actor_user_id=actor_user_id,
-                target_id=target_id,
-                correlation_id=correlation_id,
-                idempotency_key=idempotency_key,
-                payload=payload,
-            )
-            with engine.begin() as conn:
-                conn.execute(insert(primary).values(**values))
-            return
-        except Exception:
-            pass
-
-    # 2) fallback best-effort
     try:
+        # Zieltabelle einmal pro Engine (statt Reflection/DDL-Check pro Event)
+        target = table_target(db, "sale_transfer_audit", _pick_table)
         values = _build_values(
-            fallback,
+            target.table,
             event_type,
             actor_user_id=actor_user_id,
             target_id=target_id,
@@ -197,21 +214,6 @@ def write_sale_audit(
             idempotency_key=idempotency_key,
             payload=payload,
         )
-
-        # Mindestfelder absichern (falls fallback minimal ist)
-        cols = set(fallback.c.keys())
-        if "id" in cols:
-            values.setdefault("id", str(uuid.uuid4()))
-        if "at" in cols:
-            values.setdefault("at", _utc_now())
-        if "event_type" in cols:
-            values.setdefault("event_type", event_type)
-        if "module_id" in cols:
-            values.setdefault("module_id", MODULE_ID)
-        if "payload_json" in cols:
-            values.setdefault("payload_json", _json(payload))
-
-        with engine.begin() as conn:
-            conn.execute(insert(fallback).values(**values))
+        get_audit_sink().emit(target, values, critical=event_type in CRITICAL_EVENTS)
     except Exception:
         return
@@ -1,13 +1,11 @@
 from __future__ import annotations
 
-import hashlib
-import hmac
 import os
 import re
 import secrets
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from fastapi import HTTPException
 from sqlalchemy import (
@@ -27,6 +25,8 @@ from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.inspection import inspect as sa_inspect
 from sqlalchemy.orm import Session
 
+from app.core.keyring import get_keyring
+from app.db.reflection import table_registry
 from app.services.sale_transfer_audit import write_sale_audit
 
 
@@ -98,15 +98,8 @@ def _iso_z(dt: datetime) -> str:
 # Crypto / Config
 # -----------------------------------------------------------------------------
 
-def _get_secret_key() -> str:
-    secret = (os.getenv("LTC_SECRET_KEY") or "").strip()
-    if len(secret) < 16:
-        raise RuntimeError("LTC_SECRET_KEY fehlt/zu kurz (>=16)")
-    return secret
-
-
-def _hmac_hex(secret: str, value: str) -> str:
-    return hmac.new(secret.encode("utf-8"), value.encode("utf-8"), hashlib.sha256).hexdigest()
+def _hmac_hex(value: str) -> str:
+    return get_keyring().hmac_hex("transfer.token", value)
 
 
 # -----------------------------------------------------------------------------
@@ -114,6 +107,10 @@ def _hmac_hex(secret: str, value: str) -> str:
 # -----------------------------------------------------------------------------
 
 def _ensure_sale_transfer_table(engine: Engine) -> Table:
+    return table_registry.get_or_create(engine, "sale_transfers", _create_sale_transfer_table)
+
+
+def _create_sale_transfer_table(engine: Engine) -> Table:
     insp = sa_inspect(engine)
     md = MetaData()
     name = "sale_transfers"
@@ -144,9 +141,9 @@ def _ensure_sale_transfer_table(engine: Engine) -> Table:
     return t
 
 
-def _row_by_token_hmac(engine: Engine, t: Table, token_h: str) -> Optional[Dict[str, Any]]:
+def _row_by_token_hmac(engine: Engine, t: Table, token_hs: List[str]) -> Optional[Dict[str, Any]]:
     with engine.connect() as conn:
-        r = conn.execute(select(t).where(t.c.token_hmac == token_h).limit(1)).mappings().first()
+        r = conn.execute(select(t).where(t.c.token_hmac.in_(token_hs)).limit(1)).mappings().first()
         return dict(r) if r else None
 
 
@@ -183,12 +180,11 @@ def _try_transfer_ownership_best_effort(engine: Engine, vehicle_id: str, new_own
     names = insp.get_table_names()
 
     cand = [n for n in names if re.search(r"(vehicle|vehicles|servicebook|servicebooks|fahrzeug)", n, re.IGNORECASE)]
-    md = MetaData()
 
     with engine.begin() as conn:
         for table_name in cand:
             try:
-                vt = Table(table_name, md, autoload_with=engine)
+                vt = table_registry.reflect(engine, table_name)
             except Exception:
                 continue
 
@@ -234,7 +230,7 @@ def create_transfer(
 
     engine = _get_engine_for_sale_transfer(db)
     t = _ensure_sale_transfer_table(engine)
-    secret = _get_secret_key()
+    get_keyring()  # fail fast ohne Secret
 
     ttl = int(ttl_seconds or 900)
     if ttl < 60 or ttl > 7 * 24 * 3600:
@@ -245,11 +241,11 @@ def create_transfer(
 
     transfer_id = str(uuid.uuid4())
     token = secrets.token_urlsafe(32)
-    token_h = _hmac_hex(secret, token)
+    token_h = _hmac_hex(token)
 
     payload = {
         "transfer_id": transfer_id,
-        "vehicle_id_hmac": _hmac_hex(secret, vehicle_id),
+        "vehicle_id_hmac": _hmac_hex(vehicle_id),
         "expires_at": _iso_z(expires.replace(tzinfo=timezone.utc)),
     }
 
@@ -300,11 +296,11 @@ def redeem_transfer(
 
     engine = _get_engine_for_sale_transfer(db)
     t = _ensure_sale_transfer_table(engine)
-    secret = _get_secret_key()
+    get_keyring()  # fail fast ohne Secret
     now = _utc_now()
 
-    token_h = _hmac_hex(secret, transfer_token)
-    row = _row_by_token_hmac(engine, t, token_h)
+    # alle aktiven Key-IDs: Tokens aus der Zeit vor einer Rotation bleiben einlösbar
+    row = _row_by_token_hmac(engine, t, get_keyring().hmac_hex_all("transfer.token", transfer_token))
 
     if not row:
         try:
@@ -355,7 +351,7 @@ def redeem_transfer(
 
     payload = {
         "transfer_id": row["transfer_id"],
-        "vehicle_id_hmac": _hmac_hex(secret, row["vehicle_id"]),
+        "vehicle_id_hmac": _hmac_hex(row["vehicle_id"]),
         "ownership_transferred": bool(ownership_transferred),
     }
     try:
@@ -389,7 +385,7 @@ def cancel_transfer(
 
     engine = _get_engine_for_sale_transfer(db)
     t = _ensure_sale_transfer_table(engine)
-    secret = _get_secret_key()
+    get_keyring()  # fail fast ohne Secret
     now = _utc_now()
 
     row = _row_by_transfer_id(engine, t, transfer_id)
@@ -406,7 +402,7 @@ def cancel_transfer(
     if row.get("status") != "created":
         raise HTTPException(status_code=409, detail="transfer_not_cancellable")
 
-    payload = {"transfer_id": row["transfer_id"], "vehicle_id_hmac": _hmac_hex(secret, row["vehicle_id"])}
+    payload = {"transfer_id": row["transfer_id"], "vehicle_id_hmac": _hmac_hex(row["vehicle_id"])}
 
     with engine.begin() as conn:
         res = conn.execute(
@@ -441,7 +437,7 @@ def get_transfer_status(
 ) -> Dict[str, Any]:
     engine = _get_engine_for_sale_transfer(db)
     t = _ensure_sale_transfer_table(engine)
-    _ = _get_secret_key()
+    get_keyring()  # fail fast ohne Secret
     now = _utc_now()
 
     row = _row_by_transfer_id(engine, t, transfer_id)
@@ -21,10 +21,11 @@ from sqlalchemy import (
     select,
     update,
 )
-from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.orm import Session
 from sqlalchemy.sql.sqltypes import Integer as SAInteger, BigInteger as SABigInteger
 
+from app.db.reflection import table_registry
+
 
 # ---------------------------
 # helpers: actor
@@ -85,12 +86,11 @@ def _allow_bootstrap(db: Session) -> bool:
     return False
 
 
-def _create_servicebook_entries_table(db: Session, name: str) -> Table:
+def _create_servicebook_entries_table(conn: Any, name: str) -> Table:
     """
     Minimal-MVP Tabelle für Servicebook Entries.
     (Migration kann später sauber nachgezogen werden.)
     """
-    conn = db.connection()
     md = MetaData()
 
     t = Table(
@@ -119,32 +119,35 @@ def _create_servicebook_entries_table(db: Session, name: str) -> Table:
     return Table(name, MetaData(), autoload_with=conn)
 
 
+SERVICEBOOK_TABLE_CANDIDATES = (
+    "servicebook_entries",
+    "servicebook_entry",
+    "service_entries",
+    "service_entry",
+    "servicebook",
+    "servicebooks",
+)
+
+
 def servicebook_entries_table(db: Session) -> Table:
     """
     Servicebook ist evtl. noch nicht als Model vorhanden => Table autodetect.
     Wenn keine Tabelle existiert:
       - SQLite/Test: auto-create
       - sonst: 404 servicebook_table_missing
+    Reflection ist pro Engine gecacht (app.db.reflection).
     """
-    conn = db.connection()
-    insp = sa_inspect(conn)
-
-    candidates = (
-        "servicebook_entries",
-        "servicebook_entry",
-        "service_entries",
-        "service_entry",
-        "servicebook",
-        "servicebooks",
-    )
-
-    for name in candidates:
-        if insp.has_table(name):
-            return Table(name, MetaData(), autoload_with=conn)
+    t = table_registry.find(db, SERVICEBOOK_TABLE_CANDIDATES)
+    if t is not None:
+        return t
 
     if _allow_bootstrap(db):
         # Canonical table name:
-        return _create_servicebook_entries_table(db, "servicebook_entries")
+        return table_registry.get_or_create(
+            db,
+            "servicebook_entries",
+            lambda conn: _create_servicebook_entries_table(conn, "servicebook_entries"),
+        )
 
     raise HTTPException(status_code=404, detail="servicebook_table_missing")
 
@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import logging
 from dataclasses import dataclass
-from typing import Any, Iterable, Literal, Optional
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, Literal, Mapping, Optional
 
+from sqlalchemy import Connection, delete, event, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.vehicle import Vehicle, VehicleTrustSummaryRecord
 from app.models.vehicle_entry import VehicleEntry
 from app.services.trust_codes_v1 import vip_top_reasons
 from app.services.trust_light_v1 import (
@@ -11,10 +17,15 @@ from app.services.trust_light_v1 import (
     green_fallback_hint,
 )
 
+logger = logging.getLogger(__name__)
+
 AccidentStatus = Literal["unfallfrei", "nicht_unfallfrei", "unbekannt"]
 VerificationLevel = Literal["niedrig", "mittel", "hoch"]
 PresenceLabel = Literal["vorhanden", "nicht_vorhanden"]
 
+# Erhöhen, sobald sich die Ableitungsregeln ändern: veraltete Zeilen werden beim Lesen neu berechnet
+TRUST_SUMMARY_RULES_VERSION = 1
+
 
 @dataclass(frozen=True)
 class VehicleTrustSummary:
@@ -60,17 +71,21 @@ def accident_status_public_label(status: AccidentStatus) -> str:
     return "Unbekannt"
 
 
-def _top_trust_level(entries: Iterable[VehicleEntry]) -> Optional[str]:
-    levels = {str(entry.trust_level or "").strip().upper() for entry in entries}
-    if "T3" in levels:
+def _top_trust_level_of(levels: Iterable[Optional[str]]) -> Optional[str]:
+    normalized = {str(level or "").strip().upper() for level in levels}
+    if "T3" in normalized:
         return "T3"
-    if "T2" in levels:
+    if "T2" in normalized:
         return "T2"
-    if "T1" in levels:
+    if "T1" in normalized:
         return "T1"
     return None
 
 
+def _top_trust_level(entries: Iterable[VehicleEntry]) -> Optional[str]:
+    return _top_trust_level_of(entry.trust_level for entry in entries)
+
+
 def _verification_level(top_trust_level: Optional[str]) -> VerificationLevel:
     if top_trust_level == "T3":
         return "hoch"
@@ -91,14 +106,27 @@ def derive_vehicle_trust_summary(
     entries: Iterable[VehicleEntry],
 ) -> VehicleTrustSummary:
     latest_entries = list(entries)
+    return _derive(
+        vehicle_meta=vehicle_meta,
+        top_trust_level=_top_trust_level(latest_entries),
+        has_entries=bool(latest_entries),
+    )
+
+
+def _derive(
+    *,
+    vehicle_meta: Optional[dict[str, Any]],
+    top_trust_level: Optional[str],
+    has_entries: bool,
+) -> VehicleTrustSummary:
+    # Das Ergebnis hängt nur von Top-Trust-Level, Eintrags-Präsenz und Unfall-Meta ab
     accident_status = normalize_accident_status(vehicle_meta)
-    top_trust_level = _top_trust_level(latest_entries)
     verification_level = _verification_level(top_trust_level)
-    history_status: PresenceLabel = "vorhanden" if latest_entries else "nicht_vorhanden"
+    history_status: PresenceLabel = "vorhanden" if has_entries else "nicht_vorhanden"
     evidence_status = _evidence_status(top_trust_level)
 
     reason_codes: list[str] = []
-    if not latest_entries:
+    if not has_entries:
         reason_codes.append("public_evidence_incomplete")
     elif top_trust_level == "T2":
         reason_codes.append("t3_requires_document_missing")
@@ -129,3 +157,332 @@ def derive_vehicle_trust_summary(
         evidence_status=evidence_status,
         top_trust_level=top_trust_level,
     )
+
+
+# ---------------------------------------------------------------------------
+# Materialisierte Summary (vehicle_trust_summaries)
+# - Pflege im after_flush-Hook: neue Einträge => inkrementell (Max-Merge),
+#   Revisionen/Löschungen => Aggregat nur für dieses Fahrzeug, Meta-Änderung => nur Neuableitung
+# - Lesen: ein PK-Lookup; fehlende/veraltete Zeile => einmalig nachberechnen
+# ---------------------------------------------------------------------------
+
+_SUMMARY = VehicleTrustSummaryRecord.__table__
+_ENTRIES = VehicleEntry.__table__
+_VEHICLES = Vehicle.__table__
+
+# Abonnenten für geänderte Summaries (z. B. Public-QR-Cache); Aufruf erst nach Commit
+_CHANGE_LISTENERS: list[Callable[[set[str]], None]] = []
+_CHANGED_KEY = "vehicle_trust_changed"
+
+
+def add_trust_summary_listener(fn: Callable[[set[str]], None]) -> None:
+    if fn not in _CHANGE_LISTENERS:
+        _CHANGE_LISTENERS.append(fn)
+
+
+def _mark_changed(session: Session, vehicle_ids: Iterable[str]) -> None:
+    session.info.setdefault(_CHANGED_KEY, set()).update(vehicle_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_trust_summary_listeners(session: Session) -> None:
+    changed = session.info.pop(_CHANGED_KEY, None)
+    if not changed:
+        return
+    for fn in list(_CHANGE_LISTENERS):
+        try:
+            fn(changed)
+        except Exception:
+            logger.warning("trust summary listener failed", exc_info=True)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_trust_summary_changes(session: Session) -> None:
+    session.info.pop(_CHANGED_KEY, None)
+
+
+def _accident_meta(accident_status: str, accident_trust_completed: bool) -> dict[str, Any]:
+    return {"accident_status": accident_status, "accident_trust_completed": accident_trust_completed}
+
+
+def _summary_values(vehicle_id: str, meta: Optional[dict[str, Any]], top: Optional[str], has_entries: bool) -> dict[str, Any]:
+    summary = _derive(vehicle_meta=meta, top_trust_level=top, has_entries=has_entries)
+    return {
+        "vehicle_id": vehicle_id,
+        "rules_version": TRUST_SUMMARY_RULES_VERSION,
+        "top_trust_level": top,
+        "has_entries": has_entries,
+        "accident_status": summary.accident_status,
+        "accident_trust_completed": bool(_meta_value(meta, "accident_trust_completed", False)),
+        "trust_light": summary.trust_light,
+        "hint": summary.hint,
+        "reason_codes": summary.reason_codes,
+        "todo_codes": summary.todo_codes,
+        "verification_level": summary.verification_level,
+        "history_status": summary.history_status,
+        "evidence_status": summary.evidence_status,
+        "updated_at": datetime.now(timezone.utc),
+    }
+
+
+def _summary_from_values(values: Mapping[str, Any]) -> VehicleTrustSummary:
+    return VehicleTrustSummary(
+        trust_light=values["trust_light"],
+        hint=values["hint"],
+        reason_codes=list(values["reason_codes"] or []),
+        todo_codes=list(values["todo_codes"] or []),
+        verification_level=values["verification_level"],
+        accident_status=values["accident_status"],
+        history_status=values["history_status"],
+        evidence_status=values["evidence_status"],
+        top_trust_level=values["top_trust_level"],
+    )
+
+
+def _latest_levels(conn: Connection, vehicle_id: str) -> tuple[Optional[str], bool]:
+    levels = conn.execute(
+        select(_ENTRIES.c.trust_level)
+        .where(_ENTRIES.c.vehicle_id == vehicle_id, _ENTRIES.c.is_latest.is_(True))
+        .distinct()
+    ).scalars().all()
+    return _top_trust_level_of(levels), bool(levels)
+
+
+def _vehicle_meta(conn: Connection, vehicle_id: str) -> tuple[bool, Optional[dict[str, Any]]]:
+    row = conn.execute(select(_VEHICLES.c.meta).where(_VEHICLES.c.public_id == vehicle_id)).first()
+    return (row is not None, row[0] if row is not None else None)
+
+
+def _store(conn: Connection, values: dict[str, Any]) -> None:
+    res = conn.execute(update(_SUMMARY).where(_SUMMARY.c.vehicle_id == values["vehicle_id"]).values(**values))
+    if res.rowcount == 0:
+        conn.execute(insert(_SUMMARY).values(**values))
+
+
+def _refresh(conn: Connection, vehicle_id: str, meta: Optional[dict[str, Any]]) -> dict[str, Any]:
+    top, has_entries = _latest_levels(conn, vehicle_id)
+    values = _summary_values(vehicle_id, meta, top, has_entries)
+    _store(conn, values)
+    return values
+
+
+def _backfill(db: Session, rows: Iterable[dict[str, Any]]) -> None:
+    """
+    Lazy Backfill (Altbestand/Regeländerung) aus Lesepfaden: eigene Transaktion auf der Engine,
+    Session des Aufrufers wird weder committet noch zurückgerollt. Lesen darf am Schreiben nicht scheitern.
+    """
+    bind = db.get_bind()
+    engine = getattr(bind, "engine", bind)
+    try:
+        with engine.begin() as conn:
+            for row in rows:
+                _store(conn, row)
+    except Exception:
+        logger.warning("trust summary backfill failed", exc_info=True)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_trust_summaries(session: Session, _flush_context: Any) -> None:
+    meta_changed: dict[str, Optional[dict[str, Any]]] = {}
+    added_levels: dict[str, set[Optional[str]]] = {}
+    recompute: set[str] = set()
+    removed: set[str] = set()
+
+    for obj in session.new:
+        if isinstance(obj, Vehicle):
+            meta_changed[obj.public_id] = obj.meta
+        elif isinstance(obj, VehicleEntry) and obj.is_latest:
+            added_levels.setdefault(obj.vehicle_id, set()).add(obj.trust_level)
+    for obj in session.dirty:
+        if isinstance(obj, Vehicle):
+            meta_changed[obj.public_id] = obj.meta
+        elif isinstance(obj, VehicleEntry):
+            recompute.add(obj.vehicle_id)
+    for obj in session.deleted:
+        if isinstance(obj, Vehicle):
+            removed.add(obj.public_id)
+        elif isinstance(obj, VehicleEntry):
+            recompute.add(obj.vehicle_id)
+
+    touched = (set(meta_changed) | set(added_levels) | recompute) - removed
+    if not touched and not removed:
+        return
+
+    conn = session.connection()
+    _mark_changed(session, touched | removed)
+    if removed:
+        conn.execute(delete(_SUMMARY).where(_SUMMARY.c.vehicle_id.in_(removed)))
+
+    for vehicle_id in touched:
+        row = conn.execute(select(_SUMMARY).where(_SUMMARY.c.vehicle_id == vehicle_id)).first()
+        current = row is not None and row.rules_version == TRUST_SUMMARY_RULES_VERSION
+
+        if vehicle_id in meta_changed:
+            meta = meta_changed[vehicle_id]
+        elif current:
+            meta = _accident_meta(row.accident_status, row.accident_trust_completed)
+        else:
+            meta = _vehicle_meta(conn, vehicle_id)[1]
+
+        if current and vehicle_id not in recompute:
+            # inkrementell: neue Latest-Einträge können das Top-Level nur anheben
+            top = _top_trust_level_of([row.top_trust_level, *added_levels.get(vehicle_id, ())])
+            has_entries = bool(row.has_entries or added_levels.get(vehicle_id))
+            _store(conn, _summary_values(vehicle_id, meta, top, has_entries))
+        else:
+            _refresh(conn, vehicle_id, meta)
+
+
+def load_vehicle_trust_summary(db: Session, vehicle_id: str) -> Optional[VehicleTrustSummary]:
+    """PK-Lookup der materialisierten Summary; None, wenn das Fahrzeug nicht existiert."""
+    conn = db.connection()
+    row = conn.execute(select(_SUMMARY).where(_SUMMARY.c.vehicle_id == str(vehicle_id))).first()
+    if row is not None and row.rules_version == TRUST_SUMMARY_RULES_VERSION:
+        return _summary_from_values(row._mapping)
+
+    exists, meta = _vehicle_meta(conn, str(vehicle_id))
+    if not exists:
+        return None
+    top, has_entries = _latest_levels(conn, str(vehicle_id))
+    values = _summary_values(str(vehicle_id), meta, top, has_entries)
+    _backfill(db, [values])
+    return _summary_from_values(values)
+
+
+def _compute_values(conn: Connection, vehicle_ids: list[str]) -> dict[str, dict[str, Any]]:
+    # eine Query für Meta, eine für die Latest-Trust-Levels; fehlende Fahrzeuge fehlen im Ergebnis
+    metas = dict(
+        conn.execute(select(_VEHICLES.c.public_id, _VEHICLES.c.meta).where(_VEHICLES.c.public_id.in_(vehicle_ids))).all()
+    )
+    levels: dict[str, set[Optional[str]]] = {}
+    if metas:
+        for vehicle_id, level in conn.execute(
+            select(_ENTRIES.c.vehicle_id, _ENTRIES.c.trust_level)
+            .where(_ENTRIES.c.vehicle_id.in_(list(metas)), _ENTRIES.c.is_latest.is_(True))
+            .distinct()
+        ):
+            levels.setdefault(vehicle_id, set()).add(level)
+    values: dict[str, dict[str, Any]] = {}
+    for vehicle_id, meta in metas.items():
+        vehicle_levels = levels.get(vehicle_id, set())
+        values[vehicle_id] = _summary_values(vehicle_id, meta, _top_trust_level_of(vehicle_levels), bool(vehicle_levels))
+    return values
+
+
+def refresh_vehicle_trust_summaries(db: Session, vehicle_ids: Iterable[str], *, chunk: int = 500) -> int:
+    """
+    Summaries für viele Fahrzeuge neu berechnen (z. B. nach Bulk-Import an der ORM vorbei):
+    pro Chunk eine Query für Meta und eine für die Latest-Trust-Levels. Commit durch den Aufrufer.
+    """
+    ids = sorted(set(vehicle_ids))
+    conn = db.connection()
+    written = 0
+    for i in range(0, len(ids), chunk):
+        values = _compute_values(conn, ids[i : i + chunk])
+        for row in values.values():
+            _store(conn, row)
+        written += len(values)
+        _mark_changed(db, values)
+    return written
+
+
+def load_vehicle_trust_summaries(db: Session, vehicle_ids: Iterable[str]) -> dict[str, VehicleTrustSummary]:
+    """
+    Batch-Variante von load_vehicle_trust_summary mit konstanter Query-Zahl:
+    eine IN-Query auf die materialisierten Summaries, für fehlende/veraltete Zeilen
+    je eine IN-Query für Meta und Latest-Einträge (+ Backfill). Unbekannte Fahrzeuge fehlen im Ergebnis.
+    """
+    ids = sorted({str(v) for v in vehicle_ids})
+    if not ids:
+        return {}
+    conn = db.connection()
+    out: dict[str, VehicleTrustSummary] = {}
+    for row in conn.execute(select(_SUMMARY).where(_SUMMARY.c.vehicle_id.in_(ids))):
+        if row.rules_version == TRUST_SUMMARY_RULES_VERSION:
+            out[row.vehicle_id] = _summary_from_values(row._mapping)
+
+    pending = [vid for vid in ids if vid not in out]
+    if not pending:
+        return out
+    values = _compute_values(conn, pending)
+    if values:
+        # wie im Einzel-Lookup: reiner Backfill ändert die Summary nicht (kein _mark_changed)
+        _backfill(db, values.values())
+    for vehicle_id, row in values.items():
+        out[vehicle_id] = _summary_from_values(row)
+    return out
+
+
+def _expected_all(conn: Connection) -> dict[str, dict[str, Any]]:
+    levels: dict[str, set[Optional[str]]] = {}
+    for vehicle_id, level in conn.execute(
+        select(_ENTRIES.c.vehicle_id, _ENTRIES.c.trust_level).where(_ENTRIES.c.is_latest.is_(True)).distinct()
+    ):
+        levels.setdefault(vehicle_id, set()).add(level)
+
+    expected: dict[str, dict[str, Any]] = {}
+    for vehicle_id, meta in conn.execute(select(_VEHICLES.c.public_id, _VEHICLES.c.meta)):
+        vehicle_levels = levels.get(vehicle_id, set())
+        expected[vehicle_id] = _summary_values(
+            vehicle_id, meta, _top_trust_level_of(vehicle_levels), bool(vehicle_levels)
+        )
+    return expected
+
+
+_COMPARED = (
+    "rules_version",
+    "top_trust_level",
+    "has_entries",
+    "accident_status",
+    "accident_trust_completed",
+    "trust_light",
+    "hint",
+    "reason_codes",
+    "todo_codes",
+    "verification_level",
+    "history_status",
+    "evidence_status",
+)
+
+
+def _diff(conn: Connection, expected: dict[str, dict[str, Any]]) -> dict[str, list[str]]:
+    stored = {row.vehicle_id: row for row in conn.execute(select(_SUMMARY))}
+
+    stale = [
+        vid
+        for vid, want in expected.items()
+        if vid in stored and any(getattr(stored[vid], k) != want[k] for k in _COMPARED)
+    ]
+    return {
+        "missing": sorted(vid for vid in expected if vid not in stored),
+        "stale": sorted(stale),
+        "orphaned": sorted(vid for vid in stored if vid not in expected),
+    }
+
+
+def check_vehicle_trust_summaries(db: Session) -> dict[str, list[str]]:
+    """Konsistenzprüfung gegen eine Vollberechnung: fehlende, abweichende und verwaiste Zeilen."""
+    conn = db.connection()
+    return _diff(conn, _expected_all(conn))
+
+
+def rebuild_vehicle_trust_summaries(db: Session, *, only_inconsistent: bool = True) -> int:
+    """Summary-Zeilen neu schreiben (Standard: nur fehlende/abweichende) und verwaiste löschen."""
+    conn = db.connection()
+    expected = _expected_all(conn)
+    if only_inconsistent:
+        report = _diff(conn, expected)
+        targets = report["missing"] + report["stale"]
+        orphaned = report["orphaned"]
+    else:
+        targets = list(expected)
+        stored_ids = conn.execute(select(_SUMMARY.c.vehicle_id)).scalars().all()
+        orphaned = [vid for vid in stored_ids if vid not in expected]
+
+    _mark_changed(db, [*targets, *orphaned])
+    for vehicle_id in targets:
+        _store(conn, expected[vehicle_id])
+    if orphaned:
+        conn.execute(delete(_SUMMARY).where(_SUMMARY.c.vehicle_id.in_(orphaned)))
+    db.commit()
+    return len(targets) + len(orphaned)
@@ -1,11 +1,39 @@
 from __future__ import annotations
 
+import argparse
 import os
 import sqlite3
+import time
 
 DB = (os.getenv("LTC_DB_PATH") or "./data/app.db").strip()
 
+# rowid = Einfügereihenfolge: Lesen über den Rowid-B-Tree, kein Sortieren nach created_at
+_LAST = "SELECT rowid, created_at, action, result, reason_code FROM auth_audit ORDER BY rowid DESC LIMIT ?;"
+_SINCE = "SELECT rowid, created_at, action, result, reason_code FROM auth_audit WHERE rowid > ? ORDER BY rowid LIMIT ?;"
+
+
+def _print(r: sqlite3.Row) -> None:
+    print(f"- {r['created_at']}  {r['action']}  {r['result']}  reason={r['reason_code'] or '-'}")
+
+
+def follow(conn: sqlite3.Connection, last_rowid: int, interval: float, batch: int = 500) -> None:
+    """Inkrementell pollen: nur Zeilen mit rowid > zuletzt gesehener (Ctrl+C beendet)."""
+    while True:
+        rows = conn.execute(_SINCE, (last_rowid, batch)).fetchall()
+        for r in rows:
+            _print(r)
+            last_rowid = r["rowid"]
+        if len(rows) < batch:
+            time.sleep(interval)
+
+
 def main() -> None:
+    ap = argparse.ArgumentParser(description="Letzte auth_audit-Events (ohne PII)")
+    ap.add_argument("-n", "--lines", type=int, default=20)
+    ap.add_argument("-f", "--follow", action="store_true", help="neue Events fortlaufend ausgeben")
+    ap.add_argument("--interval", type=float, default=1.0, help="Poll-Intervall in Sekunden (--follow)")
+    args = ap.parse_args()
+
     if not os.path.exists(DB):
         print(f"DB nicht gefunden: {DB}")
         return
@@ -13,26 +41,21 @@ def main() -> None:
     conn = sqlite3.connect(DB)
     conn.row_factory = sqlite3.Row
     try:
-        cur = conn.execute(
-            """
-            SELECT created_at, action, result, reason_code
-            FROM auth_audit
-            ORDER BY created_at DESC
-            LIMIT 20;
-            """
-        )
-        rows = cur.fetchall()
-        if not rows:
+        rows = conn.execute(_LAST, (max(0, args.lines),)).fetchall()
+        if rows:
+            print(f"Letzte {len(rows)} Audit-Events (ohne PII):")
+            for r in reversed(rows):
+                _print(r)
+        elif not args.follow:
             print("Keine Audit-Events gefunden.")
             return
 
-        print(f"Letzte {len(rows)} Audit-Events (ohne PII):")
-        for r in rows:
-            ca = r["created_at"]
-            action = r["action"]
-            result = r["result"]
-            reason = r["reason_code"] or "-"
-            print(f"- {ca}  {action}  {result}  reason={reason}")
+        if args.follow:
+            last = rows[0]["rowid"] if rows else conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM auth_audit;").fetchone()[0]
+            try:
+                follow(conn, last, args.interval)
+            except KeyboardInterrupt:
+                pass
     finally:
         conn.close()
 
@@ -0,0 +1,68 @@
+# server/scripts/bench_audit_sink.py
+# Benchmark: Latenz pro Audit-Event im Request-Pfad (auth_audit via write_audit).
+# Vorher: eigener Writer-Lock + INSERT + COMMIT pro Event (LTC_AUDIT_MODE=sync).
+# Nachher: Write-Behind-Queue, Flusher schreibt gebündelt per executemany.
+# Run: poetry run python ./scripts/bench_audit_sink.py --events 20000
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SERVER_ROOT = Path(__file__).resolve().parents[1]
+if str(SERVER_ROOT) not in sys.path:
+    sys.path.insert(0, str(SERVER_ROOT))
+
+os.environ.setdefault("LTC_SECRET_KEY", "bench-secret-key-0123456789abcdef0123")
+
+from app.auth.audit import write_audit  # noqa: E402
+from app.auth.storage import close_pools, init_db  # noqa: E402
+from app.services import audit_sink  # noqa: E402
+from app.services.audit_sink import AuditSink  # noqa: E402
+
+
+def _run(db_path: str, mode: str, n: int) -> tuple[float, float, dict]:
+    sink = AuditSink(mode=mode)
+    audit_sink._SINK = sink
+    t0 = time.perf_counter()
+    for i in range(n):
+        write_audit(
+            None,
+            db_path=db_path,
+            actor_id="public",
+            actor_role="public",
+            action="AUTH_CHALLENGE_DELIVERED",
+            target_type="USER",
+            target_id=f"u_{i}",
+            scope="public",
+            result="success",
+            request_id=f"r_{i}",
+            redacted_metadata={"kind": "auth_delivery"},
+        )
+    emit_s = time.perf_counter() - t0
+    sink.stop()
+    return emit_s / n * 1e6, time.perf_counter() - t0, sink.stats()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=20_000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'Modus':<6} | {'µs/Event (Request)':>18} | {'gesamt s':>8} | batches | dropped")
+        for mode in ("sync", "async"):
+            db_path = str(Path(tmp) / f"{mode}.db")
+            init_db(db_path)
+            us, total, st = _run(db_path, mode, args.events)
+            print(f"{mode:<6} | {us:>18.1f} | {total:>8.2f} | {st['batches']:>7} | {st['dropped']:>7}")
+        close_pools()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,137 @@
+# server/scripts/bench_auth_resolve_me.py
+# Benchmark: parallele resolve_me-Aufrufe (Session-Token -> user_id/role).
+# Vergleicht den alten Pfad (neue Connection + PRAGMAs + globaler Lock + init_db pro Call)
+# mit dem gepoolten Pfad aus app.auth.storage.
+# Run: poetry run python ./scripts/bench_auth_resolve_me.py --threads 8 --seconds 3
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+SERVER_ROOT = Path(__file__).resolve().parents[1]
+if str(SERVER_ROOT) not in sys.path:
+    sys.path.insert(0, str(SERVER_ROOT))
+
+from app.auth import storage  # noqa: E402
+from app.auth.crypto import token_hash as token_hash_fn  # noqa: E402
+from app.auth.service import resolve_me  # noqa: E402
+from app.auth.settings import AuthSettings  # noqa: E402
+
+SECRET = "bench-secret-key-0123456789abcdef0123"
+
+_LEGACY_LOCK = threading.Lock()
+
+
+def _iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat()
+
+
+def _legacy_resolve_me(settings: AuthSettings, raw_token: str) -> Optional[Tuple[str, str]]:
+    # Nachbau des bisherigen Verhaltens (nur für den Vorher-Vergleich)
+    with _LEGACY_LOCK:
+        conn = sqlite3.connect(settings.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA foreign_keys=ON;")
+        try:
+            storage._create_schema(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+    th = token_hash_fn(settings.secret_key, raw_token)
+    with _LEGACY_LOCK:
+        conn = sqlite3.connect(settings.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA foreign_keys=ON;")
+        try:
+            sess = storage.get_session_by_token_hash(conn, th)
+            if sess is None:
+                return None
+            if datetime.now(timezone.utc) > datetime.fromisoformat(sess["expires_at"]):
+                return None
+            user = conn.execute("SELECT * FROM auth_users WHERE user_id = ? LIMIT 1;", (sess["user_id"],)).fetchone()
+            conn.commit()
+            return (user["user_id"], user["role"]) if user else None
+        finally:
+            conn.close()
+
+
+def _seed(db_path: str, sessions: int) -> list[str]:
+    storage.init_db(db_path)
+    now = datetime.now(timezone.utc)
+    tokens: list[str] = []
+    with storage.db(db_path) as conn:
+        for _ in range(sessions):
+            user_id = str(uuid.uuid4())
+            raw = "t_" + uuid.uuid4().hex
+            storage.upsert_user(conn, user_id=user_id, email_hmac="hmac_" + uuid.uuid4().hex, created_at=_iso(now))
+            storage.insert_session(
+                conn,
+                session_id=str(uuid.uuid4()),
+                user_id=user_id,
+                token_hash=token_hash_fn(SECRET, raw),
+                created_at=_iso(now),
+                expires_at=_iso(now + timedelta(hours=1)),
+            )
+            tokens.append(raw)
+    return tokens
+
+
+def _run(fn: Callable[[AuthSettings, str], object], settings: AuthSettings, tokens: list[str], threads: int, seconds: float) -> float:
+    stop = time.perf_counter() + seconds
+    counts = [0] * threads
+
+    def _worker(idx: int) -> None:
+        n = 0
+        i = idx
+        while time.perf_counter() < stop:
+            if fn(settings, tokens[i % len(tokens)]) is None:
+                raise RuntimeError("resolve_me lieferte None")
+            i += threads
+            n += 1
+        counts[idx] = n
+
+    ts = [threading.Thread(target=_worker, args=(i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return sum(counts) / seconds
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--sessions", type=int, default=500)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench_auth.db")
+        settings = AuthSettings(secret_key=SECRET, db_path=db_path)
+        tokens = _seed(db_path, args.sessions)
+
+        before = _run(_legacy_resolve_me, settings, tokens, args.threads, args.seconds)
+        after = _run(resolve_me, settings, tokens, args.threads, args.seconds)
+        storage.close_pools()
+
+    print(f"resolve_me, {args.threads} Threads, {args.seconds:.1f}s, {args.sessions} Sessions")
+    print(f"- vorher (Connection pro Call + globaler Lock): {before:10.0f} ops/s")
+    print(f"- nachher (Pool, Reader pro Thread):            {after:10.0f} ops/s")
+    print(f"- Faktor: {after / before:.1f}x" if before else "- Faktor: n/a")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
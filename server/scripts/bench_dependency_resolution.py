@@ -0,0 +1,198 @@
+# server/scripts/bench_dependency_resolution.py
+# Benchmark: Overhead der Actor-/DB-Auflösung pro Request in den Export-Routern
+# (vehicle: get_actor + _db_from_request, servicebook/user: get_actor + next(get_db)).
+# Vorher: Probing über alle dependency_overrides (TypeError-Kaskade), app.rbac, Modul-Imports pro Request.
+# Nachher: app.routers.export_vehicle kompiliert die Kette einmal pro App/Override-Stand.
+# Run: poetry run python ./scripts/bench_dependency_resolution.py --requests 20000
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+SERVER_ROOT = Path(__file__).resolve().parents[1]
+if str(SERVER_ROOT) not in sys.path:
+    sys.path.insert(0, str(SERVER_ROOT))
+
+_TMP = tempfile.TemporaryDirectory()
+os.environ.setdefault("LTC_SECRET_KEY", "bench-secret-key-0123456789abcdef0123")
+os.environ["LTC_DATABASE_URL"] = f"sqlite:///{Path(_TMP.name) / 'bench.db'}"
+
+from fastapi import FastAPI, HTTPException  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+from app.routers import export_vehicle as ev  # noqa: E402
+
+# ---------------------------------------------------------------------------
+# Nachbau des bisherigen Verhaltens (nur für den Vorher-Vergleich)
+# ---------------------------------------------------------------------------
+
+
+def _legacy_first(res: Any) -> Any:
+    if hasattr(res, "__iter__") and hasattr(res, "__next__"):
+        try:
+            return next(res)
+        except Exception:
+            return None
+        finally:
+            res.close()
+    return res
+
+
+def _legacy_get_actor(request: Request) -> Any:
+    ov = request.app.dependency_overrides
+    for fn in list(ov.values()) + list(ov.keys()):
+        try:
+            actor = _legacy_first(ev._call_best_effort(fn, request))
+        except Exception:
+            continue
+        if ev._role_of(actor):
+            return actor
+    try:
+        import app.rbac as _rbac
+
+        for name in ("require_actor", "get_actor"):
+            fn = getattr(_rbac, name, None)
+            if callable(fn):
+                try:
+                    actor = _legacy_first(ev._call_best_effort(fn, request))
+                except Exception:
+                    continue
+                if ev._role_of(actor):
+                    return actor
+    except Exception:
+        pass
+    return ev.core_require_actor(request)
+
+
+def _legacy_session(request: Request) -> Optional[Session]:
+    ov = request.app.dependency_overrides
+    for fn in list(ov.values()) + list(ov.keys()):
+        try:
+            with ev._session_from_result(ev._call_best_effort(fn, request)) as db:
+                return db
+        except Exception:
+            continue
+    st = request.app.state
+    for name in ("_SessionLocal", "SessionLocal", "session_local", "sessionmaker", "SessionMaker", "db_sessionmaker", "db_session_factory", "db_factory"):
+        if callable(getattr(st, name, None)):
+            return getattr(st, name)()
+    for modname in ("app.db", "app.database", "app.core.db", "app.core.database", "app.deps", "app.dependencies"):
+        try:
+            mod = __import__(modname, fromlist=["*"])
+        except Exception:
+            continue
+        for fname in ("get_db_prod", "get_db", "get_session", "db_session"):
+            fn = getattr(mod, fname, None)
+            if callable(fn):
+                try:
+                    with ev._session_from_result(ev._call_best_effort(fn, request)) as db:
+                        return db
+                except Exception:
+                    continue
+    return None
+
+
+@contextmanager
+def _legacy_db(request: Request) -> Iterator[Session]:
+    db = _legacy_session(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+
+
+def _request(app: FastAPI, actor: Any = None) -> Request:
+    req = Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b"", "app": app, "state": {}})
+    if actor is not None:
+        req.state.actor = actor
+    return req
+
+
+def _apps() -> dict[str, tuple[FastAPI, Any]]:
+    SessionLocal = sessionmaker(bind=create_engine(f"sqlite:///{Path(_TMP.name) / 'tests.db'}", future=True), future=True)
+
+    def override_get_db():
+        with SessionLocal() as s:
+            yield s
+
+    actor = {"role": "superadmin", "user_id": "sa_1"}
+    overridden = FastAPI()
+    # wie die Test-Suites: DB + Actor überschrieben, DB zuerst registriert
+    overridden.dependency_overrides[ev.get_db] = override_get_db
+    overridden.dependency_overrides[ev.get_actor] = lambda: actor
+
+    # Produktion: Actor aus request.state (Auth-Middleware), DB über app.deps.get_db
+    return {"overrides": (overridden, None), "production": (FastAPI(), actor)}
+
+
+def _vehicle(get_actor: Callable, db_ctx: Callable) -> Callable[[Request], None]:
+    def run(req: Request) -> None:
+        get_actor(req)
+        with db_ctx(req):
+            pass
+
+    return run
+
+
+def _next_db(get_actor: Callable, get_db: Callable) -> Callable[[Request], None]:
+    def run(req: Request) -> None:
+        get_actor(req)
+        db = next(get_db(req))
+        db.close()
+
+    return run
+
+
+def _legacy_get_db(request: Request) -> Iterator[Session]:
+    with _legacy_db(request) as db:
+        yield db
+
+
+ROUTERS = {
+    "export_vehicle": (_vehicle(_legacy_get_actor, _legacy_db), _vehicle(ev.get_actor, ev._db_from_request)),
+    "export_servicebook": (_next_db(_legacy_get_actor, _legacy_get_db), _next_db(ev.get_actor, ev.get_db)),
+    "export_user": (_next_db(_legacy_get_actor, _legacy_get_db), _next_db(ev.get_actor, ev.get_db)),
+}
+
+
+def _us_per_request(run: Callable[[Request], None], app: FastAPI, actor: Any, n: int) -> float:
+    reqs = [_request(app, actor) for _ in range(n)]
+    run(reqs[0])  # Warm-up (Imports, Kompilieren)
+    t0 = time.perf_counter()
+    for req in reqs:
+        run(req)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=20_000)
+    args = ap.parse_args()
+
+    print(f"{'Router':<20} {'Setup':<11} | {'vorher µs':>10} | {'nachher µs':>10} | Faktor")
+    for setup, (app, actor) in _apps().items():
+        for router, (legacy, compiled) in ROUTERS.items():
+            try:
+                before = _us_per_request(legacy, app, actor, args.requests)
+                after = _us_per_request(compiled, app, actor, args.requests)
+            except HTTPException as e:
+                print(f"{router:<20} {setup:<11} | Fehler: {e.detail}")
+                continue
+            print(f"{router:<20} {setup:<11} | {before:>10.1f} | {after:>10.1f} | {before / after:>5.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
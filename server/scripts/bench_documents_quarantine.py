@@ -0,0 +1,112 @@
+# server/scripts/bench_documents_quarantine.py
+# Benchmark: Admin-Quarantäne-Liste bei vielen Dokumenten.
+# Vorher: neue Connection pro Call, Full-Scan + Sort, komplette Liste (Nachbau via NOT INDEXED).
+# Nachher: gepoolte Reader, Index (approval_status, created_at, id), Keyset-Seiten.
+# Run: poetry run python ./scripts/bench_documents_quarantine.py --rows 1000000
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+SERVER_ROOT = Path(__file__).resolve().parents[1]
+if str(SERVER_ROOT) not in sys.path:
+    sys.path.insert(0, str(SERVER_ROOT))
+
+from app.services.documents_store import _SELECT_COLUMNS, DocumentsStore  # noqa: E402
+
+
+def _seed(db_path: Path, rows: int) -> None:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    statuses = ("QUARANTINED", "APPROVED", "APPROVED", "REJECTED")
+    con = sqlite3.connect(db_path)
+    try:
+        batch = []
+        for i in range(rows):
+            batch.append(
+                (
+                    uuid.uuid4().hex,
+                    f"u{i % 5000}",
+                    "scan.pdf",
+                    "application/pdf",
+                    1234,
+                    "documents/x",
+                    (start + timedelta(seconds=i)).isoformat(),
+                    statuses[i % len(statuses)],
+                    "PENDING",
+                    None,
+                )
+            )
+            if len(batch) >= 50_000:
+                con.executemany("INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                batch.clear()
+        if batch:
+            con.executemany("INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+        con.commit()
+        con.execute("ANALYZE;")
+    finally:
+        con.close()
+
+
+def _legacy_list(db_path: Path) -> int:
+    # Nachbau des bisherigen Verhaltens (nur für den Vorher-Vergleich)
+    con = sqlite3.connect(db_path)
+    try:
+        rows = con.execute(
+            f"SELECT {_SELECT_COLUMNS} FROM documents NOT INDEXED WHERE approval_status = ? ORDER BY created_at DESC",
+            ("QUARANTINED",),
+        ).fetchall()
+    finally:
+        con.close()
+    return len(rows)
+
+
+def _timed(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--page-size", type=int, default=100)
+    ap.add_argument("--depth", type=int, default=50, help="Anzahl Seiten für den Deep-Page-Test")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        with DocumentsStore(
+            storage_root=root / "storage",
+            db_path=root / "data" / "documents.sqlite",
+            max_upload_bytes=1024,
+        ) as store:
+            t0 = time.perf_counter()
+            _seed(store.db_path, args.rows)
+            print(f"seed: {args.rows} Dokumente in {time.perf_counter() - t0:.1f}s")
+
+            legacy_ms = _timed(lambda: _legacy_list(store.db_path), 3)
+            first_ms = _timed(lambda: store.list_quarantine(limit=args.page_size), 50)
+
+            after = None
+            t0 = time.perf_counter()
+            for _ in range(args.depth):
+                page = store.list_quarantine(after=after, limit=args.page_size)
+                after = page[-1].id
+            deep_ms = (time.perf_counter() - t0) / args.depth * 1000
+
+    print(f"- vorher  (Full-Scan + Sort, ganze Liste):        {legacy_ms:9.1f} ms/Call")
+    print(f"- nachher (erste Seite, {args.page_size} Einträge):           {first_ms:9.2f} ms/Call")
+    print(f"- nachher (Seiten 1..{args.depth}, Keyset):                 {deep_ms:9.2f} ms/Seite")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,88 @@
+# server/scripts/bench_documents_upload.py
+# Benchmark: Speicherprofil beim Dokument-Upload (Peak der Python-Allokationen via tracemalloc).
+# Vergleicht den alten Pfad (ganze Datei lesen + write_bytes + sha256 über alles)
+# mit DocumentsStore.upload_stream (Chunks, Hash beim Schreiben, Temp-Datei + os.replace).
+# Run: poetry run python ./scripts/bench_documents_upload.py --sizes-mb 1 10 100
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Tuple
+
+SERVER_ROOT = Path(__file__).resolve().parents[1]
+if str(SERVER_ROOT) not in sys.path:
+    sys.path.insert(0, str(SERVER_ROOT))
+
+from app.services.documents_store import DocumentsStore  # noqa: E402
+
+
+def _make_source(path: Path, size_mb: int) -> None:
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+
+def _legacy_upload(store: DocumentsStore, src: Path) -> None:
+    # Nachbau des bisherigen Verhaltens (nur für den Vorher-Vergleich)
+    with open(src, "rb") as f:
+        data = f.read()
+    if len(data) > store.max_upload_bytes:
+        raise ValueError("too_large")
+    target = store.storage_root / "legacy" / src.name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(data)
+    hashlib.sha256(target.read_bytes()).hexdigest()  # Evidence-Pfad: erneut komplett lesen
+
+
+def _stream_upload(store: DocumentsStore, src: Path) -> None:
+    with open(src, "rb") as f:
+        store.upload_stream(owner_user_id="bench", filename="scan.pdf", content_type="application/pdf", fileobj=f)
+
+
+def _measure(fn: Callable[[DocumentsStore, Path], None], store: DocumentsStore, src: Path) -> Tuple[float, float]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn(store, src)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024), elapsed
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes-mb", type=int, nargs="+", default=[1, 10, 100])
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        store = DocumentsStore(
+            storage_root=root / "storage",
+            db_path=root / "data" / "documents.sqlite",
+            max_upload_bytes=(max(args.sizes_mb) + 1) * 1024 * 1024,
+            allowed_ext={"pdf"},
+            allowed_mime={"application/pdf"},
+        )
+
+        print("Upload-Speicherprofil (Peak Python-Heap, tracemalloc)")
+        print(f"{'Größe':>8} | {'vorher MiB':>10} {'s':>6} | {'nachher MiB':>11} {'s':>6}")
+        for size_mb in args.sizes_mb:
+            src = root / f"src_{size_mb}mb.pdf"
+            _make_source(src, size_mb)
+            before, t_before = _measure(_legacy_upload, store, src)
+            after, t_after = _measure(_stream_upload, store, src)
+            src.unlink()
+            print(f"{size_mb:>6}MB | {before:>10.1f} {t_before:>6.2f} | {after:>11.1f} {t_after:>6.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,131 @@
+# server/scripts/bench_entries_import.py
+# Benchmark: Werkstatt-Migration (viele Einträge für viele Fahrzeuge).
+# Vorher: ein Request pro Zeile (Fahrzeug laden, Insert, Commit, Refresh) – Nachbau auf ORM-Ebene.
+# Nachher: app.services.entry_import (Batches, executemany, Trust-Summary einmal pro Fahrzeug).
+# Run: poetry run python ./scripts/bench_entries_import.py --rows 100000 --vehicles 500
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+SERVER_ROOT = Path(__file__).resolve().parents[1]
+if str(SERVER_ROOT) not in sys.path:
+    sys.path.insert(0, str(SERVER_ROOT))
+
+os.environ.setdefault("LTC_SECRET_KEY", "bench-secret-key-0123456789abcdef0123")
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.models.vehicle import Vehicle  # noqa: E402
+from app.models.vehicle_entry import VehicleEntry  # noqa: E402
+from app.routers.vehicles import VehicleEntryCreateIn  # noqa: E402
+from app.services.entry_groups import open_entry_group  # noqa: E402
+from app.services.entry_import import import_entries, iter_rows  # noqa: E402
+
+
+def _session(path: Path) -> Session:
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)()
+
+
+def _vehicles(db: Session, n: int) -> list[str]:
+    ids = []
+    for i in range(n):
+        v = Vehicle(owner_user_id="w1", meta={"accident_status": "accident_free"})
+        v.set_vin_from_raw(f"WVWZZZ1JZXW{i:06d}")
+        db.add(v)
+        db.flush()
+        ids.append(v.public_id)
+    db.commit()
+    return ids
+
+
+def _rows(vehicle_ids: list[str], n: int) -> list[dict]:
+    start = date(2010, 1, 1)
+    return [
+        {
+            "vehicle_id": vehicle_ids[i % len(vehicle_ids)],
+            "date": (start + timedelta(days=i % 5000)).isoformat(),
+            "type": "Service",
+            "performed_by": "Werkstatt",
+            "km": i,
+            "trust_level": ("T1", "T2", "T3")[i % 3],
+        }
+        for i in range(n)
+    ]
+
+
+def _legacy_import(db: Session, rows: list[dict]) -> None:
+    # Nachbau des bisherigen Verhaltens (nur für den Vorher-Vergleich): pro Zeile wie POST /entries
+    for row in rows:
+        payload = VehicleEntryCreateIn.model_validate(row)
+        vehicle = db.query(Vehicle).filter(Vehicle.public_id == row["vehicle_id"]).first()
+        entry_id = str(uuid.uuid4())
+        entry = VehicleEntry(
+            id=entry_id,
+            vehicle_id=vehicle.public_id,
+            owner_user_id=vehicle.owner_user_id,
+            entry_group_id=entry_id,
+            version=1,
+            is_latest=True,
+            entry_date=payload.date,
+            entry_type=payload.type,
+            performed_by=payload.performed_by,
+            km=payload.km,
+            trust_level=payload.trust_level,
+        )
+        db.add(entry)
+        open_entry_group(db, entry)
+        db.commit()
+        db.refresh(entry)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--vehicles", type=int, default=500)
+    ap.add_argument("--legacy-rows", type=int, default=2_000, help="Stichprobe für den Vorher-Pfad (hochgerechnet)")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+
+        db = _session(root / "legacy.db")
+        sample = _rows(_vehicles(db, args.vehicles), args.legacy_rows)
+        t0 = time.perf_counter()
+        _legacy_import(db, sample)
+        legacy_s = (time.perf_counter() - t0) / len(sample) * args.rows
+        db.close()
+
+        db = _session(root / "bulk.db")
+        body = "\n".join(json.dumps(r) for r in _rows(_vehicles(db, args.vehicles), args.rows)).encode()
+        t0 = time.perf_counter()
+        report = import_entries(
+            db,
+            iter_rows(io.BytesIO(body), "ndjson"),
+            schema=VehicleEntryCreateIn,
+            can_write=lambda owner: True,
+        )
+        bulk_s = time.perf_counter() - t0
+        db.close()
+
+    print(f"{args.rows} Einträge für {args.vehicles} Fahrzeuge")
+    print(f"- vorher  (pro Zeile, hochgerechnet aus {args.legacy_rows}): {legacy_s:9.1f} s")
+    print(f"- nachher (Bulk-Import, {report.inserted} ok / {report.failed} Fehler):  {bulk_s:9.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
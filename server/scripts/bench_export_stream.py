@@ -0,0 +1,115 @@
+# server/scripts/bench_export_stream.py
+# Benchmark: Spitzen-Speicher beim Export langer Fahrzeughistorien (tracemalloc).
+# Vorher: alle Zeilen als Dict-Baum, Deepcopy-Redaction über den ganzen Export, ein JSON-Blob.
+# Nachher: app.services.export_stream (cursor-basiert, Redaction pro Zeile, NDJSON-Chunks).
+# Run: poetry run python ./scripts/bench_export_stream.py --rows 10000 50000 200000
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+SERVER_ROOT = Path(__file__).resolve().parents[1]
+if str(SERVER_ROOT) not in sys.path:
+    sys.path.insert(0, str(SERVER_ROOT))
+
+os.environ.setdefault("LTC_SECRET_KEY", "bench-secret-key-0123456789abcdef0123")
+
+from sqlalchemy import create_engine, insert, select  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.models.vehicle import Vehicle  # noqa: E402,F401
+from app.models.vehicle_entry import VehicleEntry  # noqa: E402
+from app.routers.export_vehicle import _redact_entry_row  # noqa: E402
+from app.services.export_servicebook_redaction import redact_servicebook_export  # noqa: E402
+from app.services.export_stream import iter_ndjson_export, iter_table_rows  # noqa: E402
+
+_ENTRIES = VehicleEntry.__table__
+
+
+def _seed(path: Path, n: int) -> Engine:
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    Base.metadata.create_all(bind=engine)
+    start = date(2000, 1, 1)
+    rows = [
+        {
+            "id": f"e-{i:08d}",
+            "vehicle_id": "veh-1",
+            "owner_user_id": "u1",
+            "entry_group_id": f"e-{i:08d}",
+            "version": 1,
+            "is_latest": True,
+            "entry_date": start + timedelta(days=i % 9000),
+            "entry_type": "Service",
+            "performed_by": "Werkstatt",
+            "km": i,
+            "note": "Ölwechsel, Filter, Sichtprüfung",
+            "trust_level": "T2",
+        }
+        for i in range(n)
+    ]
+    with engine.begin() as conn:
+        for i in range(0, n, 10_000):
+            conn.execute(insert(_ENTRIES), rows[i : i + 10_000])
+    return engine
+
+
+def _stmt():
+    return select(_ENTRIES).where(_ENTRIES.c.vehicle_id == "veh-1").order_by(_ENTRIES.c.entry_date, _ENTRIES.c.id)
+
+
+def _legacy_export(engine: Engine) -> int:
+    # Nachbau des bisherigen Verhaltens (nur für den Vorher-Vergleich)
+    with engine.connect() as conn:
+        entries = [dict(r) for r in conn.execute(_stmt()).mappings().all()]
+    payload = {"target": "vehicle", "id": "veh-1", "vehicle": {"public_id": "veh-1"}, "entries": entries}
+    redacted = redact_servicebook_export(payload)
+    return len(json.dumps(redacted, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+def _stream_export(engine: Engine) -> int:
+    total = 0
+    for chunk in iter_ndjson_export({"target": "vehicle", "id": "veh-1"}, iter_table_rows(engine, _stmt()), redact=_redact_entry_row):
+        total += len(chunk)  # Chunk geht an den Client und wird verworfen
+    return total
+
+
+def _measure(fn, engine: Engine) -> tuple[float, float, int]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    size = fn(engine)
+    elapsed = time.perf_counter() - t0
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024), elapsed, size
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000, 200_000])
+    args = ap.parse_args()
+
+    print(f"{'Einträge':>9} | {'vorher MiB':>10} {'s':>6} | {'nachher MiB':>11} {'s':>6} | Ausgabe")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.rows:
+            engine = _seed(Path(tmp) / f"bench-{n}.db", n)
+            legacy_mib, legacy_s, legacy_size = _measure(_legacy_export, engine)
+            stream_mib, stream_s, stream_size = _measure(_stream_export, engine)
+            engine.dispose()
+            print(
+                f"{n:>9} | {legacy_mib:>10.1f} {legacy_s:>6.2f} | {stream_mib:>11.1f} {stream_s:>6.2f} | "
+                f"{legacy_size / 1e6:.1f} MB JSON / {stream_size / 1e6:.1f} MB NDJSON"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,64 @@
+# server/scripts/decrypt_export.py
+# Full Export entschlüsseln (LTC_SECRET_KEY aus ENV).
+# Chunked-Container (.ltcx): streamend, Speicher ~ ein Segment, Abbruch bei Manipulation/Abschneiden.
+# Alt-Format: Fernet-Token oder API-Antwort mit "ciphertext" (wird komplett gelesen).
+# Run: poetry run python ./scripts/decrypt_export.py export.ltcx -o export.ndjson
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+SERVER_ROOT = Path(__file__).resolve().parents[1]
+if str(SERVER_ROOT) not in sys.path:
+    sys.path.insert(0, str(SERVER_ROOT))
+
+from app.services.export_crypto import CHUNKED_MAGIC, decrypt_export, decrypt_stream  # noqa: E402
+
+READ_SIZE = 256 * 1024
+
+
+def _read_chunks(fh: BinaryIO, first: bytes) -> Iterator[bytes]:
+    yield first
+    while True:
+        block = fh.read(READ_SIZE)
+        if not block:
+            return
+        yield block
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("input", help="Export-Datei ('-' = stdin)")
+    ap.add_argument("-o", "--output", help="Klartext-Datei (Standard: stdout)")
+    args = ap.parse_args()
+
+    src = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    dst = sys.stdout.buffer if not args.output else open(args.output, "wb")
+    try:
+        first = src.read(len(CHUNKED_MAGIC))
+        if first == CHUNKED_MAGIC:
+            for plain in decrypt_stream(_read_chunks(src, first)):
+                dst.write(plain)
+            return 0
+
+        raw = (first + src.read()).strip()
+        if raw.startswith(b"{"):
+            raw = json.loads(raw)["ciphertext"].encode("utf-8")
+        dst.write(decrypt_export(raw))
+        return 0
+    except ValueError as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if src is not sys.stdin.buffer:
+            src.close()
+        if dst is not sys.stdout.buffer:
+            dst.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
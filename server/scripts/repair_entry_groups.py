@@ -0,0 +1,47 @@
+# server/scripts/repair_entry_groups.py
+# Repair-Job für entry_groups (Kopf + Revisionszahl pro Eintragsgruppe).
+# check:  Abgleich gegen die Revisionsketten in vehicle_entries (Exit-Code 1 bei Drift)
+# repair: fehlende/abweichende Gruppenzeilen neu schreiben, verwaiste löschen
+# Run: poetry run python ./scripts/repair_entry_groups.py check [--vehicle-id <public_id>]
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+SERVER_ROOT = Path(__file__).resolve().parents[1]
+if str(SERVER_ROOT) not in sys.path:
+    sys.path.insert(0, str(SERVER_ROOT))
+
+from app.db.session import get_db, init_db  # noqa: E402
+from app.services.entry_groups import check_entry_groups, repair_entry_groups  # noqa: E402
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("command", choices=("check", "repair"))
+    ap.add_argument("--vehicle-id", default=None)
+    args = ap.parse_args()
+
+    init_db()
+    db_gen = get_db()
+    db = next(db_gen)
+    try:
+        if args.command == "repair":
+            n = repair_entry_groups(db, vehicle_id=args.vehicle_id)
+            print(f"repair: {n} Gruppen korrigiert")
+            return 0
+
+        report = check_entry_groups(db, vehicle_id=args.vehicle_id)
+        for key, ids in report.items():
+            print(f"- {key}: {len(ids)}")
+            for gid in ids[:20]:
+                print(f"    {gid}")
+        return 1 if any(report.values()) else 0
+    finally:
+        db_gen.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,50 @@
+# server/scripts/vehicle_trust_summary.py
+# Wartung der materialisierten Trust-Summary (vehicle_trust_summaries).
+# check:   Abgleich gegen Vollberechnung (Exit-Code 1 bei Abweichungen)
+# rebuild: fehlende/abweichende Zeilen neu schreiben, verwaiste löschen (--all: alle Fahrzeuge)
+# Run: poetry run python ./scripts/vehicle_trust_summary.py check
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+SERVER_ROOT = Path(__file__).resolve().parents[1]
+if str(SERVER_ROOT) not in sys.path:
+    sys.path.insert(0, str(SERVER_ROOT))
+
+from app.db.session import get_db, init_db  # noqa: E402
+from app.services.vehicle_trust import (  # noqa: E402
+    check_vehicle_trust_summaries,
+    rebuild_vehicle_trust_summaries,
+)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("command", choices=("check", "rebuild"))
+    ap.add_argument("--all", action="store_true", help="rebuild: alle Fahrzeuge neu schreiben")
+    args = ap.parse_args()
+
+    init_db()
+    db_gen = get_db()
+    db = next(db_gen)
+    try:
+        if args.command == "rebuild":
+            n = rebuild_vehicle_trust_summaries(db, only_inconsistent=not args.all)
+            print(f"rebuild: {n} Zeilen geschrieben/gelöscht")
+            return 0
+
+        report = check_vehicle_trust_summaries(db)
+        for key, ids in report.items():
+            print(f"- {key}: {len(ids)}")
+            for vid in ids[:20]:
+                print(f"    {vid}")
+        return 1 if any(report.values()) else 0
+    finally:
+        db_gen.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,6 +7,9 @@ os.environ["LTC_SECRET_KEY"] = os.environ.get("LTC_SECRET_KEY") or "test-secret-
 # Export-P0 Tests nutzen historische X-LTC-* Header. Im echten Betrieb bleibt das
 # per ENV-Gate abgeschaltet; fuer Tests wird es explizit aktiviert.
 os.environ["LTC_ALLOW_DEV_HEADERS"] = os.environ.get("LTC_ALLOW_DEV_HEADERS") or "1"
+# Audit synchron: Tests prüfen Audit-Zeilen direkt nach dem Request und teilen sich
+# teils eine StaticPool-Connection. Write-Behind wird in test_audit_sink.py getestet.
+os.environ["LTC_AUDIT_MODE"] = os.environ.get("LTC_AUDIT_MODE") or "sync"
 
 # Ensure settings read the env (cache clear if present)
 try:
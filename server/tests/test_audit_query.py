@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.auth.audit import write_audit
+from app.auth.crypto import token_hash as token_hash_fn
+from app.auth.storage import db, init_db, insert_session, upsert_user
+from app.services.audit_query import SOURCES, query_audit
+from app.services.export_audit import write_export_audit
+
+TEST_SECRET = "x" * 40
+
+
+def _mk_token(db_path: str, role: str) -> str:
+    init_db(db_path)
+    now = datetime.now(timezone.utc)
+    user_id, raw = str(uuid.uuid4()), "t_" + uuid.uuid4().hex
+    with db(db_path) as conn:
+        upsert_user(conn, user_id=user_id, email_hmac="hmac_" + uuid.uuid4().hex, created_at=now.isoformat())
+        conn.execute("UPDATE auth_users SET role = ? WHERE user_id = ?;", (role, user_id))
+        insert_session(
+            conn,
+            session_id=str(uuid.uuid4()),
+            user_id=user_id,
+            token_hash=token_hash_fn(TEST_SECRET, raw),
+            created_at=now.isoformat(),
+            expires_at=(now + timedelta(hours=1)).isoformat(),
+        )
+    return raw
+
+
+@pytest.fixture()
+def auth_env(monkeypatch, tmp_path):
+    db_path = str(tmp_path / "app.db")
+    monkeypatch.setenv("LTC_SECRET_KEY", TEST_SECRET)
+    monkeypatch.setenv("LTC_DB_PATH", db_path)
+    monkeypatch.setenv("LTC_MAILER_MODE", "null")
+    init_db(db_path)
+    with db(db_path) as conn:
+        for i in range(7):
+            write_audit(
+                conn,
+                actor_id="public",
+                actor_role="public",
+                action="AUTH_CHALLENGE_CREATED" if i % 2 else "SESSION_CREATED",
+                target_type="USER",
+                target_id=f"u_{i}",
+                scope="public",
+                result="denied" if i == 3 else "success",
+                request_id=f"r_{i}",
+                redacted_metadata={"kind": "x"},
+            )
+    from app.main import create_app
+
+    return db_path, TestClient(create_app())
+
+
+def test_auth_audit_filters_and_keyset_pages(auth_env):
+    db_path, client = auth_env
+    h = {"Authorization": f"Bearer {_mk_token(db_path, 'superadmin')}"}
+
+    r = client.get("/admin/audit", params={"action": "AUTH_CHALLENGE_CREATED", "limit": 2}, headers=h)
+    assert r.status_code == 200, r.text
+    page1 = r.json()
+    assert [e["target_id"] for e in page1] == ["u_5", "u_3"]
+    assert set(page1[0]) == {"source", "event_id", "at", "action", "result", "module", "actor_role", "target_type", "target_id", "reason"}
+
+    r = client.get("/admin/audit", params={"action": "AUTH_CHALLENGE_CREATED", "limit": 2, "after": page1[-1]["event_id"]}, headers=h)
+    assert [e["target_id"] for e in r.json()] == ["u_1"]
+
+    r = client.get("/admin/audit", params={"result": "denied"}, headers=h)
+    assert [(e["target_id"], e["module"]) for e in r.json()] == [("u_3", "auth")]
+
+    future = (datetime.now(timezone.utc) + timedelta(minutes=5)).isoformat()
+    assert client.get("/admin/audit", params={"since": future}, headers=h).json() == []
+
+    assert client.get("/admin/audit", params={"after": "nope"}, headers=h).json()["detail"] == "invalid_cursor"
+    assert client.get("/admin/audit", params={"source": "nope"}, headers=h).status_code == 400
+
+
+def test_audit_query_requires_superadmin(auth_env):
+    db_path, client = auth_env
+    r = client.get("/admin/audit", headers={"Authorization": f"Bearer {_mk_token(db_path, 'admin')}"})
+    assert r.status_code == 403
+
+
+def test_export_source_uses_query_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'main.db'}", future=True)
+    with Session(engine) as s:
+        for i, ok in enumerate((True, False, True)):
+            write_export_audit(
+                s,
+                event_type="EXPORT_JOB_DOWNLOAD",
+                actor_role="superadmin",
+                actor_user_id="sa_1",
+                target_type="vehicle",
+                target_id=f"v_{i}",
+                success=ok,
+                reason=None if ok else "token_used",
+                critical=True,
+            )
+
+    rows = query_audit("export", db_path=str(tmp_path / "auth.db"), engine=engine, action="EXPORT_JOB_DOWNLOAD")
+    assert [r["target_id"] for r in rows] == ["v_2", "v_1", "v_0"]
+    assert rows[0]["at"].endswith("+00:00")
+    denied = query_audit("export", db_path="", engine=engine, result="denied")
+    assert [(r["target_id"], r["reason"]) for r in denied] == [("v_1", "token_used")]
+
+    src = SOURCES["export"]
+    with engine.connect() as c:
+        plan = c.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN SELECT id FROM {src.table} WHERE event_type = ? ORDER BY created_at DESC, id DESC LIMIT 5",
+            ("x",),
+        ).fetchall()
+    detail = " ".join(str(r[-1]) for r in plan)
+    assert "idx_export_audit_events_q_event_type" in detail and "TEMP B-TREE" not in detail
+
+
+def test_missing_table_returns_empty(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'main.db'}", future=True)
+    assert query_audit("sale_transfer", db_path="", engine=engine) == []
+
+
+def test_auth_query_indexes_come_from_schema_migration(tmp_path):
+    db_path = str(tmp_path / "auth.db")
+    init_db(db_path)
+    with db(db_path) as conn:
+        assert int(conn.execute("PRAGMA user_version;").fetchone()[0]) >= 3
+        names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index';")}
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT event_id FROM auth_audit WHERE action = ? ORDER BY created_at DESC, event_id DESC LIMIT 5",
+            ("x",),
+        ).fetchall()
+    assert {"idx_auth_audit_q_action", "idx_auth_audit_events_q_time", "idx_auth_audit_target"} <= names
+    assert "idx_auth_audit_at" not in names
+    detail = " ".join(str(r[-1]) for r in plan)
+    assert "idx_auth_audit_q_action" in detail and "TEMP B-TREE" not in detail
+    assert query_audit("admin", db_path=db_path) == []
+
+
+def test_audit_query_flushes_write_behind_only_on_request(auth_env, monkeypatch):
+    from app.admin import routes as admin_routes
+
+    db_path, client = auth_env
+    h = {"Authorization": f"Bearer {_mk_token(db_path, 'superadmin')}"}
+    calls = []
+    monkeypatch.setattr(admin_routes, "flush_audit", lambda timeout: calls.append(timeout) or True)
+
+    assert client.get("/admin/audit", headers=h).status_code == 200
+    assert calls == []
+    assert client.get("/admin/audit", params={"flush": "true"}, headers=h).status_code == 200
+    assert calls == [1.0]
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.auth.audit import write_audit
+from app.auth.storage import init_db
+from app.services import audit_sink
+from app.services.audit_sink import AuditSink, TableAuditTarget
+
+
+class ListTarget:
+    def __init__(self, fail_on=None, gate=None):
+        self.key = ("list", id(self))
+        self.rows = []
+        self.calls = 0
+        self.fail_on = fail_on
+        self.gate = gate
+
+    def write(self, rows, conn=None):
+        if self.gate is not None and threading.current_thread().name == "ltc-audit-sink":
+            self.gate.wait(5)
+        self.calls += 1
+        if self.fail_on is not None and any(r["n"] == self.fail_on for r in rows):
+            raise RuntimeError("boom")
+        self.rows.extend(rows)
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'audit.db'}", future=True)
+
+
+def test_batches_rows_with_executemany(engine):
+    t = Table("audit_t", MetaData(), Column("id", Integer, primary_key=True), Column("ev", String(32)))
+    t.create(engine)
+    sink = AuditSink(batch_size=100)
+    gate = threading.Event()
+    blocker = ListTarget(gate=gate)
+    target = TableAuditTarget(engine, t)
+
+    # Flusher hängt am ersten Event -> die übrigen stauen sich und gehen als ein Batch raus
+    sink.emit(blocker, {"n": 0})
+    for i in range(50):
+        sink.emit(target, {"ev": f"e{i}"})
+    gate.set()
+    assert sink.flush()
+
+    with engine.connect() as c:
+        assert c.execute(select(func.count()).select_from(t)).scalar_one() == 50
+    st = sink.stats()
+    assert st["written"] == 51 and st["dropped"] == 0
+    assert st["batches"] < 51
+    sink.stop()
+
+
+def test_critical_and_sync_mode_write_inline():
+    target = ListTarget()
+    sink = AuditSink()
+    sink.emit(target, {"n": 1}, critical=True)
+    assert target.rows == [{"n": 1}] and sink._thread is None
+
+    sync = AuditSink(mode="sync")
+    sync.emit(target, {"n": 2})
+    assert len(target.rows) == 2 and sync.stats()["sync_writes"] == 1
+
+
+def test_overflow_drop_and_back_pressure():
+    gate = threading.Event()
+    target = ListTarget(gate=gate)
+
+    drop = AuditSink(max_queue=1, overflow="drop")
+    for i in range(3):
+        drop.emit(target, {"n": i})
+    assert drop.stats()["dropped"] >= 1
+
+    block = AuditSink(max_queue=1, overflow="block", block_timeout_ms=1)
+    for i in range(3):
+        block.emit(target, {"n": i})
+    # Queue voll -> Producer schreibt selbst statt zu verwerfen
+    assert block.stats()["overflow_writes"] >= 1 and block.stats()["dropped"] == 0
+
+    gate.set()
+    drop.stop()
+    block.stop()
+    st = drop.stats()
+    assert st["written"] + st["dropped"] == 3
+    assert block.stats()["written"] + block.stats()["overflow_writes"] == 3
+
+
+def test_failed_batch_is_retried_row_by_row():
+    target = ListTarget(fail_on=2)
+    sink = AuditSink()
+    for i in range(4):
+        sink._q.put_nowait((target, {"n": i}))
+    sink.stop()
+
+    assert sorted(r["n"] for r in target.rows) == [0, 1, 3]
+    st = sink.stats()
+    assert st["dropped"] == 1 and st["batch_failures"] == 1
+
+
+def test_stop_flushes_queue():
+    target = ListTarget()
+    sink = AuditSink(flush_interval_ms=5_000)
+    for i in range(20):
+        sink.emit(target, {"n": i})
+    sink.stop()
+    assert len(target.rows) == 20 and sink.stats()["queue_depth"] == 0
+
+
+def test_emit_on_commit_discards_rolled_back_events(engine):
+    target = ListTarget()
+    sink = AuditSink()
+
+    with Session(engine) as db:
+        db.execute(select(1))
+        sink.emit_on_commit(db, target, {"n": 1})
+        db.rollback()
+        db.execute(select(1))
+        sink.emit_on_commit(db, target, {"n": 2})
+        assert target.rows == []
+        db.commit()
+    sink.flush()
+    assert target.rows == [{"n": 2}]
+    sink.stop()
+
+
+def test_auth_denials_are_sync_successes_write_behind(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "auth.db")
+    init_db(db_path)
+    sink = AuditSink()
+    monkeypatch.setattr(audit_sink, "_SINK", sink)
+
+    common = dict(actor_id="public", actor_role="public", target_type="USER", target_id=None, scope="public", request_id="r")
+    write_audit(None, db_path=db_path, action="AUTH_CHALLENGE_CREATED", result="denied", reason_code="RATE_LIMIT", **common)
+    write_audit(None, db_path=db_path, action="AUTH_CHALLENGE_DELIVERED", result="success", **common)
+
+    def actions():
+        with sqlite3.connect(db_path) as c:
+            return sorted(r[0] for r in c.execute("SELECT action FROM auth_audit;"))
+
+    assert "AUTH_CHALLENGE_CREATED" in actions()
+    assert sink.flush()
+    assert actions() == ["AUTH_CHALLENGE_CREATED", "AUTH_CHALLENGE_DELIVERED"]
+    sink.stop()
+
+
+def test_emit_after_stop_is_dropped_without_restarting():
+    target = ListTarget()
+    sink = AuditSink()
+    sink.emit(target, {"n": 1})
+    sink.stop()
+
+    sink.emit(target, {"n": 2})
+    assert sink._thread is None
+    assert target.rows == [{"n": 1}] and sink.stats()["dropped"] == 1
+
+    # nur ein expliziter start() öffnet wieder
+    sink.start()
+    sink.emit(target, {"n": 3})
+    sink.stop()
+    assert target.rows == [{"n": 1}, {"n": 3}]
+
+
+def test_failed_otp_attempts_and_denial_audits_persist_in_async_mode(tmp_path, monkeypatch):
+    from app.auth.service import request_challenge, verify_challenge_and_create_session
+    from app.auth.settings import AuthSettings
+
+    sink = AuditSink(mode="async")
+    monkeypatch.setattr(audit_sink, "_SINK", sink)
+    settings = AuthSettings(secret_key="x" * 40, db_path=str(tmp_path / "auth.db"), dev_expose_otp=True, mailer_mode="null")
+    challenge_id, otp = request_challenge(settings, email="a@example.com", ip="127.0.0.1", user_agent="pytest", request_id="r1")
+    wrong = "000000" if otp != "000000" else "111111"
+
+    def verify(code):
+        return verify_challenge_and_create_session(
+            settings, email="a@example.com", challenge_id=challenge_id, otp=code, ip="127.0.0.1", user_agent="pytest", request_id="r2"
+        )
+
+    for _ in range(5):
+        with pytest.raises(ValueError, match="INVALID"):
+            verify(wrong)
+    # Versuchszähler wurde trotz Exception committet -> Lockout greift, auch mit richtigem OTP
+    with pytest.raises(ValueError, match="LOCKED"):
+        verify(otp)
+
+    with sqlite3.connect(settings.db_path) as c:
+        failed = c.execute("SELECT COUNT(*) FROM auth_audit WHERE action = 'AUTH_CHALLENGE_FAILED';").fetchone()[0]
+    assert failed == 5
+    sink.stop()
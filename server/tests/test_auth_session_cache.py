@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.auth.crypto import token_hash as token_hash_fn
+from app.auth.service import logout, resolve_me
+from app.auth.session_cache import SessionCache, get_session_cache
+from app.auth.settings import AuthSettings
+from app.auth.storage import bump_cache_epoch, db, init_db, insert_session, revoke_session, upsert_user
+
+
+TEST_SECRET = "x" * 40
+
+
+def _iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat()
+
+
+def _mk_session(db_path: str, role: str = "user", ttl: timedelta = timedelta(hours=1)) -> tuple[str, str]:
+    init_db(db_path)
+    user_id = str(uuid.uuid4())
+    raw_token = "t_" + uuid.uuid4().hex
+    now = datetime.now(timezone.utc)
+    with db(db_path) as conn:
+        upsert_user(conn, user_id=user_id, email_hmac="hmac_" + uuid.uuid4().hex, created_at=_iso(now))
+        conn.execute("UPDATE auth_users SET role = ? WHERE user_id = ?;", (role, user_id))
+        insert_session(
+            conn,
+            session_id=str(uuid.uuid4()),
+            user_id=user_id,
+            token_hash=token_hash_fn(TEST_SECRET, raw_token),
+            created_at=_iso(now),
+            expires_at=_iso(now + ttl),
+        )
+    return user_id, raw_token
+
+
+def test_resolve_me_is_served_from_cache_after_first_lookup(tmp_path):
+    settings = AuthSettings(secret_key=TEST_SECRET, db_path=str(tmp_path / "auth.db"))
+    user_id, raw_token = _mk_session(settings.db_path, role="dealer")
+    cache = get_session_cache()
+
+    before = cache.stats()
+    assert resolve_me(settings, raw_token) == (user_id, "dealer")
+    assert resolve_me(settings, raw_token) == (user_id, "dealer")
+    after = cache.stats()
+
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+
+def test_logout_invalidates_cached_session(tmp_path):
+    settings = AuthSettings(secret_key=TEST_SECRET, db_path=str(tmp_path / "auth.db"))
+    user_id, raw_token = _mk_session(settings.db_path)
+
+    assert resolve_me(settings, raw_token) == (user_id, "user")
+    logout(settings, raw_token, request_id="rid-test")
+    assert resolve_me(settings, raw_token) is None
+
+
+def test_revoke_and_role_change_in_other_worker_reach_cached_sessions(tmp_path):
+    settings = AuthSettings(secret_key=TEST_SECRET, db_path=str(tmp_path / "auth.db"))
+    user_id, raw_token = _mk_session(settings.db_path)
+    other_id, other_token = _mk_session(settings.db_path)
+    assert resolve_me(settings, raw_token) == (user_id, "user")
+    assert resolve_me(settings, other_token) == (other_id, "user")
+
+    # anderer Prozess: schreibt nur in die DB, lokaler Cache bleibt unberührt
+    with db(settings.db_path) as conn:
+        conn.execute("UPDATE auth_users SET role = 'vip' WHERE user_id = ?;", (other_id,))
+        bump_cache_epoch(conn)
+    assert resolve_me(settings, other_token) == (other_id, "vip")
+
+    with db(settings.db_path) as conn:
+        revoke_session(conn, token_hash_fn(TEST_SECRET, raw_token), _iso(datetime.now(timezone.utc)))
+    assert resolve_me(settings, raw_token) is None
+
+
+def test_cache_entry_is_capped_by_session_expiry(tmp_path):
+    settings = AuthSettings(secret_key=TEST_SECRET, db_path=str(tmp_path / "auth.db"))
+    user_id, raw_token = _mk_session(settings.db_path, ttl=timedelta(seconds=1))
+
+    assert resolve_me(settings, raw_token) == (user_id, "user")
+    time.sleep(1.1)
+    assert resolve_me(settings, raw_token) is None
+
+
+def test_cache_disabled_with_zero_ttl(tmp_path):
+    settings = AuthSettings(secret_key=TEST_SECRET, db_path=str(tmp_path / "auth.db"), session_cache_ttl_seconds=0)
+    _, raw_token = _mk_session(settings.db_path)
+
+    resolve_me(settings, raw_token)
+    assert get_session_cache().get(settings.db_path, token_hash_fn(TEST_SECRET, raw_token)) is None
+
+
+def test_session_cache_lru_eviction_and_user_invalidation():
+    cache = SessionCache(max_entries=2)
+    far = time.time() + 3600
+
+    cache.put("db", "t1", "u1", "user", ttl_seconds=60, expires_at=far, epoch=cache.epoch())
+    cache.put("db", "t2", "u2", "user", ttl_seconds=60, expires_at=far, epoch=cache.epoch())
+    assert cache.get("db", "t1") == ("u1", "user")  # t1 jetzt "recent"
+    cache.put("db", "t3", "u1", "vip", ttl_seconds=60, expires_at=far, epoch=cache.epoch())
+
+    assert cache.get("db", "t2") is None
+    assert cache.stats()["evictions"] == 1
+
+    cache.invalidate_user("u1")
+    assert cache.get("db", "t1") is None
+    assert cache.get("db", "t3") is None
+
+
+def test_put_with_stale_epoch_is_ignored():
+    cache = SessionCache()
+    epoch = cache.epoch()
+    cache.invalidate_token("t1")  # paralleles logout zwischen DB-Read und put()
+    cache.put("db", "t1", "u1", "user", ttl_seconds=60, expires_at=time.time() + 60, epoch=epoch)
+    assert cache.get("db", "t1") is None
+
+
+def test_admin_role_change_invalidates_cached_role(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    from fastapi.testclient import TestClient
+
+    db_path = str(tmp_path / "app.db")
+    monkeypatch.setenv("LTC_SECRET_KEY", TEST_SECRET)
+    monkeypatch.setenv("LTC_DB_PATH", db_path)
+    monkeypatch.setenv("LTC_MAILER_MODE", "null")
+
+    from app.main import create_app
+
+    client = TestClient(create_app())
+    _, admin_token = _mk_session(db_path, role="admin")
+    target_id, target_token = _mk_session(db_path, role="user")
+
+    me = client.get("/auth/me", headers={"Authorization": f"Bearer {target_token}"})
+    assert me.json()["role"] == "user"
+
+    grant = client.post(
+        "/admin/step-up/grant",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        json={"scope": "role_grant", "ttl_seconds": 600},
+    ).json()
+    resp = client.post(
+        f"/admin/users/{target_id}/role",
+        headers={"Authorization": f"Bearer {admin_token}", grant["header"]: grant["step_up_token"]},
+        json={"role": "vip"},
+    )
+    assert resp.status_code == 200, resp.text
+
+    me2 = client.get("/auth/me", headers={"Authorization": f"Bearer {target_token}"})
+    assert me2.json()["role"] == "vip"
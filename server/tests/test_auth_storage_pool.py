@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.auth import storage
+from app.auth.crypto import token_hash as token_hash_fn
+from app.auth.service import resolve_me
+from app.auth.settings import AuthSettings
+from app.auth.storage import db, db_read, init_db, insert_session, upsert_user
+
+
+TEST_SECRET = "x" * 40
+
+
+def _iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat()
+
+
+def _mk_session(db_path: str, role: str = "user") -> tuple[str, str]:
+    user_id = str(uuid.uuid4())
+    raw_token = "t_" + uuid.uuid4().hex
+    now = datetime.now(timezone.utc)
+    with db(db_path) as conn:
+        upsert_user(conn, user_id=user_id, email_hmac="hmac_" + uuid.uuid4().hex, created_at=_iso(now))
+        conn.execute("UPDATE auth_users SET role = ? WHERE user_id = ?;", (role, user_id))
+        insert_session(
+            conn,
+            session_id=str(uuid.uuid4()),
+            user_id=user_id,
+            token_hash=token_hash_fn(TEST_SECRET, raw_token),
+            created_at=_iso(now),
+            expires_at=_iso(now + timedelta(hours=1)),
+        )
+    return user_id, raw_token
+
+
+def test_init_db_runs_schema_bootstrap_once(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    db_path = str(tmp_path / "auth.db")
+    calls: list[int] = []
+    original = storage._create_schema
+
+    def _counting(conn):
+        calls.append(1)
+        original(conn)
+
+    monkeypatch.setattr(storage, "_create_schema", _counting)
+    init_db(db_path)
+    init_db(db_path)
+    assert len(calls) == 1
+
+    # neuer Prozess (leerer Cache): user_version zeigt bereits initialisiertes Schema
+    storage._SCHEMA_READY.discard(db_path)
+    init_db(db_path)
+    assert len(calls) == 1
+
+
+def test_init_db_migrates_v1_schema(tmp_path):
+    import sqlite3
+
+    db_path = str(tmp_path / "auth.db")
+    with sqlite3.connect(db_path) as conn:
+        storage._create_schema(conn)
+        conn.execute("CREATE TABLE auth_rate_limits (key TEXT PRIMARY KEY, window_start TEXT NOT NULL, count INTEGER NOT NULL);")
+        conn.execute("PRAGMA user_version = 1;")
+
+    init_db(db_path)
+    with db_read(db_path) as conn:
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table';")}
+        assert conn.execute("PRAGMA user_version;").fetchone()[0] == storage._SCHEMA_VERSION
+    assert "auth_rate_limits" not in tables
+
+
+def test_writer_rolls_back_on_error_and_readers_see_commits(tmp_path):
+    db_path = str(tmp_path / "auth.db")
+    init_db(db_path)
+
+    with pytest.raises(RuntimeError):
+        with db(db_path) as conn:
+            upsert_user(conn, user_id="u-rollback", email_hmac="h-rollback", created_at="2026-01-01T00:00:00+00:00")
+            raise RuntimeError("boom")
+
+    with db_read(db_path) as conn:
+        assert conn.execute("SELECT 1 FROM auth_users WHERE user_id='u-rollback';").fetchone() is None
+
+    user_id, _ = _mk_session(db_path)
+    with db_read(db_path) as conn:
+        assert conn.execute("SELECT 1 FROM auth_users WHERE user_id=?;", (user_id,)).fetchone() is not None
+
+
+def test_reader_connection_is_query_only(tmp_path):
+    db_path = str(tmp_path / "auth.db")
+    init_db(db_path)
+
+    with db_read(db_path) as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM auth_users;")
+
+
+def test_concurrent_resolve_me_uses_per_thread_readers(tmp_path):
+    db_path = str(tmp_path / "auth.db")
+    init_db(db_path)
+    settings = AuthSettings(secret_key=TEST_SECRET, db_path=db_path)
+    user_id, raw_token = _mk_session(db_path, role="vip")
+
+    results: list[object] = []
+    errors: list[BaseException] = []
+
+    def _worker() -> None:
+        try:
+            for _ in range(25):
+                results.append(resolve_me(settings, raw_token))
+        except BaseException as e:  # pragma: no cover - nur Diagnose
+            errors.append(e)
+
+    threads = [threading.Thread(target=_worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert len(results) == 200
+    assert all(r == (user_id, "vip") for r in results)
+
+
+def test_close_pools_reopens_connections_lazily(tmp_path):
+    db_path = str(tmp_path / "auth.db")
+    init_db(db_path)
+    user_id, _ = _mk_session(db_path)
+
+    storage.close_pools()
+
+    with db_read(db_path) as conn:
+        assert conn.execute("SELECT 1 FROM auth_users WHERE user_id=?;", (user_id,)).fetchone() is not None
+    _mk_session(db_path)
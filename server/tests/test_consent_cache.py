@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, delete, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.consent import policy
+from app.consent.cache import ConsentStatusCache, get_consent_cache, policy_version
+from app.consent.guard import require_consent
+from app.models.consent import ConsentAcceptance
+from app.routers import vehicles as vehicles_mod
+from app.services.consent_store import has_required_consents, record_consents, validate_and_normalize_consents
+
+
+def _consents(version: str = "v1") -> list[dict]:
+    return validate_and_normalize_consents(
+        [
+            {"doc_type": "terms", "doc_version": version, "accepted_at": "2026-02-01T00:00:00Z", "source": "ui"},
+            {"doc_type": "privacy", "doc_version": "v1", "accepted_at": "2026-02-01T00:00:00Z", "source": "ui"},
+        ]
+    )
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:",
+        future=True,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    ConsentAcceptance.__table__.create(engine)
+    return engine
+
+
+@pytest.fixture()
+def queries(engine):
+    seen: list[str] = []
+    event.listen(engine, "before_cursor_execute", lambda *a: seen.append(a[2]))
+    return seen
+
+
+def test_gates_cost_no_queries_after_consent(engine, queries):
+    with Session(engine) as db:
+        record_consents(db, "u_1", _consents())
+
+        assert has_required_consents(db, "u_1")
+        queries.clear()
+        vehicles_mod.require_consent(db, {"role": "user", "user_id": "u_1"})
+        require_consent(db=db, actor={"role": "user", "user_id": "u_1"})
+        assert queries == []
+
+
+def test_missing_consent_is_never_cached(engine):
+    with Session(engine) as db:
+        with pytest.raises(HTTPException) as e:
+            require_consent(db=db, actor={"role": "user", "user_id": "u_2"})
+        assert e.value.detail == "consent_required"
+
+        record_consents(db, "u_2", _consents())
+        require_consent(db=db, actor={"role": "user", "user_id": "u_2"})
+        with pytest.raises(HTTPException):
+            require_consent(db=db, actor={"role": "user"})
+
+
+def test_policy_version_bump_requires_reconsent(engine, monkeypatch):
+    with Session(engine) as db:
+        record_consents(db, "u_3", _consents())
+        assert has_required_consents(db, "u_3")
+
+        monkeypatch.setitem(policy.CURRENT_DOC_VERSIONS, "terms", "v2")
+        assert policy_version() == "privacy:v1,terms:v2"
+        assert not has_required_consents(db, "u_3")
+
+        record_consents(db, "u_3", _consents("v2"))
+        assert has_required_consents(db, "u_3")
+
+
+def test_record_consents_invalidates_user(engine):
+    cache = get_consent_cache()
+    with Session(engine) as db:
+        record_consents(db, "u_4", _consents())
+        assert has_required_consents(db, "u_4")
+        before = cache.stats()["invalidations"]
+
+        # Consent entzogen (direkt in der DB) + erneuter Write -> Cache des Users leer
+        db.execute(delete(ConsentAcceptance).where(ConsentAcceptance.doc_type == "terms"))
+        record_consents(db, "u_4", [])
+        assert cache.stats()["invalidations"] == before + 1
+        assert not has_required_consents(db, "u_4")
+
+
+def test_cache_is_bounded_and_drops_stale_puts():
+    cache = ConsentStatusCache(max_entries=2, ttl_seconds=60)
+    epoch = cache.epoch()
+    cache.invalidate_user("u_1")
+    cache.put(1, "u_1", "v", epoch=epoch)
+    assert not cache.get(1, "u_1", "v")
+
+    for uid in ("a", "b", "c"):
+        cache.put(1, uid, "v", epoch=cache.epoch())
+    assert not cache.get(1, "a", "v") and cache.get(1, "c", "v")
+    assert not cache.get(2, "c", "v")
+    assert cache.stats()["evictions"] == 1
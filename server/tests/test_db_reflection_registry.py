@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, text
+from sqlalchemy.exc import NoSuchTableError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.db.reflection import TableRegistry
+from app.services import servicebook_store
+
+
+def _engine():
+    return create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+
+def test_reflect_is_cached_per_engine():
+    reg = TableRegistry()
+    e1, e2 = _engine(), _engine()
+    for e in (e1, e2):
+        with e.begin() as conn:
+            conn.execute(text("CREATE TABLE vehicles (id TEXT PRIMARY KEY, owner_user_id TEXT)"))
+
+    t1 = reg.reflect(e1, "vehicles")
+    assert reg.reflect(e1, "vehicles") is t1
+    t2 = reg.reflect(e2, "vehicles")
+    assert t2 is not t1
+
+    stats = reg.stats()
+    assert stats["reflections"] == 2
+    assert stats["reflections_avoided"] == 1
+
+
+def test_missing_tables_are_not_negatively_cached():
+    reg = TableRegistry()
+    e = _engine()
+
+    assert reg.find(e, ("servicebook_entries", "servicebook")) is None
+    with pytest.raises(NoSuchTableError):
+        reg.reflect(e, "servicebook")
+
+    with e.begin() as conn:
+        conn.execute(text("CREATE TABLE servicebook (id INTEGER PRIMARY KEY, vehicle_id TEXT)"))
+    assert reg.find(e, ("servicebook_entries", "servicebook")).name == "servicebook"
+
+
+def test_invalidate_reloads_changed_schema():
+    reg = TableRegistry()
+    e = _engine()
+    with e.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+    assert "extra" not in reg.reflect(e, "t").c
+
+    with e.begin() as conn:
+        conn.execute(text("ALTER TABLE t ADD COLUMN extra TEXT"))
+    assert "extra" not in reg.reflect(e, "t").c
+
+    reg.invalidate(e, "t")
+    assert "extra" in reg.reflect(e, "t").c
+
+
+def test_get_or_create_runs_factory_once_and_warm_up_skips_cached():
+    reg = TableRegistry()
+    e = _engine()
+    calls: list[int] = []
+
+    def _factory(bind):
+        calls.append(1)
+        md = MetaData()
+        t = Table("g", md, Column("id", Integer, primary_key=True))
+        md.create_all(bind)
+        return t
+
+    reg.get_or_create(e, "g", _factory)
+    reg.get_or_create(e, "g", _factory)
+    assert len(calls) == 1
+    assert reg.warm_up(e, ("g", "does_not_exist")) == 0
+
+
+def test_servicebook_table_lookup_reflects_only_once():
+    e = _engine()
+    with Session(e) as db:
+        first = servicebook_store.servicebook_entries_table(db)
+        db.commit()
+    with Session(e) as db:
+        assert servicebook_store.servicebook_entries_table(db) is first
+
+
+def test_get_or_create_ddl_survives_caller_rollback(tmp_path):
+    reg = TableRegistry()
+    e = create_engine(f"sqlite:///{tmp_path / 'reg.db'}")
+
+    def _factory(conn):
+        md = MetaData()
+        t = Table("g", md, Column("id", Integer, primary_key=True))
+        md.create_all(conn)
+        conn.execute(t.insert().values(id=1))
+        return t
+
+    with Session(e) as db:
+        t = reg.get_or_create(db, "g", _factory)
+        db.execute(t.insert().values(id=2))
+        db.rollback()
+
+    # DDL + Daten der factory sind in eigener Transaktion committet, nur id=2 ist weg
+    with e.connect() as conn:
+        assert conn.execute(text("SELECT id FROM g")).scalars().all() == [1]
+    assert reg.get(e, "g") is t
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import socket
+import struct
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.models.documents import DocumentApprovalStatus, DocumentScanStatus
+from app.services.document_scan import (
+    EICAR_SIGNATURE,
+    ClamdScanner,
+    ScanError,
+    ScanWorkerPool,
+    StubScanner,
+)
+from app.services.documents_store import DocumentsStore
+
+PDF = b"%PDF-1.4\nhello\n%%EOF\n"
+
+
+def _store(td: Path) -> DocumentsStore:
+    return DocumentsStore(
+        storage_root=td / "storage",
+        db_path=td / "data" / "app.db",
+        max_upload_bytes=1024 * 1024,
+        allowed_ext={"pdf"},
+        allowed_mime={"application/pdf"},
+        scan_mode="stub",
+    )
+
+
+def _upload(store: DocumentsStore, data: bytes = PDF, owner: str = "u1") -> str:
+    return store.upload(
+        owner_user_id=owner, filename="d.pdf", content_type="application/pdf", content_bytes=data
+    ).id
+
+
+class _FlakyScanner:
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+        self.calls = 0
+
+    def scan(self, path: Path) -> DocumentScanStatus:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ScanError("scanner busy")
+        return DocumentScanStatus.CLEAN
+
+
+def test_upload_enqueues_and_run_once_sets_clean_or_infected(tmp_path):
+    with _store(tmp_path) as store:
+        clean = _upload(store)
+        bad = _upload(store, b"%PDF-1.4\n" + EICAR_SIGNATURE + b"\n%%EOF\n")
+        assert store.scan_queue_depth() == {"queued": 2}
+
+        pool = ScanWorkerPool(store, StubScanner(), workers=1)
+        assert pool.run_once() == 2
+
+        assert store.get(clean).scan_status == DocumentScanStatus.CLEAN
+        infected = store.get(bad)
+        assert infected.scan_status == DocumentScanStatus.INFECTED
+        assert infected.approval_status == DocumentApprovalStatus.REJECTED
+        assert store.scan_queue_depth() == {"done": 2}
+        assert pool.metrics.stats()["processed"] == 2
+        assert pool.metrics.stats()["infected"] == 1
+
+
+def test_identical_blob_is_scanned_once_for_all_siblings(tmp_path):
+    with _store(tmp_path) as store:
+        a = _upload(store, owner="u1")
+        b = _upload(store, owner="u2")
+        scanner = _FlakyScanner(failures=0)
+        pool = ScanWorkerPool(store, scanner, workers=1, batch_size=1)
+
+        assert pool.run_once() == 1
+        assert pool.run_once() == 0
+        assert scanner.calls == 1
+        assert store.get(a).scan_status == store.get(b).scan_status == DocumentScanStatus.CLEAN
+
+
+def test_retry_with_backoff_then_final_error(tmp_path):
+    with _store(tmp_path) as store:
+        doc = _upload(store)
+        pool = ScanWorkerPool(store, _FlakyScanner(failures=10), workers=1, max_attempts=2, backoff_base=0.05)
+
+        assert pool.run_once() == 1
+        assert store.get(doc).scan_status == DocumentScanStatus.PENDING
+        assert pool.run_once() == 0  # Backoff noch nicht abgelaufen
+        time.sleep(0.1)
+        assert pool.run_once() == 1
+
+        assert store.get(doc).scan_status == DocumentScanStatus.ERROR
+        assert store.scan_queue_depth() == {"failed": 1}
+        stats = pool.metrics.stats()
+        assert (stats["retries"], stats["failed"]) == (1, 1)
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    with _store(tmp_path) as store:
+        doc = _upload(store)
+        assert len(store.claim_scan_jobs("crashed", limit=10, lease_seconds=0.01)) == 1
+        assert store.claim_scan_jobs("other", limit=10, lease_seconds=60) == []
+        time.sleep(0.05)
+
+        pool = ScanWorkerPool(store, StubScanner(), workers=1)
+        assert pool.run_once() == 1
+        assert store.get(doc).scan_status == DocumentScanStatus.CLEAN
+
+
+def test_background_pool_drains_backlog(tmp_path):
+    with _store(tmp_path) as store:
+        ids = [_upload(store, PDF + str(i).encode()) for i in range(12)]
+        pool = ScanWorkerPool(store, StubScanner(), workers=4, poll_interval=0.01)
+        pool.start()
+        try:
+            deadline = time.time() + 10
+            while time.time() < deadline and store.scan_queue_depth() != {"done": 12}:
+                time.sleep(0.02)
+        finally:
+            pool.stop()
+
+        assert all(store.get(i).scan_status == DocumentScanStatus.CLEAN for i in ids)
+        assert pool.metrics.stats()["processed"] == 12
+        assert pool.metrics.stats()["in_flight"] == 0
+
+
+def _fake_clamd(reply: bytes):
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(1)
+    received: list[bytes] = []
+
+    def _serve() -> None:
+        conn, _ = srv.accept()
+        with conn:
+            buf = b""
+            while not buf.startswith(b"zINSTREAM\0"):
+                buf += conn.recv(4096)
+            buf = buf[len(b"zINSTREAM\0"):]
+            data = b""
+            while True:
+                while len(buf) < 4:
+                    buf += conn.recv(4096)
+                (n,) = struct.unpack("!L", buf[:4])
+                buf = buf[4:]
+                if n == 0:
+                    break
+                while len(buf) < n:
+                    buf += conn.recv(4096)
+                data, buf = data + buf[:n], buf[n:]
+            received.append(data)
+            conn.sendall(reply)
+        srv.close()
+
+    threading.Thread(target=_serve, daemon=True).start()
+    return srv.getsockname(), received
+
+
+@pytest.mark.parametrize(
+    "reply,expected",
+    [
+        (b"stream: OK\0", DocumentScanStatus.CLEAN),
+        (b"stream: Eicar-Signature FOUND\0", DocumentScanStatus.INFECTED),
+    ],
+)
+def test_clamd_scanner_instream(tmp_path, reply, expected):
+    f = tmp_path / "x.pdf"
+    f.write_bytes(PDF * 5000)
+    addr, received = _fake_clamd(reply)
+
+    scanner = ClamdScanner(addr, timeout=5)
+    scanner.chunk_bytes = 4096
+    assert scanner.scan(f) == expected
+    assert received == [PDF * 5000]
+
+
+def test_clamd_scanner_errors_are_retryable(tmp_path):
+    f = tmp_path / "x.pdf"
+    f.write_bytes(PDF)
+    addr, _ = _fake_clamd(b"INSTREAM size limit exceeded. ERROR\0")
+    with pytest.raises(ScanError):
+        ClamdScanner(addr, timeout=5).scan(f)
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        closed = s.getsockname()
+    with pytest.raises(ScanError):
+        ClamdScanner(closed, timeout=1).scan(f)
+
+
+def test_exhausted_expired_lease_is_failed_not_reclaimed(tmp_path):
+    with _store(tmp_path) as store:
+        doc = _upload(store)
+        for _ in range(2):
+            assert len(store.claim_scan_jobs("crashed", limit=10, lease_seconds=0.01, max_attempts=2)) == 1
+            time.sleep(0.05)
+
+        # zwei abgestürzte Versuche: kein dritter Claim, Job endet als failed
+        assert store.claim_scan_jobs("other", limit=10, lease_seconds=60, max_attempts=2) == []
+        assert store.scan_queue_depth() == {"failed": 1}
+        assert store.get(doc).scan_status == DocumentScanStatus.ERROR
+
+
+def test_finished_jobs_are_purged_after_ttl(tmp_path):
+    with _store(tmp_path) as store:
+        _upload(store)
+        ScanWorkerPool(store, StubScanner(), workers=1).run_once()
+        assert store.purge_scan_jobs(older_than_seconds=3600) == 0
+        assert store.purge_scan_jobs(older_than_seconds=0) == 1
+        assert store.scan_queue_depth() == {}
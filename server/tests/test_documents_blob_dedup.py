@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+
+from app.models.documents import DocumentApprovalStatus, DocumentScanStatus
+from app.services.documents_store import DocumentsStore
+
+
+PDF = b"%PDF-1.4\n% invoice 4711\n%%EOF\n"
+
+
+def _store(td: Path) -> DocumentsStore:
+    return DocumentsStore(
+        storage_root=td / "storage",
+        db_path=td / "data" / "app.db",
+        max_upload_bytes=1024 * 1024,
+        allowed_ext={"pdf"},
+        allowed_mime={"application/pdf"},
+        scan_mode="stub",
+    )
+
+
+def _upload(store: DocumentsStore, owner: str = "u1", data: bytes = PDF, name: str = "r.pdf"):
+    return store.upload(owner_user_id=owner, filename=name, content_type="application/pdf", content_bytes=data)
+
+
+def _blob_row(store: DocumentsStore, sha: str):
+    con = sqlite3.connect(store.db_path)
+    try:
+        return con.execute("SELECT refcount, scan_status FROM document_blobs WHERE sha256 = ?", (sha,)).fetchone()
+    finally:
+        con.close()
+
+
+def _blob_files(store: DocumentsStore) -> list[Path]:
+    return sorted(p for p in (store.storage_root / "blobs").glob("*/*"))
+
+
+def test_same_content_is_stored_once_with_refcount(tmp_path):
+    store = _store(tmp_path)
+    a = _upload(store, owner="dealer-1", name="a.pdf")
+    b = _upload(store, owner="dealer-2", name="b.pdf")
+    c = _upload(store, data=PDF + b"other")
+
+    assert a.id != b.id
+    assert a.checksum_sha256 == b.checksum_sha256
+    ra, rb = store.get(a.id), store.get(b.id)
+    assert ra.storage_relpath == rb.storage_relpath == DocumentsStore.blob_relpath(a.checksum_sha256)
+    assert ra.filename == "a.pdf" and rb.filename == "b.pdf"
+
+    assert len(_blob_files(store)) == 2
+    assert _blob_row(store, a.checksum_sha256)[0] == 2
+    assert _blob_row(store, c.checksum_sha256)[0] == 1
+    assert list((store.storage_root / "tmp").iterdir()) == []
+
+
+def test_delete_releases_reference_and_gc_removes_orphaned_blob(tmp_path):
+    store = _store(tmp_path)
+    a = _upload(store)
+    b = _upload(store)
+    path = store.file_path(store.get(a.id))
+
+    store.delete(a.id)
+    assert store.gc_blobs() == 0
+    assert path.exists()
+    assert store.file_path(store.get(b.id)).read_bytes() == PDF
+
+    store.delete(b.id)
+    assert _blob_row(store, a.checksum_sha256)[0] == 0
+    assert store.gc_blobs() == 1
+    assert not path.exists()
+    assert _blob_row(store, a.checksum_sha256) is None
+
+    with pytest.raises(KeyError):
+        store.delete(a.id)
+
+    # nach GC wieder hochladbar
+    again = _upload(store)
+    assert store.file_path(store.get(again.id)).read_bytes() == PDF
+
+
+def test_gc_removes_stray_files_only_after_grace(tmp_path):
+    store = _store(tmp_path)
+    _upload(store)
+    stray = store.storage_root / "blobs" / "ff" / ("f" * 64)
+    stray.parent.mkdir(parents=True, exist_ok=True)
+    stray.write_bytes(b"abgebrochener upload")
+
+    assert store.gc_blobs(grace_seconds=3600) == 0
+    old = time.time() - 7200
+    os.utime(stray, (old, old))
+    assert store.gc_blobs(grace_seconds=3600) == 1
+    assert not stray.exists()
+    assert len(_blob_files(store)) == 1
+
+
+def test_scan_result_is_reused_per_blob(tmp_path):
+    store = _store(tmp_path)
+    first = _upload(store, owner="u1")
+    pending_sibling = _upload(store, owner="u2")
+
+    store.set_scan_status(first.id, DocumentScanStatus.CLEAN)
+    assert store.get(pending_sibling.id).scan_status == DocumentScanStatus.CLEAN.value
+    assert _blob_row(store, first.checksum_sha256)[1] == DocumentScanStatus.CLEAN.value
+
+    later = _upload(store, owner="u3")
+    assert later.scan_status == DocumentScanStatus.CLEAN
+    # Freigabe bleibt pro Dokument
+    assert later.approval_status == DocumentApprovalStatus.QUARANTINED
+
+
+def test_infected_blob_rejects_new_uploads_of_same_content(tmp_path):
+    store = _store(tmp_path)
+    first = _upload(store)
+    store.set_scan_status(first.id, DocumentScanStatus.INFECTED)
+
+    again = _upload(store, owner="u9")
+    assert again.scan_status == DocumentScanStatus.INFECTED
+    assert again.approval_status == DocumentApprovalStatus.REJECTED
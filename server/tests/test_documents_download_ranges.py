@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.ranged_files import RangeNotSatisfiable, parse_range_header
+from app.models.documents import DocumentScanStatus
+from app.routers import documents as documents_router
+from app.services.documents_store import DocumentsStore
+
+
+DATA = b"%PDF-1.4\n" + bytes(range(256)) * 8 + b"\n%%EOF\n"
+
+
+def _client(store: DocumentsStore, actor: Dict[str, Any]) -> TestClient:
+    app = FastAPI()
+    app.include_router(documents_router.router)
+    app.dependency_overrides[documents_router.get_documents_store] = lambda: store
+    app.dependency_overrides[documents_router.require_actor] = lambda: actor
+    return TestClient(app)
+
+
+@pytest.fixture()
+def setup(tmp_path: Path):
+    store = DocumentsStore(
+        storage_root=tmp_path / "storage",
+        db_path=tmp_path / "data" / "app.db",
+        max_upload_bytes=1024 * 1024,
+        allowed_ext={"pdf"},
+        allowed_mime={"application/pdf"},
+        scan_mode="stub",
+    )
+    doc = store.upload(owner_user_id="u1", filename="scan.pdf", content_type="application/pdf", content_bytes=DATA)
+    store.set_scan_status(doc.id, DocumentScanStatus.CLEAN)
+    store.approve(doc.id)
+    return store, doc, _client(store, {"role": "user", "user_id": "u1"})
+
+
+def test_full_download_carries_strong_etag_and_304_on_match(setup):
+    _, doc, client = setup
+    r = client.get(f"/documents/{doc.id}/download")
+    assert r.status_code == 200
+    assert r.content == DATA
+    assert r.headers["etag"] == f'"{doc.checksum_sha256}"'
+    assert r.headers["accept-ranges"] == "bytes"
+
+    r2 = client.get(f"/documents/{doc.id}/download", headers={"If-None-Match": r.headers["etag"]})
+    assert r2.status_code == 304
+    assert r2.content == b""
+
+    r3 = client.get(f"/documents/{doc.id}/download", headers={"If-None-Match": '"other"'})
+    assert r3.status_code == 200
+
+
+def test_single_and_suffix_ranges(setup):
+    _, doc, client = setup
+    r = client.get(f"/documents/{doc.id}/download", headers={"Range": "bytes=9-18"})
+    assert r.status_code == 206
+    assert r.content == DATA[9:19]
+    assert r.headers["content-range"] == f"bytes 9-18/{len(DATA)}"
+
+    r = client.get(f"/documents/{doc.id}/download", headers={"Range": "bytes=-7"})
+    assert r.status_code == 206
+    assert r.content == DATA[-7:]
+
+
+def test_multi_range_returns_multipart_byteranges(setup):
+    _, doc, client = setup
+    r = client.get(f"/documents/{doc.id}/download", headers={"Range": "bytes=0-3,100-109"})
+    assert r.status_code == 206
+    ctype = r.headers["content-type"]
+    assert ctype.startswith("multipart/byteranges; boundary=")
+    boundary = ctype.split("boundary=", 1)[1].encode()
+
+    body = r.content
+    assert int(r.headers["content-length"]) == len(body)
+    assert body.endswith(b"--" + boundary + b"--\r\n")
+    assert b"Content-Range: bytes 0-3/" in body and DATA[0:4] in body
+    assert b"Content-Range: bytes 100-109/" in body and DATA[100:110] in body
+
+
+def test_unsatisfiable_range_and_if_range_mismatch(setup):
+    _, doc, client = setup
+    r = client.get(f"/documents/{doc.id}/download", headers={"Range": f"bytes={len(DATA) + 5}-"})
+    assert r.status_code == 416
+    assert r.headers["content-range"] == f"bytes */{len(DATA)}"
+
+    r = client.get(f"/documents/{doc.id}/download", headers={"Range": "bytes=0-3", "If-Range": '"stale"'})
+    assert r.status_code == 200
+    assert r.content == DATA
+
+
+def test_authorization_runs_before_conditional_get(setup):
+    store, doc, _ = setup
+    stranger = _client(store, {"role": "user", "user_id": "u2"})
+    r = stranger.get(
+        f"/documents/{doc.id}/download",
+        headers={"If-None-Match": f'"{doc.checksum_sha256}"', "Range": "bytes=0-3"},
+    )
+    assert r.status_code == 403
+
+
+def test_parse_range_header_edge_cases():
+    assert parse_range_header(None, 100) is None
+    assert parse_range_header("items=0-1", 100) is None
+    assert parse_range_header("bytes=5-1", 100) is None
+    assert parse_range_header("bytes=0-9,5-19,50-", 100) == [(0, 20), (50, 100)]
+    assert parse_range_header("bytes=90-200", 100) == [(90, 100)]
+    assert parse_range_header(",".join(["bytes=0-0"] + [f"{i}-{i}" for i in range(2, 40, 2)]), 100) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header("bytes=100-", 100)
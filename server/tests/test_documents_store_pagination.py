@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.models.documents import DocumentApprovalStatus, DocumentScanStatus
+from app.routers import documents as documents_router
+from app.services import documents_store
+from app.services.documents_store import DocumentsStore
+
+
+def _store(td: Path) -> DocumentsStore:
+    return DocumentsStore(
+        storage_root=td / "storage",
+        db_path=td / "data" / "app.db",
+        max_upload_bytes=1024 * 1024,
+        allowed_ext={"pdf"},
+        allowed_mime={"application/pdf"},
+        scan_mode="stub",
+    )
+
+
+def _seed(store: DocumentsStore, n: int, owner: str = "u1") -> list[str]:
+    ids = []
+    for i in range(n):
+        out = store.upload(
+            owner_user_id=owner,
+            filename=f"d{i}.pdf",
+            content_type="application/pdf",
+            content_bytes=b"%PDF-1.4\n" + str(i).encode() + b"\n%%EOF\n",
+        )
+        ids.append(out.id)
+    return ids
+
+
+def _client(store: DocumentsStore, actor: Dict[str, Any]) -> TestClient:
+    app = FastAPI()
+    app.include_router(documents_router.router)
+    app.dependency_overrides[documents_router.get_documents_store] = lambda: store
+    app.dependency_overrides[documents_router.require_actor] = lambda: actor
+    return TestClient(app)
+
+
+def test_list_quarantine_keyset_pages_cover_everything_once(tmp_path):
+    with _store(tmp_path) as store:
+        ids = _seed(store, 7)
+
+        seen: list[str] = []
+        after = None
+        while True:
+            page = store.list_quarantine(after=after, limit=3)
+            if not page:
+                break
+            seen.extend(d.id for d in page)
+            after = page[-1].id
+
+        assert sorted(seen) == sorted(ids)
+        assert len(seen) == len(set(seen))
+        created = [store.get(i).created_at for i in seen]
+        assert created == sorted(created, reverse=True)
+
+        with pytest.raises(KeyError):
+            store.list_quarantine(after="does-not-exist")
+
+
+def test_list_by_owner_filters_owner_and_status(tmp_path):
+    with _store(tmp_path) as store:
+        mine = _seed(store, 3, owner="u1")
+        _seed(store, 2, owner="u2")
+        store.set_scan_status(mine[0], DocumentScanStatus.CLEAN)
+        store.approve(mine[0])
+
+        assert {d.id for d in store.list_by_owner("u1")} == set(mine)
+        approved = store.list_by_owner("u1", approval_status=DocumentApprovalStatus.APPROVED)
+        assert [d.id for d in approved] == [mine[0]]
+
+
+def test_routes_paginate_and_respect_visibility(tmp_path):
+    with _store(tmp_path) as store:
+        ids = _seed(store, 4, owner="u1")
+        store.set_scan_status(ids[1], DocumentScanStatus.CLEAN)
+        store.approve(ids[1])
+
+        admin = _client(store, {"role": "admin", "user_id": "a1"})
+        first = admin.get("/documents/admin/quarantine", params={"limit": 2}).json()
+        second = admin.get("/documents/admin/quarantine", params={"limit": 2, "after": first[-1]["id"]}).json()
+        assert len(first) == 2 and len(second) == 1
+        assert admin.get("/documents/admin/quarantine", params={"after": "nope"}).status_code == 400
+        assert admin.get("/documents/admin/quarantine", params={"limit": 10_000}).status_code == 422
+        assert len(admin.get("/documents/admin/owners/u1").json()) == 4
+
+        user = _client(store, {"role": "user", "user_id": "u1"})
+        assert [d["id"] for d in user.get("/documents/mine").json()] == [ids[1]]
+        assert user.get("/documents/admin/owners/u1").status_code == 403
+
+
+def test_schema_migration_adds_indexes_and_sets_version(tmp_path):
+    with _store(tmp_path) as store:
+        pass
+
+    con = sqlite3.connect(store.db_path)
+    try:
+        names = {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='index';")}
+        version = con.execute("PRAGMA user_version;").fetchone()[0]
+        plan = con.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM documents WHERE approval_status = ? "
+            "ORDER BY created_at DESC, id DESC LIMIT 10",
+            ("QUARANTINED",),
+        ).fetchall()
+    finally:
+        con.close()
+
+    assert {"idx_documents_status_created", "idx_documents_owner_created", "idx_documents_checksum"} <= names
+    assert version == documents_store._SCHEMA_VERSION
+    assert not any("TEMP B-TREE" in str(row) for row in plan)
+
+
+def test_pooled_connections_are_reused_and_thread_safe(tmp_path):
+    with _store(tmp_path) as store:
+        ids = _seed(store, 3)
+        with store._read() as a:
+            pass
+        with store._read() as b:
+            pass
+        assert a is b
+
+        errors: list[BaseException] = []
+
+        def _worker() -> None:
+            try:
+                for _ in range(20):
+                    store.list_quarantine(limit=2)
+                    store.get(ids[0])
+            except BaseException as e:  # pragma: no cover - nur Diagnose
+                errors.append(e)
+
+        threads = [threading.Thread(target=_worker) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert not errors
+
+    # nach close() lazy neu geöffnet
+    assert store.get(ids[0]).id == ids[0]
+    store.close()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import sqlite3
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import documents as documents_router
+from app.services import documents_store as ds
+from app.services.documents_store import DocumentsStore
+
+
+def _store(td: Path, max_upload_bytes: int = 1024 * 1024) -> DocumentsStore:
+    return DocumentsStore(
+        storage_root=td / "storage",
+        db_path=td / "data" / "app.db",
+        max_upload_bytes=max_upload_bytes,
+        allowed_ext={"pdf"},
+        allowed_mime={"application/pdf"},
+        scan_mode="stub",
+    )
+
+
+class _RecordingReader(io.RawIOBase):
+    def __init__(self, data: bytes) -> None:
+        self._buf = io.BytesIO(data)
+        self.read_sizes: list[int] = []
+
+    def read(self, size: int = -1) -> bytes:
+        self.read_sizes.append(size)
+        return self._buf.read(size)
+
+
+def test_upload_stream_hashes_while_writing_in_bounded_chunks(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(ds, "UPLOAD_CHUNK_BYTES", 1000)
+    store = _store(tmp_path)
+    data = b"%PDF-1.4\n" + bytes(range(256)) * 40
+
+    reader = _RecordingReader(data)
+    out = store.upload_stream(owner_user_id="u1", filename="r.pdf", content_type="application/pdf", fileobj=reader)
+
+    assert all(0 < s <= 1000 for s in reader.read_sizes)
+    assert out.size_bytes == len(data)
+    assert out.checksum_sha256 == hashlib.sha256(data).hexdigest()
+
+    rec = store.get(out.id)
+    assert rec.checksum_sha256 == out.checksum_sha256
+    assert store.file_path(rec).read_bytes() == data
+    assert list((tmp_path / "storage" / "tmp").iterdir()) == []
+
+
+def test_too_large_aborts_early_and_leaves_no_files(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(ds, "UPLOAD_CHUNK_BYTES", 100)
+    store = _store(tmp_path, max_upload_bytes=250)
+    reader = _RecordingReader(b"x" * 10_000)
+
+    with pytest.raises(ValueError, match="too_large"):
+        store.upload_stream(owner_user_id="u1", filename="big.pdf", content_type="application/pdf", fileobj=reader)
+
+    assert len(reader.read_sizes) == 3  # Abbruch beim ersten Chunk über dem Limit
+    assert list((tmp_path / "storage" / "tmp").iterdir()) == []
+    assert not (tmp_path / "storage" / "documents").exists() or not any((tmp_path / "storage" / "documents").iterdir())
+    assert store.list_quarantine() == []
+
+
+def test_upload_endpoint_streams_and_maps_too_large(tmp_path):
+    store = _store(tmp_path, max_upload_bytes=64)
+    app = FastAPI()
+    app.include_router(documents_router.router)
+    app.dependency_overrides[documents_router.get_documents_store] = lambda: store
+    app.dependency_overrides[documents_router.require_actor] = lambda: {"role": "user", "user_id": "u1"}
+    client = TestClient(app)
+
+    small = b"%PDF-1.4\n%%EOF\n"
+    r = client.post("/documents/upload", files={"file": ("t.pdf", small, "application/pdf")})
+    assert r.status_code == 200, r.text
+    assert r.json()["checksum_sha256"] == hashlib.sha256(small).hexdigest()
+
+    r = client.post("/documents/upload", files={"file": ("t.pdf", b"x" * 65, "application/pdf")})
+    assert r.status_code == 413
+
+
+def test_legacy_documents_table_gets_checksum_column(tmp_path):
+    db_path = tmp_path / "data" / "app.db"
+    db_path.parent.mkdir(parents=True)
+    con = sqlite3.connect(db_path)
+    con.execute(
+        """
+        CREATE TABLE documents (
+          id TEXT PRIMARY KEY, owner_user_id TEXT NOT NULL, filename TEXT NOT NULL,
+          content_type TEXT NOT NULL, size_bytes INTEGER NOT NULL, storage_relpath TEXT NOT NULL,
+          created_at TEXT NOT NULL, approval_status TEXT NOT NULL, scan_status TEXT NOT NULL
+        );
+        """
+    )
+    con.execute(
+        "INSERT INTO documents VALUES ('old', 'u1', 'a.pdf', 'application/pdf', 1, 'documents/old_a.pdf', "
+        "'2026-01-01T00:00:00+00:00', 'QUARANTINED', 'PENDING');"
+    )
+    con.commit()
+    con.close()
+
+    store = _store(tmp_path)
+    assert store.get("old").checksum_sha256 is None
@@ -0,0 +1,135 @@
+import os
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("LTC_SECRET_KEY", "dev_test_secret_key_32_chars_minimum__OK")
+
+from app.db.base import Base  # noqa: E402
+from app.models.vehicle import Vehicle  # noqa: E402
+from app.models.vehicle_entry import EntryGroup, VehicleEntry  # noqa: E402
+from app.services.entry_groups import (  # noqa: E402
+    EntryGroupConflict,
+    advance_entry_group,
+    check_entry_groups,
+    repair_entry_groups,
+)
+
+ENTRY = {"date": "2026-01-05", "type": "Service", "performed_by": "Werkstatt", "km": 5000}
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite+pysqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        future=True,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture()
+def client(db, monkeypatch):
+    from app.routers import vehicles as vehicles_mod
+
+    app = FastAPI()
+    app.include_router(vehicles_mod.router)
+
+    def _get_db():
+        yield db
+
+    app.dependency_overrides[vehicles_mod.get_db] = _get_db
+    app.dependency_overrides[vehicles_mod.require_actor] = lambda: {"user_id": "u1", "role": "user"}
+    monkeypatch.setattr(vehicles_mod, "require_consent", lambda db, actor: None, raising=True)
+    return TestClient(app)
+
+
+def _revise(client, vehicle_id: str, entry_id: str, km: int) -> dict:
+    r = client.post(f"/vehicles/{vehicle_id}/entries/{entry_id}/revisions", json={**ENTRY, "km": km})
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def test_create_and_revisions_maintain_group_head_and_count(client, db):
+    vehicle_id = client.post("/vehicles", json={"vin": "WVWZZZ1JZXW000001"}).json()["id"]
+    first = client.post(f"/vehicles/{vehicle_id}/entries", json=ENTRY).json()
+
+    group = db.get(EntryGroup, first["entry_group_id"])
+    assert (group.head_entry_id, group.revision_count) == (first["id"], 1)
+
+    second = _revise(client, vehicle_id, first["id"], 5100)
+    third = _revise(client, vehicle_id, second["id"], 5200)
+    assert third["revision_count"] == 3
+
+    db.expire_all()
+    group = db.get(EntryGroup, first["entry_group_id"])
+    assert (group.head_entry_id, group.revision_count) == (third["id"], 3)
+
+    listed = client.get(f"/vehicles/{vehicle_id}/entries").json()
+    assert [(e["id"], e["revision_count"]) for e in listed] == [(third["id"], 3)]
+
+    # Historie seitenweise: Revisionszahl kommt aus entry_groups, nicht aus der geladenen Teilkette
+    page = client.get(f"/vehicles/{vehicle_id}/entries/{third['id']}/history", params={"limit": 1, "after_version": 1})
+    assert [(e["version"], e["revision_count"]) for e in page.json()] == [(2, 3)]
+    assert len(client.get(f"/vehicles/{vehicle_id}/entries/{first['id']}/history").json()) == 3
+
+    assert check_entry_groups(db) == {"missing": [], "drifted": [], "orphaned": []}
+
+
+def test_advancing_a_stale_head_conflicts(client, db):
+    vehicle_id = client.post("/vehicles", json={"vin": "WVWZZZ1JZXW000001"}).json()["id"]
+    first = client.post(f"/vehicles/{vehicle_id}/entries", json=ENTRY).json()
+    _revise(client, vehicle_id, first["id"], 5100)
+
+    stale = db.get(VehicleEntry, first["id"])
+    late = VehicleEntry(id="late-revision", vehicle_id=vehicle_id, entry_group_id=stale.entry_group_id)
+    with pytest.raises(EntryGroupConflict):
+        advance_entry_group(db, previous=stale, revision=late)
+    db.rollback()
+
+
+def test_legacy_chains_fall_back_and_repair_fixes_drift(client, db):
+    vehicle_id = client.post("/vehicles", json={"vin": "WVWZZZ1JZXW000001"}).json()["id"]
+    owner = db.query(Vehicle).filter(Vehicle.public_id == vehicle_id).one().owner_user_id
+
+    # Altbestand: Kette direkt in vehicle_entries, ohne Gruppenzeile
+    for version in (1, 2):
+        db.add(
+            VehicleEntry(
+                id=f"legacy-{version}",
+                vehicle_id=vehicle_id,
+                owner_user_id=owner,
+                entry_group_id="legacy",
+                version=version,
+                is_latest=version == 2,
+                entry_date=date(2026, 1, 1),
+                entry_type="Service",
+                performed_by="Werkstatt",
+                km=1000 * version,
+            )
+        )
+    db.commit()
+    tracked = client.post(f"/vehicles/{vehicle_id}/entries", json=ENTRY).json()
+    db.execute(text("UPDATE entry_groups SET revision_count = 7 WHERE group_id = :g"), {"g": tracked["entry_group_id"]})
+    db.commit()
+
+    counts = {e["id"]: e["revision_count"] for e in client.get(f"/vehicles/{vehicle_id}/entries").json()}
+    assert counts["legacy-2"] == 2
+
+    assert check_entry_groups(db) == {"missing": ["legacy"], "drifted": [tracked["entry_group_id"]], "orphaned": []}
+    assert repair_entry_groups(db) == 2
+    assert check_entry_groups(db) == {"missing": [], "drifted": [], "orphaned": []}
+
+    # Revision auf Altbestand nach Repair zählt weiter
+    assert _revise(client, vehicle_id, "legacy-2", 3000)["revision_count"] == 3
@@ -0,0 +1,90 @@
+import json
+import os
+import struct
+
+import pytest
+
+os.environ.setdefault("LTC_SECRET_KEY", "dev_test_secret_key_32_chars_minimum__OK")
+
+from app.services.export_crypto import (  # noqa: E402
+    CHUNKED_MAGIC,
+    CHUNKED_VERSION,
+    _encrypt_segments,
+    decrypt_export,
+    decrypt_stream,
+    encrypt_json,
+    encrypt_json_chunked,
+    encrypt_stream,
+    is_chunked,
+)
+
+
+def _blob(plain: bytes, chunk_size: int = 1024) -> bytes:
+    pieces = [plain[i : i + 777] for i in range(0, len(plain), 777)]
+    return b"".join(encrypt_stream(pieces, chunk_size=chunk_size))
+
+
+@pytest.mark.parametrize("size", [0, 1, 1024, 1025, 10_000])
+def test_roundtrip_across_segment_boundaries(size):
+    plain = os.urandom(size)
+    blob = _blob(plain)
+    assert is_chunked(blob)
+    # Eingabe in ungünstigen Stücken (Reader muss über Grenzen puffern)
+    pieces = [blob[i : i + 100] for i in range(0, len(blob), 100)]
+    assert b"".join(decrypt_stream(pieces)) == plain
+
+
+def test_segments_are_bounded_and_overhead_is_small():
+    plain = os.urandom(200_000)
+    segments = list(encrypt_stream([plain], chunk_size=4096))
+    assert max(len(s) for s in segments) <= 4096 + 16 + 4
+    # kein base64: Overhead nur Header + Tag/Länge je Segment
+    assert sum(len(s) for s in segments) < len(plain) * 1.01
+
+
+def test_tampering_truncation_and_reordering_are_detected():
+    plain = os.urandom(5000)
+    segments = list(encrypt_stream([plain], chunk_size=1024))
+    header, body = segments[0], segments[1:]
+
+    flipped = bytearray(b"".join(segments))
+    flipped[-5] ^= 1
+    truncated = header + b"".join(body[:-1])  # letztes (last=1) Segment fehlt
+    reordered = header + body[1] + body[0] + b"".join(body[2:])
+    bad_header = bytearray(b"".join(segments))
+    bad_header[10] ^= 1  # chunk_size/Salt verändert => Header-HMAC passt nicht
+    trailing = b"".join(segments) + struct.pack(">I", 16) + b"x" * 16
+
+    for blob in (bytes(flipped), truncated, reordered, bytes(bad_header), trailing):
+        with pytest.raises(ValueError):
+            b"".join(decrypt_stream([blob]))
+
+
+def test_wrong_secret_fails():
+    blob = b"".join(encrypt_stream([b"geheim"], secret="another-secret-key-0123456789abcdef"))
+    with pytest.raises(ValueError):
+        decrypt_export(blob)
+
+
+def test_decrypt_export_reads_chunked_and_legacy_fernet():
+    payload = {"target": "vehicle", "id": "veh_1", "vehicle": {"vin": "WVWZZZ1JZXW000001"}}
+    chunked = b"".join(encrypt_json_chunked(payload, chunk_size=16))
+    assert json.loads(decrypt_export(chunked)) == payload
+
+    legacy = encrypt_json(payload)
+    assert not is_chunked(legacy)
+    assert json.loads(decrypt_export(legacy)) == payload
+    assert decrypt_export(legacy.encode())[:1] == b"{"
+
+
+def test_magic_is_versioned():
+    blob = _blob(b"x")
+    assert blob[:4] == CHUNKED_MAGIC and blob[4] == CHUNKED_VERSION == 2
+
+
+def test_v1_container_with_raw_secret_still_decrypts():
+    # v1 (vor Keyring-Ableitung): HKDF direkt über das rohe Secret
+    secret = os.environ["LTC_SECRET_KEY"]
+    blob = b"".join(_encrypt_segments([b"alt-export"], 1024, secret.encode("utf-8"), version=1))
+    assert blob[4] == 1
+    assert b"".join(decrypt_stream([blob])) == b"alt-export"
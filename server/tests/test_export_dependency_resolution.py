@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.requests import Request
+
+from app import rbac
+from app.routers import export_vehicle as ev
+
+
+def _request(app: FastAPI, actor=None) -> Request:
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b"", "app": app, "state": {}}
+    req = Request(scope)
+    if actor is not None:
+        req.state.actor = actor
+    return req
+
+
+@pytest.fixture()
+def app_with_overrides():
+    SessionLocal = sessionmaker(bind=create_engine("sqlite+pysqlite:///:memory:", future=True), future=True)
+    calls = {"db": 0, "actor": 0}
+
+    def override_get_db():
+        calls["db"] += 1
+        with SessionLocal() as s:
+            yield s
+
+    def override_actor():
+        calls["actor"] += 1
+        return {"role": "superadmin", "user_id": "sa_1"}
+
+    app = FastAPI()
+    app.dependency_overrides[ev.get_db] = override_get_db
+    app.dependency_overrides[ev.get_actor] = override_actor
+    return app, calls
+
+
+def _get_db(req: Request) -> Session:
+    gen = ev.get_db(req)
+    db = next(gen)
+    gen.close()
+    return db
+
+
+def test_chain_is_compiled_once_per_overrides_state(app_with_overrides):
+    app, calls = app_with_overrides
+    before = ev.resolution_stats()["compiles"]
+
+    for _ in range(5):
+        assert ev.get_actor(_request(app))["user_id"] == "sa_1"
+        assert isinstance(_get_db(_request(app)), Session)
+    assert ev.resolution_stats()["compiles"] == before + 1
+
+    # jede Quelle direkt aufgerufen: get_actor öffnet den DB-Override nie
+    assert calls == {"db": 5, "actor": 5}
+
+    app.dependency_overrides[ev.get_actor] = lambda: {"role": "admin", "user_id": "a_1"}
+    assert ev.get_actor(_request(app))["role"] == "admin"
+    assert ev.resolution_stats()["compiles"] == before + 2
+
+
+def test_without_overrides_uses_state_actor():
+    app = FastAPI()
+    assert ev.get_actor(_request(app, actor={"role": "user", "user_id": "u_1"}))["user_id"] == "u_1"
+    with pytest.raises(HTTPException) as e:
+        ev.get_actor(_request(app))
+    assert e.value.status_code == 401
+
+
+def test_di_only_callables_are_not_called_directly():
+    # Depends()-Defaults: direkter Aufruf würde das Marker-Objekt als Argument bekommen
+    assert ev._compile_call(rbac.get_current_user) is None
+    assert ev._compile_call(lambda: 1)(None) == 1
+    assert ev._compile_call(lambda request: request)("req") == "req"
+    assert ev._compile_call(lambda *, app: app) is not None
+    assert ev._compile_call(lambda a, b: None) is None
+
+
+def test_state_session_factory_is_resolved_once():
+    SessionLocal = sessionmaker(bind=create_engine("sqlite+pysqlite:///:memory:", future=True), future=True)
+    app = FastAPI()
+    app.state.SessionLocal = SessionLocal
+    assert isinstance(_get_db(_request(app)), Session)
+
+    res = ev._RESOLUTIONS[app]
+    assert _get_db(_request(app)) is not None and ev._RESOLUTIONS[app] is res
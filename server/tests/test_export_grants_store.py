@@ -0,0 +1,178 @@
+import datetime as dt
+
+import pytest
+from sqlalchemy import Boolean, Column, DateTime, Integer, MetaData, String, Table, create_engine, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.core.keyring import get_keyring
+from app.services.export_store import (
+    GRANTS_TABLE,
+    consume_one_time_token,
+    issue_one_time_token,
+    purge_expired_grants,
+)
+
+
+@pytest.fixture()
+def engine(monkeypatch):
+    monkeypatch.setenv("LTC_SECRET_KEY", "dev-only-change-me-please-change-me-32chars-XXXX")
+    return create_engine(
+        "sqlite+pysqlite:///:memory:",
+        future=True,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+
+def _grants(engine) -> Table:
+    return Table(GRANTS_TABLE, MetaData(), autoload_with=engine)
+
+
+def _issue(engine, **kw):
+    with Session(engine) as db:
+        return issue_one_time_token(db, resource_type="vehicle", resource_id="veh_1", issued_by_role="superadmin", issued_by_user_id="sa_1", **kw)
+
+
+def _consume(engine, token: str, resource_id: str = "veh_1"):
+    with Session(engine) as db:
+        return consume_one_time_token(db, "vehicle", resource_id, token)
+
+
+def test_consume_is_one_time_and_stores_only_hmac(engine):
+    tok, _exp = _issue(engine, ttl_seconds=60, uses=1)
+
+    rows = [dict(r) for r in Session(engine).execute(select(_grants(engine))).mappings()]
+    assert len(rows) == 1 and tok not in rows[0].values()
+    assert rows[0]["token_hmac"] == get_keyring().hmac_hex("export.token", tok)
+
+    with pytest.raises(PermissionError, match="token_invalid"):
+        _consume(engine, tok, resource_id="veh_2")
+    assert _consume(engine, tok)["remaining_uses"] == 0
+    with pytest.raises(PermissionError, match="token_used"):
+        _consume(engine, tok)
+    with pytest.raises(PermissionError, match="token_invalid"):
+        _consume(engine, "unknown")
+
+
+def test_expired_grant_is_rejected_and_purged(engine):
+    tok, _exp = _issue(engine, ttl_seconds=60, uses=3)
+    live, _exp = _issue(engine, ttl_seconds=600)
+    grants = _grants(engine)
+    with engine.begin() as conn:
+        past = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None) - dt.timedelta(seconds=5)
+        conn.execute(update(grants).where(grants.c.token_hmac == get_keyring().hmac_hex("export.token", tok)).values(expires_at=past))
+
+    with pytest.raises(PermissionError, match="token_expired"):
+        _consume(engine, tok)
+
+    assert purge_expired_grants(engine, batch_size=1) == 1
+    assert purge_expired_grants(engine) == 0
+    with Session(engine) as db:
+        assert db.execute(select(grants.c.remaining_uses)).scalars().all() == [1]
+    _consume(engine, live)
+
+
+def test_token_hmac_is_unique(engine):
+    _issue(engine, token="fixed-token-value")
+    with pytest.raises(IntegrityError):
+        _issue(engine, token="fixed-token-value")
+
+
+def test_legacy_tables_are_folded_in(engine):
+    now = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+    future, past = now + dt.timedelta(minutes=5), now - dt.timedelta(minutes=5)
+    md = MetaData()
+    router_style = Table(
+        "export_grants_vehicle",
+        md,
+        Column("id", Integer, primary_key=True),
+        Column("export_token", String, nullable=False),
+        Column("vehicle_id", String, nullable=False),
+        Column("expires_at", DateTime, nullable=False),
+        Column("used", Boolean, nullable=False),
+        Column("created_at", DateTime, nullable=False),
+    )
+    store_style = Table(
+        "export_grants_masterclipboard",
+        md,
+        Column("id", String, primary_key=True),
+        Column("resource_type", String, nullable=False),
+        Column("resource_id", String, nullable=False),
+        Column("token_hmac", String, nullable=False),
+        Column("expires_at", DateTime, nullable=False),
+        Column("remaining_uses", Integer, nullable=False),
+        Column("issued_by_role", String),
+        Column("issued_by_user_id", String),
+        Column("created_at", DateTime, nullable=False),
+    )
+    md.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            router_style.insert(),
+            [
+                {"export_token": "legacy-open", "vehicle_id": "veh_1", "expires_at": future, "used": False, "created_at": now},
+                {"export_token": "legacy-used", "vehicle_id": "veh_1", "expires_at": future, "used": True, "created_at": now},
+                {"export_token": "legacy-old", "vehicle_id": "veh_1", "expires_at": past, "used": False, "created_at": now},
+            ],
+        )
+        conn.execute(
+            store_style.insert().values(
+                id="g1",
+                resource_type="masterclipboard",
+                resource_id="mc_1",
+                token_hmac=get_keyring().hmac_hex("export.token", "store-token"),
+                expires_at=future,
+                remaining_uses=2,
+                issued_by_role="superadmin",
+                created_at=now,
+            )
+        )
+
+    # erster Zugriff legt die gemeinsame Tabelle an und migriert
+    _consume(engine, "legacy-open")
+    with pytest.raises(PermissionError):
+        _consume(engine, "legacy-used")
+    with Session(engine) as db:
+        assert consume_one_time_token(db, "masterclipboard", "mc_1", "store-token")["remaining_uses"] == 1
+
+    assert not any(name.startswith("export_grants_") for name in inspect(engine).get_table_names())
+    with Session(engine) as db:
+        assert db.execute(select(_grants(engine).c.resource_type)).scalars().all().count("vehicle") == 1
+
+
+def test_legacy_migration_survives_request_rollback_and_skips_unknown_tables(tmp_path, monkeypatch):
+    monkeypatch.setenv("LTC_SECRET_KEY", "dev-only-change-me-please-change-me-32chars-XXXX")
+    engine = create_engine(f"sqlite+pysqlite:///{tmp_path / 'grants.db'}", future=True)
+    now = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+    md = MetaData()
+    legacy = Table(
+        "export_grants_user",
+        md,
+        Column("id", Integer, primary_key=True),
+        Column("export_token", String, nullable=False),
+        Column("user_id", String, nullable=False),
+        Column("expires_at", DateTime, nullable=False),
+        Column("used", Boolean, nullable=False),
+        Column("created_at", DateTime, nullable=False),
+    )
+    # passt zum Präfix, ist aber keine Grant-Tabelle
+    other = Table("export_grants_archive", md, Column("id", Integer, primary_key=True))
+    md.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            legacy.insert().values(
+                export_token="legacy-user", user_id="u_1", expires_at=now + dt.timedelta(minutes=5), used=False, created_at=now
+            )
+        )
+        conn.execute(other.insert().values(id=1))
+
+    with Session(engine) as db:
+        with pytest.raises(PermissionError):
+            consume_one_time_token(db, "user", "u_2", "legacy-user")  # rollt die Request-Session zurück
+
+    names = set(inspect(engine).get_table_names())
+    assert "export_grants_user" not in names and "export_grants_archive" in names
+    with Session(engine) as db:
+        assert consume_one_time_token(db, "user", "u_1", "legacy-user")["remaining_uses"] == 0
@@ -0,0 +1,232 @@
+import datetime as dt
+import json
+import os
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import Column, Date, Integer, MetaData, String, Table, create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.routers import export_jobs, export_vehicle
+from app.services import export_jobs as jobs_service
+from app.services.export_crypto import decrypt_stream
+from app.services.export_jobs import ExportJobQueue
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    # Datei-DB: Worker-Threads bekommen eigene Connections (StaticPool würde eine Connection teilen)
+    engine = create_engine(
+        f"sqlite+pysqlite:///{tmp_path / 'jobs.db'}",
+        future=True,
+        connect_args={"check_same_thread": False},
+    )
+    md = MetaData()
+    vehicles = Table(
+        "vehicles",
+        md,
+        Column("id", String, primary_key=True),
+        Column("owner_id", String, nullable=True),
+        Column("vin", String, nullable=True),
+    )
+    entries = Table(
+        "vehicle_entries",
+        md,
+        Column("id", String, primary_key=True),
+        Column("vehicle_id", String, nullable=False),
+        Column("entry_date", Date, nullable=False),
+        Column("entry_type", String, nullable=False),
+        Column("km", Integer, nullable=True),
+    )
+    md.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(vehicles).values(id="veh_1", owner_id="user_1", vin="WVWZZZ1JZXW000001"))
+        conn.execute(
+            insert(entries),
+            [
+                {"id": f"e_{i:03d}", "vehicle_id": "veh_1", "entry_date": dt.date(2021, 1, 1), "entry_type": "Service", "km": i}
+                for i in range(300)
+            ],
+        )
+    return engine
+
+
+@pytest.fixture()
+def queue(tmp_path, monkeypatch):
+    q = ExportJobQueue(tmp_path / "jobs", workers=1, max_pending=2, ttl_seconds=60)
+    monkeypatch.setattr(jobs_service, "_QUEUE", q)
+    yield q
+    q.stop()
+
+
+@pytest.fixture()
+def client(engine, queue, monkeypatch):
+    monkeypatch.setenv("LTC_SECRET_KEY", "dev-only-change-me-please-change-me-32chars-XXXX")
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+    app = FastAPI()
+    app.include_router(export_jobs.router)
+
+    def override_get_db():
+        with SessionLocal() as s:
+            yield s
+
+    actor_box = {"actor": {"role": "superadmin", "user_id": "sa_1"}}
+    app.dependency_overrides[export_vehicle.get_db] = override_get_db
+    app.dependency_overrides[export_vehicle.get_actor] = lambda: actor_box["actor"]
+    app.state._actor_box = actor_box
+    return TestClient(app)
+
+
+def _wait_done(client, job_id: str) -> dict:
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        job = client.get(f"/export/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError("export job did not finish")
+
+
+def test_job_lifecycle_with_one_time_download(client, queue):
+    r = client.post("/export/vehicle/veh_1/jobs")
+    assert r.status_code == 202, r.text
+    job = _wait_done(client, r.json()["job_id"])
+    assert job["status"] == "done" and job["size_bytes"] > 0
+    assert job["download"] == f"/export/jobs/{job['job_id']}/download"
+
+    url = job["download"]
+    assert client.get(url).status_code == 400
+    tok = client.post(f"/export/jobs/{job['job_id']}/grant").json()["export_token"]
+    d = client.get(url, headers={"X-Export-Token": tok})
+    assert d.status_code == 200
+    assert d.headers["x-export-alg"] == "aes256gcm-chunked-v1"
+    assert b"WVWZZZ" not in d.content
+
+    lines = [json.loads(line) for line in b"".join(decrypt_stream([d.content])).splitlines()]
+    assert lines[0]["vehicle"]["vin"] == "WVWZZZ1JZXW000001"
+    assert lines[-1] == {"type": "end", "count": 300}
+
+    # Grant ist one-time
+    assert client.get(url, headers={"X-Export-Token": tok}).status_code == 403
+
+    stats = queue.metrics.stats()
+    assert stats["completed"] == 1 and stats["queue_depth"] == 0 and stats["duration_ms_p50"] > 0
+
+
+def test_ranged_or_conditional_download_still_delivers_whole_file(client):
+    job = _wait_done(client, client.post("/export/vehicle/veh_1/jobs").json()["job_id"])
+    url = job["download"]
+
+    # Token wird beim Download verbraucht: 206/304 dürfen ihn nicht verbrennen
+    for extra in ({"Range": "bytes=0-99"}, {"If-None-Match": "*"}):
+        tok = client.post(f"/export/jobs/{job['job_id']}/grant").json()["export_token"]
+        d = client.get(url, headers={"X-Export-Token": tok, **extra})
+        assert d.status_code == 200
+        assert d.headers["accept-ranges"] == "none" and "content-range" not in d.headers
+        assert len(d.content) == job["size_bytes"]
+        lines = [json.loads(line) for line in b"".join(decrypt_stream([d.content])).splitlines()]
+        assert lines[-1] == {"type": "end", "count": 300}
+
+
+def test_jobs_are_superadmin_and_owner_only(client):
+    box = client.app.state._actor_box
+    box["actor"] = {"role": "admin", "user_id": "a_1"}
+    assert client.post("/export/vehicle/veh_1/jobs").status_code == 403
+
+    box["actor"] = {"role": "superadmin", "user_id": "sa_1"}
+    assert client.post("/export/vehicle/missing/jobs").status_code == 404
+    assert client.post("/export/documents/veh_1/jobs").status_code == 404
+    job_id = client.post("/export/vehicle/veh_1/jobs").json()["job_id"]
+
+    box["actor"] = {"role": "superadmin", "user_id": "sa_2"}
+    assert client.get(f"/export/jobs/{job_id}").status_code == 404
+    assert client.post(f"/export/jobs/{job_id}/grant").status_code == 404
+
+
+def test_failed_build_is_reported_without_artifact(engine, queue):
+    def broken(_db, _rid):
+        raise ValueError("PRIVATE DATA")
+
+    job = queue.submit(engine, kind="vehicle", resource_id="veh_1", build=broken, requested_by_role="superadmin", requested_by_user_id="sa_1")
+    deadline = time.time() + 10
+    while queue.get(engine, job["id"])["status"] not in ("done", "failed") and time.time() < deadline:
+        time.sleep(0.02)
+    row = queue.get(engine, job["id"])
+    assert row["status"] == "failed" and row["error"] == "ValueError"
+    assert list(queue.artifact_dir.glob("*")) == []
+
+
+def test_queue_is_bounded(engine, queue):
+    release = threading.Event()
+
+    def slow(_db, _rid):
+        release.wait(5)
+        return [b"{}\n"]
+
+    for _ in range(2):
+        queue.submit(engine, kind="vehicle", resource_id="veh_1", build=slow, requested_by_role="superadmin", requested_by_user_id="sa_1")
+    with pytest.raises(jobs_service.ExportQueueFull):
+        queue.submit(engine, kind="vehicle", resource_id="veh_1", build=slow, requested_by_role="superadmin", requested_by_user_id="sa_1")
+    assert queue.metrics.stats()["rejected"] == 1
+
+    # Limit gilt über die DB, nicht pro Prozess
+    other = ExportJobQueue(queue.artifact_dir, workers=1, max_pending=2, ttl_seconds=60)
+    try:
+        with pytest.raises(jobs_service.ExportQueueFull):
+            other.submit(engine, kind="vehicle", resource_id="veh_1", build=slow, requested_by_role="superadmin", requested_by_user_id="sa_1")
+    finally:
+        release.set()
+        other.stop()
+
+
+def test_stale_jobs_from_earlier_runs_are_failed_and_purged(engine, queue):
+    t = jobs_service.jobs_table(engine)
+    old = jobs_service._utcnow_naive() - dt.timedelta(hours=2)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(t),
+            [
+                {"id": "j_run", "kind": "vehicle", "resource_id": "veh_1", "status": "running", "created_at": old, "started_at": old},
+                {"id": "j_new", "kind": "vehicle", "resource_id": "veh_1", "status": "queued", "created_at": jobs_service._utcnow_naive(), "started_at": None},
+            ],
+        )
+
+    queue.attach(engine)
+    assert queue.get(engine, "j_run")["status"] == "failed"
+    assert queue.get(engine, "j_run")["error"] == "stale"
+    assert queue.get(engine, "j_new")["status"] == "queued"
+
+    later = dt.datetime.now(dt.timezone.utc) + dt.timedelta(days=8)
+    assert queue.purge(engine) == 0
+    assert queue.purge(engine, now=later) == 1
+    assert queue.get(engine, "j_run") is None and queue.get(engine, "j_new") is not None
+
+
+def test_sweep_removes_leftover_files_without_known_engine(queue):
+    queue.artifact_dir.mkdir(parents=True)
+    leftover = queue.artifact_dir / "from-last-run.ltcx"
+    partial = queue.artifact_dir / "crashed.part"
+    fresh = queue.artifact_dir / "fresh.ltcx"
+    for p in (leftover, partial, fresh):
+        p.write_bytes(b"x")
+    past = time.time() - 7200
+    os.utime(leftover, (past, past))
+    os.utime(partial, (past, past))
+
+    assert queue.sweep_artifacts() == 2
+    assert [p.name for p in queue.artifact_dir.iterdir()] == ["fresh.ltcx"]
+
+
+def test_expired_artifacts_are_removed(client, engine, queue):
+    job = _wait_done(client, client.post("/export/vehicle/veh_1/jobs").json()["job_id"])
+    assert queue.artifact_path(job["job_id"]).exists()
+
+    assert queue.cleanup(engine, now=dt.datetime.now(dt.timezone.utc)) == 0
+    assert queue.cleanup(engine, now=dt.datetime.now(dt.timezone.utc) + dt.timedelta(seconds=61)) == 1
+    assert not queue.artifact_path(job["job_id"]).exists()
+    assert client.get(f"/export/jobs/{job['job_id']}").json()["status"] == "expired"
+    assert client.post(f"/export/jobs/{job['job_id']}/grant").status_code == 410
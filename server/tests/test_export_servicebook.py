@@ -188,7 +188,7 @@ def test_ttl_enforced_without_sleep(app: FastAPI, client: TestClient):
     with SessionLocal() as s:
         engine = s.get_bind()
         md = MetaData()
-        grants = Table("export_grants_servicebook", md, autoload_with=engine)
+        grants = Table("export_grants", md, autoload_with=engine)
 
         row = s.execute(select(grants).limit(1)).mappings().first()
         assert row
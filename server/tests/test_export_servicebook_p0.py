@@ -9,6 +9,7 @@ from sqlalchemy import DateTime as SA_DateTime, MetaData, Table, insert, select,
 from sqlalchemy.orm import Session
 from starlette.requests import Request
 
+from app.core.keyring import get_keyring
 from app.routers import export_vehicle as ev
 
 
@@ -137,10 +138,11 @@ def test_export_servicebook_p0_grant_persist_full_one_time_ttl_and_moderator_403
     assert isinstance(token, str) and len(token) > 10
 
     with _db_from_client(client) as db:
-        grants = Table("export_grants_servicebook", MetaData(), autoload_with=db.get_bind())
-        rows = db.execute(select(grants).where(grants.c.servicebook_id == sbid)).mappings().all()
+        grants = Table("export_grants", MetaData(), autoload_with=db.get_bind())
+        rows = db.execute(select(grants).where(grants.c.resource_type == "servicebook", grants.c.resource_id == sbid)).mappings().all()
         assert len(rows) == 1
-        assert rows[0]["export_token"] == token
+        assert rows[0]["token_hmac"] == get_keyring().hmac_hex("export.token", token)
+        assert rows[0]["remaining_uses"] == 1
 
     r_full = client.get(f"/export/servicebook/{sbid}/full", headers={**sa_headers, "X-Export-Token": token})
     assert r_full.status_code == 200, r_full.text
@@ -153,8 +155,8 @@ def test_export_servicebook_p0_grant_persist_full_one_time_ttl_and_moderator_403
     exp_token = r_grant_exp.json()["token"]
 
     with _db_from_client(client) as db:
-        grants = Table("export_grants_servicebook", MetaData(), autoload_with=db.get_bind())
-        row = db.execute(select(grants).where(grants.c.export_token == exp_token)).mappings().first()
+        grants = Table("export_grants", MetaData(), autoload_with=db.get_bind())
+        row = db.execute(select(grants).where(grants.c.token_hmac == get_keyring().hmac_hex("export.token", exp_token))).mappings().first()
         assert row is not None
         past = datetime.now(timezone.utc) - timedelta(seconds=5)
         db.execute(update(grants).where(grants.c.id == row["id"]).values(expires_at=past))
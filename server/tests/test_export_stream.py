@@ -0,0 +1,170 @@
+import datetime as dt
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import Column, Date, DateTime, Integer, MetaData, String, Table, create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.routers import export_servicebook, export_vehicle
+from app.services.export_stream import iter_ndjson_export
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:",
+        future=True,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    md = MetaData()
+    vehicles = Table(
+        "vehicles",
+        md,
+        Column("id", String, primary_key=True),
+        Column("owner_id", String, nullable=True),
+        Column("vin", String, nullable=True),
+        Column("owner_email", String, nullable=True),
+    )
+    entries = Table(
+        "vehicle_entries",
+        md,
+        Column("id", String, primary_key=True),
+        Column("vehicle_id", String, nullable=False),
+        Column("owner_user_id", String, nullable=True),
+        Column("entry_date", Date, nullable=False),
+        Column("entry_type", String, nullable=False),
+        Column("km", Integer, nullable=True),
+        Column("note", String, nullable=True),
+    )
+    servicebook = Table(
+        "servicebook_entries",
+        md,
+        Column("id", String, primary_key=True),
+        Column("servicebook_id", String, nullable=False),
+        Column("owner_id", String, nullable=True),
+        Column("entry_type", String, nullable=True),
+        Column("notes", String, nullable=True),
+        Column("created_at", DateTime(timezone=True), nullable=True),
+    )
+    md.create_all(engine)
+
+    with engine.begin() as conn:
+        conn.execute(insert(vehicles).values(id="veh_1", owner_id="user_1", vin="WVWZZZ1JZXW000001", owner_email="p@example.com"))
+        conn.execute(
+            insert(entries),
+            [
+                {
+                    "id": f"e_{i:04d}",
+                    "vehicle_id": "veh_1",
+                    "owner_user_id": "user_1",
+                    "entry_date": dt.date(2020, 1, 1) + dt.timedelta(days=i),
+                    "entry_type": "Service",
+                    "km": 1000 * i,
+                    "note": "PRIVATE",
+                }
+                for i in range(1200)
+            ],
+        )
+        conn.execute(
+            insert(servicebook),
+            [
+                {"id": f"s_{i:04d}", "servicebook_id": "sb_1", "owner_id": "user_1", "entry_type": "service", "notes": "FREE TEXT"}
+                for i in range(5)
+            ],
+        )
+    return engine
+
+
+@pytest.fixture()
+def app(engine, monkeypatch):
+    monkeypatch.setenv("LTC_SECRET_KEY", "dev-only-change-me-please-change-me-32chars-XXXX")
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+    app = FastAPI()
+    app.include_router(export_vehicle.router)
+    app.include_router(export_servicebook.router)
+
+    def override_get_db():
+        with SessionLocal() as s:
+            yield s
+
+    actor_box = {"actor": {"role": "user", "user_id": "user_1"}}
+    app.dependency_overrides[export_vehicle.get_db] = override_get_db
+    app.dependency_overrides[export_vehicle.get_actor] = lambda: actor_box["actor"]
+    app.state._actor_box = actor_box
+    return app
+
+
+def _lines(r) -> list[dict]:
+    return [json.loads(line) for line in r.text.splitlines()]
+
+
+def test_vehicle_stream_is_redacted_ndjson_with_full_history(app):
+    client = TestClient(app)
+    r = client.get("/export/vehicle/veh_1/stream")
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = _lines(r)
+    header, rows, end = lines[0], lines[1:-1], lines[-1]
+    assert header["type"] == "header" and header["_redacted"] is True and "vin_hmac" in header
+    assert end == {"type": "end", "count": 1200}
+    assert [row["data"]["id"] for row in rows[:2]] == ["e_0000", "e_0001"]
+    assert "PRIVATE" not in r.text and "p@example.com" not in r.text and "WVWZZZ" not in r.text
+    assert all("owner_user_id" not in row["data"] for row in rows)
+
+
+def test_stream_scope_is_checked_before_streaming(app):
+    client = TestClient(app)
+    app.state._actor_box["actor"] = {"role": "user", "user_id": "user_2"}
+    assert client.get("/export/vehicle/veh_1/stream").status_code == 403
+    assert client.get("/export/servicebook/sb_1/stream").status_code == 403
+
+    app.state._actor_box["actor"] = {"role": "admin", "user_id": "a_1"}
+    assert client.get("/export/servicebook/missing/stream").status_code == 404
+
+
+def test_servicebook_stream_redacts_per_row(app):
+    client = TestClient(app)
+    r = client.get("/export/servicebook/sb_1/stream")
+    assert r.status_code == 200, r.text
+    lines = _lines(r)
+    assert lines[0]["target"] == "servicebook"
+    assert lines[-1]["count"] == 5
+    assert all("notes" not in row["data"] for row in lines[1:-1])
+
+
+def test_chunks_stay_bounded():
+    rows = ({"id": i, "payload": "x" * 100} for i in range(10_000))
+    chunks = list(iter_ndjson_export({"target": "t"}, rows, chunk_bytes=4096))
+    assert len(chunks) > 100
+    assert max(len(c) for c in chunks) < 4096 + 200
+
+
+def test_full_vehicle_export_as_chunked_container(app):
+    from app.services.export_crypto import decrypt_stream
+
+    client = TestClient(app)
+    app.state._actor_box["actor"] = {"role": "superadmin", "user_id": "sa_1"}
+    tok = client.post("/export/vehicle/veh_1/grant").json()["export_token"]
+
+    assert client.get("/export/vehicle/veh_1/full", params={"format": "zip"}, headers={"X-Export-Token": tok}).status_code == 400
+
+    r = client.get("/export/vehicle/veh_1/full", params={"format": "chunked"}, headers={"X-Export-Token": tok})
+    assert r.status_code == 200, r.text
+    assert r.headers["x-export-alg"] == "aes256gcm-chunked-v1"
+    assert b"WVWZZZ" not in r.content
+
+    plain = b"".join(decrypt_stream([r.content])).decode("utf-8")
+    lines = [json.loads(line) for line in plain.splitlines()]
+    assert lines[0]["vehicle"]["vin"] == "WVWZZZ1JZXW000001"
+    assert lines[-1] == {"type": "end", "count": 1200}
+    assert lines[1]["data"]["note"] == "PRIVATE"
+
+    # one-time auch im Chunked-Format
+    again = client.get("/export/vehicle/veh_1/full", params={"format": "chunked"}, headers={"X-Export-Token": tok})
+    assert again.status_code == 403
@@ -9,6 +9,7 @@ from sqlalchemy import MetaData, Table, insert, select, text, update
 from sqlalchemy.orm import Session
 from starlette.requests import Request
 
+from app.core.keyring import get_keyring
 from app.routers import export_vehicle as ev
 
 
@@ -142,10 +143,11 @@ def test_export_user_p0_grant_persist_full_one_time_ttl_and_moderator_403(client
     token = r_grant.json()["token"]
 
     with _db_from_client(client) as db:
-        grants = Table("export_grants_user", MetaData(), autoload_with=db.get_bind())
-        rows = db.execute(select(grants).where(grants.c.user_id == uid)).mappings().all()
+        grants = Table("export_grants", MetaData(), autoload_with=db.get_bind())
+        rows = db.execute(select(grants).where(grants.c.resource_type == "user", grants.c.resource_id == uid)).mappings().all()
         assert len(rows) == 1
-        assert rows[0]["export_token"] == token
+        assert rows[0]["token_hmac"] == get_keyring().hmac_hex("export.token", token)
+        assert rows[0]["remaining_uses"] == 1
 
     r_full = client.get(f"/export/user/{uid}/full", headers={**sa_headers, "X-Export-Token": token})
     assert r_full.status_code == 200
@@ -157,8 +159,8 @@ def test_export_user_p0_grant_persist_full_one_time_ttl_and_moderator_403(client
     r_grant_exp = client.post(f"/export/user/{uid}/grant", headers=sa_headers)
     exp_token = r_grant_exp.json()["token"]
     with _db_from_client(client) as db:
-        grants = Table("export_grants_user", MetaData(), autoload_with=db.get_bind())
-        row = db.execute(select(grants).where(grants.c.export_token == exp_token)).mappings().first()
+        grants = Table("export_grants", MetaData(), autoload_with=db.get_bind())
+        row = db.execute(select(grants).where(grants.c.token_hmac == get_keyring().hmac_hex("export.token", exp_token))).mappings().first()
         assert row is not None
         past = datetime.now(timezone.utc) - timedelta(seconds=5)
         db.execute(update(grants).where(grants.c.id == row["id"]).values(expires_at=past))
@@ -2,6 +2,7 @@ import os
 from typing import Optional, Any
 
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 
 # ------------------------------------------------------------
@@ -12,6 +13,7 @@ os.environ["LTC_ENV"] = "dev"
 
 from app.core.config import get_settings  # noqa: E402
 from app.main import create_app  # noqa: E402
+from app.routers.export import _encrypt_full_payload  # noqa: E402
 
 
 def _cache_clear(obj: Any) -> None:
@@ -126,3 +128,10 @@ def test_grant_is_superadmin_only(api_client: TestClient):
     )
     # require_roles("superadmin") -> 403
     assert r.status_code == 403
+
+
+def test_full_export_encryption_with_bad_secret_is_500():
+    with pytest.raises(HTTPException) as exc:
+        _encrypt_full_payload("kurz", {"a": 1})
+    assert exc.value.status_code == 500
+    assert exc.value.detail == "server_misconfigured"
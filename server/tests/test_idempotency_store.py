@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+
+from app.models.audit import IdempotencyRecord
+from app.services import idempotency_store
+from app.services.idempotency_store import IdempotencyStore, decode_body, purge_expired_idempotency, run_idempotent, scoped_key
+
+_T = IdempotencyRecord.__table__
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'idem.db'}", future=True)
+    _T.create(engine)
+    return engine
+
+
+@pytest.fixture()
+def store(monkeypatch):
+    store = IdempotencyStore(max_entries=100, ttl_seconds=3600, compress_min_bytes=256)
+    monkeypatch.setattr(idempotency_store, "_STORE", store)
+    return store
+
+
+def _handler(calls, status=201, body=None):
+    def run():
+        calls.append(1)
+        return status, body if body is not None else {"n": len(calls)}
+
+    return run
+
+
+def test_replay_runs_handler_once_and_is_served_from_cache(engine, store):
+    calls: list = []
+    with Session(engine) as db:
+        assert run_idempotent(db, "org1", "mc:k1", _handler(calls)) == (201, {"n": 1})
+        db.commit()
+
+    seen: list = []
+    event.listen(engine, "before_cursor_execute", lambda *a: seen.append(a[2]))
+    with Session(engine) as db:
+        assert run_idempotent(db, "org1", "mc:k1", _handler(calls)) == (201, {"n": 1})
+    assert calls == [1] and seen == []
+    assert store.stats()["hits"] == 1
+
+    # anderer Prozess/Cache leer: Replay aus der DB
+    store.invalidate()
+    with Session(engine) as db:
+        assert run_idempotent(db, "org1", "mc:k1", _handler(calls)) == (201, {"n": 1})
+    assert calls == [1]
+
+
+def test_keys_are_scoped(engine, store):
+    calls: list = []
+    with Session(engine) as db:
+        assert run_idempotent(db, "org1", "mc:k1", _handler(calls)) == (201, {"n": 1})
+        assert run_idempotent(db, "org2", "mc:k1", _handler(calls)) == (201, {"n": 2})
+        db.commit()
+    with pytest.raises(ValueError):
+        scoped_key("", "mc:k1")
+    long_key = scoped_key("org1", "k" * 400)
+    assert long_key.startswith("sha256:") and len(long_key) <= _T.c.key.type.length
+
+
+def test_error_responses_and_rollbacks_release_the_key(engine, store):
+    calls: list = []
+    with Session(engine) as db:
+        assert run_idempotent(db, "org1", "mc:k2", _handler(calls, status=404, body={"error": "not_found"}))[0] == 404
+        db.commit()
+        assert db.execute(select(_T.c.key)).all() == []
+
+        run_idempotent(db, "org1", "mc:k2", _handler(calls))
+        db.rollback()
+        assert store.stats()["size"] == 0
+
+        assert run_idempotent(db, "org1", "mc:k2", _handler(calls)) == (201, {"n": 3})
+        db.commit()
+    assert len(calls) == 3
+
+
+def test_concurrent_retries_run_handler_once(engine, store):
+    calls: list = []
+    results: list = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.3)
+        return 201, {"id": "s_1"}
+
+    def worker():
+        with Session(engine) as db:
+            results.append(run_idempotent(db, "org1", "mc:k3", slow))
+            db.commit()
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [(201, {"id": "s_1"})] * 2
+
+
+def test_large_bodies_are_compressed(engine, store):
+    body = {"items": ["x" * 40] * 50}
+    with Session(engine) as db:
+        run_idempotent(db, "org1", "mc:k4", _handler([], body=body))
+        db.commit()
+        stored = db.execute(select(_T.c.response_json).where(_T.c.key == "org1:mc:k4")).scalar_one()
+    assert stored.startswith("z:") and len(stored) < 500
+    assert decode_body(stored) == body
+
+
+def test_expired_records_are_purged_and_reclaimable(engine, store):
+    calls: list = []
+    with Session(engine) as db:
+        run_idempotent(db, "org1", "mc:old", _handler(calls))
+        run_idempotent(db, "org1", "mc:new", _handler(calls))
+        db.commit()
+        old = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=2)
+        db.execute(_T.update().where(_T.c.key == "org1:mc:old").values(created_at=old))
+        db.commit()
+
+    store.invalidate()
+    with Session(engine) as db:
+        # abgelaufen, noch nicht gepurged: neuer Claim statt Replay
+        assert run_idempotent(db, "org1", "mc:old", _handler(calls)) == (201, {"n": 3})
+        db.rollback()
+
+    assert purge_expired_idempotency(engine, ttl_seconds=3600) == 1
+    with Session(engine) as db:
+        assert [r.key for r in db.execute(select(_T.c.key))] == ["org1:mc:new"]
@@ -0,0 +1,70 @@
+import hashlib
+import hmac
+
+import pytest
+
+from app.core.keyring import Keyring, KeyringError, get_keyring, prekeyed_hmac
+
+OLD = "old-secret-key-0123456789abcdef"
+NEW = "new-secret-key-0123456789abcdef"
+
+
+def test_derivations_are_cached_per_purpose():
+    ring = Keyring([NEW])
+    assert ring.key("export.fernet") is ring.key("export.fernet")
+    assert ring.fernet("export.fernet") is ring.fernet("export.fernet")
+
+    before = prekeyed_hmac.cache_info().hits
+    ring.hmac_hex("export.token", "a")
+    ring.hmac_hex("export.token", "b")
+    assert prekeyed_hmac.cache_info().hits >= before + 1
+
+
+def test_legacy_derivations_stay_compatible():
+    ring = Keyring([NEW])
+    plain = hmac.new(NEW.encode(), b"WVWZZZ1JZXW000001", hashlib.sha256).hexdigest()
+    for purpose in ("auth.lookup", "vehicle.vin", "export.token", "transfer.token"):
+        assert ring.hmac_hex(purpose, "WVWZZZ1JZXW000001") == plain
+
+    assert ring.key("export.fernet") == hashlib.sha256(NEW.encode()).digest()
+    assert ring.key("export.full") == hmac.new(NEW.encode(), b"export|full", hashlib.sha256).digest()
+
+
+def test_hkdf_purposes_are_separated():
+    ring = Keyring([NEW])
+    assert ring.key("export.chunked") != ring.key("export.fernet")
+    assert ring.key("export.chunked") != NEW.encode()
+    assert Keyring([OLD]).key("export.chunked") != ring.key("export.chunked")
+    # redacted Exports dürfen nicht gegen vehicles.vin_hmac joinbar sein
+    assert ring.hmac_hex("export.redaction", "WVWZZZ1JZXW000001") != ring.hmac_hex("vehicle.vin", "WVWZZZ1JZXW000001")
+
+
+def test_rotation_via_previous_keys(monkeypatch):
+    monkeypatch.delenv("LTC_SECRET_KEYS_PREVIOUS", raising=False)
+    monkeypatch.setenv("LTC_SECRET_KEY", OLD)
+    old_ring = get_keyring()
+    token = old_ring.fernet("export.fernet").encrypt(b"payload")
+    old_h = old_ring.hmac_hex("export.token", "tok")
+
+    monkeypatch.setenv("LTC_SECRET_KEY", NEW)
+    monkeypatch.setenv("LTC_SECRET_KEYS_PREVIOUS", OLD)
+    ring = get_keyring()
+    assert ring is not old_ring and ring is get_keyring()
+    assert ring.fernet("export.fernet").decrypt(token) == b"payload"
+    assert ring.hmac_hex_all("export.token", "tok")[1] == old_h
+    assert ring.hmac_hex("export.token", "tok") != old_h
+
+    # neue Tokens nur mit dem primären Key
+    fresh = ring.fernet("export.fernet").encrypt(b"x")
+    with pytest.raises(Exception):
+        old_ring.fernet("export.fernet").decrypt(fresh)
+
+
+def test_missing_or_short_secret_is_rejected(monkeypatch):
+    with pytest.raises(KeyringError):
+        Keyring(["short"])
+    monkeypatch.setenv("LTC_SECRET_KEY", "")
+    with pytest.raises(KeyringError):
+        get_keyring()
+    with pytest.raises(KeyringError):
+        Keyring([NEW]).key("unknown.purpose")
@@ -96,3 +96,23 @@ def test_missing_idempotency_key_is_400(client):
     h = _auth_headers()
     r = client.post("/api/masterclipboard/sessions", json={"vehicle_public_id": "veh_public_1"}, headers=h)
     assert r.status_code == 400
+
+
+def test_idempotency_replay_is_scoped_to_org(client):
+    h1 = _auth_headers(org_id="org1")
+    session_id = client.post(
+        "/api/masterclipboard/sessions", json={"vehicle_public_id": "veh_public_1"}, headers={**h1, "Idempotency-Key": "s1"}
+    ).json()["session_id"]
+    path = f"/api/masterclipboard/sessions/{session_id}/speech"
+    body = {"source": "text", "content_redacted": "defekt"}
+    first = client.post(path, json=body, headers={**h1, "Idempotency-Key": "shared"})
+    assert first.status_code == 201
+    # gleiche Org: Replay
+    assert client.post(path, json=body, headers={**h1, "Idempotency-Key": "shared"}).json() == first.json()
+
+    # fremde Org mit gleichem Key: kein Replay, Org-Check greift
+    h2 = _auth_headers(org_id="org2", sub="u2")
+    other = client.post(path, json=body, headers={**h2, "Idempotency-Key": "shared"})
+    assert other.status_code == 403
+    assert other.json() == {"error": "forbidden"}
+    assert other.json() != first.json()
@@ -0,0 +1,38 @@
+import threading
+
+from app.core import periodic
+from app.core.periodic import PeriodicWorker, start_periodic, stop_periodic
+
+
+def test_worker_runs_counts_and_survives_failures():
+    done = threading.Event()
+    results = iter([3, RuntimeError("boom"), 2])
+
+    def fn():
+        r = next(results, None)
+        if isinstance(r, Exception):
+            raise r
+        if r is None:
+            done.set()
+            return None
+        return r
+
+    w = PeriodicWorker("test-worker", 0.01, fn).start()
+    assert done.wait(5)
+    w.stop()
+    assert w.stats()["processed"] == 5 and w.failures == 1
+
+    # stop() ist endgültig
+    w.start()
+    assert w._thread is None
+
+
+def test_registry_starts_once_per_name_and_respects_disabled_interval():
+    try:
+        a = start_periodic("test-registry", 3600, lambda: 0)
+        assert start_periodic("test-registry", 3600, lambda: 0) is a
+        assert start_periodic("test-off", 0, lambda: 0) is None
+        assert set(periodic.periodic_stats()) == {"test-registry"}
+    finally:
+        stop_periodic()
+    assert periodic.periodic_stats() == {} and a._thread is None
@@ -0,0 +1,132 @@
+import os
+import re
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import bindparam, create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("LTC_SECRET_KEY", "dev_test_secret_key_32_chars_minimum__OK")
+
+from app.db.base import Base  # noqa: E402
+from app.models.vehicle import Vehicle  # noqa: E402
+from app.models.vehicle_entry import VehicleEntry  # noqa: E402
+from app.public.qr_cache import get_public_qr_cache  # noqa: E402
+from app.public.routes import MAX_PUBLIC_QR_BATCH  # noqa: E402
+
+
+@pytest.fixture()
+def engine():
+    eng = create_engine(
+        "sqlite+pysqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        future=True,
+    )
+    Base.metadata.create_all(bind=eng)
+    return eng
+
+
+@pytest.fixture()
+def db(engine):
+    session = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)()
+    get_public_qr_cache().clear()
+    try:
+        yield session
+    finally:
+        session.close()
+        get_public_qr_cache().clear()
+
+
+@pytest.fixture()
+def client(db):
+    from app.public import routes as public_mod
+
+    app = FastAPI()
+    app.include_router(public_mod.router)
+
+    def _get_db():
+        yield db
+
+    app.dependency_overrides[public_mod.get_db] = _get_db
+    return TestClient(app)
+
+
+def _vehicles(db, n: int) -> list[str]:
+    ids = []
+    for i in range(n):
+        v = Vehicle(owner_user_id="d1", meta={"accident_status": "accident_free" if i % 2 else "unknown"})
+        v.set_vin_from_raw(f"WVWZZZ1JZXW{i:06d}")
+        db.add(v)
+        db.flush()
+        for version, level in enumerate(("T1", "T3")[: 1 + i % 2], start=1):
+            db.add(
+                VehicleEntry(
+                    vehicle_id=v.public_id,
+                    owner_user_id="d1",
+                    entry_group_id=f"grp-{i}-{version}",
+                    version=1,
+                    is_latest=True,
+                    entry_date=date(2026, 1, version),
+                    entry_type="Service",
+                    performed_by="Werkstatt",
+                    km=1000 * version,
+                    trust_level=level,
+                )
+            )
+        ids.append(v.public_id)
+    db.commit()
+    return ids
+
+
+def _count_selects(engine) -> list[str]:
+    seen: list[str] = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            seen.append(statement)
+
+    return seen
+
+
+def test_batch_matches_single_item_endpoint_and_keeps_redaction(client, db):
+    ids = _vehicles(db, 5)
+    r = client.post("/public/qr/batch", json={"vehicle_ids": [*ids, "unknown-id", ids[0]]})
+    assert r.status_code == 200, r.text
+    results = r.json()["results"]
+
+    assert list(results) == [*ids, "unknown-id"]
+    for vid in [*ids, "unknown-id"]:
+        assert results[vid] == client.get(f"/public/qr/{vid}").json()
+        assert not re.search(r"\d", results[vid]["hint"] + results[vid]["disclaimer"])
+    # unbekannt => neutrale Antwort, wie beim Einzel-Endpoint
+    assert results["unknown-id"]["history_status"] == "nicht_vorhanden"
+
+
+def test_batch_uses_constant_number_of_queries(client, db, engine):
+    ids = _vehicles(db, 60)
+    # Hälfte ohne materialisierte Zeile (Altbestand) => Backfill im Batch
+    stmt = text("DELETE FROM vehicle_trust_summaries WHERE vehicle_id IN :ids")
+    db.execute(stmt.bindparams(bindparam("ids", expanding=True)), {"ids": ids[::2]})
+    db.commit()
+
+    selects = _count_selects(engine)
+    r = client.post("/public/qr/batch", json={"vehicle_ids": ids})
+    assert r.status_code == 200
+    assert len(r.json()["results"]) == 60
+    assert len(selects) <= 3  # Summaries IN + Meta IN + Latest-Levels IN
+
+    # reiner Backfill invalidiert nicht: zweiter Aufruf kommt komplett aus dem Cache
+    selects.clear()
+    client.post("/public/qr/batch", json={"vehicle_ids": ids})
+    assert selects == []
+
+
+def test_batch_size_is_limited(client):
+    assert client.post("/public/qr/batch", json={"vehicle_ids": []}).status_code == 422
+    too_many = [f"id-{i}" for i in range(MAX_PUBLIC_QR_BATCH + 1)]
+    assert client.post("/public/qr/batch", json={"vehicle_ids": too_many}).status_code == 422
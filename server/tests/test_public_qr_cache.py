@@ -0,0 +1,189 @@
+import os
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("LTC_SECRET_KEY", "dev_test_secret_key_32_chars_minimum__OK")
+
+from app.db.base import Base  # noqa: E402
+from app.models.vehicle import Vehicle  # noqa: E402
+from app.models.vehicle_entry import VehicleEntry  # noqa: E402
+from app.public.qr_cache import PublicQrCache, get_public_qr_cache  # noqa: E402
+
+
+@pytest.fixture()
+def engine():
+    eng = create_engine(
+        "sqlite+pysqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        future=True,
+    )
+    Base.metadata.create_all(bind=eng)
+    return eng
+
+
+@pytest.fixture()
+def db(engine):
+    session = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)()
+    get_public_qr_cache().clear()
+    try:
+        yield session
+    finally:
+        session.close()
+        get_public_qr_cache().clear()
+
+
+@pytest.fixture()
+def client(db):
+    from app.public import routes as public_mod
+
+    app = FastAPI()
+    app.include_router(public_mod.router)
+
+    def _get_db():
+        yield db
+
+    app.dependency_overrides[public_mod.get_db] = _get_db
+    return TestClient(app)
+
+
+def _vehicle(db, meta=None) -> Vehicle:
+    v = Vehicle(owner_user_id="u1", meta=meta)
+    v.set_vin_from_raw("WVWZZZ1JZXW000001")
+    db.add(v)
+    db.commit()
+    return v
+
+
+def _entry(db, vehicle_id: str, trust_level: str) -> None:
+    db.add(
+        VehicleEntry(
+            vehicle_id=vehicle_id,
+            owner_user_id="u1",
+            entry_group_id=f"grp-{trust_level}",
+            version=1,
+            is_latest=True,
+            entry_date=date(2026, 2, 20),
+            entry_type="Service",
+            performed_by="Werkstatt",
+            km=1000,
+            trust_level=trust_level,
+        )
+    )
+    db.commit()
+
+
+def _count_selects(engine) -> list[str]:
+    seen: list[str] = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            seen.append(statement)
+
+    return seen
+
+
+def test_second_hit_is_served_from_cache_with_etag(client, db, engine):
+    vid = _vehicle(db, {"accident_status": "accident_free"}).public_id
+    cache = get_public_qr_cache()
+    before = cache.stats()
+
+    first = client.get(f"/public/qr/{vid}")
+    assert first.status_code == 200, first.text
+    assert first.headers["cache-control"] == "public, no-cache"
+    etag = first.headers["etag"]
+
+    selects = _count_selects(engine)
+    second = client.get(f"/public/qr/{vid}")
+    assert second.content == first.content
+    assert second.headers["etag"] == etag
+    assert selects == []
+
+    not_modified = client.get(f"/public/qr/{vid}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    stats = cache.stats()
+    assert (stats["hits"] - before["hits"], stats["misses"] - before["misses"]) == (2, 1)
+    assert 0 < stats["hit_ratio"] <= 1
+
+
+def test_entries_and_meta_changes_invalidate(client, db):
+    vehicle = _vehicle(db, {"accident_status": "accident_free"})
+    vid = vehicle.public_id
+    before = get_public_qr_cache().stats()["invalidations"]
+
+    assert client.get(f"/public/qr/{vid}").json()["history_status"] == "nicht_vorhanden"
+
+    _entry(db, vid, "T3")
+    after_entry = client.get(f"/public/qr/{vid}").json()
+    assert after_entry["history_status"] == "vorhanden"
+
+    vehicle.meta = {"accident_status": "not_accident_free"}
+    db.commit()
+    assert client.get(f"/public/qr/{vid}").json()["accident_status"] == "nicht_unfallfrei"
+    assert get_public_qr_cache().stats()["invalidations"] - before == 2
+
+
+def test_rolled_back_changes_do_not_invalidate(client, db):
+    vehicle = _vehicle(db, {"accident_status": "accident_free"})
+    client.get(f"/public/qr/{vehicle.public_id}")
+    before = get_public_qr_cache().stats()["invalidations"]
+
+    vehicle.meta = {"accident_status": "not_accident_free"}
+    db.flush()
+    db.rollback()
+    assert get_public_qr_cache().stats()["invalidations"] == before
+    assert client.get(f"/public/qr/{vehicle.public_id}").json()["accident_status"] == "unfallfrei"
+
+
+def test_unknown_ids_are_negatively_cached_without_leaking_existence(client, db, engine):
+    known = client.get(f"/public/qr/{_vehicle(db).public_id}")
+    unknown = client.get("/public/qr/does-not-exist")
+    assert unknown.status_code == 200
+    assert unknown.headers["cache-control"] == known.headers["cache-control"]
+
+    before = get_public_qr_cache().stats()["negative_hits"]
+    selects = _count_selects(engine)
+    client.get("/public/qr/does-not-exist")
+    assert selects == []
+    assert get_public_qr_cache().stats()["negative_hits"] - before == 1
+
+
+def test_negative_entries_use_short_ttl_and_drop_stale_puts(monkeypatch):
+    import app.core.ttl_cache as ttl_cache_mod
+
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache_mod.time, "time", lambda: now[0])
+    cache = PublicQrCache(10, ttl_seconds=300, negative_ttl_seconds=30)
+
+    cache.put("known", b"{}", negative=False, epoch=cache.epoch())
+    cache.put("unknown", b"{}", negative=True, epoch=cache.epoch())
+    now[0] += 31
+    assert cache.get("unknown") is None
+    assert cache.get("known") is not None
+
+    # Ergebnis vor einer Invalidierung gelesen => nicht cachen
+    epoch = cache.epoch()
+    cache.invalidate(["other"])
+    cache.put("late", b"{}", negative=False, epoch=epoch)
+    assert cache.get("late") is None
+
+
+def test_negative_entries_do_not_evict_positive_ones():
+    cache = PublicQrCache(2, negative_max_entries=3)
+    for vid in ("a", "b"):
+        cache.put(vid, b"{}", negative=False, epoch=cache.epoch())
+    for i in range(50):
+        cache.put(f"scan-{i}", b"{}", negative=True, epoch=cache.epoch())
+
+    assert cache.get("a") is not None and cache.get("b") is not None
+    stats = cache.stats()
+    assert (stats["size"], stats["negative_size"]) == (2, 3)
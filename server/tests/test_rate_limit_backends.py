@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import socketserver
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+
+from app.core import rate_limit_backends as rlb
+from app.core.rate_limit_backends import (
+    InMemoryRateLimitBackend,
+    RedisRateLimitBackend,
+    SQLiteRateLimitBackend,
+    check_rate_limit,
+    get_rate_limit_backend,
+    set_rate_limit_backend,
+)
+
+
+class _FrozenClock:
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def clock(monkeypatch: pytest.MonkeyPatch) -> _FrozenClock:
+    c = _FrozenClock(1_000_000.0)  # Fensteranfang für window=10
+    monkeypatch.setattr(rlb.time, "time", c.time)
+    return c
+
+
+# --- Redis-Stand-in (RESP2, nur die vom Backend genutzten Kommandos) ---------
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def _read_command(self) -> Optional[List[bytes]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        n = int(line[1:-2])
+        args = []
+        for _ in range(n):
+            size = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def handle(self) -> None:
+        store: Dict[bytes, Tuple[int, Optional[float]]] = self.server.store  # type: ignore[attr-defined]
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            cmd = args[0].upper()
+            with self.server.lock:  # type: ignore[attr-defined]
+                self.server.commands.append(cmd)  # type: ignore[attr-defined]
+                if cmd == b"PING":
+                    self.wfile.write(b"+PONG\r\n")
+                elif cmd in (b"INCR", b"DECR"):
+                    value, exp = store.get(args[1], (0, None))
+                    value += 1 if cmd == b"INCR" else -1
+                    store[args[1]] = (value, exp)
+                    self.wfile.write(b":%d\r\n" % value)
+                elif cmd == b"PEXPIRE":
+                    value, _ = store.get(args[1], (0, None))
+                    store[args[1]] = (value, int(args[2]) / 1000)
+                    self.wfile.write(b":1\r\n")
+                elif cmd == b"GET":
+                    item = store.get(args[1])
+                    if item is None:
+                        self.wfile.write(b"$-1\r\n")
+                    else:
+                        raw = str(item[0]).encode()
+                        self.wfile.write(b"$%d\r\n%s\r\n" % (len(raw), raw))
+                else:
+                    self.wfile.write(b"-ERR unknown command\r\n")
+
+
+class _RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _RespHandler)
+        self.store: Dict[bytes, Tuple[int, Optional[float]]] = {}
+        self.commands: List[bytes] = []
+        self.lock = threading.Lock()
+
+
+@pytest.fixture()
+def resp_server():
+    server = _RespServer()
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _backends(tmp_path, resp_server) -> List[Any]:
+    host, port = resp_server.server_address
+    return [
+        InMemoryRateLimitBackend(),
+        SQLiteRateLimitBackend(str(tmp_path / "rl.db")),
+        RedisRateLimitBackend(host, port),
+    ]
+
+
+# --- Verhalten -----------------------------------------------------------------
+
+
+def test_all_backends_enforce_limit_and_do_not_count_denied_hits(tmp_path, resp_server, clock):
+    for backend in _backends(tmp_path, resp_server):
+        results = [backend.hit("k", limit=3, window_seconds=10) for _ in range(5)]
+        assert results == [True, True, True, False, False], type(backend).__name__
+
+        # anderer Key ist unabhängig
+        assert backend.hit("other", limit=3, window_seconds=10) is True
+        backend.close()
+
+
+def test_sliding_window_weights_previous_window(tmp_path, resp_server, clock):
+    for backend in _backends(tmp_path, resp_server):
+        clock.now = 1_000_000.0
+        for _ in range(4):
+            assert backend.hit("s", limit=4, window_seconds=10)
+
+        # 50% ins nächste Fenster: Schätzung = 4 * 0.5 = 2 => noch 2 Hits frei
+        clock.now = 1_000_015.0
+        assert [backend.hit("s", limit=4, window_seconds=10) for _ in range(3)] == [True, True, False]
+
+        # zwei Fenster später ist alles vergessen
+        clock.now = 1_000_040.0
+        assert backend.hit("s", limit=4, window_seconds=10) is True
+        backend.close()
+
+
+def test_in_memory_backend_evicts_idle_keys(clock):
+    backend = InMemoryRateLimitBackend(sweep_interval_seconds=5)
+    for i in range(100):
+        backend.hit(f"ip-{i}", limit=10, window_seconds=10)
+    assert backend.stats()["keys"] == 100
+
+    clock.now += 30
+    backend.hit("fresh", limit=10, window_seconds=10)
+    stats = backend.stats()
+    assert stats["keys"] == 1
+    assert stats["evictions"] == 100
+
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path, clock):
+    path = str(tmp_path / "shared.db")
+    worker_a = SQLiteRateLimitBackend(path)
+    worker_b = SQLiteRateLimitBackend(path)
+
+    assert worker_a.hit("ip", limit=2, window_seconds=10)
+    assert worker_b.hit("ip", limit=2, window_seconds=10)
+    assert worker_a.hit("ip", limit=2, window_seconds=10) is False
+    assert worker_b.hit("ip", limit=2, window_seconds=10) is False
+    worker_a.close()
+    worker_b.close()
+
+
+def test_sqlite_backend_concurrent_hits_never_exceed_limit(tmp_path):
+    backend = SQLiteRateLimitBackend(str(tmp_path / "rl.db"))
+    allowed: List[bool] = []
+    lock = threading.Lock()
+
+    def _worker() -> None:
+        for _ in range(20):
+            ok = backend.hit("burst", limit=25, window_seconds=3600)
+            with lock:
+                allowed.append(ok)
+
+    threads = [threading.Thread(target=_worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(allowed) == 120
+    assert sum(allowed) <= 25
+    backend.close()
+
+
+def test_redis_backend_uses_expiring_keys_and_reconnects(resp_server, clock):
+    host, port = resp_server.server_address
+    backend = RedisRateLimitBackend.from_url(f"redis://{host}:{port}/0")
+
+    assert backend.hit("ip", limit=1, window_seconds=10)
+    assert backend.hit("ip", limit=1, window_seconds=10) is False
+    assert b"PEXPIRE" in resp_server.commands
+    # abgelehnter Hit wurde zurückgenommen
+    assert [v for v, _ in resp_server.store.values()] == [1]
+
+    # Verbindungsabbruch: nächster Hit baut neu auf
+    backend._conn._sock.close()  # type: ignore[union-attr]
+    assert backend.hit("ip2", limit=1, window_seconds=10) is True
+    backend.close()
+
+
+def test_check_rate_limit_fails_open_when_backend_unreachable():
+    backend = RedisRateLimitBackend("127.0.0.1", 1, timeout=0.2)
+    set_rate_limit_backend(backend)
+    try:
+        assert check_rate_limit("k", limit=1, window_seconds=10) is True
+        assert check_rate_limit("k", limit=1, window_seconds=10, fail_open=False) is False
+    finally:
+        set_rate_limit_backend(None)
+
+
+def test_auth_limiter_fails_closed(tmp_path):
+    from app.auth.rate_limit import check_and_inc
+
+    set_rate_limit_backend(RedisRateLimitBackend("127.0.0.1", 1, timeout=0.2))
+    try:
+        assert check_and_inc(str(tmp_path / "auth.db"), "rl:verify:ip:x", 60, 30) is False
+    finally:
+        set_rate_limit_backend(None)
+
+
+def test_backend_selection_from_env(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.delenv("LTC_RATE_LIMIT_BACKEND", raising=False)
+    monkeypatch.delenv("LTC_RATE_LIMIT_SQLITE_PATH", raising=False)
+    monkeypatch.setenv("LTC_DB_PATH", str(tmp_path / "auth.db"))
+    # auto: Routen-Dependency und Auth-Flow teilen sich dieselbe SQLite-Datei (alle Worker)
+    auth_default = get_rate_limit_backend(str(tmp_path / "auth.db"))
+    assert isinstance(auth_default, SQLiteRateLimitBackend)
+    assert auth_default.path == str(tmp_path / "auth.db")
+    assert get_rate_limit_backend() is auth_default
+
+    monkeypatch.setenv("LTC_RATE_LIMIT_BACKEND", "memory")
+    assert isinstance(get_rate_limit_backend(), InMemoryRateLimitBackend)
+
+    monkeypatch.setenv("LTC_RATE_LIMIT_BACKEND", "sqlite")
+    monkeypatch.setenv("LTC_RATE_LIMIT_SQLITE_PATH", str(tmp_path / "shared.db"))
+    assert get_rate_limit_backend().path == str(tmp_path / "shared.db")  # type: ignore[attr-defined]
+    assert get_rate_limit_backend(str(tmp_path / "auth.db")) is get_rate_limit_backend()
+
+    monkeypatch.setenv("LTC_RATE_LIMIT_BACKEND", "redis")
+    monkeypatch.setenv("LTC_RATE_LIMIT_REDIS_URL", "redis://:pw@cache:6380/2")
+    r = get_rate_limit_backend()
+    assert isinstance(r, RedisRateLimitBackend)
+    assert (r.host, r.port, r.db, r.password) == ("cache", 6380, 2, "pw")
+
+
+def test_auth_request_rate_limit_uses_backend_outside_writer_lock(tmp_path):
+    from app.auth.service import request_challenge
+    from app.auth.settings import AuthSettings
+    from app.auth.storage import db_read
+
+    settings = AuthSettings(
+        secret_key="x" * 40,
+        db_path=str(tmp_path / "auth.db"),
+        rl_req_per_email=2,
+        dev_expose_otp=True,
+    )
+    results = [
+        request_challenge(settings, email="a@example.com", ip="1.2.3.4", user_agent="t", request_id=f"r{i}")
+        for i in range(3)
+    ]
+    assert [otp is not None for _, otp in results] == [True, True, False]
+
+    with db_read(settings.db_path) as conn:
+        rows = conn.execute("SELECT key, curr FROM rate_limit_counters ORDER BY key;").fetchall()
+        denied = conn.execute(
+            "SELECT COUNT(*) FROM auth_audit WHERE reason_code = 'RATE_LIMIT';"
+        ).fetchone()[0]
+    assert [r[1] for r in rows] == [2, 2]  # email (2 erlaubt) + ip (nur bei erlaubter email gezählt)
+    assert denied == 1
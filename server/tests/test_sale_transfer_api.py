@@ -64,6 +64,11 @@ def _set_role(db_path: str, user_id: str, role: str) -> None:
     finally:
         conn.close()
 
+    # Rollenwechsel am Admin-API vorbei: Session-Cache wie _apply_role_change invalidieren
+    from app.auth.session_cache import get_session_cache
+
+    get_session_cache().invalidate_user(user_id)
+
 
 def test_sale_transfer_create_redeem_happy_path(monkeypatch: pytest.MonkeyPatch, tmp_path):
     db_path = _ensure_env(monkeypatch, tmp_path)
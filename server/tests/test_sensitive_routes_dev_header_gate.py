@@ -18,25 +18,24 @@ def test_documents_rejects_legacy_x_ltc_headers_without_dev_gate(monkeypatch) ->
     monkeypatch.delenv("LTC_ALLOW_DEV_HEADERS", raising=False)
 
     with tempfile.TemporaryDirectory() as td:
-        store = DocumentsStore(
+        with DocumentsStore(
             storage_root=Path(td) / "storage",
             db_path=Path(td) / "data" / "app.db",
             max_upload_bytes=1024 * 1024,
             allowed_ext={"pdf"},
             allowed_mime={"application/pdf"},
             scan_mode="stub",
-        )
-
-        app = FastAPI()
-        app.include_router(documents_router.router)
-        app.dependency_overrides[documents_router.get_documents_store] = lambda: store
-
-        with TestClient(app) as client:
-            response = client.get(
-                "/documents/admin/quarantine",
-                headers={"X-LTC-ROLE": "admin", "X-LTC-UID": "dev-admin"},
-            )
-            assert response.status_code == 401, response.text
+        ) as store:
+            app = FastAPI()
+            app.include_router(documents_router.router)
+            app.dependency_overrides[documents_router.get_documents_store] = lambda: store
+
+            with TestClient(app) as client:
+                response = client.get(
+                    "/documents/admin/quarantine",
+                    headers={"X-LTC-ROLE": "admin", "X-LTC-UID": "dev-admin"},
+                )
+                assert response.status_code == 401, response.text
 
 
 def test_export_vehicle_rejects_legacy_x_ltc_headers_without_dev_gate(monkeypatch) -> None:
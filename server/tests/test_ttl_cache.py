@@ -0,0 +1,33 @@
+from sqlalchemy import create_engine
+
+from app.core.ttl_cache import TtlLruCache, engine_scope
+
+
+def test_lru_ttl_epoch_and_groups(monkeypatch):
+    import app.core.ttl_cache as mod
+
+    now = [1000.0]
+    monkeypatch.setattr(mod.time, "time", lambda: now[0])
+    cache: TtlLruCache = TtlLruCache(2, group=lambda _k, v: v)
+
+    cache.put("a", "u1", ttl=10)
+    cache.put("b", "u2", ttl=None)
+    assert cache.get("a") == "u1"  # a jetzt "recent"
+    cache.put("c", "u1", ttl=10, expires_at=1005.0)
+    assert cache.get("b") is None and cache.stats()["evictions"] == 1
+
+    now[0] += 6
+    assert cache.get("c") is None and cache.get("a") == "u1"
+
+    epoch = cache.epoch()
+    assert cache.invalidate_group("u1") == 1
+    assert not cache.put("late", "u1", ttl=10, epoch=epoch)
+    assert not cache.put("off", "u1", ttl=0)
+    assert len(cache) == 0
+
+
+def test_engine_scope_is_stable_per_engine():
+    e1, e2 = create_engine("sqlite://"), create_engine("sqlite://")
+    with e1.connect() as conn:
+        assert engine_scope(conn) == engine_scope(e1)
+    assert engine_scope(e1) != engine_scope(e2)
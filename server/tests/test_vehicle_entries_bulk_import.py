@@ -0,0 +1,172 @@
+import io
+import json
+import os
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("LTC_SECRET_KEY", "dev_test_secret_key_32_chars_minimum__OK")
+
+from app.db.base import Base  # noqa: E402
+from app.models.vehicle import Vehicle  # noqa: E402
+from app.services.entry_groups import check_entry_groups  # noqa: E402
+from app.services.entry_import import import_entries, iter_rows  # noqa: E402
+from app.services.vehicle_trust import check_vehicle_trust_summaries  # noqa: E402
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite+pysqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        future=True,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _vehicle(db, owner: str, meta=None) -> str:
+    v = Vehicle(owner_user_id=owner, meta=meta)
+    v.set_vin_from_raw("WVWZZZ1JZXW000001")
+    db.add(v)
+    db.commit()
+    return v.public_id
+
+
+def _client(db, monkeypatch, user_id: str = "w1", role: str = "dealer") -> TestClient:
+    from app.routers import vehicles as vehicles_mod
+
+    app = FastAPI()
+    app.include_router(vehicles_mod.router)
+
+    def _get_db():
+        yield db
+
+    app.dependency_overrides[vehicles_mod.get_db] = _get_db
+    app.dependency_overrides[vehicles_mod.require_actor] = lambda: {"user_id": user_id, "role": role}
+    monkeypatch.setattr(vehicles_mod, "require_consent", lambda db, actor: None, raising=True)
+    return TestClient(app)
+
+
+def _row(vehicle_id: str, day: int, **extra) -> dict:
+    return {
+        "vehicle_id": vehicle_id,
+        "date": f"2024-03-{day:02d}",
+        "type": "Service",
+        "performed_by": "Werkstatt",
+        "km": 1000 * day,
+        **extra,
+    }
+
+
+def test_ndjson_import_for_many_vehicles_with_row_report(db, monkeypatch):
+    a = _vehicle(db, "w1", {"accident_status": "accident_free"})
+    b = _vehicle(db, "w1")
+    foreign = _vehicle(db, "someone-else")
+
+    lines = [
+        json.dumps(_row(a, 1, trust_level="T3")),
+        json.dumps(_row(a, 2, note="  Ölwechsel  ")),
+        json.dumps(_row(b, 3, cost_amount="129.90")),
+        json.dumps(_row(b, 4, km=-5)),
+        "{kaputt",
+        json.dumps(_row(foreign, 5)),
+        json.dumps(_row("does-not-exist", 6)),
+        json.dumps(_row(a, 7, trust_level="T9")),
+    ]
+    body = ("\n".join(lines) + "\n").encode()
+
+    client = _client(db, monkeypatch)
+    r = client.post("/vehicles/entries/import", files={"file": ("history.ndjson", body, "application/x-ndjson")})
+    assert r.status_code == 200, r.text
+    report = r.json()
+
+    assert (report["inserted"], report["failed"], report["vehicles"]) == (3, 5, 2)
+    errors = {e["row"]: (e["error"], e["field"]) for e in report["errors"]}
+    assert errors == {
+        4: ("invalid_row", "km"),
+        5: ("unreadable_row", None),
+        6: ("vehicle_not_found", "vehicle_id"),
+        7: ("vehicle_not_found", "vehicle_id"),
+        8: ("invalid_row", "trust_level"),
+    }
+
+    listed = client.get(f"/vehicles/{a}/entries").json()
+    assert [e["date"] for e in listed] == ["2024-03-02", "2024-03-01"]
+    assert listed[0]["note"] == "Ölwechsel"
+    assert all(e["revision_count"] == 1 for e in listed)
+
+    # Trust-Summary einmal pro Fahrzeug nachgezogen, Gruppen konsistent
+    assert client.get(f"/vehicles/{a}/trust-summary").json()["trust_light"] == "gruen"
+    assert check_vehicle_trust_summaries(db) == {"missing": [], "stale": [], "orphaned": []}
+    assert check_entry_groups(db) == {"missing": [], "drifted": [], "orphaned": []}
+
+
+def test_csv_and_xlsx_imports(db, monkeypatch):
+    import openpyxl
+
+    vid = _vehicle(db, "w1")
+    client = _client(db, monkeypatch)
+
+    csv_body = (
+        "vehicle_id,date,type,performed_by,km,note,cost_amount,trust_level\r\n"
+        f"{vid},2024-01-10,Inspektion,Werkstatt,15000,,,T2\r\n"
+        f"{vid},2024-02-10,Reifen,Werkstatt,16000,Winter,80.00,\r\n"
+    ).encode("utf-8-sig")
+    r = client.post("/vehicles/entries/import", files={"file": ("rows.csv", csv_body, "text/csv")})
+    assert r.status_code == 200, r.text
+    assert (r.json()["inserted"], r.json()["failed"]) == (2, 0)
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["vehicle_id", "date", "type", "performed_by", "km", "trust_level"])
+    ws.append([vid, date(2024, 3, 10), "Service", "Werkstatt", 17000, "T1"])
+    ws.append([vid, "kein Datum", "Service", "Werkstatt", 18000, None])
+    buf = io.BytesIO()
+    wb.save(buf)
+    r = client.post(
+        "/vehicles/entries/import",
+        files={"file": ("rows.bin", buf.getvalue(), "application/octet-stream")},
+        params={"format": "xlsx"},
+    )
+    assert r.status_code == 200, r.text
+    assert (r.json()["inserted"], r.json()["failed"]) == (1, 1)
+    assert r.json()["errors"][0] == {"row": 2, "error": "invalid_row", "field": "date"}
+
+    assert len(client.get(f"/vehicles/{vid}/entries").json()) == 3
+
+
+def test_unsupported_or_unreadable_files_are_rejected(db, monkeypatch):
+    client = _client(db, monkeypatch)
+    r = client.post("/vehicles/entries/import", files={"file": ("rows.txt", b"x", "text/plain")})
+    assert r.status_code == 415
+    r = client.post("/vehicles/entries/import", files={"file": ("rows.xlsx", b"not a zip", "application/octet-stream")})
+    assert r.status_code == 400
+
+
+def test_batches_commit_independently_and_respect_row_limit(db):
+    from app.routers.vehicles import VehicleEntryCreateIn
+
+    vid = _vehicle(db, "w1")
+    body = "\n".join(json.dumps(_row(vid, d)) for d in range(1, 8)).encode()
+
+    report = import_entries(
+        db,
+        iter_rows(io.BytesIO(body), "ndjson"),
+        schema=VehicleEntryCreateIn,
+        can_write=lambda owner: owner == "w1",
+        batch_rows=2,
+        max_rows=5,
+    )
+    assert report.inserted == 5
+    assert report.errors == [{"row": 6, "error": "row_limit_exceeded", "field": None}]
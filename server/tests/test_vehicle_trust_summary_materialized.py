@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import os
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("LTC_SECRET_KEY", "dev_test_secret_key_32_chars_minimum__OK")
+
+from app.db.base import Base  # noqa: E402
+from app.models.vehicle import Vehicle, VehicleTrustSummaryRecord  # noqa: E402
+from app.models.vehicle_entry import VehicleEntry  # noqa: E402
+from app.services.vehicle_trust import (  # noqa: E402
+    check_vehicle_trust_summaries,
+    derive_vehicle_trust_summary,
+    load_vehicle_trust_summary,
+    rebuild_vehicle_trust_summaries,
+)
+
+
+@pytest.fixture()
+def engine():
+    eng = create_engine(
+        "sqlite+pysqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        future=True,
+    )
+    Base.metadata.create_all(bind=eng)
+    return eng
+
+
+@pytest.fixture()
+def db(engine):
+    session = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _vehicle(db, meta=None) -> Vehicle:
+    v = Vehicle(owner_user_id="u1", meta=meta)
+    v.set_vin_from_raw("WVWZZZ1JZXW000001")
+    db.add(v)
+    db.commit()
+    db.refresh(v)
+    return v
+
+
+def _entry(db, vehicle: Vehicle, level, *, group: str = "g1", version: int = 1, latest: bool = True) -> VehicleEntry:
+    e = VehicleEntry(
+        vehicle_id=vehicle.public_id,
+        owner_user_id=vehicle.owner_user_id,
+        entry_group_id=group,
+        version=version,
+        is_latest=latest,
+        entry_date=date(2026, 1, 1),
+        entry_type="Service",
+        performed_by="Werkstatt",
+        km=1000,
+        trust_level=level,
+    )
+    db.add(e)
+    db.commit()
+    return e
+
+
+def _row(db, vehicle: Vehicle) -> VehicleTrustSummaryRecord:
+    db.expire_all()
+    return db.get(VehicleTrustSummaryRecord, vehicle.public_id)
+
+
+def _full(db, vehicle: Vehicle):
+    entries = db.query(VehicleEntry).filter(VehicleEntry.vehicle_id == vehicle.public_id, VehicleEntry.is_latest.is_(True))
+    return derive_vehicle_trust_summary(vehicle_meta=vehicle.meta, entries=entries.all())
+
+
+def test_summary_row_follows_entries_revisions_and_meta(db):
+    v = _vehicle(db, {"accident_status": "accident_free"})
+    assert _row(db, v).history_status == "nicht_vorhanden"
+
+    _entry(db, v, "T1", group="a")
+    t3 = _entry(db, v, "T3", group="b")
+    assert _row(db, v).top_trust_level == "T3"
+    assert load_vehicle_trust_summary(db, v.public_id) == _full(db, v)
+
+    # Revision senkt das Top-Level => Neuberechnung aus den Latest-Einträgen
+    t3.is_latest = False
+    _entry(db, v, "T2", group="b", version=2)
+    assert _row(db, v).top_trust_level == "T2"
+    assert load_vehicle_trust_summary(db, v.public_id) == _full(db, v)
+
+    v.meta = {"accident_status": "accident", "accident_trust_completed": True}
+    db.commit()
+    row = _row(db, v)
+    assert row.accident_status == "nicht_unfallfrei"
+    assert "accident_trust_missing_evidence" in row.reason_codes
+    assert load_vehicle_trust_summary(db, v.public_id) == _full(db, v)
+
+    db.delete(v)
+    db.commit()
+    assert _row(db, v) is None
+
+
+def test_read_path_is_single_lookup_without_entry_scan(db, engine):
+    v = _vehicle(db, {"accident_status": "unknown"})
+    _entry(db, v, "T2")
+    vehicle_id = v.public_id
+
+    statements: list[str] = []
+
+    def _capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        summary = load_vehicle_trust_summary(db, vehicle_id)
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+
+    assert summary.top_trust_level == "T2"
+    assert len(statements) == 1
+    assert "vehicle_trust_summaries" in statements[0]
+    assert "vehicle_entries" not in statements[0]
+
+
+def test_missing_row_is_backfilled_and_unknown_vehicle_is_none(db):
+    v = _vehicle(db)
+    _entry(db, v, "T3")
+    db.execute(text("DELETE FROM vehicle_trust_summaries"))
+    db.commit()
+
+    assert load_vehicle_trust_summary(db, v.public_id).top_trust_level == "T3"
+    assert _row(db, v) is not None
+    assert load_vehicle_trust_summary(db, "does-not-exist") is None
+
+
+def test_backfill_leaves_callers_pending_work_alone(db):
+    v = _vehicle(db)
+    db.execute(text("DELETE FROM vehicle_trust_summaries"))
+    db.commit()
+
+    pending = Vehicle(owner_user_id="u2")
+    db.add(pending)
+    assert load_vehicle_trust_summary(db, v.public_id) is not None
+    # Backfill in eigener Transaktion: kein commit/rollback der Request-Session
+    assert pending in db.new
+    assert _row(db, v) is not None
+
+
+def test_check_and_rebuild_repair_drift(db):
+    a = _vehicle(db, {"accident_status": "accident_free"})
+    b = _vehicle(db)
+    _entry(db, a, "T3")
+    assert check_vehicle_trust_summaries(db) == {"missing": [], "stale": [], "orphaned": []}
+
+    # Drift erzeugen (z. B. Altbestand oder Schreiben an der ORM vorbei)
+    db.execute(text("UPDATE vehicle_trust_summaries SET trust_light = 'rot' WHERE vehicle_id = :v"), {"v": a.public_id})
+    db.execute(text("DELETE FROM vehicle_trust_summaries WHERE vehicle_id = :v"), {"v": b.public_id})
+    db.execute(
+        text(
+            "INSERT INTO vehicle_trust_summaries (vehicle_id, rules_version, has_entries, accident_status, "
+            "accident_trust_completed, trust_light, hint, reason_codes, todo_codes, verification_level, "
+            "history_status, evidence_status, updated_at) "
+            "VALUES ('ghost', 1, 0, 'unbekannt', 0, 'rot', 'x', '[]', '[]', 'niedrig', 'x', 'x', '2026-01-01')"
+        )
+    )
+    db.commit()
+
+    report = check_vehicle_trust_summaries(db)
+    assert report == {"missing": [b.public_id], "stale": [a.public_id], "orphaned": ["ghost"]}
+
+    assert rebuild_vehicle_trust_summaries(db) == 3
+    assert check_vehicle_trust_summaries(db) == {"missing": [], "stale": [], "orphaned": []}
+    assert _row(db, a).trust_light == _full(db, a).trust_light
+
+
+def test_vehicle_router_entries_update_summary(db, monkeypatch):
+    from app.routers import vehicles as vehicles_mod
+
+    app = FastAPI()
+    app.include_router(vehicles_mod.router)
+
+    def _get_db():
+        yield db
+
+    app.dependency_overrides[vehicles_mod.get_db] = _get_db
+    app.dependency_overrides[vehicles_mod.require_actor] = lambda: {"user_id": "u1", "role": "user"}
+    monkeypatch.setattr(vehicles_mod, "require_consent", lambda db, actor: None, raising=True)
+    client = TestClient(app)
+
+    v = _vehicle(db, {"accident_status": "accident_free"})
+    body = {"date": "2026-02-01", "type": "Service", "performed_by": "Werkstatt", "km": 10}
+    r = client.post(f"/vehicles/{v.public_id}/entries", json={**body, "trust_level": "T3"})
+    assert r.status_code == 201, r.text
+    assert client.get(f"/vehicles/{v.public_id}/trust-summary").json()["trust_light"] == "gruen"
+
+    r = client.post(f"/vehicles/{v.public_id}/entries/{r.json()['id']}/revisions", json={**body, "trust_level": "T1"})
+    assert r.status_code == 201, r.text
+    data = client.get(f"/vehicles/{v.public_id}/trust-summary").json()
+    assert data["top_trust_level"] == "T1"
+    assert data["verification_level"] == "niedrig"
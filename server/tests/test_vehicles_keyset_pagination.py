@@ -0,0 +1,144 @@
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("LTC_SECRET_KEY", "dev_test_secret_key_32_chars_minimum__OK")
+
+
+class ActorStub(dict):
+    def __getattr__(self, item):
+        return self.get(item)
+
+
+def _mem_db():
+    engine = create_engine(
+        "sqlite+pysqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        future=True,
+    )
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
+
+    from app.db.base import Base  # type: ignore
+    from app.models.vehicle import Vehicle  # noqa: F401
+    from app.models.vehicle_entry import VehicleEntry  # noqa: F401
+
+    Base.metadata.create_all(bind=engine)
+    return SessionLocal()
+
+
+def _client(db, actor: ActorStub, monkeypatch) -> TestClient:
+    from app.routers import vehicles as vehicles_mod  # type: ignore
+
+    app = FastAPI()
+    app.include_router(vehicles_mod.router)
+
+    def _get_db():
+        yield db
+
+    app.dependency_overrides[vehicles_mod.get_db] = _get_db  # type: ignore
+    app.dependency_overrides[vehicles_mod.require_actor] = lambda: actor  # type: ignore
+    monkeypatch.setattr(vehicles_mod, "require_consent", lambda db, actor: None, raising=True)
+    return TestClient(app)
+
+
+def _pages(client: TestClient, url: str, limit: int) -> list[list[dict]]:
+    pages, after = [], None
+    for _ in range(50):
+        params = {"limit": limit} if after is None else {"limit": limit, "after": after}
+        r = client.get(url, params=params)
+        assert r.status_code == 200, r.text
+        page = r.json()
+        pages.append(page)
+        # X-Next-Cursor nur solange weitere Seiten existieren
+        after = r.headers.get("X-Next-Cursor")
+        if after is None:
+            return pages
+        assert after == page[-1]["id"]
+    raise AssertionError("Pagination terminiert nicht")
+
+
+def test_vehicle_listing_pages_per_owner_and_for_admin(monkeypatch):
+    db = _mem_db()
+    try:
+        dealer = _client(db, ActorStub(user_id="d1", role="dealer"), monkeypatch)
+        other = _client(db, ActorStub(user_id="d2", role="dealer"), monkeypatch)
+        mine = [dealer.post("/vehicles", json={"vin": f"WVWZZZ1JZXW00000{i}"}).json()["id"] for i in range(5)]
+        theirs = [other.post("/vehicles", json={"vin": f"WVWZZZ1JZXW00001{i}"}).json()["id"] for i in range(2)]
+
+        pages = _pages(dealer, "/vehicles", limit=2)
+        assert [len(p) for p in pages] == [2, 2, 1]
+        assert [v["id"] for p in pages for v in p] == mine
+
+        admin = _client(db, ActorStub(user_id="a1", role="admin"), monkeypatch)
+        assert [v["id"] for p in _pages(admin, "/vehicles", limit=3) for v in p] == mine + theirs
+
+        assert dealer.get("/vehicles", params={"after": "nope"}).status_code == 400
+        # fremdes Fahrzeug als Cursor: wie unbekannt, kein Existenz-Leak
+        assert dealer.get("/vehicles", params={"after": theirs[0]}).status_code == 400
+        assert "X-Next-Cursor" not in dealer.get("/vehicles").headers
+        assert dealer.get("/vehicles", params={"limit": 10_000}).status_code == 422
+    finally:
+        db.close()
+
+
+def test_entry_listing_pages_in_date_order_with_revision_counts(monkeypatch):
+    db = _mem_db()
+    try:
+        client = _client(db, ActorStub(user_id="u1", role="user"), monkeypatch)
+        vehicle_id = client.post("/vehicles", json={"vin": "WVWZZZ1JZXW000001"}).json()["id"]
+
+        created = []
+        for day in (3, 1, 5, 2, 4):
+            r = client.post(
+                f"/vehicles/{vehicle_id}/entries",
+                json={"date": f"2026-01-0{day}", "type": "Service", "performed_by": "Werkstatt", "km": day * 1000},
+            )
+            assert r.status_code == 201, r.text
+            created.append(r.json())
+
+        # zwei Revisionen für den Eintrag vom 05.01.
+        head = next(e for e in created if e["date"] == "2026-01-05")
+        for km in (5100, 5200):
+            head = client.post(
+                f"/vehicles/{vehicle_id}/entries/{head['id']}/revisions",
+                json={"date": "2026-01-05", "type": "Service", "performed_by": "Werkstatt", "km": km},
+            ).json()
+
+        pages = _pages(client, f"/vehicles/{vehicle_id}/entries", limit=2)
+        entries = [e for p in pages for e in p]
+        assert [e["date"] for e in entries] == [f"2026-01-0{d}" for d in (5, 4, 3, 2, 1)]
+        assert entries[0]["id"] == head["id"]
+        assert entries[0]["revision_count"] == 3
+        assert all(e["revision_count"] == 1 for e in entries[1:])
+
+        # Cursor auf nicht mehr aktuelle Revision ist ungültig
+        stale = next(e for e in created if e["date"] == "2026-01-05")["id"]
+        assert client.get(f"/vehicles/{vehicle_id}/entries", params={"after": stale}).status_code == 400
+    finally:
+        db.close()
+
+
+def test_listing_queries_use_composite_indexes():
+    db = _mem_db()
+    try:
+        entries_plan = db.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT id FROM vehicle_entries WHERE vehicle_id = 'v' AND is_latest = 1 "
+                "ORDER BY entry_date DESC, created_at DESC, id DESC LIMIT 50"
+            )
+        ).fetchall()
+        vehicles_plan = db.execute(
+            text("EXPLAIN QUERY PLAN SELECT id FROM vehicles WHERE owner_user_id = 'u' AND id > 10 ORDER BY id LIMIT 50")
+        ).fetchall()
+    finally:
+        db.close()
+
+    assert any("ix_vehicle_entries_latest_listing" in str(r) for r in entries_plan)
+    assert not any("TEMP B-TREE" in str(r) for r in entries_plan)
+    assert any("ix_vehicles_owner" in str(r) for r in vehicles_plan)
+    assert not any("TEMP B-TREE" in str(r) for r in vehicles_plan)